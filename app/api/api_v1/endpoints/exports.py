@@ -315,7 +315,7 @@ async def download_export_file(
     try:
         # Get file from storage
         storage_service = StorageService()
-        file_content = await storage_service.get_file_content(job.file_path)
+        file_content = await storage_service.get_file_content(job.file_path, bypass_cache=True)
 
         # Determine media type
         if job.file_path.endswith('.json'):
@@ -500,7 +500,7 @@ async def download_staged_export(
 
         # Get file from storage
         storage_service = StorageService()
-        file_content = await storage_service.get_file_content(staged_export.file_name)
+        file_content = await storage_service.get_file_content(staged_export.file_name, bypass_cache=True)
 
         # Determine media type
         media_type = "application/json" if staged_export.format == ExportFormat.JSON else "text/csv"
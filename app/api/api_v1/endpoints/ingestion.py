@@ -2,7 +2,6 @@
 Enhanced ingestion API endpoints with comprehensive file handling and deduplication.
 """
 
-import asyncio
 import hashlib
 import logging
 import time
@@ -40,6 +39,8 @@ from app.services.ingestion_service import IngestionService
 from app.services.deduplication_service import DeduplicationService
 from app.services.signed_url_service import SignedUrlService
 from app.services.idempotency_service import IdempotencyService, IdempotencyOperationType
+from app.services.upload_staging import upload_stager
+from app.services.batch_ingestion_pipeline import BatchIngestionPipeline
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -76,18 +77,15 @@ async def upload_file(
     """
     logger.info(f"Uploading file: {file.filename} (size: {file.size or 'unknown'})")
 
+    staged = None
     try:
         # Validate file upload
         if not file.filename:
             raise HTTPException(status_code=400, detail="Filename is required")
 
-        # Read file content for hashing and idempotency key generation
-        file_content = await file.read()
-        await file.seek(0)  # Reset file pointer for later processing
-
-        # Calculate file hash for idempotency
-        import hashlib
-        file_hash = hashlib.sha256(file_content).hexdigest()
+        # Stream the upload to a temp file, hashing it for idempotency on the way
+        staged = await upload_stager.stage(file, file.filename, file.content_type)
+        file_hash = staged.file_hash
 
         # Generate idempotency key if not provided
         if not idempotency_key:
@@ -144,7 +142,7 @@ async def upload_file(
 
         # Ingest file with comprehensive processing
         ingestion_result = await ingestion_service.ingest_file(
-            file_content=file_content,
+            file_content=staged,
             filename=file.filename,
             content_type=file.content_type,
             vendor_id=vendor_id,
@@ -196,6 +194,9 @@ async def upload_file(
             await idempotency_service.mark_operation_failed(db, idempotency_key, {"error": str(e)})
         logger.error(f"Unexpected error uploading file {file.filename}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if staged is not None:
+            staged.cleanup()
 
 
 @router.post("/batch-upload")
@@ -250,7 +251,6 @@ async def batch_upload_files(
     }
 
     validated_files = []
-    total_file_size = 0
     duplicate_count = 0
 
     for file in files:
@@ -281,207 +281,102 @@ async def batch_upload_files(
             )
 
         validated_files.append(file)
-        total_file_size += file.size or 0
 
     if not validated_files:
         raise HTTPException(status_code=400, detail="No valid files provided")
 
+    # Stream the files to temp files concurrently, hashing them and enforcing the size limit in chunks
+    batch_pipeline = BatchIngestionPipeline(ingestion_service, idempotency_service)
+    try:
+        batch_items = await batch_pipeline.stage_uploads(validated_files, max_size=MAX_FILE_SIZE)
+    except IngestionException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total_file_size = sum(item.staged.size for item in batch_items)
+
     # Generate batch idempotency key if not provided
     if not idempotency_key:
-        file_hashes = []
-        for file in validated_files:
-            content = await file.read()
-            file_hash = hashlib.sha256(content).hexdigest()
-            file_hashes.append(file_hash[:8])  # Use first 8 chars for batch key
-            await file.seek(0)  # Reset file pointer
+        # Use first 8 chars of each file hash for the batch key
+        file_hashes = [item.staged.file_hash[:8] for item in batch_items]
 
         batch_hash = hashlib.sha256("".join(sorted(file_hashes)).encode()).hexdigest()[:16]
         idempotency_key = f"batch_{batch_hash}_{int(time.time())}"
 
-    # Check for existing batch idempotency record
-    existing_record, is_new = await idempotency_service.check_and_create_idempotency_record(
-        db=db,
-        idempotency_key=idempotency_key,
-        operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
-        operation_data={
-            "batch_upload": True,
-            "file_count": len(validated_files),
-            "total_size": total_file_size,
-            "vendor_id": vendor_id,
-            "source_type": source_type,
-            "source_reference": source_reference,
-            "uploaded_by": uploaded_by,
-        },
-        user_id=uploaded_by,
-        client_ip=request.client.host if request else None,
-    )
+    try:
+        # Check for existing batch idempotency record
+        existing_record, is_new = await idempotency_service.check_and_create_idempotency_record(
+            db=db,
+            idempotency_key=idempotency_key,
+            operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+            operation_data={
+                "batch_upload": True,
+                "file_count": len(validated_files),
+                "total_size": total_file_size,
+                "vendor_id": vendor_id,
+                "source_type": source_type,
+                "source_reference": source_reference,
+                "uploaded_by": uploaded_by,
+            },
+            user_id=uploaded_by,
+            client_ip=request.client.host if request else None,
+        )
 
-    if not is_new:
-        # Return existing batch result
-        if existing_record.operation_status.value == "completed":
-            logger.info(f"Returning existing batch result for idempotency key: {idempotency_key}")
-            return existing_record.result_data
-        elif existing_record.operation_status.value == "in_progress":
-            raise HTTPException(
-                status_code=409,
-                detail="Batch upload is already in progress with the same idempotency key"
-            )
-        else:
-            # Check if we can retry failed batch operation
-            if existing_record.execution_count < existing_record.max_executions:
-                await idempotency_service.mark_operation_started(db, idempotency_key)
-            else:
+        if not is_new:
+            # Return existing batch result
+            if existing_record.operation_status.value == "completed":
+                logger.info(f"Returning existing batch result for idempotency key: {idempotency_key}")
+                batch_pipeline.discard(batch_items)
+                return existing_record.result_data
+            elif existing_record.operation_status.value == "in_progress":
                 raise HTTPException(
                     status_code=409,
-                    detail=f"Batch upload with idempotency key has failed and exceeded retry limit"
+                    detail="Batch upload is already in progress with the same idempotency key"
                 )
-    else:
-        # Mark new batch operation as started
-        await idempotency_service.mark_operation_started(db, idempotency_key)
+            else:
+                # Check if we can retry failed batch operation
+                if existing_record.execution_count < existing_record.max_executions:
+                    await idempotency_service.mark_operation_started(db, idempotency_key)
+                else:
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Batch upload with idempotency key has failed and exceeded retry limit"
+                    )
+        else:
+            # Mark new batch operation as started
+            await idempotency_service.mark_operation_started(db, idempotency_key)
+    except Exception:
+        batch_pipeline.discard(batch_items)
+        raise
 
-    # Process files concurrently
+    # Run the files through the staged pipeline
     batch_id = str(uuid.uuid4())
     results = []
     successful_uploads = 0
     failed_uploads = 0
 
-    async def process_single_file(file: UploadFile) -> Dict[str, Any]:
-        """Process a single file in the batch."""
-        try:
-            # Read file content
-            file_content = await file.read()
-            file_hash = hashlib.sha256(file_content).hexdigest()
-
-            # Generate file-specific idempotency key
-            file_idempotency_key = idempotency_service.generate_idempotency_key(
-                operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
-                vendor_id=vendor_id,
-                file_hash=file_hash,
-                user_id=uploaded_by,
-                additional_context={
-                    "filename": file.filename,
-                    "source_type": source_type,
-                    "batch_id": batch_id,
-                }
-            )
-
-            # Check for existing file idempotency record
-            file_existing_record, file_is_new = await idempotency_service.check_and_create_idempotency_record(
-                db=db,
-                idempotency_key=file_idempotency_key,
-                operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
-                operation_data={
-                    "filename": file.filename,
-                    "vendor_id": vendor_id,
-                    "source_type": source_type,
-                    "source_reference": source_reference,
-                    "uploaded_by": uploaded_by,
-                    "file_hash": file_hash,
-                    "batch_id": batch_id,
-                },
-                user_id=uploaded_by,
-                client_ip=request.client.host if request else None,
-            )
-
-            if not file_is_new:
-                if file_existing_record.operation_status.value == "completed":
-                    logger.info(f"Returning existing file result for {file.filename}")
-                    return {
-                        "success": True,
-                        "is_duplicate": True,
-                        "result": file_existing_record.result_data
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"File {file.filename} has existing operation with status: {file_existing_record.operation_status.value}"
-                    }
-
-            # Mark file operation as started
-            await idempotency_service.mark_operation_started(db, file_idempotency_key)
-
-            # Ingest file
-            ingestion_result = await ingestion_service.ingest_file(
-                file_content=file_content,
-                filename=file.filename,
-                content_type=file.content_type,
-                vendor_id=vendor_id,
-                source_type=source_type,
-                source_reference=source_reference,
-                uploaded_by=uploaded_by,
-                user_id=getattr(request.state, 'user_id', None),
-                request=request,
-            )
-
-            # Transform to response format
-            response_data = {
-                "id": ingestion_result["ingestion_job_id"],
-                "original_filename": file.filename,
-                "file_size_bytes": ingestion_result["file_size"],
-                "file_hash_sha256": ingestion_result["file_hash"],
-                "status": ingestion_result["status"],
-                "storage_path": ingestion_result["storage_path"],
-                "duplicate_analysis": ingestion_result.get("duplicate_analysis", {}),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "estimated_processing_time_seconds": ingestion_result.get("estimated_processing_time", 0),
-                "idempotency_key": file_idempotency_key,
-                "batch_id": batch_id,
-            }
-
-            # Mark file operation as completed
-            await idempotency_service.mark_operation_completed(db, file_idempotency_key, response_data)
-
-            return {
-                "success": True,
-                "is_duplicate": False,
-                "result": response_data
-            }
-
-        except Exception as e:
-            logger.error(f"Error processing file {file.filename}: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
-        finally:
-            # Reset file pointer
-            await file.seek(0)
-
-    # Process all files concurrently with limited concurrency
-    MAX_CONCURRENT_UPLOADS = 10
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
-
-    async def process_with_semaphore(file):
-        async with semaphore:
-            return await process_single_file(file)
-
-    # Run concurrent processing
-    processing_tasks = [process_with_semaphore(file) for file in validated_files]
-    processing_results = await asyncio.gather(*processing_tasks, return_exceptions=True)
+    await batch_pipeline.run(
+        batch_items,
+        batch_id,
+        vendor_id=vendor_id,
+        source_type=source_type,
+        source_reference=source_reference,
+        uploaded_by=uploaded_by,
+        user_id=getattr(request.state, 'user_id', None),
+        request=request,
+    )
 
     # Process results
     file_results = []
-    for i, result in enumerate(processing_results):
-        filename = validated_files[i].filename
-
-        if isinstance(result, Exception):
-            file_results.append({
-                "success": False,
-                "error": f"Processing error: {str(result)}",
-                "original_filename": filename,
-                "status": "error"
-            })
-            failed_uploads += 1
-        elif result["success"]:
-            file_results.append(result["result"])
+    for item in batch_items:
+        if item.result is not None:
+            file_results.append(item.result)
             successful_uploads += 1
-            if result["is_duplicate"]:
+            if item.is_duplicate:
                 duplicate_count += 1
         else:
             file_results.append({
                 "success": False,
-                "error": result["error"],
-                "original_filename": filename,
+                "error": item.error,
+                "original_filename": item.filename,
                 "status": "error"
             })
             failed_uploads += 1
@@ -788,18 +683,13 @@ async def access_file_via_signed_url(
             db=db,
         )
 
-        # Get file content from storage
-        file_content = await ingestion_service.storage_service.get_file_content(
-            job.storage_path
-        )
-
-        # Return file as streaming response
+        # Stream file content from storage without reading it whole
         return StreamingResponse(
-            iter([file_content]),
+            ingestion_service.storage_service.iter_file_content(job.storage_path),
             media_type=job.mime_type,
             headers={
                 "Content-Disposition": f"attachment; filename={job.original_filename}",
-                "Content-Length": str(len(file_content)),
+                "Content-Length": str(job.file_size_bytes),
                 "X-File-ID": str(job.id),
                 "X-Access-Count": str(signed_url_record.access_count),
             }
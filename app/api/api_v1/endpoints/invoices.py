@@ -2,7 +2,6 @@
 Invoice management endpoints.
 """
 
-import hashlib
 import logging
 import uuid
 from typing import List, Optional, Dict, Any
@@ -21,10 +20,11 @@ from app.api.schemas import (
     InvoiceListResponse,
 )
 from app.core.config import settings
-from app.core.exceptions import APIntakeException, StorageException
+from app.core.exceptions import APIntakeException, IngestionException, StorageException
 from app.db.session import get_db
 from app.models.invoice import Invoice, InvoiceStatus, InvoiceExtraction, Validation
 from app.services.storage_service import StorageService
+from app.services.upload_staging import upload_stager
 from app.workers.invoice_tasks import process_invoice_task
 
 logger = logging.getLogger(__name__)
@@ -192,6 +192,7 @@ async def upload_invoice(
     """Upload and process an invoice file."""
     logger.info(f"Uploading invoice file: {file.filename}")
 
+    staged = None
     try:
         # Validate file type
         if not file.filename:
@@ -204,17 +205,16 @@ async def upload_invoice(
                 detail=f"File type '{file_extension}' not allowed. Allowed types: {settings.ALLOWED_FILE_TYPES}"
             )
 
-        # Validate file size
-        content = await file.read()
-        file_size_mb = len(content) / (1024 * 1024)
-        if file_size_mb > settings.MAX_FILE_SIZE_MB:
+        # Stream to a temp file in chunks, hashing and enforcing the size limit on the way
+        try:
+            staged = await upload_stager.stage(file, file.filename, file.content_type)
+        except IngestionException:
             raise HTTPException(
                 status_code=400,
-                detail=f"File size {file_size_mb:.1f}MB exceeds maximum {settings.MAX_FILE_SIZE_MB}MB"
+                detail=f"File size exceeds maximum {settings.MAX_FILE_SIZE_MB}MB"
             )
-
-        # Calculate file hash
-        file_hash = hashlib.sha256(content).hexdigest()
+        file_size_mb = staged.size / (1024 * 1024)
+        file_hash = staged.file_hash
 
         # Check for duplicate files
         result = await db.execute(select(Invoice).where(Invoice.file_hash == file_hash))
@@ -229,7 +229,7 @@ async def upload_invoice(
         # Store file
         storage_service = StorageService()
         storage_info = await storage_service.store_file(
-            content,
+            staged,
             file.filename,
             content_type=file.content_type
         )
@@ -266,6 +266,9 @@ async def upload_invoice(
     except Exception as e:
         logger.error(f"Unexpected error during upload: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if staged is not None:
+            staged.cleanup()
 
 
 @router.get("/", response_model=InvoiceListResponse)
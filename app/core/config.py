@@ -56,8 +56,26 @@ class Settings(BaseSettings):
 
     # Enhanced Local Storage Configuration
     STORAGE_COMPRESSION_ENABLED: bool = True
-    STORAGE_COMPRESSION_TYPE: str = "gzip"  # gzip, lz4, none
+    STORAGE_COMPRESSION_TYPE: str = "gzip"  # gzip, lz4, zstd, none
+    STORAGE_ZSTD_LEVEL: int = 9
+    STORAGE_ZSTD_DICTIONARY_PATH: str = "./zstd_dictionaries"
+    STORAGE_ZSTD_DICTIONARY_ID: int = 0  # trained dictionary for new PDF objects; 0 = none
     STORAGE_COMPRESSION_THRESHOLD: int = 1024  # bytes
+    STORAGE_AUDIT_DEFERRED: bool = True  # bulk-write audit rows from a background flusher
+    STORAGE_AUDIT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    STORAGE_AUDIT_FLUSH_BATCH_SIZE: int = 500
+    STORAGE_AUDIT_QUEUE_MAX_ROWS: int = 10000  # buffered rows before spilling to disk
+    STORAGE_AUDIT_SPILL_ENABLED: bool = True  # spill to STORAGE_PATH/audit_spill instead of dropping
+    STORAGE_USAGE_BATCHED: bool = True  # coalesce access-time updates per hash
+    STORAGE_USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    STORAGE_LAYOUT: str = "legacy"  # legacy (organized path + originals/ copy) or content_addressed
+    STORAGE_BACKUP_MODE: str = "replicate"  # content_addressed only: link, replicate, none
+    STORAGE_BACKUP_PATH: str = "./storage_backup"
+    STORAGE_REPLICATION_MAX_BYTES_PER_SECOND: int = 20 * 1024 * 1024
+    STORAGE_CACHE_ENABLED: bool = True  # per-process LRU of decompressed document bytes
+    STORAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    STORAGE_CACHE_MAX_ITEM_BYTES: int = 32 * 1024 * 1024
+    STORAGE_CACHE_TTL_SECONDS: float = 300.0
 
     # AWS S3 configuration
     AWS_ACCESS_KEY_ID: Optional[str] = None
@@ -65,11 +83,38 @@ class Settings(BaseSettings):
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: Optional[str] = None
     S3_ENDPOINT_URL: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: int = 50
+    S3_MULTIPART_THRESHOLD_BYTES: int = 16 * 1024 * 1024
+    S3_MULTIPART_PART_SIZE_BYTES: int = 8 * 1024 * 1024  # also the ranged GET size; S3 minimum is 5 MB
+    S3_TRANSFER_CONCURRENCY: int = 8  # parts or ranges in flight per transfer
 
     # Docling configuration
     DOCLING_CONFIDENCE_THRESHOLD: float = 0.85
     DOCLING_MAX_PAGES: int = 50
     DOCLING_TIMEOUT: int = 30
+    DOCLING_CONVERTER_POOL_SIZE: int = 1  # warm converters per worker process; process-pool children keep one
+    DOCLING_WARMUP_ON_WORKER_INIT: bool = True
+    # "inline" converts on the calling thread; "process" uses a spawned process pool
+    # (needs a non-daemonic host, e.g. the API or a threads/solo Celery pool)
+    DOCLING_EXECUTION_MODE: str = "inline"
+    DOCLING_EXECUTOR_MAX_WORKERS: int = 2  # conversion parallelism per node
+    DOCLING_STREAM_THRESHOLD_PAGES: int = 10  # longer PDFs are converted page range by page range
+    DOCLING_STREAM_CHUNK_PAGES: int = 2
+
+    # Extraction result cache (keyed by file sha256 + parser version/options)
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_BACKEND: str = "disk"  # disk or redis
+    EXTRACTION_CACHE_PATH: str = "./storage/extraction_cache"
+    EXTRACTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Near-duplicate (MinHash/LSH) index for fuzzy deduplication
+    NEAR_DUPLICATE_NUM_PERM: int = 128
+    NEAR_DUPLICATE_LSH_BANDS: int = 32  # rows per band = NUM_PERM / BANDS
+    NEAR_DUPLICATE_SHINGLE_SIZE: int = 3  # words per shingle
+    NEAR_DUPLICATE_MAX_CANDIDATES: int = 50
+
+    # Temporal deduplication: top-K jobs scored in SQL
+    TEMPORAL_DEDUP_MAX_CANDIDATES: int = 20
 
     # LangGraph configuration
     LANGGRAPH_PERSIST_PATH: str = "./langgraph_storage"
@@ -120,6 +165,9 @@ class Settings(BaseSettings):
 
     # File handling
     MAX_FILE_SIZE_MB: int = 25
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024  # uploads are staged to disk in chunks of this size
+    BATCH_UPLOAD_HASH_CONCURRENCY: int = 8  # files staged and hashed at once per batch
+    BATCH_UPLOAD_STORAGE_CONCURRENCY: int = 10  # files validated and stored at once per batch
     ALLOWED_FILE_TYPES: List[str] = ["pdf", "jpeg", "jpg", "png"]
 
     @field_validator("ALLOWED_FILE_TYPES", mode="before")
@@ -130,6 +178,10 @@ class Settings(BaseSettings):
             return [i.strip().lower() for i in v.split(",")]
         return v
 
+    # Validation configuration
+    VALIDATION_RULE_CONCURRENCY: int = 4  # database-backed rules run at once per invoice
+    VALIDATION_BATCH_CHUNK_SIZE: int = 500  # invoices per batch re-validation chunk
+
     # Background worker configuration
     WORKER_CONCURRENCY: int = 4
     WORKER_PREFETCH_MULTIPLIER: int = 1
@@ -172,6 +224,42 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
 
+    @field_validator("DOCLING_EXECUTION_MODE", mode="before")
+    @classmethod
+    def validate_docling_execution_mode(cls, v):
+        """Validate Docling execution mode."""
+        valid_modes = ["inline", "process"]
+        if v not in valid_modes:
+            raise ValueError(f"Docling execution mode must be one of {valid_modes}")
+        return v
+
+    @field_validator("EXTRACTION_CACHE_BACKEND", mode="before")
+    @classmethod
+    def validate_extraction_cache_backend(cls, v):
+        """Validate extraction cache backend."""
+        valid_backends = ["disk", "redis"]
+        if v not in valid_backends:
+            raise ValueError(f"Extraction cache backend must be one of {valid_backends}")
+        return v
+
+    @field_validator("STORAGE_LAYOUT", mode="before")
+    @classmethod
+    def validate_storage_layout(cls, v):
+        """Validate local storage layout."""
+        valid_layouts = ["legacy", "content_addressed"]
+        if v not in valid_layouts:
+            raise ValueError(f"Storage layout must be one of {valid_layouts}")
+        return v
+
+    @field_validator("STORAGE_BACKUP_MODE", mode="before")
+    @classmethod
+    def validate_storage_backup_mode(cls, v):
+        """Validate storage backup mode."""
+        valid_modes = ["link", "replicate", "none"]
+        if v not in valid_modes:
+            raise ValueError(f"Storage backup mode must be one of {valid_modes}")
+        return v
+
     @field_validator("LOG_LEVEL", mode="before")
     @classmethod
     def validate_log_level(cls, v):
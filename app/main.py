@@ -147,6 +147,26 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Shutdown
     logger.info("Shutting down AP Intake & Validation API")
 
+    if settings.DOCLING_EXECUTION_MODE == "process":
+        from app.services.docling_executor import docling_process_executor
+        docling_process_executor.shutdown(wait=False)
+
+    if settings.STORAGE_AUDIT_DEFERRED:
+        from app.services.storage_metadata import storage_audit_flusher
+        await storage_audit_flusher.shutdown()
+
+    if settings.STORAGE_USAGE_BATCHED:
+        from app.services.storage_metadata import storage_usage_accumulator
+        await storage_usage_accumulator.shutdown()
+
+    if settings.STORAGE_LAYOUT == "content_addressed":
+        from app.services.storage_replication import storage_replicator
+        await storage_replicator.shutdown()
+
+    if settings.STORAGE_TYPE.lower() == "s3":
+        from app.services.s3_storage_backend import s3_storage_backend
+        await s3_storage_backend.close()
+
 
 # Create FastAPI application
 app = FastAPI(
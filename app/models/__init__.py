@@ -5,6 +5,7 @@ Database models for the AP Intake & Validation system.
 from .invoice import (
     Invoice,
     InvoiceExtraction,
+    InvoiceFingerprint,
     Validation,
     Exception,
     StagedExport,
@@ -51,6 +52,7 @@ from .metrics import (
 __all__ = [
     "Invoice",
     "InvoiceExtraction",
+    "InvoiceFingerprint",
     "Validation",
     "Exception",
     "StagedExport",
@@ -9,6 +9,7 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     CheckConstraint,
     Column,
@@ -22,6 +23,8 @@ from sqlalchemy import (
     UniqueConstraint,
     Integer,
     Float,
+    LargeBinary,
+    SmallInteger,
     ARRAY
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -128,6 +131,8 @@ class IngestionJob(Base, UUIDMixin, TimestampMixin):
         Index('idx_ingestion_duplicate_group', 'duplicate_group_id'),
         Index('idx_ingestion_processing_window', 'processing_started_at', 'status'),
         Index('idx_ingestion_error_code', 'error_code', 'created_at'),
+        # Covers the temporal dedup range scan and its scoring columns
+        Index('idx_ingestion_temporal_dedup', 'created_at', 'vendor_id', 'file_extension', 'file_size_bytes'),
         # Unique constraints for data integrity
         UniqueConstraint('file_hash_sha256', name='uq_ingestion_file_hash'),
         # Check constraints
@@ -245,6 +250,58 @@ class SignedUrl(Base, UUIDMixin, TimestampMixin):
         return f"<SignedUrl(id={self.id}, token={self.url_token}, expires={self.expires_at})>"
 
 
+class DocumentMinHash(Base, UUIDMixin, TimestampMixin):
+    """MinHash signature of an ingested document's text for near-duplicate search."""
+
+    __tablename__ = "document_minhashes"
+
+    ingestion_job_id = Column(
+        UUID(as_uuid=True), ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    signature = Column(LargeBinary, nullable=False)  # uint32 array, one value per permutation
+    num_perm = Column(SmallInteger, nullable=False)
+    shingle_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DocumentMinHash(job={self.ingestion_job_id}, shingles={self.shingle_count})>"
+
+
+class DocumentTextSidecar(Base, UUIDMixin, TimestampMixin):
+    """Compressed plain text and shingle hashes captured when a document is first parsed."""
+
+    __tablename__ = "document_text_sidecars"
+
+    ingestion_job_id = Column(
+        UUID(as_uuid=True), ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    text_compressed = Column(LargeBinary, nullable=False)  # lz4 frame of UTF-8 text
+    text_length = Column(Integer, nullable=False, default=0)
+    shingle_hashes = Column(LargeBinary, nullable=False)  # sorted unique uint32 array
+    extraction_method = Column(String(50), nullable=False)
+
+    def __repr__(self):
+        return f"<DocumentTextSidecar(job={self.ingestion_job_id}, chars={self.text_length})>"
+
+
+class DocumentLSHBucket(Base):
+    """LSH band bucket membership; one row per (band, document)."""
+
+    __tablename__ = "document_lsh_buckets"
+
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    ingestion_job_id = Column(
+        UUID(as_uuid=True), ForeignKey("ingestion_jobs.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    __table_args__ = (
+        Index('idx_lsh_bucket_job', 'ingestion_job_id'),
+    )
+
+    def __repr__(self):
+        return f"<DocumentLSHBucket(band={self.band}, bucket={self.bucket}, job={self.ingestion_job_id})>"
+
+
 class DeduplicationRule(Base, UUIDMixin, TimestampMixin):
     """Configurable deduplication rules and strategies."""
 
@@ -3,21 +3,30 @@ Invoice-related database models.
 """
 
 import enum
+import re
 import uuid
-from typing import Optional
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Optional
 
 from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Column,
+    Date,
     DateTime,
     Enum,
     ForeignKey,
     Index,
     JSON,
+    Numeric,
     String,
     Text,
     UniqueConstraint,
+    delete,
+    event,
+    insert,
+    select,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -122,6 +131,122 @@ class InvoiceExtraction(Base, UUIDMixin, TimestampMixin):
         return f"<InvoiceExtraction(id={self.id}, invoice_id={self.invoice_id})>"
 
 
+def normalize_vendor_key(vendor_name: Optional[str]) -> Optional[str]:
+    """Normalise a vendor name for duplicate matching ("ACME, Inc." -> "acme inc")."""
+    if not vendor_name:
+        return None
+    key = re.sub(r"[^a-z0-9]+", " ", str(vendor_name).lower()).strip()
+    return key[:255] or None
+
+
+def normalize_invoice_number_key(invoice_number: Optional[str]) -> Optional[str]:
+    """Normalise an invoice number for duplicate matching ("inv-00123" -> "INV00123")."""
+    if not invoice_number:
+        return None
+    key = re.sub(r"[^A-Z0-9]", "", str(invoice_number).upper())
+    return key[:100] or None
+
+
+class InvoiceFingerprint(Base, UUIDMixin, TimestampMixin):
+    """Normalised duplicate-detection keys for an invoice's latest extraction."""
+
+    __tablename__ = "invoice_fingerprints"
+
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, unique=True)
+    extraction_id = Column(UUID(as_uuid=True), ForeignKey("invoice_extractions.id", ondelete="CASCADE"), nullable=False)
+    vendor_id = Column(UUID(as_uuid=True), ForeignKey("vendors.id"), nullable=True)
+
+    # Duplicate keys
+    vendor_key = Column(String(255), nullable=True)
+    invoice_number_key = Column(String(100), nullable=True)
+    total_amount = Column(Numeric(15, 2), nullable=True)
+    invoice_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index('idx_fingerprint_vendor_key_number', 'vendor_key', 'invoice_number_key'),
+        Index('idx_fingerprint_vendor_id_number', 'vendor_id', 'invoice_number_key'),
+    )
+
+    @staticmethod
+    def keys_from_header(header: Dict[str, Any]) -> Dict[str, Any]:
+        """Build fingerprint key columns from an extracted header."""
+        header = header or {}
+        return {
+            "vendor_key": normalize_vendor_key(header.get("vendor_name")),
+            "invoice_number_key": normalize_invoice_number_key(
+                header.get("invoice_number") or header.get("invoice_no")
+            ),
+            "total_amount": _fingerprint_amount(
+                header.get("total_amount") if header.get("total_amount") is not None else header.get("total")
+            ),
+            "invoice_date": _fingerprint_date(header.get("invoice_date")),
+        }
+
+    def __repr__(self):
+        return f"<InvoiceFingerprint(invoice_id={self.invoice_id}, number={self.invoice_number_key})>"
+
+
+# Amount rules shared with the backfill in migration c3d4e5f6a7b8, which applies them in SQL
+_FINGERPRINT_AMOUNT_PATTERN = re.compile(r"[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)")
+_FINGERPRINT_AMOUNT_LIMIT = Decimal("1e13")  # Numeric(15, 2)
+
+
+def _fingerprint_amount(value: Any) -> Optional[Decimal]:
+    """Parse a header amount ("$1,250.00", "-40"), ignoring values that are not plain decimals."""
+    if value is None:
+        return None
+    text = str(value).replace(",", "").replace("$", "").strip(" ")
+    if not _FINGERPRINT_AMOUNT_PATTERN.fullmatch(text):
+        return None
+    # ROUND_HALF_UP rounds ties away from zero, like Postgres ROUND(numeric)
+    amount = Decimal(text).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return amount if abs(amount) < _FINGERPRINT_AMOUNT_LIMIT else None
+
+
+def _fingerprint_date(value: Any) -> Optional[date]:
+    """Parse a header date, ignoring values that are not ISO dates."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+@event.listens_for(InvoiceExtraction, "after_insert")
+def _sync_invoice_fingerprint(mapper, connection, target: InvoiceExtraction) -> None:
+    """Point the invoice's fingerprint at its newly saved extraction."""
+    fingerprint = InvoiceFingerprint.__table__
+    connection.execute(delete(fingerprint).where(fingerprint.c.invoice_id == target.invoice_id))
+    connection.execute(
+        insert(fingerprint).values(
+            id=uuid.uuid4(),
+            invoice_id=target.invoice_id,
+            extraction_id=target.id,
+            vendor_id=select(Invoice.vendor_id).where(Invoice.id == target.invoice_id).scalar_subquery(),
+            **InvoiceFingerprint.keys_from_header(target.header_json),
+        )
+    )
+
+
+@event.listens_for(InvoiceExtraction, "after_update")
+def _sync_updated_invoice_fingerprint(mapper, connection, target: InvoiceExtraction) -> None:
+    """Re-fingerprint an updated extraction, unless a newer one supersedes it."""
+    latest_extraction_id = connection.execute(
+        select(InvoiceExtraction.id)
+        .where(InvoiceExtraction.invoice_id == target.invoice_id)
+        .order_by(InvoiceExtraction.created_at.desc())
+        .limit(1)
+    ).scalar()
+    if latest_extraction_id is not None and latest_extraction_id != target.id:
+        return
+    _sync_invoice_fingerprint(mapper, connection, target)
+
+
 class Validation(Base, UUIDMixin, TimestampMixin):
     """Validation results for invoices."""
 
@@ -0,0 +1,267 @@
+"""
+Staged pipeline for batch uploads.
+
+A batch used to run every file through idempotency claim, ingest and
+completion on the request's single session, one step after another. The
+pipeline instead runs each step for the whole batch before the next one:
+stage and hash, claim every idempotency key with one bulk check-and-create,
+validate and store, then queue every stored file in one call and record all
+results with one bulk update. The file stages have their own concurrency
+limits and the idempotency stages each use one short-lived session, so a batch
+takes about as long as its slowest file rather than the sum.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.exceptions import IngestionException
+from app.db.session import AsyncSessionLocal
+from app.services.idempotency_service import IdempotencyOperationType, IdempotencyService
+from app.services.ingestion_service import IngestionService
+from app.services.upload_staging import StagedUpload, upload_stager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """One file moving through the batch pipeline."""
+
+    filename: str
+    content_type: Optional[str]
+    staged: StagedUpload
+    idempotency_key: Optional[str] = None
+    prepared: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    is_duplicate: bool = False
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None or self.error is not None
+
+
+class BatchIngestionPipeline:
+    """Runs a batch of uploads through stage-by-stage bounded concurrency."""
+
+    def __init__(
+        self,
+        ingestion_service: IngestionService,
+        idempotency_service: IdempotencyService,
+        session_factory: Callable = AsyncSessionLocal,
+        hash_concurrency: Optional[int] = None,
+        storage_concurrency: Optional[int] = None,
+    ):
+        """Initialize; concurrency limits default to the current settings."""
+        self.ingestion_service = ingestion_service
+        self.idempotency_service = idempotency_service
+        self._session_factory = session_factory
+        self.hash_concurrency = hash_concurrency or settings.BATCH_UPLOAD_HASH_CONCURRENCY
+        self.storage_concurrency = storage_concurrency or settings.BATCH_UPLOAD_STORAGE_CONCURRENCY
+
+    async def stage_uploads(self, files: List[Any], max_size: Optional[int] = None) -> List[BatchItem]:
+        """
+        Stream and hash every upload to a temp file concurrently.
+
+        Raises IngestionException naming the first file that could not be
+        staged; nothing is left on disk in that case.
+        """
+        semaphore = asyncio.Semaphore(self.hash_concurrency)
+
+        async def stage(file) -> BatchItem:
+            async with semaphore:
+                staged = await upload_stager.stage(file, file.filename, file.content_type, max_size=max_size)
+            return BatchItem(filename=file.filename, content_type=file.content_type, staged=staged)
+
+        results = await asyncio.gather(*(stage(file) for file in files), return_exceptions=True)
+        failures = [(file, result) for file, result in zip(files, results) if isinstance(result, BaseException)]
+        if failures:
+            self.discard([result for result in results if isinstance(result, BatchItem)])
+            file, error = failures[0]
+            if isinstance(error, IngestionException):
+                raise IngestionException(f"File {file.filename}: {error}")
+            raise error
+        return list(results)
+
+    async def run(
+        self,
+        items: List[BatchItem],
+        batch_id: str,
+        vendor_id: Optional[str] = None,
+        source_type: str = "batch_upload",
+        source_reference: Optional[str] = None,
+        uploaded_by: Optional[str] = None,
+        user_id: Optional[str] = None,
+        request: Optional[Request] = None,
+    ) -> List[BatchItem]:
+        """Claim, store, queue and complete every staged item; per-file outcomes are set on the items."""
+        client_ip = request.client.host if request else None
+
+        async def claim_keys() -> None:
+            for item in items:
+                item.idempotency_key = self.idempotency_service.generate_idempotency_key(
+                    operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+                    vendor_id=vendor_id,
+                    file_hash=item.staged.file_hash,
+                    user_id=uploaded_by,
+                    additional_context={
+                        "filename": item.filename,
+                        "source_type": source_type,
+                        "batch_id": batch_id,
+                    }
+                )
+            async with self._session_factory() as db:
+                claims = await self.idempotency_service.check_and_create_idempotency_records(
+                    db=db,
+                    operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+                    operations=[
+                        {
+                            "idempotency_key": item.idempotency_key,
+                            "operation_data": {
+                                "filename": item.filename,
+                                "vendor_id": vendor_id,
+                                "source_type": source_type,
+                                "source_reference": source_reference,
+                                "uploaded_by": uploaded_by,
+                                "file_hash": item.staged.file_hash,
+                                "batch_id": batch_id,
+                            },
+                        }
+                        for item in items
+                    ],
+                    user_id=uploaded_by,
+                    client_ip=client_ip,
+                    mark_started=True,
+                )
+
+            seen_keys = set()
+            for item in items:
+                claim = claims[item.idempotency_key]
+                if item.idempotency_key in seen_keys:
+                    item.error = f"File {item.filename} is already in this batch"
+                elif claim.error is not None:
+                    item.error = str(claim.error)
+                elif claim.record.operation_status.value == "completed":
+                    logger.info(f"Returning existing file result for {item.filename}")
+                    item.result = claim.record.result_data
+                    item.is_duplicate = True
+                elif not claim.started:
+                    item.error = (
+                        f"File {item.filename} has existing operation with status: "
+                        f"{claim.record.operation_status.value}"
+                    )
+                seen_keys.add(item.idempotency_key)
+
+        async def store(item: BatchItem) -> None:
+            try:
+                item.prepared = await self.ingestion_service.prepare_staged_file(
+                    item.staged,
+                    filename=item.filename,
+                    content_type=item.content_type,
+                    vendor_id=vendor_id,
+                    source_type=source_type,
+                    source_reference=source_reference,
+                    uploaded_by=uploaded_by,
+                    user_id=user_id,
+                    request=request,
+                )
+            except Exception as e:
+                raise IngestionException(f"Ingestion failed: {str(e)}")
+
+        async def finish(claimed: List[BatchItem]) -> None:
+            async with self._session_factory() as db:
+                await self.idempotency_service.mark_operations_finished(
+                    db,
+                    completed={item.idempotency_key: item.result for item in claimed if item.error is None},
+                    failed={item.idempotency_key: {"error": item.error} for item in claimed if item.error is not None},
+                )
+
+        try:
+            try:
+                await claim_keys()
+            except Exception as e:
+                logger.error(f"Batch idempotency stage failed: {e}")
+                for item in items:
+                    item.error = str(e)
+            claimed = [item for item in items if not item.finished]
+
+            await self._run_stage("storage", claimed, store, self.storage_concurrency)
+
+            stored = [item for item in claimed if item.prepared is not None]
+            for item in stored:
+                if item.prepared["job"] is None:
+                    # Content that was ingested before reports the original job
+                    item.result = item.prepared["result"]
+                    item.is_duplicate = True
+
+            queued = [item for item in stored if not item.finished]
+            if queued:
+                try:
+                    await self.ingestion_service.queue_processing_tasks([item.prepared for item in queued])
+                except Exception as e:
+                    logger.error(f"Failed to queue {len(queued)} batch files: {e}")
+                    for item in queued:
+                        item.error = f"Queueing failed: {str(e)}"
+
+            for item in queued:
+                if item.error is None:
+                    item.result = self._response_data(item, batch_id)
+
+            if claimed:
+                await finish(claimed)
+        finally:
+            # Storage has moved each temp file into place unless its content was deduplicated
+            self.discard(items)
+
+        return items
+
+    async def _run_stage(
+        self,
+        name: str,
+        items: List[BatchItem],
+        step: Callable[[BatchItem], Awaitable[None]],
+        concurrency: int,
+    ) -> None:
+        """Run one step for every item, at most ``concurrency`` at a time; failures are recorded per item."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_step(item: BatchItem) -> None:
+            async with semaphore:
+                try:
+                    await step(item)
+                except Exception as e:
+                    logger.error(f"Batch {name} stage failed for file {item.filename}: {e}")
+                    if item.error is None:
+                        item.error = str(e)
+
+        await asyncio.gather(*(run_step(item) for item in items))
+
+    @staticmethod
+    def _response_data(item: BatchItem, batch_id: str) -> Dict[str, Any]:
+        """Per-file response entry, as stored in the file's idempotency record."""
+        ingestion_result = item.prepared["result"]
+        return {
+            "id": ingestion_result["ingestion_job_id"],
+            "original_filename": item.filename,
+            "file_size_bytes": ingestion_result["file_size"],
+            "file_hash_sha256": ingestion_result["file_hash"],
+            "status": ingestion_result["status"],
+            "storage_path": ingestion_result["storage_path"],
+            "duplicate_analysis": ingestion_result.get("duplicate_analysis", {}),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "estimated_processing_time_seconds": ingestion_result.get("estimated_processing_time", 0),
+            "idempotency_key": item.idempotency_key,
+            "batch_id": batch_id,
+        }
+
+    @staticmethod
+    def discard(items: List[BatchItem]) -> None:
+        """Remove the temp files of staged items."""
+        for item in items:
+            item.staged.cleanup()
@@ -15,7 +15,7 @@ from decimal import Decimal
 
 import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc
+from sqlalchemy import select, and_, or_, func, desc, case, literal
 
 from app.core.config import settings
 from app.core.exceptions import DeduplicationException
@@ -28,6 +28,8 @@ from app.models.ingestion import (
 )
 from app.models.invoice import Invoice
 from app.models.reference import Vendor
+from app.services.document_text_sidecar import document_text_sidecars
+from app.services.near_duplicate_index import estimate_jaccard, exact_jaccard, near_duplicate_index
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +39,7 @@ class DeduplicationService:
 
     def __init__(self):
         """Initialize the deduplication service."""
-        self.fuzzy_similarity_threshold = 0.85
+        self.fuzzy_similarity_threshold = 0.6  # Jaccard over word shingles (see near_duplicate_index)
         self.temporal_window_hours = 24  # Hours to check for temporal duplicates
         self.amount_tolerance = 0.01  # 1% tolerance for amount matching
 
@@ -59,18 +61,24 @@ class DeduplicationService:
         duplicates = []
 
         try:
+            # Text is extracted once per job and kept in its sidecar; it feeds fuzzy matching and the index
+            document_text = await self._get_document_text(ingestion_job, file_content, db)
+
             # Get active deduplication rules
             active_rules = await self._get_active_rules(db, ingestion_job)
 
             # Apply each enabled strategy
             for rule in active_rules:
                 strategy_deduplication = await self._apply_strategy_rule(
-                    rule, ingestion_job, file_content, extracted_metadata, db
+                    rule, ingestion_job, file_content, extracted_metadata, db, document_text=document_text
                 )
 
                 if strategy_deduplication:
                     duplicates.extend(strategy_deduplication)
 
+            # Index this document so later uploads can find it as a near-duplicate
+            await self._index_document_text(ingestion_job, document_text, db)
+
             # Sort duplicates by confidence score (highest first)
             duplicates.sort(key=lambda x: x["confidence_score"], reverse=True)
 
@@ -314,6 +322,7 @@ class DeduplicationService:
         file_content: bytes,
         metadata: Dict[str, Any],
         db: AsyncSession,
+        document_text: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """Apply a specific deduplication strategy rule."""
         strategy = rule.strategy
@@ -329,13 +338,19 @@ class DeduplicationService:
             return await self._temporal_deduplication(ingestion_job, metadata, config, db)
 
         elif strategy == DeduplicationStrategy.FUZZY_MATCHING:
-            return await self._fuzzy_matching_deduplication(ingestion_job, file_content, config, db)
+            return await self._fuzzy_matching_deduplication(
+                ingestion_job, file_content, config, db, document_text=document_text
+            )
 
         elif strategy == DeduplicationStrategy.COMPOSITE:
-            return await self._composite_deduplication(ingestion_job, file_content, metadata, config, db)
+            return await self._composite_deduplication(
+                ingestion_job, file_content, metadata, config, db, document_text=document_text
+            )
 
         elif strategy == DeduplicationStrategy.WORKING_CAPITAL:
-            return await self._working_capital_aware_deduplication(ingestion_job, file_content, metadata, config, db)
+            return await self._working_capital_aware_deduplication(
+                ingestion_job, file_content, metadata, config, db, document_text=document_text
+            )
 
         return []
 
@@ -806,136 +821,192 @@ class DeduplicationService:
         config: Dict[str, Any],
         db: AsyncSession,
     ) -> List[Dict[str, Any]]:
-        """Temporal deduplication within time windows."""
+        """Temporal deduplication within time windows, scored and ranked in SQL."""
         duplicates = []
 
         # Get time window from config
         window_hours = config.get("window_hours", self.temporal_window_hours)
-        time_threshold = ingestion_job.created_at - timedelta(hours=window_hours)
+        window_seconds = window_hours * 3600
+        threshold = config.get("confidence_threshold", 0.6)
+        current_epoch = ingestion_job.created_at.timestamp()
+
+        # confidence = time proximity + 0.2 vendor + 0.1 size band + 0.1 extension, capped at 1.0
+        time_confidence = 1.0 - (current_epoch - func.extract("epoch", IngestionJob.created_at)) / window_seconds
+        vendor_bonus = (
+            case((IngestionJob.vendor_id == ingestion_job.vendor_id, 0.2), else_=0.0)
+            if ingestion_job.vendor_id else literal(0.0)
+        )
+        # |a - b| / max(a, b) < 0.1 rewritten as a range on the candidate's size
+        size_match = and_(
+            IngestionJob.file_size_bytes > ingestion_job.file_size_bytes * 0.9,
+            IngestionJob.file_size_bytes < ingestion_job.file_size_bytes / 0.9,
+        )
+        size_bonus = case((size_match, 0.1), else_=0.0)
+        type_bonus = case((IngestionJob.file_extension == ingestion_job.file_extension, 0.1), else_=0.0)
+        confidence = func.least(time_confidence + vendor_bonus + size_bonus + type_bonus, 1.0).label("confidence")
+
+        # Necessary conditions on the indexed columns: a job older than the time a bonus
+        # combination can make up for needs the bonuses it is missing, so vendor and
+        # extension also narrow the scan instead of only scoring it
+        vendor_bonus_max = 0.2 if ingestion_job.vendor_id else 0.0
+        oldest = self._temporal_cutoff(ingestion_job.created_at, window_hours, threshold, vendor_bonus_max + 0.2)
+        without_vendor = self._temporal_cutoff(ingestion_job.created_at, window_hours, threshold, 0.2)
+        without_type = self._temporal_cutoff(ingestion_job.created_at, window_hours, threshold, vendor_bonus_max + 0.1)
+        candidate_filters = [
+            IngestionJob.created_at >= oldest,
+            or_(IngestionJob.created_at >= without_type, IngestionJob.file_extension == ingestion_job.file_extension),
+        ]
+        if ingestion_job.vendor_id:
+            candidate_filters.append(
+                or_(IngestionJob.created_at >= without_vendor, IngestionJob.vendor_id == ingestion_job.vendor_id)
+            )
 
-        # Look for ingestion jobs within time window
-        query = select(IngestionJob).where(
-            and_(
-                IngestionJob.created_at >= time_threshold,
+        query = (
+            select(
+                IngestionJob.id,
+                IngestionJob.created_at,
+                IngestionJob.vendor_id,
+                IngestionJob.file_size_bytes,
+                IngestionJob.file_extension,
+                confidence,
+            )
+            .where(
+                *candidate_filters,
                 IngestionJob.created_at <= ingestion_job.created_at,
                 IngestionJob.id != ingestion_job.id,
+                confidence >= threshold,
             )
+            .order_by(desc("confidence"), desc(IngestionJob.created_at))
+            .limit(config.get("max_candidates", settings.TEMPORAL_DEDUP_MAX_CANDIDATES))
         )
         result = await db.execute(query)
-        recent_jobs = result.scalars().all()
 
-        for recent_job in recent_jobs:
-            # Calculate time-based confidence
-            time_diff = (ingestion_job.created_at - recent_job.created_at).total_seconds()
-            time_confidence = 1.0 - (time_diff / (window_hours * 3600))
+        for job_id, created_at, vendor_id, file_size_bytes, file_extension, time_confidence in result.all():
+            time_confidence = float(time_confidence)
+            time_diff = (ingestion_job.created_at - created_at).total_seconds()
+            size_diff_ratio = abs(ingestion_job.file_size_bytes - file_size_bytes) / max(
+                ingestion_job.file_size_bytes, file_size_bytes
+            )
 
-            # Check additional criteria
             criteria_matches = []
-
-            # Same vendor
-            if ingestion_job.vendor_id and recent_job.vendor_id:
-                if ingestion_job.vendor_id == recent_job.vendor_id:
-                    criteria_matches.append("vendor_match")
-                    time_confidence += 0.2
-
-            # Similar file size
-            size_diff_ratio = abs(ingestion_job.file_size_bytes - recent_job.file_size_bytes) / max(
-                ingestion_job.file_size_bytes, recent_job.file_size_bytes
-            )
+            if ingestion_job.vendor_id and vendor_id == ingestion_job.vendor_id:
+                criteria_matches.append("vendor_match")
             if size_diff_ratio < 0.1:  # Within 10% size difference
                 criteria_matches.append("size_match")
-                time_confidence += 0.1
-
-            # Same file type
-            if ingestion_job.file_extension == recent_job.file_extension:
+            if file_extension == ingestion_job.file_extension:
                 criteria_matches.append("type_match")
-                time_confidence += 0.1
-
-            # Cap confidence at 1.0
-            time_confidence = min(time_confidence, 1.0)
 
-            if time_confidence >= config.get("confidence_threshold", 0.6):
-                duplicates.append({
-                    "confidence_score": time_confidence,
-                    "matching_job_id": str(recent_job.id),
-                    "strategy": DeduplicationStrategy.TEMPORAL,
-                    "match_criteria": {
-                        "time_window_hours": window_hours,
-                        "time_diff_seconds": time_diff,
-                        "criteria_matches": criteria_matches,
-                    },
-                    "similarity_score": time_confidence,
-                    "comparison_details": {
-                        "time_diff_hours": time_diff / 3600,
-                        "size_diff_ratio": size_diff_ratio,
-                        "vendor_match": ingestion_job.vendor_id == recent_job.vendor_id,
-                    },
-                })
+            duplicates.append({
+                "confidence_score": time_confidence,
+                "matching_job_id": str(job_id),
+                "strategy": DeduplicationStrategy.TEMPORAL,
+                "match_criteria": {
+                    "time_window_hours": window_hours,
+                    "time_diff_seconds": time_diff,
+                    "criteria_matches": criteria_matches,
+                },
+                "similarity_score": time_confidence,
+                "comparison_details": {
+                    "time_diff_hours": time_diff / 3600,
+                    "size_diff_ratio": size_diff_ratio,
+                    "vendor_match": ingestion_job.vendor_id == vendor_id,
+                },
+            })
 
         return duplicates
 
+    @staticmethod
+    def _temporal_cutoff(created_at: datetime, window_hours: float, threshold: float, max_bonus: float) -> datetime:
+        """Oldest upload time that can still reach the threshold with at most ``max_bonus`` added."""
+        reachable_seconds = window_hours * 3600 * min(1.0, 1.0 + max_bonus - threshold)
+        return created_at - timedelta(seconds=reachable_seconds)
+
     async def _fuzzy_matching_deduplication(
         self,
         ingestion_job: IngestionJob,
         file_content: bytes,
         config: Dict[str, Any],
         db: AsyncSession,
+        document_text: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
-        """Fuzzy matching based on content similarity."""
+        """Fuzzy matching via MinHash/LSH candidates scored on stored shingle sets."""
         duplicates = []
 
         # Extract text content from file for comparison
-        current_text = await self._extract_text_content(file_content, ingestion_job.mime_type)
+        current_text = document_text
+        if current_text is None:
+            current_text = await self._extract_text_content(file_content, ingestion_job.mime_type)
         if not current_text:
             return duplicates
 
-        # Get recent ingestion jobs for comparison
+        fingerprint = near_duplicate_index.signature_for_text(current_text)
+        if fingerprint is None:
+            return duplicates
+        signature, shingle_count = fingerprint
+
+        # Candidate lookup probes the LSH buckets instead of scanning recent jobs
         days_back = config.get("days_back", 30)
         date_threshold = ingestion_job.created_at - timedelta(days=days_back)
-
-        query = select(IngestionJob).where(
-            and_(
+        candidates = await near_duplicate_index.query(
+            db,
+            signature,
+            exclude_job_id=ingestion_job.id,
+            filters=[
                 IngestionJob.created_at >= date_threshold,
-                IngestionJob.id != ingestion_job.id,
                 IngestionJob.mime_type == ingestion_job.mime_type,  # Same file type
-            )
-        ).limit(config.get("max_comparisons", 50))  # Limit comparisons for performance
+            ],
+            limit=config.get("max_comparisons", settings.NEAR_DUPLICATE_MAX_CANDIDATES),
+        )
 
-        result = await db.execute(query)
-        comparison_jobs = result.scalars().all()
+        # Exact Jaccard over the candidates' stored shingles, read in one query; jobs
+        # indexed before sidecars existed keep their signature estimate
+        current_shingles = near_duplicate_index.shingle_hashes(current_text)
+        stored_shingles = await document_text_sidecars.load_shingles(db, [job.id for job, _ in candidates])
+
+        threshold = config.get("similarity_threshold", self.fuzzy_similarity_threshold)
+        for comparison_job, estimate in candidates:
+            shingles = stored_shingles.get(comparison_job.id)
+            if shingles is not None:
+                similarity = exact_jaccard(current_shingles, shingles)
+                method = "shingle_jaccard"
+            else:
+                similarity = estimate
+                method = "minhash_lsh"
 
-        for comparison_job in comparison_jobs:
-            try:
-                # Get comparison file content and extract text
-                comparison_text = await self._get_job_text_content(comparison_job)
-                if not comparison_text:
-                    continue
+            if similarity >= threshold:
+                duplicates.append({
+                    "confidence_score": similarity,
+                    "matching_job_id": str(comparison_job.id),
+                    "strategy": DeduplicationStrategy.FUZZY_MATCHING,
+                    "match_criteria": {
+                        "similarity_threshold": threshold,
+                        "text_similarity": similarity,
+                    },
+                    "similarity_score": similarity,
+                    "comparison_details": {
+                        "text_length_current": len(current_text),
+                        "shingle_count_current": shingle_count,
+                        "candidates_considered": len(candidates),
+                        "similarity_method": method,
+                    },
+                })
 
-                # Calculate text similarity
-                similarity = await self._calculate_text_similarity(current_text, comparison_text)
-
-                if similarity >= self.fuzzy_similarity_threshold:
-                    duplicates.append({
-                        "confidence_score": similarity,
-                        "matching_job_id": str(comparison_job.id),
-                        "strategy": DeduplicationStrategy.FUZZY_MATCHING,
-                        "match_criteria": {
-                            "similarity_threshold": self.fuzzy_similarity_threshold,
-                            "text_similarity": similarity,
-                        },
-                        "similarity_score": similarity,
-                        "comparison_details": {
-                            "text_length_current": len(current_text),
-                            "text_length_comparison": len(comparison_text),
-                            "similarity_method": "sequence_matcher",
-                        },
-                    })
+        return duplicates
 
-            except Exception as e:
-                logger.warning(f"Fuzzy matching failed for job {comparison_job.id}: {e}")
-                continue
+    async def _index_document_text(
+        self, ingestion_job: IngestionJob, document_text: Optional[str], db: AsyncSession
+    ) -> None:
+        """Add a document to the near-duplicate index."""
+        if not document_text:
+            return
 
-        return duplicates
+        try:
+            fingerprint = near_duplicate_index.signature_for_text(document_text)
+            if fingerprint is not None:
+                signature, shingle_count = fingerprint
+                await near_duplicate_index.add(db, ingestion_job.id, signature, shingle_count)
+        except Exception as e:
+            logger.warning(f"Failed to index job {ingestion_job.id} for near-duplicate search: {e}")
 
     async def _composite_deduplication(
         self,
@@ -944,6 +1015,7 @@ class DeduplicationService:
         metadata: Dict[str, Any],
         config: Dict[str, Any],
         db: AsyncSession,
+        document_text: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """Composite deduplication combining multiple strategies."""
         all_duplicates = []
@@ -964,7 +1036,7 @@ class DeduplicationService:
             )
 
             strategy_duplicates = await self._apply_strategy_rule(
-                mock_rule, ingestion_job, file_content, metadata, db
+                mock_rule, ingestion_job, file_content, metadata, db, document_text=document_text
             )
             all_duplicates.extend(strategy_duplicates)
 
@@ -1021,13 +1093,16 @@ class DeduplicationService:
         metadata: Dict[str, Any],
         config: Dict[str, Any],
         db: AsyncSession,
+        document_text: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         Working capital-aware deduplication that extends composite detection
         with financial impact analysis and cash flow sensitivity thresholds.
         """
         # Start with base composite deduplication
-        composite_duplicates = await self._composite_deduplication(ingestion_job, file_content, metadata, config, db)
+        composite_duplicates = await self._composite_deduplication(
+            ingestion_job, file_content, metadata, config, db, document_text=document_text
+        )
 
         if not composite_duplicates:
             return []
@@ -1176,6 +1251,26 @@ class DeduplicationService:
         else:
             return "low"
 
+    async def _get_document_text(
+        self, ingestion_job: IngestionJob, file_content: bytes, db: AsyncSession
+    ) -> Optional[str]:
+        """Text for a job from its sidecar, extracting and storing it on first parse."""
+        try:
+            text = await document_text_sidecars.load_text(db, ingestion_job.id)
+            if text is not None:
+                return text
+        except Exception as e:
+            logger.warning(f"Failed to read text sidecar for job {ingestion_job.id}: {e}")
+
+        text = await self._extract_text_content(file_content, ingestion_job.mime_type)
+        if text:
+            try:
+                method = "pdfium_text" if ingestion_job.mime_type == "application/pdf" else "plain_text"
+                await document_text_sidecars.save(db, ingestion_job.id, text, method)
+            except Exception as e:
+                logger.warning(f"Failed to store text sidecar for job {ingestion_job.id}: {e}")
+        return text
+
     async def _extract_text_content(self, file_content: bytes, mime_type: str) -> Optional[str]:
         """Extract text content from file for similarity comparison."""
         try:
@@ -1198,20 +1293,39 @@ class DeduplicationService:
 
     async def _extract_pdf_text(self, file_content: bytes) -> Optional[str]:
         """Extract text from PDF content."""
-        # Placeholder - would use libraries like PyPDF2, pdfplumber, or pdfminer
-        return "extracted pdf text placeholder"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._read_pdf_text, file_content)
+
+    @staticmethod
+    def _read_pdf_text(file_content: bytes) -> Optional[str]:
+        """Read the PDF text layer page by page, up to DOCLING_MAX_PAGES."""
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(file_content)
+        try:
+            pages = []
+            for index in range(min(len(pdf), settings.DOCLING_MAX_PAGES)):
+                page = pdf[index]
+                text_page = page.get_textpage()
+                try:
+                    pages.append(text_page.get_text_range())
+                finally:
+                    text_page.close()
+                    page.close()
+            text = "\n".join(pages).strip()
+            return text or None
+        finally:
+            pdf.close()
 
     async def _extract_image_text(self, file_content: bytes) -> Optional[str]:
         """Extract text from image content using OCR."""
-        # Placeholder - would use OCR libraries like pytesseract
-        return "extracted image text placeholder"
+        # No OCR engine is available here; images are matched by hash and business rules only
+        return None
 
-    async def _get_job_text_content(self, job: IngestionJob) -> Optional[str]:
+    async def _get_job_text_content(self, job: IngestionJob, db: AsyncSession) -> Optional[str]:
         """Get text content from an existing ingestion job."""
         try:
-            # This would retrieve the file content and extract text
-            # For now, return a placeholder
-            return f"text content for job {job.id}"
+            return await document_text_sidecars.load_text(db, job.id)
 
         except Exception as e:
             logger.warning(f"Failed to get text content for job {job.id}: {e}")
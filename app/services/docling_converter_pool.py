@@ -0,0 +1,160 @@
+"""
+Process-wide pool of warm Docling document converters.
+
+Loading the OCR, layout and table-structure models behind a Docling
+``DocumentConverter`` dominates per-invoice latency, so converters are built
+once per process (at ``worker_process_init`` for Celery workers) and reused by
+every ``DoclingService`` created afterwards. A converter is checked out for one
+conversion at a time and returned afterwards, so concurrent callers never share
+one; they wait for a free converter instead.
+"""
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_pipeline_options() -> PdfPipelineOptions:
+    """Build the PDF pipeline options shared by all extraction services."""
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = True
+    pipeline_options.do_table_structure = True
+    return pipeline_options
+
+
+def build_document_converter(pipeline_options: Optional[PdfPipelineOptions] = None) -> DocumentConverter:
+    """Create a (cold) DocumentConverter for PDF input."""
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options or build_pipeline_options()),
+        }
+    )
+
+
+class DoclingConverterPool:
+    """Fixed-size pool of pre-loaded DocumentConverter instances for one process."""
+
+    def __init__(self, size: Optional[int] = None):
+        """Initialize the pool without loading any models."""
+        self.size = max(1, size or settings.DOCLING_CONVERTER_POOL_SIZE)
+        self.pipeline_options = build_pipeline_options()
+        self._converters: List[DocumentConverter] = []
+        self._idle: "queue.Queue[DocumentConverter]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._warm = False
+        self._model_load_seconds: Dict[str, float] = {}
+        self._warmed_at: Optional[float] = None
+        self._checkouts = 0
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether every converter in the pool has its models loaded."""
+        return self._warm
+
+    def warm_up(self) -> None:
+        """Build the converters and load the PDF pipeline models eagerly."""
+        with self._lock:
+            if self._warm:
+                return
+
+            logger.info(f"Warming Docling converter pool (size={self.size})")
+            started = time.perf_counter()
+
+            for index in range(len(self._converters), self.size):
+                converter = build_document_converter(self.pipeline_options)
+
+                # Docling loads the layout, OCR and table-structure models together
+                # when the format pipeline is initialised, so time it per pipeline.
+                load_started = time.perf_counter()
+                converter.initialize_pipeline(InputFormat.PDF)
+                load_seconds = time.perf_counter() - load_started
+                self._model_load_seconds[f"pdf_pipeline_{index}"] = load_seconds
+                self._record_model_load(f"pdf_pipeline_{index}", load_seconds)
+
+                self._converters.append(converter)
+                self._idle.put(converter)
+
+            self._warm = True
+            self._warmed_at = time.time()
+            self._record_pool_state()
+
+            logger.info(
+                f"Docling converter pool warm in {time.perf_counter() - started:.2f}s "
+                f"({self.size} converter(s))"
+            )
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[DocumentConverter]:
+        """Borrow a warm converter for one conversion, warming the pool on first use.
+
+        Blocks until a converter is free; raises ``queue.Empty`` after ``timeout`` seconds.
+        """
+        if not self._warm:
+            self.warm_up()
+
+        converter = self._idle.get(timeout=timeout)
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield converter
+        finally:
+            with self._lock:
+                # Converters released by shutdown() while checked out are dropped
+                if any(converter is loaded for loaded in self._converters):
+                    self._idle.put(converter)
+
+    def shutdown(self) -> None:
+        """Release converters so model memory can be reclaimed."""
+        with self._lock:
+            self._converters.clear()
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            self._warm = False
+            self._record_pool_state()
+        logger.info("Docling converter pool shut down")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool status for monitoring."""
+        return {
+            "warm": self._warm,
+            "pool_size": self.size,
+            "converters_loaded": len(self._converters),
+            "converters_idle": self._idle.qsize(),
+            "checkouts": self._checkouts,
+            "warmed_at": self._warmed_at,
+            "model_load_seconds": dict(self._model_load_seconds),
+        }
+
+    def _record_model_load(self, model: str, seconds: float) -> None:
+        """Publish a model load time to Prometheus."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_docling_model_load(model, seconds)
+        except Exception as e:
+            logger.debug(f"Could not record Docling model load metric: {e}")
+
+    def _record_pool_state(self) -> None:
+        """Publish warm-up status and pool size to Prometheus."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.set_docling_pool_state(self._warm, len(self._converters))
+        except Exception as e:
+            logger.debug(f"Could not record Docling pool metrics: {e}")
+
+
+# Singleton instance (one per process; forked Celery children build their own)
+docling_converter_pool = DoclingConverterPool()
@@ -0,0 +1,105 @@
+"""
+Process-pool execution of Docling document conversion.
+
+``DocumentConverter.convert`` is CPU-bound and synchronous; calling it inside a
+coroutine freezes the event loop for the whole parse. This module runs
+conversions in a bounded ``ProcessPoolExecutor`` whose children pre-load the
+Docling models once and hand the converted document back through asyncio.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple
+
+from docling_core.types.doc import DoclingDocument
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker_process() -> None:
+    """Load one converter's Docling models when a pool child starts."""
+    from app.services.docling_converter_pool import docling_converter_pool
+    # A child runs one conversion at a time, so more than one warm converter is dead weight
+    docling_converter_pool.size = 1
+    docling_converter_pool.warm_up()
+
+
+def _convert_in_worker(source_path: str, page_range: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+    """Convert a document in a pool child and return it in serialisable form."""
+    from app.services.docling_converter_pool import docling_converter_pool
+    with docling_converter_pool.checkout() as converter:
+        if page_range:
+            result = converter.convert(source_path, page_range=page_range)
+        else:
+            result = converter.convert(source_path)
+    return result.document.export_to_dict()
+
+
+class DoclingProcessExecutor:
+    """Bounded process pool that runs Docling conversions off the event loop."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """Initialize the executor; child processes start on first use."""
+        self.max_workers = max(1, max_workers or settings.DOCLING_EXECUTOR_MAX_WORKERS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._inflight: Set[Future] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, creating it if needed."""
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent may hold event loops, DB pools and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker_process,
+                )
+                logger.info(f"Started Docling process pool with {self.max_workers} worker(s)")
+            return self._executor
+
+    async def convert(
+        self, source_path: str, page_range: Optional[Tuple[int, int]] = None
+    ) -> DoclingDocument:
+        """Convert a document in the process pool without blocking the event loop."""
+        future = self._get_executor().submit(_convert_in_worker, source_path, page_range)
+        self._inflight.add(future)
+
+        try:
+            payload = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Only this caller's conversion is cancelled. One already running in a child
+            # finishes there and its result is dropped: terminating the child would break
+            # the pool and fail every other caller's conversion with it.
+            if not future.cancel():
+                logger.warning(f"Docling conversion of {source_path} already running; discarding its result")
+            raise
+        finally:
+            self._inflight.discard(future)
+
+        return DoclingDocument.model_validate(payload)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut the pool down gracefully."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor status for monitoring."""
+        return {
+            "running": self._executor is not None,
+            "max_workers": self.max_workers,
+            "inflight": len(self._inflight),
+        }
+
+
+# Singleton instance
+docling_process_executor = DoclingProcessExecutor()
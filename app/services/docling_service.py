@@ -5,14 +5,13 @@ Docling integration for document extraction and parsing.
 import hashlib
 import logging
 import re
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from decimal import Decimal
 
 import aiofiles
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling.document_converter import DocumentConverter
 from docling_core.types.doc import DoclingDocument
 
 from app.core.config import settings
@@ -24,28 +23,47 @@ from app.models.schemas import (
     ConfidenceScores,
     ExtractionMetadata
 )
+from app.services.docling_converter_pool import docling_converter_pool
+from app.services.docling_executor import docling_process_executor
+from app.services.extraction_cache import extraction_cache
+from app.services.extraction_context import ExtractionContext
+from app.services.field_extraction_engine import header_field_engine
 from app.services.schema_service import schema_service
 
 logger = logging.getLogger(__name__)
 
+PARSER_VERSION = "docling-2.60.1"
+
+# Header fields that must be found before streaming extraction may stop early
+STREAMING_REQUIRED_FIELDS = ("vendor_name", "invoice_number", "invoice_date")
+
+
+@dataclass
+class PageChunkResult:
+    """Header candidates found after converting one page range."""
+    start_page: int
+    end_page: int
+    total_pages: int
+    text: str
+    header: Dict[str, Optional[str]]
+    has_totals: bool
+    complete: bool
+
 
 class DoclingService:
     """Service for document extraction using Docling."""
 
-    def __init__(self):
+    def __init__(self, converter: Optional[DocumentConverter] = None):
         """Initialize the Docling service."""
-        self.pipeline_options = PdfPipelineOptions()
-        self.pipeline_options.do_ocr = True
-        self.pipeline_options.do_table_structure = True
+        self.pipeline_options = docling_converter_pool.pipeline_options
         self.confidence_threshold = settings.DOCLING_CONFIDENCE_THRESHOLD
         self.max_pages = settings.DOCLING_MAX_PAGES
+        self.stream_threshold_pages = settings.DOCLING_STREAM_THRESHOLD_PAGES
+        self.stream_chunk_pages = max(1, settings.DOCLING_STREAM_CHUNK_PAGES)
 
-        # Initialize DocumentConverter with pipeline options
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=self.pipeline_options),
-            }
-        )
+        # Without an injected converter, each conversion borrows a warm one from the
+        # process pool; constructing the service never loads models
+        self.converter = converter
 
     async def extract_from_file(self, file_path: str) -> Dict[str, Any]:
         """Extract data from a document file."""
@@ -63,17 +81,24 @@ class DoclingService:
             raise ExtractionException(f"Failed to extract document: {str(e)}")
 
     async def extract_from_content(
-        self, file_content: bytes, file_path: Optional[str] = None
+        self, file_content: bytes, file_path: Optional[str] = None, file_hash: Optional[str] = None
     ) -> InvoiceExtractionResult:
         """Extract data from document content bytes and return structured result."""
         logger.info(f"Extracting data from content ({len(file_content)} bytes)")
         start_time = datetime.utcnow()
 
+        # Repeat documents (re-uploads, DLQ redrives) are served from the extraction cache
+        cache_key = self._cache_key(file_hash or hashlib.sha256(file_content).hexdigest())
+        cached_result = await extraction_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info(f"Extraction cache hit for {cache_key}")
+            return cached_result
+
         try:
             # Convert document using DocumentConverter
             # For content bytes, save to temporary file if needed, or use file_path directly
             if file_path:
-                result = self.converter.convert(file_path)
+                context, conversion_notes = await self._convert_capped(file_path)
             else:
                 # For content bytes without file path, save to temp file first
                 import tempfile
@@ -83,26 +108,21 @@ class DoclingService:
                     temp_file_path = temp_file.name
 
                 try:
-                    result = self.converter.convert(temp_file_path)
+                    context, conversion_notes = await self._convert_capped(temp_file_path)
                 finally:
                     # Clean up temporary file
                     os.unlink(temp_file_path)
 
-            doc = result.document
-
-            # Check page count
-            page_count = len(getattr(doc, 'pages', []))
-            if page_count > self.max_pages:
-                logger.warning(f"Document has {page_count} pages, exceeding limit of {self.max_pages}")
+            page_count = context.page_count
 
             # Extract header information
-            header_data = await self._extract_header(doc)
+            header_data = await self._extract_header(context)
 
             # Extract line items (table data)
-            lines_data = await self._extract_lines(doc)
+            lines_data = await self._extract_lines(context)
 
             # Calculate confidence scores
-            confidence_data = await self._calculate_confidence(doc, header_data, lines_data)
+            confidence_data = await self._calculate_confidence(context, header_data, lines_data)
 
             # Create structured Pydantic models
             header_model = self._create_header_model(header_data)
@@ -114,7 +134,7 @@ class DoclingService:
 
             # Create metadata
             metadata = ExtractionMetadata(
-                parser_version="docling-2.60.1",
+                parser_version=PARSER_VERSION,
                 processing_time_ms=processing_time,
                 page_count=page_count,
                 file_size_bytes=len(file_content),
@@ -128,7 +148,9 @@ class DoclingService:
                 lines=lines_models,
                 confidence=confidence_model,
                 metadata=metadata,
-                processing_notes=self._generate_processing_notes(header_data, lines_data, confidence_data)
+                processing_notes=conversion_notes + self._generate_processing_notes(
+                    header_data, lines_data, confidence_data
+                )
             )
 
             # Validate extraction result against schema
@@ -152,6 +174,7 @@ class DoclingService:
                 logger.warning(f"Schema validation failed: {e}")
 
             logger.info(f"Successfully extracted data with overall confidence: {float(confidence_model.overall):.2f}")
+            await extraction_cache.set(cache_key, extraction_result)
             return extraction_result
 
         except Exception as e:
@@ -159,62 +182,146 @@ class DoclingService:
             # Return a structured result with error information instead of raising
             return self._create_error_result(e, file_path, len(file_content), start_time)
 
-    async def _extract_header(self, doc: DoclingDocument) -> Dict[str, Any]:
-        """Extract header information from document."""
-        logger.debug("Extracting header information")
+    def _cache_key(self, file_hash: str) -> str:
+        """Extraction cache key for a document under the current parser configuration."""
+        options = self.pipeline_options
+        if hasattr(options, "model_dump"):
+            options = options.model_dump(mode="json")
+        return extraction_cache.build_key(file_hash, PARSER_VERSION, {
+            "pipeline": options,
+            "max_pages": self.max_pages,
+            # Streaming stops early, so its page ranges change what gets extracted
+            "stream_threshold_pages": self.stream_threshold_pages,
+            "stream_chunk_pages": self.stream_chunk_pages,
+        })
+
+    async def _convert(
+        self, source_path: str, page_range: Optional[Tuple[int, int]] = None
+    ) -> DoclingDocument:
+        """Convert a document, off the event loop when process execution is enabled."""
+        if settings.DOCLING_EXECUTION_MODE == "process":
+            return await docling_process_executor.convert(source_path, page_range=page_range)
+
+        if self.converter is not None:
+            return self._convert_with(self.converter, source_path, page_range)
+        with docling_converter_pool.checkout() as converter:
+            return self._convert_with(converter, source_path, page_range)
+
+    @staticmethod
+    def _convert_with(
+        converter: DocumentConverter, source_path: str, page_range: Optional[Tuple[int, int]]
+    ) -> DoclingDocument:
+        """Run one conversion on the given converter."""
+        if page_range:
+            return converter.convert(source_path, page_range=page_range).document
+        return converter.convert(source_path).document
+
+    async def _convert_capped(self, source_path: str) -> Tuple[ExtractionContext, List[str]]:
+        """Convert at most ``max_pages`` pages, streaming page ranges for long documents."""
+        total_pages = self._count_pdf_pages(source_path)
+        notes: List[str] = []
+
+        if total_pages is None:
+            # Page count unknown up front; still never OCR beyond the page limit
+            doc = await self._convert(source_path, page_range=(1, self.max_pages))
+            return ExtractionContext(doc), notes
+
+        if total_pages > self.max_pages:
+            logger.warning(f"Document has {total_pages} pages, exceeding limit of {self.max_pages}")
+
+        if total_pages <= self.stream_threshold_pages:
+            # Short documents convert in one call, still capped at the page limit
+            doc = await self._convert(source_path, page_range=(1, min(total_pages, self.max_pages)))
+            return ExtractionContext(doc), notes
+
+        texts = []
+        pages_processed = 0
+        last_chunk: Optional[PageChunkResult] = None
+        async for chunk in self.stream_header_candidates(source_path, total_pages):
+            texts.append(chunk.text)
+            pages_processed = chunk.end_page
+            last_chunk = chunk
+
+        if pages_processed < total_pages:
+            reason = "header and totals found" if last_chunk and last_chunk.complete else "page limit reached"
+            notes.append(f"Processed {pages_processed} of {total_pages} pages ({reason})")
+
+        return ExtractionContext(text="\n".join(texts), page_count=pages_processed), notes
+
+    async def stream_header_candidates(
+        self, source_path: str, total_pages: Optional[int] = None
+    ) -> AsyncIterator[PageChunkResult]:
+        """Convert page ranges incrementally and yield header candidates found so far.
+
+        Stops once the required header fields and a closing totals block have
+        been seen, or when ``DOCLING_MAX_PAGES`` pages have been converted.
+        """
+        if total_pages is None:
+            total_pages = self._count_pdf_pages(source_path) or self.max_pages
+
+        last_page = min(total_pages, self.max_pages)
+        found: Dict[str, Optional[str]] = {field: None for field in header_field_engine.fields}
+
+        for start_page in range(1, last_page + 1, self.stream_chunk_pages):
+            end_page = min(start_page + self.stream_chunk_pages - 1, last_page)
+            doc = await self._convert(source_path, page_range=(start_page, end_page))
+            context = ExtractionContext(doc)
+
+            # Earlier pages win: only fill fields not found on previous pages
+            for field, value in found.items():
+                if value is None:
+                    found[field] = self._first_field_value(context, field)
+
+            has_totals = found.get("total") is not None
+            complete = has_totals and all(found.get(field) for field in STREAMING_REQUIRED_FIELDS)
+
+            yield PageChunkResult(
+                start_page=start_page,
+                end_page=end_page,
+                total_pages=total_pages,
+                text=context.text,
+                header=dict(found),
+                has_totals=has_totals,
+                complete=complete,
+            )
 
-        header = {}
+            if complete:
+                logger.info(f"Header and totals found by page {end_page} of {total_pages}, stopping early")
+                return
 
+    def _count_pdf_pages(self, source_path: str) -> Optional[int]:
+        """Count PDF pages without converting them (None if unknown)."""
         try:
-            # Get full text
-            full_text = doc.export_to_markdown()
-
-            # Extract vendor name
-            vendor_patterns = [
-                r"(?:vendor|supplier|bill to|from):\s*([^\n\r]+?)(?:\n|$)",
-                r"^(.+?)\s+(?:invoice|bill)",
-                r"([A-Z][a-z]+\s+(?:Inc|LLC|Corp|Co|Ltd))",
-            ]
-            header["vendor_name"] = self._extract_with_patterns(full_text, vendor_patterns)
+            import pypdfium2
 
-            # Extract invoice number
-            invoice_patterns = [
-                r"(?:invoice\s*(?:no|#|number))\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
-                r"invoice[:\s]*([A-Za-z0-9\-\/]+)",
-                r"bill[:\s]*([A-Za-z0-9\-\/]+)",
-            ]
-            header["invoice_no"] = self._extract_with_patterns(full_text, invoice_patterns)
+            pdf = pypdfium2.PdfDocument(source_path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+        except Exception as e:
+            logger.debug(f"Could not count pages for {source_path}: {e}")
+            return None
 
-            # Extract invoice date
-            date_patterns = [
-                r"(?:invoice\s+date|date|bill\s+date):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-                r"date[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-            ]
-            header["invoice_date"] = self._extract_with_patterns(full_text, date_patterns)
+    async def _extract_header(self, context: ExtractionContext) -> Dict[str, Any]:
+        """Extract header information from document."""
+        logger.debug("Extracting header information")
 
-            # Extract due date
-            due_date_patterns = [
-                r"(?:due\s+date|payment\s+due):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-                r"due[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-            ]
-            header["due_date"] = self._extract_with_patterns(full_text, due_date_patterns)
+        header = {}
 
-            # Extract PO number
-            po_patterns = [
-                r"(?:purchase\s+order|po|p\.o\.)\s*(?:no|#|number)\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
-                r"po[:\s]*([A-Za-z0-9\-\/]+)",
-            ]
-            header["po_no"] = self._extract_with_patterns(full_text, po_patterns)
+        try:
+            # Header fields come from the precompiled field engine, scanned once per document
+            header["vendor_name"] = self._first_field_value(context, "vendor_name")
+            header["invoice_no"] = self._first_field_value(context, "invoice_number")
+            header["invoice_date"] = self._first_field_value(context, "invoice_date")
+            header["due_date"] = self._first_field_value(context, "due_date")
+            header["po_no"] = self._first_field_value(context, "po_number")
 
             # Extract currency
-            currency_patterns = [
-                r"(?:currency|curr)[:\s]*([A-Z]{3})",
-                r"\$|€|£|¥|₹",
-            ]
-            header["currency"] = self._extract_currency(full_text)
+            header["currency"] = self._extract_currency(context)
 
             # Extract monetary amounts
-            header = await self._extract_amounts(full_text, header)
+            header = await self._extract_amounts(context, header)
 
             # Clean and normalize extracted data
             header = self._clean_header_data(header)
@@ -225,22 +332,19 @@ class DoclingService:
             logger.error(f"Failed to extract header: {e}")
             return {}
 
-    async def _extract_lines(self, doc: DoclingDocument) -> List[Dict[str, Any]]:
+    async def _extract_lines(self, context: ExtractionContext) -> List[Dict[str, Any]]:
         """Extract line items (table data) from document."""
         logger.debug("Extracting line items")
 
         lines = []
 
         try:
-            # Look for tables in the document
-            full_text = doc.export_to_markdown()
-
             # Try to extract line items from table-like structures
-            lines = self._extract_table_lines(full_text)
+            lines = self._extract_table_lines(context)
 
             # If no table found, try to extract from text patterns
             if not lines:
-                lines = self._extract_text_lines(full_text)
+                lines = self._extract_text_lines(context)
 
             logger.info(f"Extracted {len(lines)} line items")
             return lines
@@ -250,7 +354,7 @@ class DoclingService:
             return []
 
     async def _calculate_confidence(
-        self, doc: DoclingDocument, header: Dict[str, Any], lines: List[Dict[str, Any]]
+        self, context: ExtractionContext, header: Dict[str, Any], lines: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Calculate confidence scores for extracted data."""
         logger.debug("Calculating confidence scores")
@@ -304,21 +408,27 @@ class DoclingService:
         """Calculate overall confidence score."""
         return confidence_data.get("overall", 0.0)
 
-    def _extract_with_patterns(self, text: str, patterns: List[str]) -> Optional[str]:
+    def _extract_with_patterns(
+        self, text: Union[str, ExtractionContext], patterns: List[str]
+    ) -> Optional[str]:
         """Extract text using multiple regex patterns."""
+        context = self._as_context(text)
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            match = context.search(pattern)
             if match:
                 result = match.group(1).strip()
                 return result if result else None
         return None
 
-    def _extract_currency(self, text: str) -> str:
+    def _extract_currency(self, text: Union[str, ExtractionContext]) -> str:
         """Extract currency from document."""
+        context = self._as_context(text)
+        text = context.text
+
         # Look for explicit currency codes
-        currency_match = re.search(r"\b(USD|EUR|GBP|JPY|INR|CAD|AUD)\b", text, re.IGNORECASE)
-        if currency_match:
-            return currency_match.group(1).upper()
+        currency_code = self._first_field_value(context, "currency_code")
+        if currency_code:
+            return currency_code.upper()
 
         # Look for currency symbols
         if "$" in text:
@@ -332,38 +442,29 @@ class DoclingService:
 
         return "USD"  # Default
 
-    async def _extract_amounts(self, text: str, header: Dict[str, Any]) -> Dict[str, Any]:
+    async def _extract_amounts(
+        self, text: Union[str, ExtractionContext], header: Dict[str, Any]
+    ) -> Dict[str, Any]:
         """Extract monetary amounts from document."""
-        amount_patterns = [
-            r"(?:subtotal|sub[-\s]?total)[:\s]*\$?([\d,]+\.\d{2})",
-            r"(?:tax|vat|gst)[:\s]*\$?([\d,]+\.\d{2})",
-            r"(?:total|grand[-\s]?total|amount[-\s]?due)[:\s]*\$?([\d,]+\.\d{2})",
-        ]
+        context = self._as_context(text)
 
-        for pattern in amount_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                amount_str = match.group(1).replace(",", "")
+        for field in ("subtotal", "tax", "total"):
+            amount_str = self._first_field_value(context, field)
+            if amount_str:
                 try:
-                    amount = float(amount_str)
-                    if "subtotal" in pattern.lower():
-                        header["subtotal"] = amount
-                    elif "tax" in pattern.lower():
-                        header["tax"] = amount
-                    elif "total" in pattern.lower():
-                        header["total"] = amount
+                    header[field] = float(amount_str.replace(",", ""))
                 except ValueError:
                     continue
 
         return header
 
-    def _extract_table_lines(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_table_lines(self, text: Union[str, ExtractionContext]) -> List[Dict[str, Any]]:
         """Extract line items from table-like structures."""
         lines = []
 
         # Look for table patterns
         table_pattern = r"(?:description|item|product|service)[^\n]*\n((?:[^\n]*\d+\.?\d*[^\n]*\n)+)"
-        table_match = re.search(table_pattern, text, re.IGNORECASE | re.MULTILINE)
+        table_match = self._as_context(text).search(table_pattern)
 
         if table_match:
             table_content = table_match.group(1)
@@ -378,13 +479,13 @@ class DoclingService:
 
         return lines
 
-    def _extract_text_lines(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_text_lines(self, text: Union[str, ExtractionContext]) -> List[Dict[str, Any]]:
         """Extract line items from text patterns."""
         lines = []
 
         # Look for line items with amounts
         line_pattern = r"([^\n]+?)\s+([\d,]+\.\d{2})\s*$"
-        matches = re.findall(line_pattern, text, re.MULTILINE)
+        matches = self._as_context(text).findall(line_pattern, re.MULTILINE)
 
         for description, amount in matches:
             if description.strip() and amount:
@@ -397,6 +498,19 @@ class DoclingService:
 
         return lines
 
+    def _first_field_value(self, context: ExtractionContext, field: str) -> Optional[str]:
+        """Get the first-match value for a header field."""
+        candidate = context.first_field(field)
+        if candidate and candidate.value:
+            return candidate.value
+        return None
+
+    def _as_context(self, text: Union[str, ExtractionContext]) -> ExtractionContext:
+        """Wrap plain text in an extraction context."""
+        if isinstance(text, ExtractionContext):
+            return text
+        return ExtractionContext.from_text(text)
+
     def _parse_line_item(self, item_text: str) -> Optional[Dict[str, Any]]:
         """Parse a single line item from text."""
         # Extract amount at the end
@@ -679,7 +793,7 @@ class DoclingService:
         confidence = ConfidenceScores(overall=Decimal("0.0"))
 
         metadata = ExtractionMetadata(
-            parser_version="docling-2.60.1",
+            parser_version=PARSER_VERSION,
             processing_time_ms=processing_time,
             page_count=0,
             file_size_bytes=file_size,
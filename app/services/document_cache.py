@@ -0,0 +1,162 @@
+"""
+In-process LRU cache of decompressed document bytes.
+
+One workflow reads the same stored file several times: parsing, fuzzy dedup,
+export preview and retries. Each read goes through the ACL check,
+decompression, an access-time commit and an audit insert. Stored objects are
+immutable per content hash, so decompressed bytes are cached under that hash,
+bounded by total bytes and a TTL. Audited external reads bypass the cache.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import PurePosixPath
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+def file_hash_from_path(file_path: str) -> Optional[str]:
+    """Content hash encoded in a stored object's file name, if there is one."""
+    stem = PurePosixPath(file_path).name.split(".", 1)[0]
+    return stem if _SHA256_HEX.match(stem) else None
+
+
+class DocumentByteCache:
+    """Size-bounded LRU of decompressed bytes keyed by file hash, with a TTL."""
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_item_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        """Initialize an empty cache; limits default to the current settings."""
+        self._max_bytes = max_bytes
+        self._max_item_bytes = max_item_bytes
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.STORAGE_CACHE_ENABLED and self.max_bytes > 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes if self._max_bytes is not None else settings.STORAGE_CACHE_MAX_BYTES
+
+    @property
+    def max_item_bytes(self) -> int:
+        return self._max_item_bytes if self._max_item_bytes is not None else settings.STORAGE_CACHE_MAX_ITEM_BYTES
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl_seconds if self._ttl_seconds is not None else settings.STORAGE_CACHE_TTL_SECONDS
+
+    def get(self, file_hash: str) -> Optional[bytes]:
+        """Cached bytes for a hash, marking them recently used."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(file_hash)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                self._evict(file_hash, "expired")
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(file_hash)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        self._record("hit" if entry is not None else "miss")
+        return entry[0] if entry is not None else None
+
+    def put(self, file_hash: str, content: bytes) -> None:
+        """Cache bytes for a hash, evicting least recently used entries to fit."""
+        if not self.enabled or len(content) > min(self.max_item_bytes, self.max_bytes):
+            return
+
+        with self._lock:
+            if file_hash in self._entries:
+                self._evict(file_hash, None)
+            self._entries[file_hash] = (content, time.monotonic())
+            self.current_bytes += len(content)
+            while self.current_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)), "size")
+            current_bytes = self.current_bytes
+
+        self._set_size(current_bytes)
+
+    def invalidate(self, file_hash: str) -> None:
+        """Drop a hash, e.g. after its file is deleted."""
+        with self._lock:
+            if file_hash in self._entries:
+                self._evict(file_hash, None)
+            current_bytes = self.current_bytes
+        self._set_size(current_bytes)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+        self._set_size(0)
+
+    def _evict(self, file_hash: str, reason: Optional[str]) -> None:
+        """Remove an entry; callers hold the lock. Eviction metrics use ``reason``."""
+        content, _ = self._entries.pop(file_hash)
+        self.current_bytes -= len(content)
+        if reason is not None:
+            self.evictions += 1
+            try:
+                from app.services.prometheus_service import prometheus_service
+                prometheus_service.record_document_cache_eviction(reason)
+            except Exception as e:
+                logger.debug(f"Could not record document cache metric: {e}")
+
+    def _record(self, outcome: str) -> None:
+        """Count a hit or miss."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_document_cache_request(outcome)
+        except Exception as e:
+            logger.debug(f"Could not record document cache metric: {e}")
+
+    def _set_size(self, current_bytes: int) -> None:
+        """Publish the cache size."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.set_document_cache_bytes(current_bytes)
+        except Exception as e:
+            logger.debug(f"Could not record document cache metric: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Singleton instance
+document_cache = DocumentByteCache()
@@ -0,0 +1,81 @@
+"""
+Plain-text sidecars for ingested documents.
+
+Text is extracted once, when a document is first analysed, and stored
+lz4-compressed next to its sorted shingle hashes. Deduplication strategies
+then read sidecars for many jobs in a single query instead of fetching and
+re-extracting each comparison document.
+"""
+
+import logging
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+import lz4.frame
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.ingestion import DocumentTextSidecar
+from app.services.near_duplicate_index import near_duplicate_index
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTextSidecarStore:
+    """Read and write document text sidecars."""
+
+    @staticmethod
+    def compress(text: str) -> bytes:
+        """Compress text for storage."""
+        return lz4.frame.compress(text.encode("utf-8"))
+
+    @staticmethod
+    def decompress(blob: bytes) -> str:
+        """Decompress stored text."""
+        return lz4.frame.decompress(blob).decode("utf-8")
+
+    async def save(
+        self, db: AsyncSession, ingestion_job_id: UUID, text: str, extraction_method: str
+    ) -> DocumentTextSidecar:
+        """Store (or replace) the sidecar for a job. The caller commits."""
+        await db.execute(delete(DocumentTextSidecar).where(DocumentTextSidecar.ingestion_job_id == ingestion_job_id))
+        sidecar = DocumentTextSidecar(
+            ingestion_job_id=ingestion_job_id,
+            text_compressed=self.compress(text),
+            text_length=len(text),
+            shingle_hashes=near_duplicate_index.shingle_hashes(text).tobytes(),
+            extraction_method=extraction_method,
+        )
+        db.add(sidecar)
+        return sidecar
+
+    async def load_text(self, db: AsyncSession, ingestion_job_id: UUID) -> Optional[str]:
+        """Text for one job, or None if no sidecar was captured."""
+        return (await self.load_texts(db, [ingestion_job_id])).get(ingestion_job_id)
+
+    async def load_texts(self, db: AsyncSession, ingestion_job_ids: Iterable[UUID]) -> Dict[UUID, str]:
+        """Text for many jobs in one query."""
+        ids = list(ingestion_job_ids)
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(DocumentTextSidecar.ingestion_job_id, DocumentTextSidecar.text_compressed)
+            .where(DocumentTextSidecar.ingestion_job_id.in_(ids))
+        )
+        return {job_id: self.decompress(blob) for job_id, blob in result.all()}
+
+    async def load_shingles(self, db: AsyncSession, ingestion_job_ids: Iterable[UUID]) -> Dict[UUID, np.ndarray]:
+        """Shingle hashes for many jobs in one query, without decompressing any text."""
+        ids = list(ingestion_job_ids)
+        if not ids:
+            return {}
+        result = await db.execute(
+            select(DocumentTextSidecar.ingestion_job_id, DocumentTextSidecar.shingle_hashes)
+            .where(DocumentTextSidecar.ingestion_job_id.in_(ids))
+        )
+        return {job_id: np.frombuffer(blob, dtype=np.uint32) for job_id, blob in result.all()}
+
+
+# Singleton instance
+document_text_sidecars = DocumentTextSidecarStore()
@@ -11,9 +11,7 @@ from decimal import Decimal
 from dataclasses import dataclass
 import json
 
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
+from docling.document_converter import DocumentConverter
 from docling_core.types.doc import DoclingDocument
 
 from app.core.config import settings
@@ -26,6 +24,10 @@ from app.models.schemas import (
     ExtractionMetadata
 )
 from app.models.extraction import FieldExtraction, BBoxCoordinates, ExtractionLineage
+from app.services.docling_converter_pool import docling_converter_pool
+from app.services.docling_executor import docling_process_executor
+from app.services.extraction_context import ExtractionContext
+from app.services.field_extraction_engine import FieldCandidate, header_field_engine
 from app.services.llm_patch_service import LLMPatchService
 
 logger = logging.getLogger(__name__)
@@ -81,20 +83,15 @@ class ExtractionLineage:
 class EnhancedExtractionService:
     """Enhanced extraction service with per-field confidence and bbox tracking."""
 
-    def __init__(self):
+    def __init__(self, converter: Optional[DocumentConverter] = None):
         """Initialize the enhanced extraction service."""
-        self.pipeline_options = PdfPipelineOptions()
-        self.pipeline_options.do_ocr = True
-        self.pipeline_options.do_table_structure = True
+        self.pipeline_options = docling_converter_pool.pipeline_options
         self.confidence_threshold = settings.DOCLING_CONFIDENCE_THRESHOLD
         self.max_pages = settings.DOCLING_MAX_PAGES
 
-        # Initialize DocumentConverter
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=self.pipeline_options),
-            }
-        )
+        # Without an injected converter, each conversion borrows a warm one from the
+        # process pool; constructing the service never loads models
+        self.converter = converter
 
         # Initialize LLM patch service
         self.llm_patch_service = LLMPatchService()
@@ -104,38 +101,11 @@ class EnhancedExtractionService:
 
     def _init_extraction_patterns(self) -> Dict[str, List[str]]:
         """Initialize extraction patterns for different fields."""
+        # Patterns are compiled once in the shared field engine
         return {
-            "vendor_name": [
-                r"(?:vendor|supplier|bill to|from):\s*([^\n\r]+?)(?:\n|$)",
-                r"^(.+?)\s+(?:invoice|bill)",
-                r"([A-Z][a-z]+\s+(?:Inc|LLC|Corp|Co|Ltd))",
-            ],
-            "invoice_number": [
-                r"(?:invoice\s*(?:no|#|number))\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
-                r"invoice[:\s]*([A-Za-z0-9\-\/]+)",
-                r"bill[:\s]*([A-Za-z0-9\-\/]+)",
-            ],
-            "invoice_date": [
-                r"(?:invoice\s+date|date|bill\s+date):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-                r"date[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-            ],
-            "due_date": [
-                r"(?:due\s+date|payment\s+due):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-                r"due[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
-            ],
-            "po_number": [
-                r"(?:purchase\s+order|po|p\.o\.)\s*(?:no|#|number)\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
-                r"po[:\s]*([A-Za-z0-9\-\/]+)",
-            ],
-            "subtotal": [
-                r"(?:subtotal|sub[-\s]?total)[:\s]*\$?([\d,]+\.\d{2})",
-            ],
-            "tax": [
-                r"(?:tax|vat|gst)[:\s]*\$?([\d,]+\.\d{2})",
-            ],
-            "total": [
-                r"(?:total|grand[-\s]?total|amount[-\s]?due)[:\s]*\$?([\d,]+\.\d{2})",
-            ],
+            field: patterns
+            for field, patterns in header_field_engine.field_patterns.items()
+            if field != "currency_code"
         }
 
     async def extract_with_enhancement(
@@ -152,15 +122,15 @@ class EnhancedExtractionService:
             # Convert document
             doc = await self._convert_document(file_content, file_path)
 
-            # Extract full text and layout information
-            full_text = doc.export_to_markdown()
-            layout_info = self._extract_layout_info(doc)
+            # Render text once and share it with layout, header and line extraction
+            context = ExtractionContext(doc)
+            layout_info = self._extract_layout_info(context)
 
             # Extract header fields with confidence and bbox
-            header_fields = await self._extract_header_with_metadata(doc, full_text, layout_info)
+            header_fields = await self._extract_header_with_metadata(context, layout_info)
 
             # Extract line items with confidence and bbox
-            line_items = await self._extract_lines_with_metadata(doc, full_text, layout_info)
+            line_items = await self._extract_lines_with_metadata(context, layout_info)
 
             # Calculate confidence scores
             confidence_scores = self._calculate_enhanced_confidence(header_fields, line_items)
@@ -178,7 +148,7 @@ class EnhancedExtractionService:
 
             # Create extraction metadata with lineage
             metadata = self._create_enhanced_metadata(
-                doc, file_content, header_fields, line_items, start_time
+                context, file_content, header_fields, line_items, start_time
             )
 
             # Generate processing notes
@@ -206,25 +176,33 @@ class EnhancedExtractionService:
         """Convert document content to DoclingDocument."""
         try:
             if file_path:
-                result = self.converter.convert(file_path)
-            else:
-                import tempfile
-                import os
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                    temp_file.write(file_content)
-                    temp_file_path = temp_file.name
+                return await self._convert_path(file_path)
 
-                try:
-                    result = self.converter.convert(temp_file_path)
-                finally:
-                    os.unlink(temp_file_path)
+            import tempfile
+            import os
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+                temp_file.write(file_content)
+                temp_file_path = temp_file.name
 
-            return result.document
+            try:
+                return await self._convert_path(temp_file_path)
+            finally:
+                os.unlink(temp_file_path)
 
         except Exception as e:
             raise ExtractionException(f"Document conversion failed: {str(e)}")
 
-    def _extract_layout_info(self, doc: DoclingDocument) -> Dict[str, Any]:
+    async def _convert_path(self, source_path: str) -> DoclingDocument:
+        """Run the converter inline or in the Docling process pool."""
+        if settings.DOCLING_EXECUTION_MODE == "process":
+            return await docling_process_executor.convert(source_path)
+
+        if self.converter is not None:
+            return self.converter.convert(source_path).document
+        with docling_converter_pool.checkout() as converter:
+            return converter.convert(source_path).document
+
+    def _extract_layout_info(self, context: ExtractionContext) -> Dict[str, Any]:
         """Extract layout information from document."""
         layout_info = {
             "pages": [],
@@ -234,7 +212,7 @@ class EnhancedExtractionService:
 
         try:
             # Get page information
-            pages = getattr(doc, 'pages', [])
+            pages = getattr(context.doc, 'pages', None) or []
             for i, page in enumerate(pages):
                 page_info = {
                     "page_number": i + 1,
@@ -245,10 +223,7 @@ class EnhancedExtractionService:
 
             # Extract text blocks with positions
             # This is a simplified version - you'd enhance this based on Docling's actual API
-            full_text = doc.export_to_markdown()
-            lines = full_text.split('\n')
-
-            for line_num, line in enumerate(lines):
+            for line_num, line in enumerate(context.lines):
                 if line.strip():
                     block_info = {
                         "text": line,
@@ -266,16 +241,15 @@ class EnhancedExtractionService:
 
     async def _extract_header_with_metadata(
         self,
-        doc: DoclingDocument,
-        full_text: str,
+        context: ExtractionContext,
         layout_info: Dict[str, Any]
     ) -> Dict[str, FieldMetadata]:
         """Extract header fields with confidence and bbox metadata."""
         header_fields = {}
 
-        for field_name, patterns in self.extraction_patterns.items():
+        for field_name in self.extraction_patterns:
             field_metadata = await self._extract_field_with_metadata(
-                field_name, patterns, full_text, layout_info
+                field_name, context, layout_info
             )
             if field_metadata.value is not None:
                 header_fields[field_name] = field_metadata
@@ -285,8 +259,7 @@ class EnhancedExtractionService:
     async def _extract_field_with_metadata(
         self,
         field_name: str,
-        patterns: List[str],
-        full_text: str,
+        context: ExtractionContext,
         layout_info: Dict[str, Any]
     ) -> FieldMetadata:
         """Extract a single field with metadata."""
@@ -294,21 +267,17 @@ class EnhancedExtractionService:
         best_confidence = 0.0
         best_bbox = None
 
-        for pattern in patterns:
-            matches = list(re.finditer(pattern, full_text, re.IGNORECASE | re.MULTILINE))
-            for match in matches:
-                value = match.group(1).strip() if match.groups() else match.group(0).strip()
-
-                # Calculate confidence based on match quality
-                confidence = self._calculate_field_confidence(field_name, value, pattern, match)
+        # All candidates for the field, from one scan of the document text
+        for candidate in context.header_candidates.get(field_name, []):
+            value = candidate.value
 
-                # Extract bbox coordinates (simplified)
-                bbox = self._estimate_bbox_from_match(match, layout_info)
+            # Calculate confidence based on match quality
+            confidence = self._calculate_field_confidence(field_name, value, candidate.pattern, candidate)
 
-                if confidence > best_confidence:
-                    best_value = value
-                    best_confidence = confidence
-                    best_bbox = bbox
+            if confidence > best_confidence:
+                best_value = value
+                best_confidence = confidence
+                best_bbox = self._estimate_bbox_from_candidate(candidate, context)
 
         # Create lineage
         lineage = ExtractionLineage(
@@ -332,7 +301,7 @@ class EnhancedExtractionService:
         field_name: str,
         value: str,
         pattern: str,
-        match: re.Match
+        candidate: FieldCandidate
     ) -> float:
         """Calculate confidence score for a field extraction."""
         base_confidence = 0.5
@@ -365,28 +334,16 @@ class EnhancedExtractionService:
 
         return min(max(confidence, 0.0), 1.0)
 
-    def _estimate_bbox_from_match(
+    def _estimate_bbox_from_candidate(
         self,
-        match: re.Match,
-        layout_info: Dict[str, Any]
+        candidate: FieldCandidate,
+        context: ExtractionContext
     ) -> Optional[BBoxCoordinates]:
-        """Estimate bounding box coordinates from regex match."""
+        """Estimate bounding box coordinates from a candidate's text position."""
         try:
             # Simplified bbox estimation
             # In a real implementation, you'd use Docling's layout API
-            match_start = match.start()
-            match_end = match.end()
-
-            # Estimate line number from character position
-            text_blocks = layout_info.get("text_blocks", [])
-            line_number = 0
-            char_count = 0
-
-            for block in text_blocks:
-                if char_count + len(block["text"]) >= match_start:
-                    break
-                char_count += len(block["text"])
-                line_number += 1
+            line_number = context.line_number_at(candidate.start)
 
             # Create estimated bbox
             return BBoxCoordinates(
@@ -403,28 +360,27 @@ class EnhancedExtractionService:
 
     async def _extract_lines_with_metadata(
         self,
-        doc: DoclingDocument,
-        full_text: str,
+        context: ExtractionContext,
         layout_info: Dict[str, Any]
     ) -> List[Dict[str, FieldMetadata]]:
         """Extract line items with metadata."""
         line_items = []
 
         # Try table extraction first
-        table_lines = self._extract_table_lines_with_metadata(full_text, layout_info)
+        table_lines = self._extract_table_lines_with_metadata(context, layout_info)
         if table_lines:
             line_items.extend(table_lines)
 
         # Fallback to text-based extraction
         if not line_items:
-            text_lines = self._extract_text_lines_with_metadata(full_text, layout_info)
+            text_lines = self._extract_text_lines_with_metadata(context, layout_info)
             line_items.extend(text_lines)
 
         return line_items[:10]  # Limit to 10 line items
 
     def _extract_table_lines_with_metadata(
         self,
-        full_text: str,
+        context: ExtractionContext,
         layout_info: Dict[str, Any]
     ) -> List[Dict[str, FieldMetadata]]:
         """Extract line items from table structures."""
@@ -432,7 +388,7 @@ class EnhancedExtractionService:
 
         # Look for table patterns
         table_pattern = r"(?:description|item|product|service)[^\n]*\n((?:[^\n]*\d+\.?\d*[^\n]*\n)+)"
-        table_match = re.search(table_pattern, full_text, re.IGNORECASE | re.MULTILINE)
+        table_match = context.search(table_pattern)
 
         if table_match:
             table_content = table_match.group(1)
@@ -448,7 +404,7 @@ class EnhancedExtractionService:
 
     def _extract_text_lines_with_metadata(
         self,
-        full_text: str,
+        context: ExtractionContext,
         layout_info: Dict[str, Any]
     ) -> List[Dict[str, FieldMetadata]]:
         """Extract line items from text patterns."""
@@ -456,7 +412,7 @@ class EnhancedExtractionService:
 
         # Look for line items with amounts
         line_pattern = r"([^\n]+?)\s+([\d,]+\.\d{2})\s*$"
-        matches = re.findall(line_pattern, full_text, re.MULTILINE)
+        matches = context.findall(line_pattern, re.MULTILINE)
 
         for i, (description, amount) in enumerate(matches):
             if description.strip() and amount:
@@ -746,7 +702,7 @@ class EnhancedExtractionService:
 
     def _create_enhanced_metadata(
         self,
-        doc: DoclingDocument,
+        context: ExtractionContext,
         file_content: bytes,
         header_fields: Dict[str, FieldMetadata],
         line_items: List[Dict[str, FieldMetadata]],
@@ -754,7 +710,7 @@ class EnhancedExtractionService:
     ) -> ExtractionMetadata:
         """Create enhanced extraction metadata."""
         processing_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-        page_count = len(getattr(doc, 'pages', []))
+        page_count = context.page_count
 
         # Calculate completeness score
         required_header_fields = ["vendor_name", "invoice_number", "total"]
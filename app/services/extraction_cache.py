@@ -0,0 +1,287 @@
+"""
+Content-addressed cache of Docling extraction results.
+
+The same PDF often reaches us several times (email, re-upload, DLQ redrive).
+Results are cached under ``(sha256, parser_version, pipeline_options)`` so a
+repeat document skips conversion entirely. Two tiers are supported: a local
+disk directory or Redis, both with size-bounded LRU eviction.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiofiles
+
+from app.core.config import settings
+from app.models.schemas import InvoiceExtractionResult
+
+logger = logging.getLogger(__name__)
+
+
+class DiskExtractionCache:
+    """Extraction cache tier on local disk, evicting least recently used files."""
+
+    def __init__(self, cache_path: str, max_bytes: int):
+        """Initialize the disk tier."""
+        self.cache_path = Path(cache_path)
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._approx_bytes: Optional[int] = None
+
+    def _entry_path(self, key: str) -> Path:
+        """Get the file path for a cache key."""
+        return self.cache_path / key[:2] / f"{key}.json"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Read an entry and mark it as recently used."""
+        path = self._entry_path(key)
+        try:
+            async with aiofiles.open(path, "r") as f:
+                payload = await f.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            # mtime doubles as the LRU timestamp
+            os.utime(path, None)
+        except OSError:
+            pass
+        return payload
+
+    async def set(self, key: str, payload: str) -> None:
+        """Write an entry atomically and evict if over budget."""
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+
+        async with aiofiles.open(temp_path, "w") as f:
+            await f.write(payload)
+        os.replace(temp_path, path)
+
+        if self._approx_bytes is None:
+            self._approx_bytes = sum(size for _, size, _ in self._list_entries())
+        else:
+            self._approx_bytes += len(payload)
+
+        if self._approx_bytes > self.max_bytes:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._evict)
+
+    async def delete(self, key: str) -> None:
+        """Remove an entry."""
+        try:
+            os.unlink(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _list_entries(self) -> List[Tuple[float, int, Path]]:
+        """List (mtime, size, path) for every entry."""
+        entries = []
+        for path in self.cache_path.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until 90% of the budget is free."""
+        entries = sorted(self._list_entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                evicted += 1
+            except FileNotFoundError:
+                continue
+
+        self._approx_bytes = total
+        if evicted:
+            logger.info(f"Evicted {evicted} extraction cache entries ({total} bytes remain)")
+
+    def get_size_bytes(self) -> int:
+        """Current size of the tier."""
+        return sum(size for _, size, _ in self._list_entries())
+
+
+class RedisExtractionCache:
+    """Extraction cache tier in Redis with a sorted-set LRU index."""
+
+    def __init__(self, redis_url: str, max_bytes: int, prefix: str = "extraction_cache"):
+        """Initialize the Redis tier."""
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(redis_url)
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.lru_key = f"{prefix}:lru"
+        self.sizes_key = f"{prefix}:sizes"
+        self.bytes_key = f"{prefix}:bytes"
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Read an entry and mark it as recently used."""
+        payload = await self.client.get(self._entry_key(key))
+        if payload is None:
+            return None
+        await self.client.zadd(self.lru_key, {key: time.time()})
+        return payload.decode("utf-8") if isinstance(payload, bytes) else payload
+
+    async def set(self, key: str, payload: str) -> None:
+        """Write an entry and evict if over budget."""
+        size = len(payload)
+        previous = await self.client.hget(self.sizes_key, key)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self._entry_key(key), payload)
+            pipe.zadd(self.lru_key, {key: time.time()})
+            pipe.hset(self.sizes_key, key, size)
+            pipe.incrby(self.bytes_key, size - int(previous or 0))
+            results = await pipe.execute()
+
+        if int(results[-1]) > self.max_bytes:
+            await self._evict()
+
+    async def delete(self, key: str) -> None:
+        """Remove an entry."""
+        size = await self.client.hget(self.sizes_key, key)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._entry_key(key))
+            pipe.zrem(self.lru_key, key)
+            pipe.hdel(self.sizes_key, key)
+            if size is not None:
+                pipe.decrby(self.bytes_key, int(size))
+            await pipe.execute()
+
+    async def _evict(self, batch_size: int = 50) -> None:
+        """Delete least recently used entries until 90% of the budget is free."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+
+        while int(await self.client.get(self.bytes_key) or 0) > target:
+            oldest = await self.client.zrange(self.lru_key, 0, batch_size - 1)
+            if not oldest:
+                break
+            for raw_key in oldest:
+                await self.delete(raw_key.decode("utf-8") if isinstance(raw_key, bytes) else raw_key)
+                evicted += 1
+
+        if evicted:
+            logger.info(f"Evicted {evicted} extraction cache entries from Redis")
+
+    def get_size_bytes(self) -> int:
+        """Size is tracked in Redis; not available synchronously."""
+        return -1
+
+
+class ExtractionResultCache:
+    """Cache of serialised InvoiceExtractionResult keyed by content and parser configuration."""
+
+    def __init__(self):
+        """Initialize the cache; the backend tier is created on first use."""
+        self.enabled = settings.EXTRACTION_CACHE_ENABLED
+        self.backend_type = settings.EXTRACTION_CACHE_BACKEND.lower()
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def backend(self):
+        """Get the configured cache tier."""
+        if self._backend is None:
+            if self.backend_type == "redis":
+                self._backend = RedisExtractionCache(settings.REDIS_URL, settings.EXTRACTION_CACHE_MAX_BYTES)
+            else:
+                self._backend = DiskExtractionCache(settings.EXTRACTION_CACHE_PATH, settings.EXTRACTION_CACHE_MAX_BYTES)
+        return self._backend
+
+    @staticmethod
+    def build_key(file_hash: str, parser_version: str, pipeline_options: Dict[str, Any]) -> str:
+        """Build a cache key from the content hash and everything that changes the parse."""
+        options = json.dumps(pipeline_options, sort_keys=True, default=str)
+        fingerprint = hashlib.sha256(f"{parser_version}|{options}".encode("utf-8")).hexdigest()[:16]
+        return f"{file_hash}-{fingerprint}"
+
+    async def get(self, key: str) -> Optional[InvoiceExtractionResult]:
+        """Look up a cached extraction result."""
+        if not self.enabled:
+            return None
+
+        try:
+            payload = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Extraction cache read failed: {e}")
+            return None
+
+        if payload is None:
+            self._record("miss")
+            return None
+
+        try:
+            result = InvoiceExtractionResult.model_validate_json(payload)
+        except Exception as e:
+            # Stale or incompatible entry; drop it and re-extract
+            logger.warning(f"Discarding unreadable extraction cache entry {key}: {e}")
+            await self.backend.delete(key)
+            self._record("miss")
+            return None
+
+        self._record("hit")
+        return result
+
+    async def set(self, key: str, result: InvoiceExtractionResult) -> None:
+        """Store an extraction result."""
+        if not self.enabled:
+            return
+
+        try:
+            await self.backend.set(key, result.model_dump_json())
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Extraction cache write failed: {e}")
+
+    def _record(self, outcome: str) -> None:
+        """Count a hit or miss."""
+        if outcome == "hit":
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_extraction_cache_request(outcome)
+        except Exception as e:
+            logger.debug(f"Could not record extraction cache metric: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend_type,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Singleton instance
+extraction_cache = ExtractionResultCache()
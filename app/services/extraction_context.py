@@ -0,0 +1,130 @@
+"""
+Per-document extraction context shared by the Docling extraction services.
+
+Rendering a ``DoclingDocument`` to markdown is expensive on long invoices, so
+the context renders it once and caches the text together with everything
+derived from it (lowercased text, line offsets, tables, regex matches and
+header field candidates).
+"""
+
+import bisect
+import re
+from functools import cached_property, lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from docling_core.types.doc import DoclingDocument
+
+from app.services.field_extraction_engine import FieldCandidate, header_field_engine
+
+DEFAULT_FLAGS = re.IGNORECASE | re.MULTILINE
+
+
+@lru_cache(maxsize=512)
+def compile_pattern(pattern: str, flags: int = DEFAULT_FLAGS) -> Pattern[str]:
+    """Compile a regex pattern once per process."""
+    return re.compile(pattern, flags)
+
+
+class ExtractionContext:
+    """Lazily rendered text and cached derived artefacts for one document."""
+
+    def __init__(
+        self,
+        doc: Optional[DoclingDocument] = None,
+        text: Optional[str] = None,
+        page_count: Optional[int] = None,
+    ):
+        """Create a context from a Docling document or from already-rendered text."""
+        self.doc = doc
+        if text is not None:
+            self.__dict__["text"] = text
+        if page_count is not None:
+            self.__dict__["page_count"] = page_count
+        self._match_cache: Dict[Tuple[str, int, str], Any] = {}
+
+    @classmethod
+    def from_text(cls, text: str) -> "ExtractionContext":
+        """Create a context over plain text (no Docling document)."""
+        return cls(text=text)
+
+    @cached_property
+    def text(self) -> str:
+        """Markdown rendering of the document, produced once."""
+        if self.doc is None:
+            return ""
+        return self.doc.export_to_markdown()
+
+    @cached_property
+    def text_lower(self) -> str:
+        """Lowercased text for cheap keyword checks."""
+        return self.text.lower()
+
+    @cached_property
+    def lines(self) -> List[str]:
+        """Text split into lines."""
+        return self.text.split("\n")
+
+    @cached_property
+    def line_offsets(self) -> List[int]:
+        """Character offset at which each line starts."""
+        offsets = []
+        position = 0
+        for line in self.lines:
+            offsets.append(position)
+            position += len(line) + 1
+        return offsets
+
+    @cached_property
+    def tables(self) -> List[Any]:
+        """Table items detected by Docling."""
+        if self.doc is None:
+            return []
+        return list(getattr(self.doc, "tables", None) or [])
+
+    @cached_property
+    def page_count(self) -> int:
+        """Number of pages in the converted document."""
+        if self.doc is None:
+            return 0
+        return len(getattr(self.doc, "pages", None) or [])
+
+    @cached_property
+    def header_candidates(self) -> Dict[str, List[FieldCandidate]]:
+        """Every header field candidate with its span, scanned once."""
+        return header_field_engine.scan(self.text)
+
+    def first_field(self, field: str) -> Optional[FieldCandidate]:
+        """First-match candidate for a header field."""
+        if "header_candidates" in self.__dict__:
+            candidates = self.header_candidates.get(field)
+            return candidates[0] if candidates else None
+
+        key = (field, 0, "first_field")
+        if key not in self._match_cache:
+            self._match_cache[key] = header_field_engine.first(self.text, field)
+        return self._match_cache[key]
+
+    def line_number_at(self, position: int) -> int:
+        """Get the zero-based line number containing a character offset."""
+        return max(bisect.bisect_right(self.line_offsets, position) - 1, 0)
+
+    def search(self, pattern: str, flags: int = DEFAULT_FLAGS) -> Optional[re.Match]:
+        """Cached ``re.search`` over the document text."""
+        key = (pattern, flags, "search")
+        if key not in self._match_cache:
+            self._match_cache[key] = compile_pattern(pattern, flags).search(self.text)
+        return self._match_cache[key]
+
+    def finditer(self, pattern: str, flags: int = DEFAULT_FLAGS) -> List[re.Match]:
+        """Cached list of all matches over the document text."""
+        key = (pattern, flags, "finditer")
+        if key not in self._match_cache:
+            self._match_cache[key] = list(compile_pattern(pattern, flags).finditer(self.text))
+        return self._match_cache[key]
+
+    def findall(self, pattern: str, flags: int = DEFAULT_FLAGS) -> List[Any]:
+        """Cached ``re.findall`` over the document text."""
+        key = (pattern, flags, "findall")
+        if key not in self._match_cache:
+            self._match_cache[key] = compile_pattern(pattern, flags).findall(self.text)
+        return self._match_cache[key]
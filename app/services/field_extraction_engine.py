@@ -0,0 +1,155 @@
+"""
+Precompiled regex engine for invoice header field extraction.
+
+Every header pattern is compiled once per process. ``scan`` runs each compiled
+pattern over the text exactly once and returns every candidate with its
+character span (used for bbox estimation); ``first`` answers the cheaper
+"first pattern that matches wins" question with early exit.
+
+Matching itself is no faster than calling ``re`` directly, whose pattern cache
+already avoids recompiling. The engine exists so both extraction services share
+one pattern table and one candidate format, and so ``ExtractionContext`` can
+scan each document once. A single combined alternation does not fit: one pass
+over it yields non-overlapping matches, while candidates from different
+patterns may overlap, and the lookahead form that keeps them is slower.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Pattern, Sequence
+
+DEFAULT_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Header patterns shared by DoclingService and EnhancedExtractionService,
+# in priority order per field (earlier patterns win).
+HEADER_FIELD_PATTERNS: Dict[str, List[str]] = {
+    "vendor_name": [
+        r"(?:vendor|supplier|bill to|from):\s*([^\n\r]+?)(?:\n|$)",
+        r"^(.+?)\s+(?:invoice|bill)",
+        r"([A-Z][a-z]+\s+(?:Inc|LLC|Corp|Co|Ltd))",
+    ],
+    "invoice_number": [
+        r"(?:invoice\s*(?:no|#|number))\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
+        r"invoice[:\s]*([A-Za-z0-9\-\/]+)",
+        r"bill[:\s]*([A-Za-z0-9\-\/]+)",
+    ],
+    "invoice_date": [
+        r"(?:invoice\s+date|date|bill\s+date):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
+        r"date[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
+    ],
+    "due_date": [
+        r"(?:due\s+date|payment\s+due):\s*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
+        r"due[:\s]*([0-9]{1,2}[\/\-\.][0-9]{1,2}[\/\-\.][0-9]{2,4})",
+    ],
+    "po_number": [
+        r"(?:purchase\s+order|po|p\.o\.)\s*(?:no|#|number)\s*[:#]?\s*([A-Za-z0-9\-\/]+)",
+        r"po[:\s]*([A-Za-z0-9\-\/]+)",
+    ],
+    "subtotal": [
+        r"(?:subtotal|sub[-\s]?total)[:\s]*\$?([\d,]+\.\d{2})",
+    ],
+    "tax": [
+        r"(?:tax|vat|gst)[:\s]*\$?([\d,]+\.\d{2})",
+    ],
+    "total": [
+        r"(?:total|grand[-\s]?total|amount[-\s]?due)[:\s]*\$?([\d,]+\.\d{2})",
+    ],
+    "currency_code": [
+        r"\b(USD|EUR|GBP|JPY|INR|CAD|AUD)\b",
+    ],
+}
+
+
+class FieldCandidate(NamedTuple):
+    """A candidate value for a field, with its position in the text."""
+    field: str
+    value: str
+    start: int
+    end: int
+    value_start: int
+    value_end: int
+    pattern: str
+    priority: int
+
+
+@dataclass(frozen=True)
+class _CompiledPattern:
+    """A compiled field pattern and where its value lives."""
+    field: str
+    priority: int
+    pattern: str
+    regex: Pattern[str]
+    value_group: int
+
+
+class FieldExtractionEngine:
+    """Compiled multi-field scanner returning candidates with positions."""
+
+    def __init__(self, field_patterns: Dict[str, Sequence[str]], flags: int = DEFAULT_FLAGS):
+        """Compile all field patterns once."""
+        self.field_patterns = {field: list(patterns) for field, patterns in field_patterns.items()}
+        self.flags = flags
+        self._compiled: Dict[str, List[_CompiledPattern]] = {}
+
+        for field, patterns in self.field_patterns.items():
+            compiled = []
+            for priority, pattern in enumerate(patterns):
+                regex = re.compile(pattern, flags)
+                compiled.append(_CompiledPattern(
+                    field=field,
+                    priority=priority,
+                    pattern=pattern,
+                    regex=regex,
+                    value_group=1 if regex.groups else 0,
+                ))
+            self._compiled[field] = compiled
+
+    @property
+    def fields(self) -> List[str]:
+        """Fields known to the engine."""
+        return list(self.field_patterns)
+
+    def scan(self, text: str, fields: Optional[Sequence[str]] = None) -> Dict[str, List[FieldCandidate]]:
+        """Return every candidate for each field, ordered by pattern priority then position."""
+        candidates: Dict[str, List[FieldCandidate]] = {}
+
+        for field in fields or self.field_patterns:
+            field_candidates = []
+            for compiled in self._compiled.get(field, []):
+                for match in compiled.regex.finditer(text):
+                    field_candidates.append(self._to_candidate(compiled, match))
+            candidates[field] = field_candidates
+
+        return candidates
+
+    def first(self, text: str, field: str) -> Optional[FieldCandidate]:
+        """Return the first match of the highest-priority matching pattern."""
+        for compiled in self._compiled.get(field, []):
+            match = compiled.regex.search(text)
+            if match:
+                return self._to_candidate(compiled, match)
+        return None
+
+    def extract(self, text: str, fields: Optional[Sequence[str]] = None) -> Dict[str, Optional[str]]:
+        """Return the first-match value for each field (None when absent or blank)."""
+        values = {}
+        for field in fields or self.field_patterns:
+            candidate = self.first(text, field)
+            values[field] = candidate.value if candidate and candidate.value else None
+        return values
+
+    @staticmethod
+    def _to_candidate(compiled: _CompiledPattern, match: re.Match) -> FieldCandidate:
+        """Build a candidate from a regex match."""
+        group = compiled.value_group
+        value = match.group(group) or ""
+        start, end = match.span()
+        value_start, value_end = match.span(group)
+        return FieldCandidate(
+            compiled.field, value.strip(), start, end, value_start, value_end,
+            compiled.pattern, compiled.priority,
+        )
+
+
+# Singleton instance
+header_field_engine = FieldExtractionEngine(HEADER_FIELD_PATTERNS)
@@ -7,11 +7,12 @@ import hashlib
 import json
 import logging
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, desc, update, delete
+from sqlalchemy import String, select, and_, or_, func, desc, update, delete, column, values
 from sqlalchemy.dialects.postgresql import insert
 
 from app.core.config import settings
@@ -29,6 +30,16 @@ from app.models.ingestion import IngestionJob
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class IdempotencyClaim:
+    """Outcome for one key of a bulk check-and-create."""
+
+    record: IdempotencyRecord
+    is_new: bool
+    started: bool = False
+    error: Optional[ConflictException] = None
+
+
 class IdempotencyService:
     """Service for managing idempotency across all operations."""
 
@@ -125,83 +136,184 @@ class IdempotencyService:
         Returns:
             Tuple of (idempotency_record, is_new_record)
         """
+        claims = await self.check_and_create_idempotency_records(
+            db=db,
+            operation_type=operation_type,
+            operations=[{
+                "idempotency_key": idempotency_key,
+                "operation_data": operation_data,
+                "invoice_id": invoice_id,
+                "ingestion_job_id": ingestion_job_id,
+            }],
+            user_id=user_id,
+            ttl_seconds=ttl_seconds,
+            max_executions=max_executions,
+            client_ip=client_ip,
+            session_id=session_id,
+        )
+        claim = claims[idempotency_key]
+        if claim.error is not None:
+            raise claim.error
+        return claim.record, claim.is_new
+
+    async def check_and_create_idempotency_records(
+        self,
+        db: AsyncSession,
+        operation_type: IdempotencyOperationType,
+        operations: List[Dict[str, Any]],
+        user_id: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_executions: Optional[int] = None,
+        client_ip: Optional[str] = None,
+        session_id: Optional[str] = None,
+        mark_started: bool = False,
+    ) -> Dict[str, IdempotencyClaim]:
+        """
+        Check and create idempotency records for many keys in one transaction.
+
+        New keys are inserted with a single ``INSERT ... ON CONFLICT DO NOTHING
+        RETURNING``; the keys that already existed are loaded with one SELECT
+        and resolved exactly as ``check_and_create_idempotency_record`` does,
+        except that a conflict is returned on the claim instead of raised.
+
+        Args:
+            db: Database session
+            operation_type: Type of operation shared by all keys
+            operations: Dicts with ``idempotency_key`` and ``operation_data``, and
+                optionally ``invoice_id`` and ``ingestion_job_id``
+            user_id: Optional user ID
+            ttl_seconds: Time to live in seconds
+            max_executions: Maximum execution attempts
+            client_ip: Client IP address
+            session_id: Session ID
+            mark_started: Also mark every executable key as in progress, saving
+                a ``mark_operation_started`` round trip per key
+
+        Returns:
+            Claim per idempotency key
+        """
+        operations_by_key = {}
+        for operation in operations:
+            operations_by_key.setdefault(operation["idempotency_key"], operation)
+        if not operations_by_key:
+            return {}
+
         try:
-            # Set defaults
             ttl_seconds = ttl_seconds or self.default_ttl_seconds
             max_executions = max_executions or self.max_execution_attempts
-            expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
-
-            # First, try to find existing record
-            existing_record = await self._get_idempotency_record(db, idempotency_key)
-
-            if existing_record:
-                # Check if existing record can be used
-                if existing_record.operation_status == IdempotencyStatus.COMPLETED:
-                    logger.info(f"Returning completed operation for key: {idempotency_key}")
-                    return existing_record, False
-
-                elif existing_record.operation_status == IdempotencyStatus.IN_PROGRESS:
-                    # Another instance is processing this operation
-                    if existing_record.is_expired():
-                        # Mark as expired and allow new execution
-                        await self._mark_record_expired(db, existing_record)
-                        logger.warning(f"Expired in-progress operation for key: {idempotency_key}")
-                    else:
-                        # Still in progress, create conflict record
-                        await self._create_conflict_record(
-                            db, existing_record, operation_data, "concurrent_execution"
-                        )
-                        raise ConflictException(
-                            f"Operation with idempotency key '{idempotency_key}' is already in progress"
-                        )
+            now = datetime.now(timezone.utc)
+            expires_at = now + timedelta(seconds=ttl_seconds)
+
+            rows = []
+            for key, operation in operations_by_key.items():
+                invoice_id = operation.get("invoice_id")
+                ingestion_job_id = operation.get("ingestion_job_id")
+                rows.append({
+                    "id": uuid.uuid4(),
+                    "idempotency_key": key,
+                    "operation_type": operation_type,
+                    "operation_status": IdempotencyStatus.IN_PROGRESS if mark_started else IdempotencyStatus.PENDING,
+                    "operation_data": operation["operation_data"],
+                    "invoice_id": uuid.UUID(invoice_id) if invoice_id else None,
+                    "ingestion_job_id": uuid.UUID(ingestion_job_id) if ingestion_job_id else None,
+                    "execution_count": 1 if mark_started else 0,
+                    "max_executions": max_executions,
+                    "first_attempt_at": now if mark_started else None,
+                    "last_attempt_at": now if mark_started else None,
+                    "expires_at": expires_at,
+                    "ttl_seconds": ttl_seconds,
+                    "user_id": user_id,
+                    "client_ip": client_ip,
+                    "session_id": session_id,
+                })
+
+            insert_stmt = (
+                insert(IdempotencyRecord)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[IdempotencyRecord.idempotency_key])
+                .returning(IdempotencyRecord)
+            )
+            claims = {
+                record.idempotency_key: IdempotencyClaim(record, is_new=True, started=mark_started)
+                for record in (await db.scalars(insert_stmt)).all()
+            }
 
-                elif existing_record.operation_status == IdempotencyStatus.FAILED:
-                    # Check if we can retry
-                    if existing_record.execution_count >= existing_record.max_executions:
-                        raise ConflictException(
-                            f"Operation with idempotency key '{idempotency_key}' has exceeded maximum execution attempts"
-                        )
-                    # We can retry this failed operation
-                    await self._mark_record_retry(db, existing_record)
-                    logger.info(f"Retrying failed operation for key: {idempotency_key}")
-
-                else:
-                    # Other status, create conflict
-                    await self._create_conflict_record(
-                        db, existing_record, operation_data, "status_conflict"
-                    )
-                    raise ConflictException(
-                        f"Operation with idempotency key '{idempotency_key}' has conflicting status: {existing_record.operation_status}"
+            existing_keys = [key for key in operations_by_key if key not in claims]
+            if existing_keys:
+                # Locked so two batches cannot both retry the same failed operation
+                existing_stmt = (
+                    select(IdempotencyRecord)
+                    .where(IdempotencyRecord.idempotency_key.in_(existing_keys))
+                    .with_for_update()
+                )
+                for record in (await db.scalars(existing_stmt)).all():
+                    operation_data = operations_by_key[record.idempotency_key]["operation_data"]
+                    claims[record.idempotency_key] = self._resolve_existing_record(
+                        db, record, operation_data, expires_at, mark_started
                     )
 
-            # Create new idempotency record
-            new_record = IdempotencyRecord(
-                idempotency_key=idempotency_key,
-                operation_type=operation_type,
-                operation_status=IdempotencyStatus.PENDING,
-                operation_data=operation_data,
-                invoice_id=uuid.UUID(invoice_id) if invoice_id else None,
-                ingestion_job_id=uuid.UUID(ingestion_job_id) if ingestion_job_id else None,
-                expires_at=expires_at,
-                ttl_seconds=ttl_seconds,
-                max_executions=max_executions,
-                user_id=user_id,
-                client_ip=client_ip,
-                session_id=session_id,
-            )
-
-            db.add(new_record)
             await db.commit()
-            await db.refresh(new_record)
 
-            logger.info(f"Created new idempotency record for key: {idempotency_key}")
-            return new_record, True
+            created = sum(1 for claim in claims.values() if claim.is_new)
+            logger.info(
+                f"Resolved {len(claims)} idempotency keys: {created} new, {len(claims) - created} existing"
+            )
+            return claims
 
         except Exception as e:
             await db.rollback()
-            logger.error(f"Error in check_and_create_idempotency_record: {e}")
+            logger.error(f"Error in check_and_create_idempotency_records: {e}")
             raise
 
+    def _resolve_existing_record(
+        self,
+        db: AsyncSession,
+        record: IdempotencyRecord,
+        operation_data: Dict[str, Any],
+        expires_at: datetime,
+        mark_started: bool,
+    ) -> IdempotencyClaim:
+        """Apply the per-status rules to a key that already had a record."""
+        key = record.idempotency_key
+
+        if record.operation_status == IdempotencyStatus.COMPLETED:
+            logger.info(f"Returning completed operation for key: {key}")
+            return IdempotencyClaim(record, is_new=False)
+
+        if record.operation_status == IdempotencyStatus.IN_PROGRESS:
+            if not record.is_expired():
+                # Another instance is processing this operation
+                db.add(self._conflict_record(record, operation_data, "concurrent_execution"))
+                return IdempotencyClaim(record, is_new=False, error=ConflictException(
+                    f"Operation with idempotency key '{key}' is already in progress"
+                ))
+            # Mark as expired and allow new execution
+            record.operation_status = IdempotencyStatus.FAILED
+            record.error_data = {"error": "operation_expired", "message": "Operation expired before completion"}
+            logger.warning(f"Expired in-progress operation for key: {key}")
+
+        elif record.operation_status != IdempotencyStatus.FAILED:
+            db.add(self._conflict_record(record, operation_data, "status_conflict"))
+            return IdempotencyClaim(record, is_new=False, error=ConflictException(
+                f"Operation with idempotency key '{key}' has conflicting status: {record.operation_status}"
+            ))
+
+        if record.execution_count >= record.max_executions:
+            return IdempotencyClaim(record, is_new=False, error=ConflictException(
+                f"Operation with idempotency key '{key}' has exceeded maximum execution attempts"
+            ))
+
+        if not mark_started:
+            # The caller retries through mark_operation_started
+            logger.info(f"Retrying failed operation for key: {key}")
+            return IdempotencyClaim(record, is_new=False)
+
+        record.mark_attempt()
+        record.mark_in_progress()
+        record.expires_at = expires_at
+        logger.info(f"Retrying failed operation for key: {key}")
+        return IdempotencyClaim(record, is_new=False, started=True)
+
     async def mark_operation_started(
         self,
         db: AsyncSession,
@@ -343,6 +455,74 @@ class IdempotencyService:
             logger.error(f"Error marking operation as failed: {e}")
             return False
 
+    async def mark_operations_finished(
+        self,
+        db: AsyncSession,
+        completed: Optional[Dict[str, Dict[str, Any]]] = None,
+        failed: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> int:
+        """
+        Mark many in-progress operations completed or failed in one transaction.
+
+        Args:
+            db: Database session
+            completed: Result data by idempotency key
+            failed: Error details by idempotency key
+
+        Returns:
+            Number of records updated
+        """
+        completed = completed or {}
+        failed = failed or {}
+        now = datetime.now(timezone.utc)
+
+        try:
+            updated = 0
+            if completed:
+                updated += await self._finish_in_progress(
+                    db, IdempotencyStatus.COMPLETED, "result_data", completed, completed_at=now, updated_at=now
+                )
+            if failed:
+                updated += await self._finish_in_progress(
+                    db, IdempotencyStatus.FAILED, "error_data", failed, updated_at=now
+                )
+            await db.commit()
+
+            operation_count = len(completed) + len(failed)
+            if updated < operation_count:
+                logger.warning(f"Only {updated} of {operation_count} operations were in progress when finished")
+            return updated
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error marking operations as finished: {e}")
+            return 0
+
+    async def _finish_in_progress(
+        self,
+        db: AsyncSession,
+        status: IdempotencyStatus,
+        data_field: str,
+        data_by_key: Dict[str, Dict[str, Any]],
+        **timestamps: datetime,
+    ) -> int:
+        """Move the in-progress records among data_by_key to status; returns how many moved."""
+        table = IdempotencyRecord.__table__
+        finished = values(
+            column("key", String),
+            column("data", table.c[data_field].type),
+            name="finished",
+        ).data(list(data_by_key.items()))
+
+        result = await db.execute(
+            update(table)
+            .where(table.c.idempotency_key == finished.c.key)
+            .where(table.c.operation_status == IdempotencyStatus.IN_PROGRESS)
+            .values({data_field: finished.c.data, "operation_status": status, **timestamps})
+            .returning(table.c.id)
+        )
+        return len(result.all())
+
     async def get_operation_result(
         self,
         db: AsyncSession,
@@ -538,52 +718,20 @@ class IdempotencyService:
             logger.error(f"Error getting idempotency record: {e}")
             return None
 
-    async def _create_conflict_record(
-        self,
-        db: AsyncSession,
+    @staticmethod
+    def _conflict_record(
         existing_record: IdempotencyRecord,
         conflicting_data: Dict[str, Any],
         conflict_reason: str,
-    ) -> None:
-        """Create a conflict record."""
-        try:
-            conflict = IdempotencyConflict(
-                idempotency_record_id=existing_record.id,
-                conflict_key=existing_record.idempotency_key,
-                conflict_type="data_mismatch",
-                conflict_reason=conflict_reason,
-                conflicting_operation_data=conflicting_data,
-            )
-            db.add(conflict)
-            await db.commit()
-        except Exception as e:
-            logger.error(f"Error creating conflict record: {e}")
-
-    async def _mark_record_expired(
-        self,
-        db: AsyncSession,
-        record: IdempotencyRecord,
-    ) -> None:
-        """Mark a record as expired."""
-        try:
-            record.operation_status = IdempotencyStatus.FAILED
-            record.error_data = {"error": "operation_expired", "message": "Operation expired before completion"}
-            await db.commit()
-        except Exception as e:
-            logger.error(f"Error marking record as expired: {e}")
-
-    async def _mark_record_retry(
-        self,
-        db: AsyncSession,
-        record: IdempotencyRecord,
-    ) -> None:
-        """Mark a record for retry."""
-        try:
-            record.mark_attempt()
-            record.operation_status = IdempotencyStatus.PENDING
-            await db.commit()
-        except Exception as e:
-            logger.error(f"Error marking record for retry: {e}")
+    ) -> IdempotencyConflict:
+        """Build a conflict record."""
+        return IdempotencyConflict(
+            idempotency_record_id=existing_record.id,
+            conflict_key=existing_record.idempotency_key,
+            conflict_type="data_mismatch",
+            conflict_reason=conflict_reason,
+            conflicting_operation_data=conflicting_data,
+        )
 
     async def _update_metrics(
         self,
@@ -6,7 +6,6 @@ import asyncio
 import hashlib
 import logging
 import uuid
-import magic
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union, BinaryIO
@@ -30,6 +29,7 @@ from app.models.ingestion import (
 )
 from app.models.reference import Vendor
 from app.services.storage_service import StorageService
+from app.services.upload_staging import SNIFF_BYTES, StagedUpload, upload_stager
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +54,7 @@ class IngestionService:
 
     async def ingest_file(
         self,
-        file_content: Union[bytes, BinaryIO],
+        file_content: Union[bytes, BinaryIO, UploadFile, StagedUpload],
         filename: str,
         content_type: Optional[str] = None,
         vendor_id: Optional[str] = None,
@@ -67,8 +67,12 @@ class IngestionService:
         """
         Ingest a file with comprehensive hashing, storage, and deduplication.
 
+        Content that is not already staged is streamed to a temp file in chunks
+        first; storage moves that file into place and later stages read it
+        through a memoryview, so the file is never held in memory as bytes.
+
         Args:
-            file_content: Raw file content or file-like object
+            file_content: Raw bytes, a file-like object with async read(), or a StagedUpload
             filename: Original filename
             content_type: MIME type (auto-detected if not provided)
             vendor_id: Optional vendor UUID
@@ -83,34 +87,80 @@ class IngestionService:
         """
         logger.info(f"Starting ingestion for file: {filename}")
 
+        staged = None
         try:
-            # Convert file content to bytes if needed
-            if hasattr(file_content, 'read'):
-                file_bytes = await file_content.read()
+            # Hash, sniff and size-check the content while streaming it to disk
+            if isinstance(file_content, StagedUpload):
+                staged = file_content
             else:
-                file_bytes = file_content
+                staged = await upload_stager.stage(
+                    file_content, filename, content_type, max_size=self.max_file_size
+                )
+
+            prepared = await self.prepare_staged_file(
+                staged,
+                filename=filename,
+                content_type=content_type,
+                vendor_id=vendor_id,
+                source_type=source_type,
+                source_reference=source_reference,
+                uploaded_by=uploaded_by,
+                user_id=user_id,
+                request=request,
+            )
+            if prepared["job"] is not None:
+                await self.queue_processing_tasks([prepared])
 
-            # Validate file content
-            await self._validate_file_content(file_bytes, filename, content_type)
+            return prepared["result"]
 
-            # Calculate file hashes
-            file_hash = await self._calculate_file_hash(file_bytes)
-            mime_type = await self._detect_mime_type(file_bytes, content_type)
+        except Exception as e:
+            logger.error(f"Failed to ingest file {filename}: {e}")
+            raise IngestionException(f"Ingestion failed: {str(e)}")
+        finally:
+            # Storage has moved the temp file into place unless the content was deduplicated
+            if staged is not None and staged is not file_content:
+                staged.cleanup()
 
+    async def prepare_staged_file(
+        self,
+        staged: StagedUpload,
+        filename: str,
+        content_type: Optional[str] = None,
+        vendor_id: Optional[str] = None,
+        source_type: str = "upload",
+        source_reference: Optional[str] = None,
+        uploaded_by: Optional[str] = None,
+        user_id: Optional[str] = None,
+        request: Optional[Request] = None,
+    ) -> Dict[str, Any]:
+        """
+        Validate, store and analyse a staged upload, stopping short of queuing it.
+
+        Returns the ingestion result together with the job and storage info to
+        queue; ``job`` is None when the file was already ingested.
+        """
+        # Validate file content
+        await self._validate_file_content(staged, filename, content_type)
+
+        file_hash = staged.file_hash
+        mime_type = staged.mime_type
+
+        with staged.view() as file_view:
             # Extract file metadata
             file_metadata = await self._extract_file_metadata(
-                file_bytes, filename, mime_type, file_hash
+                file_view, filename, mime_type, file_hash
             )
 
             # Check for existing ingestion jobs
             existing_job = await self._check_existing_ingestion(file_hash)
             if existing_job:
                 logger.warning(f"Duplicate file detected: {filename} (hash: {file_hash})")
-                return await self._handle_duplicate_file(existing_job, filename, source_reference)
+                result = await self._handle_duplicate_file(existing_job, filename, source_reference)
+                return {"result": result, "job": None, "storage_info": None}
 
             # Store file with enhanced metadata
             storage_info = await self.storage_service.store_file(
-                file_content=file_bytes,
+                file_content=staged,
                 filename=filename,
                 content_type=mime_type,
                 user_id=user_id,
@@ -123,7 +173,7 @@ class IngestionService:
             # Create ingestion job
             ingestion_job = await self._create_ingestion_job(
                 filename=filename,
-                file_bytes=file_bytes,
+                file_bytes=file_view,
                 file_hash=file_hash,
                 mime_type=mime_type,
                 storage_info=storage_info,
@@ -134,31 +184,30 @@ class IngestionService:
                 metadata=file_metadata
             )
 
-            # Run deduplication analysis
+            # Run deduplication analysis while the staged content is still mapped
             duplicate_analysis = await self._run_deduplication_analysis(
-                ingestion_job, file_bytes, file_metadata
+                ingestion_job, file_view, file_metadata
             )
 
-            # Queue processing task
-            await self._queue_processing_task(ingestion_job, storage_info)
-
-            logger.info(f"Successfully ingested file {filename} as job {ingestion_job.id}")
+        logger.info(f"Successfully ingested file {filename} as job {ingestion_job.id}")
 
-            return {
-                "ingestion_job_id": str(ingestion_job.id),
-                "status": ingestion_job.status.value,
-                "filename": filename,
-                "file_hash": file_hash,
-                "file_size": len(file_bytes),
-                "storage_path": storage_info["file_path"],
-                "duplicate_analysis": duplicate_analysis,
-                "created_at": ingestion_job.created_at,
-                "estimated_processing_time": self._estimate_processing_time(file_bytes, mime_type),
-            }
+        result = {
+            "ingestion_job_id": str(ingestion_job.id),
+            "status": ingestion_job.status.value,
+            "filename": filename,
+            "file_hash": file_hash,
+            "file_size": staged.size,
+            "storage_path": storage_info["file_path"],
+            "duplicate_analysis": duplicate_analysis,
+            "created_at": ingestion_job.created_at,
+            "estimated_processing_time": self._estimate_processing_time(staged.size, mime_type),
+        }
+        return {"result": result, "job": ingestion_job, "storage_info": storage_info}
 
-        except Exception as e:
-            logger.error(f"Failed to ingest file {filename}: {e}")
-            raise IngestionException(f"Ingestion failed: {str(e)}")
+    async def queue_processing_tasks(self, prepared: List[Dict[str, Any]]) -> None:
+        """Queue processing for a set of prepared files in one pass."""
+        for item in prepared:
+            await self._queue_processing_task(item["job"], item["storage_info"])
 
     async def get_ingestion_job(
         self,
@@ -377,18 +426,18 @@ class IngestionService:
             raise IngestionException(f"Failed to get metrics: {str(e)}")
 
     async def _validate_file_content(
-        self, file_bytes: bytes, filename: str, content_type: Optional[str]
+        self, staged: StagedUpload, filename: str, content_type: Optional[str]
     ) -> None:
-        """Validate file content against allowed types and sizes."""
+        """Validate staged file content against allowed types and sizes."""
         # Check file size
-        if len(file_bytes) > self.max_file_size:
+        if staged.size > self.max_file_size:
             raise IngestionException(
-                f"File size {len(file_bytes)} bytes exceeds maximum {self.max_file_size} bytes"
+                f"File size {staged.size} bytes exceeds maximum {self.max_file_size} bytes"
             )
 
-        # Detect MIME type if not provided
+        # Use the MIME type sniffed while staging if none was provided
         if not content_type:
-            content_type = await self._detect_mime_type(file_bytes)
+            content_type = staged.mime_type
 
         # Check if file type is allowed
         if content_type not in self.allowed_file_types:
@@ -406,28 +455,15 @@ class IngestionService:
 
     async def _detect_mime_type(self, file_bytes: bytes, content_type: Optional[str] = None) -> str:
         """Detect MIME type using python-magic library."""
-        try:
-            # Use python-magic for accurate MIME type detection
-            mime = magic.Magic(mime=True)
-            detected_type = mime.from_buffer(file_bytes)
-
-            # Fallback to provided content_type if detection fails
-            if detected_type == "application/octet-stream" and content_type:
-                return content_type
-
-            return detected_type
-
-        except Exception as e:
-            logger.warning(f"MIME type detection failed: {e}")
-            # Fallback to provided content_type or default
-            return content_type or "application/octet-stream"
+        # libmagic only needs the start of the file
+        return upload_stager.sniff_mime_type(bytes(file_bytes[:SNIFF_BYTES]), content_type)
 
     async def _calculate_file_hash(self, file_bytes: bytes) -> str:
         """Calculate SHA-256 hash of file content."""
         return hashlib.sha256(file_bytes).hexdigest()
 
     async def _extract_file_metadata(
-        self, file_bytes: bytes, filename: str, mime_type: str, file_hash: str
+        self, file_bytes: Union[bytes, memoryview], filename: str, mime_type: str, file_hash: str
     ) -> Dict[str, Any]:
         """Extract metadata from file content."""
         metadata = {
@@ -450,7 +486,7 @@ class IngestionService:
 
         return metadata
 
-    async def _extract_pdf_metadata(self, file_bytes: bytes) -> Dict[str, Any]:
+    async def _extract_pdf_metadata(self, file_bytes: Union[bytes, memoryview]) -> Dict[str, Any]:
         """Extract metadata from PDF files."""
         # This is a placeholder - implement PDF metadata extraction
         # using libraries like PyPDF2 or pdfplumber
@@ -465,7 +501,7 @@ class IngestionService:
             "modification_date": None,
         }
 
-    async def _extract_image_metadata(self, file_bytes: bytes) -> Dict[str, Any]:
+    async def _extract_image_metadata(self, file_bytes: Union[bytes, memoryview]) -> Dict[str, Any]:
         """Extract metadata from image files."""
         # This is a placeholder - implement image metadata extraction
         # using libraries like Pillow (PIL)
@@ -505,7 +541,7 @@ class IngestionService:
     async def _create_ingestion_job(
         self,
         filename: str,
-        file_bytes: bytes,
+        file_bytes: Union[bytes, memoryview],
         file_hash: str,
         mime_type: str,
         storage_info: Dict[str, Any],
@@ -539,7 +575,7 @@ class IngestionService:
         return job
 
     async def _run_deduplication_analysis(
-        self, job: IngestionJob, file_bytes: bytes, metadata: Dict[str, Any]
+        self, job: IngestionJob, file_bytes: Union[bytes, memoryview], metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Run comprehensive deduplication analysis."""
         analysis = {
@@ -576,7 +612,7 @@ class IngestionService:
         self,
         strategy: DeduplicationStrategy,
         job: IngestionJob,
-        file_bytes: bytes,
+        file_bytes: Union[bytes, memoryview],
         metadata: Dict[str, Any],
     ) -> Dict[str, Any]:
         """Apply a specific deduplication strategy."""
@@ -618,7 +654,7 @@ class IngestionService:
         return {"confidence": 0.0, "duplicates": []}
 
     async def _fuzzy_matching_deduplication(
-        self, job: IngestionJob, file_bytes: bytes
+        self, job: IngestionJob, file_bytes: Union[bytes, memoryview]
     ) -> Dict[str, Any]:
         """Fuzzy matching based on content similarity."""
         # Placeholder implementation
@@ -631,10 +667,10 @@ class IngestionService:
         # For now, just log the action
         logger.info(f"Would queue processing task for job {job.id}")
 
-    def _estimate_processing_time(self, file_bytes: bytes, mime_type: str) -> int:
+    def _estimate_processing_time(self, file_size: int, mime_type: str) -> int:
         """Estimate processing time in seconds based on file size and type."""
         base_time = 2  # Base processing time
-        size_factor = len(file_bytes) / (1024 * 1024)  # Size in MB
+        size_factor = file_size / (1024 * 1024)  # Size in MB
 
         if mime_type == "application/pdf":
             return int(base_time + size_factor * 5)
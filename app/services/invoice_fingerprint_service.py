@@ -0,0 +1,178 @@
+"""
+Indexed duplicate-invoice lookup over normalised invoice fingerprints.
+
+Fingerprints are written alongside every extraction save (see
+``app.models.invoice``), so a duplicate check probes the
+``(vendor_key, invoice_number_key)`` and ``(vendor_id, invoice_number_key)``
+indexes instead of filtering the unindexed ``header_json`` column. The vendor
+matches on its normalised extracted name or, when the invoice has one, on its
+vendor record, so name variants ("Acme Inc" vs "ACME Incorporated") of a
+resolved vendor still match.
+"""
+
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.invoice import (
+    Invoice,
+    InvoiceExtraction,
+    InvoiceFingerprint,
+    normalize_invoice_number_key,
+    normalize_vendor_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class InvoiceFingerprintService:
+    """Service for duplicate lookups against invoice fingerprints."""
+
+    async def find_duplicates(
+        self,
+        session: AsyncSession,
+        vendor_name: Optional[str],
+        invoice_number: Optional[str],
+        exclude_invoice_id: Optional[Union[str, uuid.UUID]] = None,
+        vendor_id: Optional[Union[str, uuid.UUID]] = None,
+    ) -> List[Tuple[Invoice, InvoiceExtraction, InvoiceFingerprint]]:
+        """
+        Find invoices from the same vendor with the same normalised invoice number.
+
+        The vendor is the normalised extracted name or the vendor record:
+        ``vendor_id``, or else the vendor of ``exclude_invoice_id``, resolved
+        once by primary key. Both are equality probes on fingerprint indexes.
+        """
+        vendor_key, invoice_number_key = self.lookup_key(vendor_name, invoice_number)
+        if not vendor_key or not invoice_number_key:
+            return []
+
+        vendor_match = InvoiceFingerprint.vendor_key == vendor_key
+        if vendor_id is not None:
+            vendor_match = or_(vendor_match, InvoiceFingerprint.vendor_id == self.as_uuid(vendor_id))
+        elif exclude_invoice_id:
+            invoice_vendor = (
+                select(Invoice.vendor_id).where(Invoice.id == self.as_uuid(exclude_invoice_id)).scalar_subquery()
+            )
+            vendor_match = or_(vendor_match, InvoiceFingerprint.vendor_id == invoice_vendor)
+
+        query = (
+            select(Invoice, InvoiceExtraction, InvoiceFingerprint)
+            .join(Invoice, Invoice.id == InvoiceFingerprint.invoice_id)
+            .join(InvoiceExtraction, InvoiceExtraction.id == InvoiceFingerprint.extraction_id)
+            .where(
+                and_(InvoiceFingerprint.invoice_number_key == invoice_number_key, vendor_match)
+            )
+        )
+        if exclude_invoice_id:
+            query = query.where(InvoiceFingerprint.invoice_id != self.as_uuid(exclude_invoice_id))
+
+        result = await session.execute(query)
+        duplicates = [tuple(row) for row in result.all()]
+        logger.debug(f"Fingerprint lookup {vendor_key}/{invoice_number_key}: {len(duplicates)} match(es)")
+        return duplicates
+
+    async def find_duplicates_bulk(
+        self,
+        session: AsyncSession,
+        lookups: Iterable[Tuple[Optional[str], Optional[str]]],
+        chunk_size: int = 1000,
+    ) -> Dict[Tuple[str, str], List[Tuple[Invoice, InvoiceExtraction, InvoiceFingerprint]]]:
+        """Fingerprint matches for many (vendor name, invoice number) pairs, keyed by normalised keys."""
+        keys = sorted({self.lookup_key(vendor_name, invoice_number) for vendor_name, invoice_number in lookups})
+        keys = [key for key in keys if key[0] and key[1]]
+        matches: Dict[Tuple[str, str], List[Tuple[Invoice, InvoiceExtraction, InvoiceFingerprint]]] = {
+            key: [] for key in keys
+        }
+
+        for start in range(0, len(keys), chunk_size):
+            query = (
+                select(Invoice, InvoiceExtraction, InvoiceFingerprint)
+                .join(Invoice, Invoice.id == InvoiceFingerprint.invoice_id)
+                .join(InvoiceExtraction, InvoiceExtraction.id == InvoiceFingerprint.extraction_id)
+                .where(
+                    tuple_(InvoiceFingerprint.vendor_key, InvoiceFingerprint.invoice_number_key).in_(
+                        keys[start:start + chunk_size]
+                    )
+                )
+            )
+            result = await session.execute(query)
+            for row in result.all():
+                fingerprint = row[2]
+                matches[(fingerprint.vendor_key, fingerprint.invoice_number_key)].append(tuple(row))
+
+        logger.debug(f"Bulk fingerprint lookup: {len(keys)} key(s), {sum(map(len, matches.values()))} match(es)")
+        return matches
+
+    async def find_duplicates_by_vendor_bulk(
+        self,
+        session: AsyncSession,
+        lookups: Iterable[Tuple[Optional[Union[str, uuid.UUID]], Optional[str]]],
+        chunk_size: int = 1000,
+    ) -> Dict[Tuple[uuid.UUID, str], List[Tuple[Invoice, InvoiceExtraction, InvoiceFingerprint]]]:
+        """Fingerprint matches for many (vendor id, invoice number) pairs, keyed by vendor id and number key."""
+        keys = {self.vendor_lookup_key(vendor_id, invoice_number) for vendor_id, invoice_number in lookups}
+        keys = sorted((key for key in keys if key[0] and key[1]), key=lambda key: (str(key[0]), key[1]))
+        matches: Dict[Tuple[uuid.UUID, str], List[Tuple[Invoice, InvoiceExtraction, InvoiceFingerprint]]] = {
+            key: [] for key in keys
+        }
+
+        for start in range(0, len(keys), chunk_size):
+            query = (
+                select(Invoice, InvoiceExtraction, InvoiceFingerprint)
+                .join(Invoice, Invoice.id == InvoiceFingerprint.invoice_id)
+                .join(InvoiceExtraction, InvoiceExtraction.id == InvoiceFingerprint.extraction_id)
+                .where(
+                    tuple_(InvoiceFingerprint.vendor_id, InvoiceFingerprint.invoice_number_key).in_(
+                        keys[start:start + chunk_size]
+                    )
+                )
+            )
+            result = await session.execute(query)
+            for row in result.all():
+                fingerprint = row[2]
+                matches[(fingerprint.vendor_id, fingerprint.invoice_number_key)].append(tuple(row))
+
+        logger.debug(
+            f"Bulk fingerprint lookup by vendor: {len(keys)} key(s), {sum(map(len, matches.values()))} match(es)"
+        )
+        return matches
+
+    @staticmethod
+    def lookup_key(vendor_name: Optional[str], invoice_number: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Normalised (vendor, invoice number) key used by duplicate lookups."""
+        return normalize_vendor_key(vendor_name), normalize_invoice_number_key(invoice_number)
+
+    @classmethod
+    def vendor_lookup_key(
+        cls, vendor_id: Optional[Union[str, uuid.UUID]], invoice_number: Optional[str]
+    ) -> Tuple[Optional[Union[str, uuid.UUID]], Optional[str]]:
+        """(vendor id, normalised invoice number) key used by duplicate lookups on the vendor record."""
+        return cls.as_uuid(vendor_id) if vendor_id else None, normalize_invoice_number_key(invoice_number)
+
+    @staticmethod
+    def header_keys(header: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalised fingerprint keys for an extracted header."""
+        return InvoiceFingerprint.keys_from_header(header)
+
+    @classmethod
+    def same_invoice(cls, invoice_id: Any, other_id: Optional[Union[str, uuid.UUID]]) -> bool:
+        """Whether two invoice ids, as UUIDs or strings, name the same invoice."""
+        return other_id is not None and str(cls.as_uuid(invoice_id)) == str(cls.as_uuid(other_id))
+
+    @staticmethod
+    def as_uuid(value: Union[str, uuid.UUID]) -> Union[str, uuid.UUID]:
+        """Coerce string ids so the comparison stays index-friendly."""
+        if isinstance(value, uuid.UUID):
+            return value
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            return value
+
+
+# Singleton instance
+invoice_fingerprint_service = InvoiceFingerprintService()
@@ -3,7 +3,6 @@ Enhanced local storage service with compression, deduplication, and audit loggin
 """
 
 import asyncio
-import gzip
 import hashlib
 import json
 import logging
@@ -12,20 +11,37 @@ import shutil
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import aiofiles
-import lz4.frame
 from fastapi import Request
 
 from app.core.config import settings
 from app.core.exceptions import StorageException
 from app.db.session import AsyncSessionLocal
-from app.models.storage_audit import FileAccessControl, FileDeduplication, StorageAudit
+from app.models.storage_audit import FileAccessControl, FileDeduplication
+from app.services.storage_codec import storage_codecs
+from app.services.storage_metadata import (
+    StorageMetadataUnitOfWork,
+    storage_audit_flusher,
+    storage_usage_accumulator,
+)
+from app.services.storage_replication import storage_replicator
+from app.services.upload_staging import StagedUpload
 
 logger = logging.getLogger(__name__)
 
 
+def file_extension(filename: str) -> str:
+    """Lower-cased extension used in stored object names."""
+    return Path(filename).suffix.lower() or ".bin"
+
+
+def content_addressed_path(file_hash: str, extension: str) -> str:
+    """Canonical object path for a hash in the content-addressed layout."""
+    return f"objects/{file_hash[:2]}/{file_hash[2:4]}/{file_hash}{extension}"
+
+
 class LocalStorageService:
     """Enhanced local storage service with compression, deduplication, and audit logging."""
 
@@ -35,6 +51,7 @@ class LocalStorageService:
         self.compression_enabled = getattr(settings, 'STORAGE_COMPRESSION_ENABLED', True)
         self.compression_type = getattr(settings, 'STORAGE_COMPRESSION_TYPE', 'gzip')  # gzip, lz4, none
         self.compression_threshold = getattr(settings, 'STORAGE_COMPRESSION_THRESHOLD', 1024)  # bytes
+        self.layout = getattr(settings, 'STORAGE_LAYOUT', 'legacy')  # legacy, content_addressed
 
         # Initialize storage directories
         self._init_storage_directories()
@@ -46,6 +63,7 @@ class LocalStorageService:
             directories = [
                 self.storage_path,
                 self.storage_path / "originals",
+                self.storage_path / "objects",
                 self.storage_path / "processed",
                 self.storage_path / "compressed",
                 self.storage_path / "temp",
@@ -66,7 +84,7 @@ class LocalStorageService:
 
     async def store_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, StagedUpload],
         filename: str,
         content_type: Optional[str] = None,
         user_id: Optional[str] = None,
@@ -76,24 +94,129 @@ class LocalStorageService:
         vendor_name: Optional[str] = None,
         invoice_date: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Store a file with compression, deduplication, and audit logging."""
+        """
+        Store a file with compression, deduplication, and audit logging.
+
+        A StagedUpload is moved or compressed into place from its temp file
+        without being read into memory.
+        """
         operation_start = time.time()
+        staged = file_content if isinstance(file_content, StagedUpload) else None
+        final_content: Union[bytes, Path, None] = None
 
         try:
             # Generate file hash
-            file_hash = hashlib.sha256(file_content).hexdigest()
-            file_size = len(file_content)
+            if staged is not None:
+                file_hash, file_size = staged.file_hash, staged.size
+            else:
+                file_hash = hashlib.sha256(file_content).hexdigest()
+                file_size = len(file_content)
 
-            # Check for existing file using deduplication
-            deduplication_info = await self._check_deduplication(file_hash, filename)
+            # One canonical object per hash, or the legacy organized path
+            if self.layout == "content_addressed":
+                file_path = content_addressed_path(file_hash, file_extension(filename))
+            else:
+                file_path = self._generate_organized_file_path(
+                    file_hash, filename, organization_path, vendor_name, invoice_date
+                )
 
-            if deduplication_info:
-                # File already exists, update reference count
-                await self._update_reference_count(file_hash)
+            # Deduplication check and insert, access control and audit share one transaction
+            async with self._metadata_unit_of_work() as unit:
+                # Claimed as uncompressed; only the call that creates the record compresses
+                dedup_record, created = await unit.claim_file(
+                    file_hash=file_hash,
+                    original_filename=filename,
+                    stored_path=file_path,
+                    file_size=file_size,
+                    content_type=content_type,
+                    is_compressed=False,
+                    compression_type=None,
+                    original_size=file_size,
+                    compressed_size=file_size,
+                )
+                restore = not created and not (self.storage_path / dedup_record["stored_path"]).exists()
+
+                if created or restore:
+                    # Compress file if enabled and meets threshold
+                    if staged is not None:
+                        final_content, is_compressed, compression_info = await self._compress_staged_file(
+                            staged, content_type
+                        )
+                    else:
+                        compressed_content, is_compressed, compression_info = await self._compress_file(
+                            file_content, content_type
+                        )
+                        final_content = compressed_content if is_compressed else file_content
+                    stored_path = file_path if not is_compressed else f"compressed/{file_path}"
+                    full_path = self.storage_path / stored_path
+                    compression_fields = {
+                        "is_compressed": is_compressed,
+                        "compression_type": compression_info.get("type") if compression_info else None,
+                        "original_size": compression_info.get("original_size") if compression_info else file_size,
+                        "compressed_size": compression_info.get("compressed_size") if compression_info else file_size,
+                    }
+                    if is_compressed or restore:
+                        await unit.repoint_file(file_hash, stored_path, **compression_fields)
+
+                if restore:
+                    # The record outlived its object (a permanent delete between its unlink and
+                    # its reference release); store this copy and point the record at it
+                    logger.warning(f"Object for {file_hash} missing at {dedup_record['stored_path']}, rewriting")
+                    await self._place_object(final_content, full_path)
+                    dedup_record = {"stored_path": stored_path, **compression_fields}
+
+                if not created:
+                    # File already exists; the upsert took a reference on it
+                    unit.audit(**self._audit_fields(
+                        file_path=dedup_record["stored_path"],
+                        file_hash=file_hash,
+                        operation="store",
+                        operation_status="success",
+                        user_id=user_id,
+                        session_id=session_id,
+                        request=request,
+                        file_size=file_size,
+                        content_type=content_type,
+                        duration_ms=int((time.time() - operation_start) * 1000),
+                        metadata=json.dumps({"deduplicated": True, "original_filename": filename})
+                    ))
 
-                # Log access
-                await self._log_storage_operation(
-                    file_path=deduplication_info["stored_path"],
+                    return {
+                        "storage_type": "local",
+                        "file_path": dedup_record["stored_path"],
+                        "file_hash": file_hash,
+                        "file_size": file_size,
+                        "filename": filename,
+                        "content_type": content_type,
+                        "url": f"file://{self.storage_path / dedup_record['stored_path']}",
+                        "deduplicated": True,
+                        "is_compressed": dedup_record.get("is_compressed", False),
+                        "original_size": dedup_record.get("original_size", file_size),
+                        "compressed_size": dedup_record.get("compressed_size", file_size),
+                    }
+
+                if self.layout == "legacy":
+                    # Store in originals directory as backup
+                    original_path = self.storage_path / "originals" / file_path
+                    if staged is not None:
+                        await self._copy_file_async(staged.path, original_path)
+                    else:
+                        await self._write_file_async(original_path, file_content)
+
+                # Write the file before commit so a failed write never leaves a dangling record
+                await self._place_object(final_content, full_path)
+
+                # Set up file access control
+                unit.grant_access(
+                    file_path=stored_path,
+                    file_hash=file_hash,
+                    access_level="private",
+                    created_by=user_id
+                )
+
+                # Log successful operation
+                unit.audit(**self._audit_fields(
+                    file_path=stored_path,
                     file_hash=file_hash,
                     operation="store",
                     operation_status="success",
@@ -103,84 +226,28 @@ class LocalStorageService:
                     file_size=file_size,
                     content_type=content_type,
                     duration_ms=int((time.time() - operation_start) * 1000),
-                    metadata=json.dumps({"deduplicated": True, "original_filename": filename})
-                )
-
-                return {
-                    "storage_type": "local",
-                    "file_path": deduplication_info["stored_path"],
-                    "file_hash": file_hash,
-                    "file_size": file_size,
-                    "filename": filename,
-                    "content_type": content_type,
-                    "url": f"file://{self.storage_path / deduplication_info['stored_path']}",
-                    "deduplicated": True,
-                    "is_compressed": deduplication_info.get("is_compressed", False),
-                    "original_size": deduplication_info.get("original_size", file_size),
-                    "compressed_size": deduplication_info.get("compressed_size", file_size),
-                }
-
-            # Generate file path with organization
-            file_path = self._generate_organized_file_path(
-                file_hash, filename, organization_path, vendor_name, invoice_date
-            )
-
-            # Compress file if enabled and meets threshold
-            compressed_content, is_compressed, compression_info = await self._compress_file(
-                file_content, content_type
-            )
-
-            # Store the file
-            final_content = compressed_content if is_compressed else file_content
-            stored_path = file_path if not is_compressed else f"compressed/{file_path}"
-            full_path = self.storage_path / stored_path
-
-            # Write file
-            await self._write_file_async(full_path, final_content)
-
-            # Store in originals directory as backup
-            original_path = self.storage_path / "originals" / file_path
-            await self._write_file_async(original_path, file_content)
-
-            # Save deduplication record
-            await self._save_deduplication_record(
-                file_hash=file_hash,
-                original_filename=filename,
-                stored_path=stored_path,
-                file_size=file_size,
-                content_type=content_type,
-                is_compressed=is_compressed,
-                compression_info=compression_info
-            )
-
-            # Set up file access control
-            await self._set_file_access_control(
-                file_path=stored_path,
-                file_hash=file_hash,
-                access_level="private",
-                created_by=user_id
-            )
-
-            # Log successful operation
-            await self._log_storage_operation(
-                file_path=stored_path,
-                file_hash=file_hash,
-                operation="store",
-                operation_status="success",
-                user_id=user_id,
-                session_id=session_id,
-                request=request,
-                file_size=file_size,
-                content_type=content_type,
-                duration_ms=int((time.time() - operation_start) * 1000),
-                metadata=json.dumps({
-                    "compression": compression_info,
-                    "original_filename": filename,
-                    "organization_path": organization_path,
-                    "vendor_name": vendor_name,
-                    "invoice_date": invoice_date
-                })
-            )
+                    metadata=json.dumps({
+                        "compression": compression_info,
+                        "original_filename": filename,
+                        "organization_path": organization_path,
+                        "vendor_name": vendor_name,
+                        "invoice_date": invoice_date
+                    })
+                ))
+
+            if self.layout == "content_addressed":
+                # Backups are links or a later rate-limited copy, never a second write here
+                await storage_replicator.backup(stored_path)
+
+                # The caller's organization path becomes a view onto the canonical object
+                if organization_path:
+                    link_path = self.storage_path / organization_path / f"{file_hash}{file_extension(filename)}"
+                    try:
+                        link_path.parent.mkdir(parents=True, exist_ok=True)
+                        if not link_path.exists():
+                            link_path.symlink_to(full_path.resolve())
+                    except OSError as e:
+                        logger.warning(f"Failed to create organization link for {file_hash}: {e}")
 
             # Create additional organizational links
             await self._create_organizational_links(
@@ -199,11 +266,14 @@ class LocalStorageService:
                 "is_compressed": is_compressed,
                 "compression_type": compression_info.get("type") if compression_info else None,
                 "original_size": compression_info.get("original_size", file_size) if compression_info else file_size,
-                "compressed_size": compression_info.get("compressed_size", len(final_content)) if compression_info else file_size,
+                "compressed_size": compression_info.get("compressed_size") if compression_info else file_size,
                 "compression_ratio": compression_info.get("ratio", 0) if compression_info else 0,
             }
 
         except Exception as e:
+            if staged is not None and isinstance(final_content, Path) and final_content != staged.path:
+                final_content.unlink(missing_ok=True)
+
             # Log failed operation
             await self._log_storage_operation(
                 file_path="",
@@ -213,7 +283,7 @@ class LocalStorageService:
                 user_id=user_id,
                 session_id=session_id,
                 request=request,
-                file_size=len(file_content) if file_content else 0,
+                file_size=staged.size if staged is not None else (len(file_content) if file_content else 0),
                 content_type=content_type,
                 duration_ms=int((time.time() - operation_start) * 1000),
                 error_message=str(e),
@@ -442,9 +512,7 @@ class LocalStorageService:
         prefix2 = file_hash[2:4]
 
         # Get file extension
-        extension = Path(filename).suffix.lower()
-        if not extension:
-            extension = ".bin"  # Default extension
+        extension = file_extension(filename)
 
         base_path = f"{prefix1}/{prefix2}/{file_hash}{extension}"
 
@@ -486,20 +554,16 @@ class LocalStorageService:
             return file_content, False, None
 
         # Don't compress already compressed files
-        if content_type:
-            skip_types = [
-                "application/zip", "application/gzip", "application/x-gzip",
-                "application/x-lz4", "application/x-7z-compressed",
-                "application/x-rar-compressed", "image/jpeg", "image/png"
-            ]
-            if any(skip_type in content_type.lower() for skip_type in skip_types):
-                return file_content, False, None
+        if self._skip_compression(content_type):
+            return file_content, False, None
 
         try:
             if self.compression_type == "gzip":
                 compressed_content = await self._compress_gzip(file_content)
             elif self.compression_type == "lz4":
                 compressed_content = await self._compress_lz4(file_content)
+            elif self.compression_type == "zstd":
+                compressed_content = await self._compress_zstd(file_content, content_type)
             else:
                 return file_content, False, None
 
@@ -520,31 +584,137 @@ class LocalStorageService:
             logger.warning(f"Compression failed: {e}")
             return file_content, False, None
 
+    async def _place_object(self, content: Union[bytes, Path], full_path: Path) -> None:
+        """Move a staged or compressed temp file into place, or write bytes there."""
+        if isinstance(content, Path):
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(content, full_path)
+        else:
+            await self._write_file_async(full_path, content)
+
+    async def _compress_staged_file(
+        self, staged: StagedUpload, content_type: Optional[str] = None
+    ) -> Tuple[Path, bool, Optional[Dict[str, Any]]]:
+        """Compress a staged upload file-to-file; returns the path to store and compression info."""
+        if (
+            not self.compression_enabled
+            or self.compression_type not in ("gzip", "lz4", "zstd")
+            or staged.size < self.compression_threshold
+            or self._skip_compression(content_type)
+        ):
+            return staged.path, False, None
+
+        target = staged.path.with_name(f"{staged.path.name}.{self.compression_type}")
+        try:
+            loop = asyncio.get_event_loop()
+            compressed_size = await loop.run_in_executor(
+                None, storage_codecs.encode_file, staged.path, target, self.compression_type, content_type
+            )
+        except Exception as e:
+            logger.warning(f"Compression failed: {e}")
+            target.unlink(missing_ok=True)
+            return staged.path, False, None
+
+        compression_ratio = (staged.size - compressed_size) / staged.size
+
+        # Only use compression if it's beneficial (at least 10% reduction)
+        if compression_ratio > 0.1:
+            return target, True, {
+                "type": self.compression_type,
+                "original_size": staged.size,
+                "compressed_size": compressed_size,
+                "ratio": compression_ratio
+            }
+
+        target.unlink(missing_ok=True)
+        return staged.path, False, None
+
     async def _compress_gzip(self, content: bytes) -> bytes:
-        """Compress content using gzip."""
+        """Compress content into a gzip frame."""
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: gzip.compress(content))
+        return await loop.run_in_executor(None, storage_codecs.encode, content, "gzip")
 
     async def _compress_lz4(self, content: bytes) -> bytes:
-        """Compress content using LZ4."""
+        """Compress content into an LZ4 frame."""
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: lz4.frame.compress(content))
+        return await loop.run_in_executor(None, storage_codecs.encode, content, "lz4")
+
+    async def _compress_zstd(self, content: bytes, content_type: Optional[str] = None) -> bytes:
+        """Compress content into a zstd frame, with the trained dictionary for PDFs."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, storage_codecs.encode, content, "zstd", content_type)
 
     async def _decompress_file(self, content: bytes, file_path: str) -> bytes:
-        """Decompress file content based on compression type."""
+        """Decompress file content using the codec recorded in the object itself."""
         try:
-            if self.compression_type == "gzip":
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(None, lambda: gzip.decompress(content))
-            elif self.compression_type == "lz4":
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(None, lambda: lz4.frame.decompress(content))
-            else:
-                return content
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, storage_codecs.decode, content)
         except Exception as e:
             logger.error(f"Decompression failed for {file_path}: {e}")
             raise StorageException(f"Decompression failed: {str(e)}")
 
+    async def recompress_object(self, file_hash: str, stored_path: str, codec: str) -> Optional[Dict[str, Any]]:
+        """
+        Re-encode a compressed object with another codec, swapping it in atomically.
+
+        Readers see either the old or the new frame, and both describe their own codec,
+        so objects can be recompressed while the service is serving them.
+        """
+        full_path = self.storage_path / stored_path
+        if not stored_path.startswith("compressed/") or not full_path.is_file():
+            return None
+
+        loop = asyncio.get_event_loop()
+        old_content = await self._read_file_async(full_path)
+        content = await loop.run_in_executor(None, storage_codecs.decode, old_content)
+        new_content = await loop.run_in_executor(
+            None, storage_codecs.encode, content, codec, self._guess_content_type(stored_path)
+        )
+        if len(new_content) >= len(old_content):
+            return None
+
+        temp_path = full_path.with_name(f".{full_path.name}.recompress")
+        await self._write_file_async(temp_path, new_content)
+        os.replace(temp_path, full_path)
+
+        try:
+            async with AsyncSessionLocal() as session:
+                from sqlalchemy import update
+
+                await session.execute(
+                    update(FileDeduplication)
+                    .where(FileDeduplication.file_hash == file_hash)
+                    .values(compression_type=codec, compressed_size=len(new_content))
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record recompression of {file_hash}: {e}")
+
+        return {"old_size": len(old_content), "new_size": len(new_content), "codec": codec}
+
+    @staticmethod
+    def _guess_content_type(stored_path: str) -> Optional[str]:
+        """Content type from a stored object's extension."""
+        return "application/pdf" if stored_path.lower().endswith(".pdf") else None
+
+    @staticmethod
+    def _skip_compression(content_type: Optional[str]) -> bool:
+        """Whether a content type is already compressed."""
+        if not content_type:
+            return False
+        skip_types = [
+            "application/zip", "application/gzip", "application/x-gzip",
+            "application/x-lz4", "application/x-7z-compressed",
+            "application/x-rar-compressed", "image/jpeg", "image/png"
+        ]
+        return any(skip_type in content_type.lower() for skip_type in skip_types)
+
+    async def _copy_file_async(self, source: Path, target: Path):
+        """Copy a file without reading it into memory."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, shutil.copyfile, source, target)
+
     async def _write_file_async(self, file_path: Path, content: bytes):
         """Write file content asynchronously."""
         file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -604,126 +774,27 @@ class LocalStorageService:
         except Exception as e:
             logger.warning(f"Failed to create organizational links for {file_hash}: {e}")
 
-    async def _check_deduplication(self, file_hash: str, filename: str) -> Optional[Dict[str, Any]]:
-        """Check if file already exists using deduplication."""
-        try:
-            async with AsyncSessionLocal() as session:
-                from sqlalchemy import select
-
-                result = await session.execute(
-                    select(FileDeduplication).where(FileDeduplication.file_hash == file_hash)
-                )
-                dedup_record = result.scalar_one_or_none()
-
-                if dedup_record:
-                    return {
-                        "stored_path": dedup_record.stored_path,
-                        "is_compressed": dedup_record.is_compressed,
-                        "original_size": dedup_record.original_size,
-                        "compressed_size": dedup_record.compressed_size,
-                    }
-
-                return None
-
-        except Exception as e:
-            logger.error(f"Failed to check deduplication for {file_hash}: {e}")
-            return None
-
-    async def _save_deduplication_record(
-        self,
-        file_hash: str,
-        original_filename: str,
-        stored_path: str,
-        file_size: int,
-        content_type: Optional[str],
-        is_compressed: bool,
-        compression_info: Optional[Dict[str, Any]]
-    ):
-        """Save deduplication record to database."""
-        try:
-            async with AsyncSessionLocal() as session:
-                dedup_record = FileDeduplication(
-                    file_hash=file_hash,
-                    original_filename=original_filename,
-                    stored_path=stored_path,
-                    file_size=file_size,
-                    content_type=content_type,
-                    reference_count=1,
-                    is_compressed=is_compressed,
-                    compression_type=self.compression_type if is_compressed else None,
-                    original_size=compression_info.get("original_size") if compression_info else file_size,
-                    compressed_size=compression_info.get("compressed_size") if compression_info else file_size,
-                )
-
-                session.add(dedup_record)
-                await session.commit()
-
-        except Exception as e:
-            logger.error(f"Failed to save deduplication record for {file_hash}: {e}")
-
     async def _update_reference_count(self, file_hash: str, increment: bool = True):
         """Update reference count for deduplicated file."""
         try:
-            async with AsyncSessionLocal() as session:
-                from sqlalchemy import select, update
-
-                result = await session.execute(
-                    select(FileDeduplication).where(FileDeduplication.file_hash == file_hash)
-                )
-                dedup_record = result.scalar_one_or_none()
-
-                if dedup_record:
-                    if increment:
-                        dedup_record.reference_count += 1
-                    else:
-                        dedup_record.reference_count = max(0, dedup_record.reference_count - 1)
-
-                    dedup_record.last_accessed = datetime.utcnow()
-                    await session.commit()
-
+            async with self._metadata_unit_of_work() as unit:
+                await unit.adjust_reference_count(file_hash, 1 if increment else -1)
         except Exception as e:
             logger.error(f"Failed to update reference count for {file_hash}: {e}")
 
     async def _decrement_reference_count(self, file_hash: str):
-        """Decrement reference count and potentially delete deduplication record."""
-        try:
-            async with AsyncSessionLocal() as session:
-                from sqlalchemy import select
-
-                result = await session.execute(
-                    select(FileDeduplication).where(FileDeduplication.file_hash == file_hash)
-                )
-                dedup_record = result.scalar_one_or_none()
-
-                if dedup_record:
-                    dedup_record.reference_count = max(0, dedup_record.reference_count - 1)
-
-                    # Delete record if no more references
-                    if dedup_record.reference_count <= 0:
-                        await session.delete(dedup_record)
-
-                    await session.commit()
-
-        except Exception as e:
-            logger.error(f"Failed to decrement reference count for {file_hash}: {e}")
+        """Decrement reference count now; the record is deleted once no references remain."""
+        await self._update_reference_count(file_hash, increment=False)
 
     async def _update_access_time(self, file_hash: str):
         """Update last accessed time for deduplication record."""
-        try:
-            async with AsyncSessionLocal() as session:
-                from sqlalchemy import select, update
-
-                result = await session.execute(
-                    select(FileDeduplication).where(FileDeduplication.file_hash == file_hash)
-                )
-                dedup_record = result.scalar_one_or_none()
-
-                if dedup_record:
-                    dedup_record.last_accessed = datetime.utcnow()
-                    await session.commit()
+        storage_usage_accumulator.touch(file_hash)
+        await self._flush_usage_unless_batched()
 
-        except Exception as e:
-            logger.error(f"Failed to update access time for {file_hash}: {e}")
+    async def _flush_usage_unless_batched(self):
+        """Write usage changes now when batching is turned off."""
+        if not settings.STORAGE_USAGE_BATCHED:
+            await storage_usage_accumulator.flush()
 
     async def _get_file_hash_from_path(self, file_path: str) -> Optional[str]:
         """Get file hash from deduplication record using file path."""
@@ -742,29 +813,6 @@ class LocalStorageService:
             logger.error(f"Failed to get file hash from path {file_path}: {e}")
             return None
 
-    async def _set_file_access_control(
-        self,
-        file_path: str,
-        file_hash: str,
-        access_level: str = "private",
-        created_by: Optional[str] = None
-    ):
-        """Set access control for a file."""
-        try:
-            async with AsyncSessionLocal() as session:
-                access_control = FileAccessControl(
-                    file_path=file_path,
-                    file_hash=file_hash,
-                    access_level=access_level,
-                    created_by=created_by
-                )
-
-                session.add(access_control)
-                await session.commit()
-
-        except Exception as e:
-            logger.error(f"Failed to set access control for {file_path}: {e}")
-
     async def _check_file_access(
         self,
         file_path: str,
@@ -826,6 +874,42 @@ class LocalStorageService:
         except Exception as e:
             logger.error(f"Failed to delete access control for {file_path}: {e}")
 
+    def _metadata_unit_of_work(self):
+        """Unit of work for the metadata rows written by one storage operation."""
+        return StorageMetadataUnitOfWork.begin(session_factory=AsyncSessionLocal)
+
+    @staticmethod
+    def _audit_fields(
+        file_path: str,
+        file_hash: str,
+        operation: str,
+        operation_status: str,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request: Optional[Request] = None,
+        file_size: Optional[int] = None,
+        content_type: Optional[str] = None,
+        error_message: Optional[str] = None,
+        metadata: Optional[str] = None,
+        duration_ms: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Column values for a StorageAudit row."""
+        return {
+            "file_path": file_path,
+            "file_hash": file_hash,
+            "operation": operation,
+            "operation_status": operation_status,
+            "user_id": user_id,
+            "session_id": session_id,
+            "ip_address": request.client.host if request else None,
+            "user_agent": request.headers.get("user-agent") if request else None,
+            "file_size": file_size,
+            "content_type": content_type,
+            "error_message": error_message,
+            "audit_metadata": metadata,
+            "duration_ms": duration_ms,
+        }
+
     async def _log_storage_operation(
         self,
         file_path: str,
@@ -842,26 +926,28 @@ class LocalStorageService:
         duration_ms: Optional[int] = None
     ):
         """Log storage operation for audit trail."""
+        fields = self._audit_fields(
+            file_path=file_path,
+            file_hash=file_hash,
+            operation=operation,
+            operation_status=operation_status,
+            user_id=user_id,
+            session_id=session_id,
+            request=request,
+            file_size=file_size,
+            content_type=content_type,
+            error_message=error_message,
+            metadata=metadata,
+            duration_ms=duration_ms
+        )
         try:
-            async with AsyncSessionLocal() as session:
-                audit_log = StorageAudit(
-                    file_path=file_path,
-                    file_hash=file_hash,
-                    operation=operation,
-                    operation_status=operation_status,
-                    user_id=user_id,
-                    session_id=session_id,
-                    ip_address=request.client.host if request else None,
-                    user_agent=request.headers.get("user-agent") if request else None,
-                    file_size=file_size,
-                    content_type=content_type,
-                    error_message=error_message,
-                    metadata=metadata,
-                    duration_ms=duration_ms
-                )
+            if settings.STORAGE_AUDIT_DEFERRED:
+                # Nothing else is written, so there is no transaction to wait for
+                storage_audit_flusher.add(fields)
+                return
 
-                session.add(audit_log)
-                await session.commit()
+            async with self._metadata_unit_of_work() as unit:
+                unit.audit(**fields)
 
         except Exception as e:
             logger.error(f"Failed to log storage operation: {e}")
\ No newline at end of file
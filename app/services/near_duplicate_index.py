@@ -0,0 +1,253 @@
+"""
+MinHash/LSH near-duplicate index over ingested document text.
+
+Each document's text is reduced to a set of word shingles and a fixed-size
+MinHash signature. The signature is split into bands; documents sharing any
+band bucket become candidates. Candidate lookup is one probe per band on the
+``document_lsh_buckets`` primary key, so fuzzy deduplication no longer needs
+to compare the new document against a window of recent jobs one by one.
+"""
+
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, delete, desc, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.ingestion import DocumentLSHBucket, DocumentMinHash, IngestionJob
+
+logger = logging.getLogger(__name__)
+
+# Shingle hashes and permutations stay below 2**31 so a*x + b fits in uint64
+MERSENNE_PRIME = (1 << 31) - 1
+SIGNATURE_CHUNK_ROWS = 4096
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def shingle_text(text: str, size: int = 3) -> Set[str]:
+    """Word shingles of normalised text, taken within lines so reordered rows still match."""
+    shingles: Set[str] = set()
+    for line in text.lower().splitlines():
+        tokens = _TOKEN_RE.findall(line)
+        if len(tokens) <= size:
+            if tokens:
+                shingles.add(" ".join(tokens))
+            continue
+        shingles.update(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+    return shingles
+
+
+def hash_shingles(shingles: Iterable[str]) -> np.ndarray:
+    """Stable 31-bit hashes of shingles."""
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+            & MERSENNE_PRIME
+            for shingle in shingles
+        ],
+        dtype=np.uint64,
+    )
+
+
+def exact_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Jaccard similarity of two sorted, de-duplicated shingle hash arrays."""
+    if not first.size or not second.size:
+        return 0.0
+    intersection = np.intersect1d(first, second, assume_unique=True).size
+    return intersection / (first.size + second.size - intersection)
+
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Jaccard similarity estimated from two MinHash signatures."""
+    if first.shape != second.shape or not first.size:
+        return 0.0
+    return float(np.count_nonzero(first == second)) / first.size
+
+
+class MinHasher:
+    """MinHash signatures from universal hashing ``(a * x + b) mod p``."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """Draw the permutation coefficients; the seed must never change once signatures are stored."""
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def signature(self, hashed_shingles: np.ndarray) -> np.ndarray:
+        """Signature of a set of hashed shingles."""
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, hashed_shingles.size, SIGNATURE_CHUNK_ROWS):
+            chunk = hashed_shingles[start:start + SIGNATURE_CHUNK_ROWS]
+            values = (np.outer(chunk, self.a) + self.b) % MERSENNE_PRIME
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray, bands: int) -> List[Tuple[int, int]]:
+    """LSH (band, bucket) keys for a signature."""
+    rows = signature.size // bands
+    return [
+        (
+            band,
+            int.from_bytes(
+                hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+                "big",
+                signed=True,
+            ),
+        )
+        for band in range(bands)
+    ]
+
+
+class LSHIndex:
+    """In-memory LSH index with the same banding as the persistent index."""
+
+    def __init__(self, bands: int):
+        """Initialize an empty index."""
+        self.bands = bands
+        self._buckets: Dict[Tuple[int, int], Set[Any]] = {}
+        self._signatures: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key: Any, signature: np.ndarray) -> None:
+        """Add a document signature."""
+        self._signatures[key] = signature
+        for bucket in band_buckets(signature, self.bands):
+            self._buckets.setdefault(bucket, set()).add(key)
+
+    def remove(self, key: Any) -> None:
+        """Drop a document signature; unknown keys are ignored."""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket in band_buckets(signature, self.bands):
+            keys = self._buckets.get(bucket)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._buckets[bucket]
+
+    def candidates(self, signature: np.ndarray) -> Dict[Any, int]:
+        """Documents sharing at least one band bucket, with the number of shared bands."""
+        hits: Dict[Any, int] = {}
+        for bucket in band_buckets(signature, self.bands):
+            for key in self._buckets.get(bucket, ()):
+                hits[key] = hits.get(key, 0) + 1
+        return hits
+
+    def query(self, signature: np.ndarray, threshold: float = 0.0, limit: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """Candidates scored by signature similarity, best first."""
+        ranked = sorted(self.candidates(signature).items(), key=lambda item: item[1], reverse=True)
+        if limit:
+            ranked = ranked[:limit]
+        scored = [(key, estimate_jaccard(signature, self._signatures[key])) for key, _ in ranked]
+        return sorted(
+            [(key, score) for key, score in scored if score >= threshold],
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index backed by ``document_minhashes`` and ``document_lsh_buckets``."""
+
+    def __init__(
+        self,
+        num_perm: Optional[int] = None,
+        bands: Optional[int] = None,
+        shingle_size: Optional[int] = None,
+    ):
+        """Initialize the index from settings."""
+        self.num_perm = num_perm or settings.NEAR_DUPLICATE_NUM_PERM
+        self.bands = bands or settings.NEAR_DUPLICATE_LSH_BANDS
+        self.shingle_size = shingle_size or settings.NEAR_DUPLICATE_SHINGLE_SIZE
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.hasher = MinHasher(self.num_perm)
+        # The same text is shingled and signed by the fuzzy strategy, the text sidecar and the index
+        self.shingle_hashes = lru_cache(maxsize=64)(self._shingle_hashes)
+        self.signature_for_text = lru_cache(maxsize=64)(self._signature_for_text)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """Sorted, de-duplicated shingle hashes for text."""
+        return np.unique(hash_shingles(shingle_text(text, self.shingle_size))).astype(np.uint32)
+
+    def _signature_for_text(self, text: str) -> Optional[Tuple[np.ndarray, int]]:
+        """MinHash signature and shingle count for text (None when there is nothing to sign)."""
+        hashes = self.shingle_hashes(text)
+        if not hashes.size:
+            return None
+        return self.hasher.signature(hashes.astype(np.uint64)), int(hashes.size)
+
+    async def add(self, db: AsyncSession, ingestion_job_id: UUID, signature: np.ndarray, shingle_count: int) -> None:
+        """Index (or re-index) a document. The caller commits."""
+        await self.remove(db, ingestion_job_id)
+        db.add(DocumentMinHash(
+            ingestion_job_id=ingestion_job_id,
+            signature=signature.astype(np.uint32).tobytes(),
+            num_perm=self.num_perm,
+            shingle_count=shingle_count,
+        ))
+        db.add_all([
+            DocumentLSHBucket(band=band, bucket=bucket, ingestion_job_id=ingestion_job_id)
+            for band, bucket in band_buckets(signature, self.bands)
+        ])
+
+    async def remove(self, db: AsyncSession, ingestion_job_id: UUID) -> None:
+        """Drop a document from the index."""
+        await db.execute(delete(DocumentLSHBucket).where(DocumentLSHBucket.ingestion_job_id == ingestion_job_id))
+        await db.execute(delete(DocumentMinHash).where(DocumentMinHash.ingestion_job_id == ingestion_job_id))
+
+    async def query(
+        self,
+        db: AsyncSession,
+        signature: np.ndarray,
+        exclude_job_id: Optional[UUID] = None,
+        filters: Sequence[Any] = (),
+        limit: Optional[int] = None,
+    ) -> List[Tuple[IngestionJob, float]]:
+        """Near-duplicate candidates scored by signature similarity, best first."""
+        bucket_match = or_(*[
+            and_(DocumentLSHBucket.band == band, DocumentLSHBucket.bucket == bucket)
+            for band, bucket in band_buckets(signature, self.bands)
+        ])
+        candidates = (
+            select(DocumentLSHBucket.ingestion_job_id, func.count().label("band_hits"))
+            .where(bucket_match)
+            .group_by(DocumentLSHBucket.ingestion_job_id)
+            .subquery()
+        )
+
+        query = (
+            select(IngestionJob, DocumentMinHash.signature)
+            .join(candidates, candidates.c.ingestion_job_id == IngestionJob.id)
+            .join(DocumentMinHash, DocumentMinHash.ingestion_job_id == IngestionJob.id)
+            .where(DocumentMinHash.num_perm == self.num_perm, *filters)
+            .order_by(desc(candidates.c.band_hits))
+            .limit(limit or settings.NEAR_DUPLICATE_MAX_CANDIDATES)
+        )
+        if exclude_job_id is not None:
+            query = query.where(IngestionJob.id != exclude_job_id)
+
+        result = await db.execute(query)
+        scored = [
+            (job, estimate_jaccard(signature, np.frombuffer(stored, dtype=np.uint32)))
+            for job, stored in result.all()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+
+# Singleton instance
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,203 @@
+"""
+Normalised view of an extracted invoice, parsed once per validation.
+
+``ValidationService`` and its validators used to read the raw ``header`` and
+``lines`` dicts independently, each converting amounts with ``float()`` and
+dates with its own copy of the parsing helpers. ``ParsedInvoice`` parses
+every field they use once into Decimals and datetimes, keeps the raw dicts
+(read-only) for fields that are reported as extracted, and parses the lines
+and their total lazily. A value is a number exactly when ``float()`` accepts
+it as a finite value, and converts back to the same float, so checks that
+compare in float give the same results as on the raw values.
+
+``ValidationEngine`` reads the same fields under other header keys
+(``invoice_number``, ``total_amount``, ...) and allows "$" and "," in
+amounts; ``ENGINE_HEADER_FIELDS`` parses its headers into the same form.
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%m-%d-%Y",
+    "%m/%d/%Y",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%Y-%m-%d %H:%M:%S",
+)
+
+_NUMERIC_LINE_FIELDS = ("amount", "quantity", "unit_price")
+
+
+@dataclass(frozen=True)
+class HeaderFields:
+    """Header keys one extraction format uses for the fields ParsedInvoice parses."""
+    invoice_number: str = "invoice_no"
+    subtotal: str = "subtotal"
+    tax: str = "tax"
+    total: str = "total"
+    currency_strings: bool = False  # amounts may carry "$" and ","
+
+
+SERVICE_HEADER_FIELDS = HeaderFields()
+ENGINE_HEADER_FIELDS = HeaderFields(
+    invoice_number="invoice_number",
+    subtotal="subtotal_amount",
+    tax="tax_amount",
+    total="total_amount",
+    currency_strings=True,
+)
+
+
+def parse_amount(value: Any, currency_strings: bool = False) -> Optional[Decimal]:
+    """Value as a Decimal if ``float()`` accepts it as a finite number, else None; optionally drop "$" and ","."""
+    if currency_strings and isinstance(value, str):
+        value = value.replace("$", "").replace(",", "")
+    try:
+        number = float(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if not math.isfinite(number):
+        return None
+
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, str):
+        try:
+            return Decimal(value.strip())
+        except InvalidOperation:
+            pass
+    return Decimal(str(number))
+
+
+def lenient_amount(value: Any) -> Decimal:
+    """Amount as the validation engine reads line values: "$" and "," allowed, anything else 0."""
+    parsed = parse_amount(value, currency_strings=True)
+    return parsed if parsed is not None else Decimal(0)
+
+
+def parse_date(value: Any) -> Optional[datetime]:
+    """Parse a date string in one of the supported formats; datetimes pass through."""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+
+    return None
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedLine:
+    """One line item with its numeric fields parsed."""
+    raw: Mapping[str, Any]
+    description: Any
+    quantity: Optional[Decimal]  # 1 when absent
+    unit_price: Optional[Decimal]  # the amount when absent
+    amount: Optional[Decimal]  # 0 when absent
+    invalid: FrozenSet[str]  # numeric fields present but not numbers; their values are None
+
+    @classmethod
+    def from_raw(cls, line: Dict[str, Any]) -> "ParsedLine":
+        """Parse a raw line dict, applying the validators' defaults for absent fields."""
+        invalid = set()
+
+        def number(name: str, default: Optional[Decimal]) -> Optional[Decimal]:
+            if name not in line:
+                return default
+            parsed = parse_amount(line[name])
+            if parsed is None:
+                invalid.add(name)
+            return parsed
+
+        amount = number("amount", Decimal(0))
+        quantity = number("quantity", Decimal(1))
+        unit_price = number("unit_price", amount)
+        if "unit_price" not in line and "amount" in invalid:
+            invalid.add("unit_price")
+
+        return cls(
+            raw=MappingProxyType(line),
+            description=line.get("description", ""),
+            quantity=quantity,
+            unit_price=unit_price,
+            amount=amount,
+            invalid=frozenset(invalid),
+        )
+
+    @property
+    def invalid_field(self) -> Optional[str]:
+        """The first numeric field, in amount/quantity/unit price order, that is not a number."""
+        return next((name for name in _NUMERIC_LINE_FIELDS if name in self.invalid), None)
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedInvoice:
+    """Header fields and line items of one extraction result, parsed once."""
+    header: Mapping[str, Any]
+    raw_lines: Tuple[Dict[str, Any], ...]
+    vendor_name: Optional[str]
+    invoice_number: Optional[str]
+    po_number: Optional[str]
+    currency: Any
+    tax_id: Optional[str]
+    invoice_date: Optional[datetime]  # None when absent or not in a supported format
+    subtotal: Optional[Decimal]  # None when absent or not a number
+    tax: Optional[Decimal]
+    total: Optional[Decimal]
+    _lines: Optional[Tuple[ParsedLine, ...]] = field(default=None, init=False, repr=False, compare=False)
+    _lines_total: Optional[Decimal] = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_extraction(
+        cls,
+        header: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        fields: HeaderFields = SERVICE_HEADER_FIELDS,
+    ) -> "ParsedInvoice":
+        """Parse the header of an extraction result under the keys ``fields`` names; lines parse on first use."""
+        def amount(key: str) -> Optional[Decimal]:
+            return parse_amount(header.get(key), currency_strings=fields.currency_strings)
+
+        return cls(
+            header=MappingProxyType(header),
+            raw_lines=tuple(lines),
+            vendor_name=header.get("vendor_name"),
+            invoice_number=header.get(fields.invoice_number),
+            po_number=header.get("po_number"),
+            currency=header.get("currency", "USD"),
+            tax_id=header.get("tax_id"),
+            invoice_date=parse_date(header.get("invoice_date")),
+            subtotal=amount(fields.subtotal),
+            tax=amount(fields.tax),
+            total=amount(fields.total),
+        )
+
+    @property
+    def lines(self) -> Tuple[ParsedLine, ...]:
+        """The line items, parsed on first access."""
+        if self._lines is None:
+            object.__setattr__(self, "_lines", tuple(ParsedLine.from_raw(line) for line in self.raw_lines))
+        return self._lines
+
+    @property
+    def lines_total(self) -> Decimal:
+        """Sum of the line amounts that are numbers."""
+        if self._lines_total is None:
+            total = sum((line.amount for line in self.lines if line.amount is not None), Decimal(0))
+            object.__setattr__(self, "_lines_total", total)
+        return self._lines_total
@@ -131,6 +131,80 @@ class PrometheusService:
             registry=self.registry
         )
 
+        # Extraction engine metrics
+        self.docling_pool_warm = Gauge(
+            'ap_intake_docling_pool_warm',
+            'Whether the Docling converter pool has its models loaded (1 = warm)',
+            registry=self.registry
+        )
+
+        self.docling_pool_size = Gauge(
+            'ap_intake_docling_pool_size',
+            'Number of warm Docling converters in the process pool',
+            registry=self.registry
+        )
+
+        self.docling_model_load_seconds = Gauge(
+            'ap_intake_docling_model_load_seconds',
+            'Time spent loading Docling pipeline models',
+            ['model'],
+            registry=self.registry
+        )
+
+        self.extraction_cache_requests_total = Counter(
+            'ap_intake_extraction_cache_requests_total',
+            'Extraction result cache lookups',
+            ['result'],
+            registry=self.registry
+        )
+
+        # Storage metrics
+        self.document_cache_requests_total = Counter(
+            'ap_intake_document_cache_requests_total',
+            'In-process document byte cache lookups',
+            ['result'],
+            registry=self.registry
+        )
+
+        self.document_cache_evictions_total = Counter(
+            'ap_intake_document_cache_evictions_total',
+            'Document byte cache evictions',
+            ['reason'],
+            registry=self.registry
+        )
+
+        self.document_cache_bytes = Gauge(
+            'ap_intake_document_cache_bytes',
+            'Bytes held by the document byte cache',
+            registry=self.registry
+        )
+
+        self.storage_audit_queue_depth = Gauge(
+            'ap_intake_storage_audit_queue_depth',
+            'Storage audit rows buffered for the next flush',
+            registry=self.registry
+        )
+
+        self.storage_audit_backpressure_total = Counter(
+            'ap_intake_storage_audit_backpressure_total',
+            'Times the storage audit queue was full',
+            registry=self.registry
+        )
+
+        self.storage_audit_rows_total = Counter(
+            'ap_intake_storage_audit_rows_total',
+            'Storage audit rows by outcome',
+            ['outcome'],
+            registry=self.registry
+        )
+
+        self.storage_audit_flush_duration_seconds = Histogram(
+            'ap_intake_storage_audit_flush_duration_seconds',
+            'Time to write one batch of storage audit rows',
+            buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5],
+            registry=self.registry
+        )
+
         logger.info("Prometheus metrics service initialized")
 
     def record_invoice_processed(self, status: str, vendor: str = "unknown") -> None:
@@ -211,6 +285,47 @@ class PrometheusService:
         """Set CPU usage for a component."""
         self.cpu_usage_percent.labels(component=component).set(percent_used)
 
+    def set_docling_pool_state(self, warm: bool, size: int) -> None:
+        """Set Docling converter pool warm-up status and size."""
+        self.docling_pool_warm.set(1 if warm else 0)
+        self.docling_pool_size.set(size)
+
+    def record_docling_model_load(self, model: str, seconds: float) -> None:
+        """Record how long a Docling model pipeline took to load."""
+        self.docling_model_load_seconds.labels(model=model).set(seconds)
+
+    def record_extraction_cache_request(self, result: str) -> None:
+        """Record an extraction cache lookup (hit or miss)."""
+        self.extraction_cache_requests_total.labels(result=result).inc()
+
+    def record_document_cache_request(self, result: str) -> None:
+        """Record a document cache lookup (hit or miss)."""
+        self.document_cache_requests_total.labels(result=result).inc()
+
+    def record_document_cache_eviction(self, reason: str) -> None:
+        """Record a document cache eviction (size or expired)."""
+        self.document_cache_evictions_total.labels(reason=reason).inc()
+
+    def set_document_cache_bytes(self, bytes_cached: int) -> None:
+        """Set the bytes held by the document cache."""
+        self.document_cache_bytes.set(bytes_cached)
+
+    def set_storage_audit_queue_depth(self, depth: int) -> None:
+        """Set the number of buffered storage audit rows."""
+        self.storage_audit_queue_depth.set(depth)
+
+    def record_storage_audit_backpressure(self) -> None:
+        """Record a full storage audit queue."""
+        self.storage_audit_backpressure_total.inc()
+
+    def record_storage_audit_rows(self, outcome: str, count: int) -> None:
+        """Record storage audit rows (written, spilled, replayed or dropped)."""
+        self.storage_audit_rows_total.labels(outcome=outcome).inc(count)
+
+    def record_storage_audit_flush(self, duration_seconds: float) -> None:
+        """Record the duration of one storage audit batch write."""
+        self.storage_audit_flush_duration_seconds.observe(duration_seconds)
+
     def get_metrics_response(self) -> Response:
         """Get Prometheus metrics as HTTP response."""
         try:
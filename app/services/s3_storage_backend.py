@@ -0,0 +1,309 @@
+"""
+Async S3 backend.
+
+Every StorageService shares one aiobotocore client, so requests reuse pooled
+HTTP connections and never block the event loop. Uploads above
+``S3_MULTIPART_THRESHOLD_BYTES`` are sent as concurrent multipart parts read
+from disk one part at a time. Large downloads are split into concurrent
+ranged GETs. Bodies can be streamed chunk by chunk instead of read whole.
+Works against any S3-compatible endpoint (``S3_ENDPOINT_URL``), such as
+MinIO or a moto server.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from app.core.exceptions import StorageException
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than this, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _read_range(path: Path, offset: int, size: int) -> bytes:
+    """Read one part of a file."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def _write_range(path: Path, offset: int, data: bytes) -> None:
+    """Write one part of a file in place."""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.pwrite(fd, data, offset)
+    finally:
+        os.close(fd)
+
+
+class S3StorageBackend:
+    """Pooled async S3 client with multipart uploads and ranged downloads."""
+
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: Optional[int] = None,
+        multipart_threshold: Optional[int] = None,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        """Initialize; the client is created on first use and defaults come from settings."""
+        self._bucket = bucket
+        self._endpoint_url = endpoint_url
+        self._max_pool_connections = max_pool_connections
+        self._multipart_threshold = multipart_threshold
+        self._part_size = part_size
+        self._concurrency = concurrency
+        self._client = None
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def bucket(self) -> str:
+        return self._bucket or settings.S3_BUCKET_NAME
+
+    @property
+    def endpoint_url(self) -> Optional[str]:
+        return self._endpoint_url or settings.S3_ENDPOINT_URL
+
+    @property
+    def multipart_threshold(self) -> int:
+        return self._multipart_threshold or settings.S3_MULTIPART_THRESHOLD_BYTES
+
+    @property
+    def part_size(self) -> int:
+        return max(self._part_size or settings.S3_MULTIPART_PART_SIZE_BYTES, MIN_PART_SIZE)
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency or settings.S3_TRANSFER_CONCURRENCY
+
+    async def client(self):
+        """The shared client, created on first use."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A client is bound to the loop that created it (e.g. one asyncio.run per Celery task)
+            self._loop = loop
+            self._client_lock = asyncio.Lock()
+            await self.close()
+
+        async with self._client_lock:
+            if self._client is None:
+                exit_stack = AsyncExitStack()
+                self._client = await exit_stack.enter_async_context(
+                    get_session().create_client(
+                        "s3",
+                        region_name=settings.AWS_REGION,
+                        endpoint_url=self.endpoint_url,
+                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                        config=AioConfig(
+                            max_pool_connections=self._max_pool_connections or settings.S3_MAX_POOL_CONNECTIONS,
+                            retries={"max_attempts": 3, "mode": "standard"},
+                        ),
+                    )
+                )
+                self._exit_stack = exit_stack
+                logger.info(f"Initialized S3 client for bucket: {self.bucket}")
+        return self._client
+
+    async def close(self) -> None:
+        """Close the client and its connection pool, even if a previous event loop created them."""
+        exit_stack, self._client, self._exit_stack = self._exit_stack, None, None
+        if exit_stack is None:
+            return
+        try:
+            await exit_stack.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing S3 client: {e}")
+
+    def url(self, key: str) -> str:
+        """Public URL of an object."""
+        if self.endpoint_url:
+            # For custom S3 endpoints (like MinIO)
+            return f"{self.endpoint_url}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+
+    async def put_object(
+        self, key: str, source: Union[bytes, Path], content_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Upload bytes or a file, as a multipart upload above the threshold."""
+        size = source.stat().st_size if isinstance(source, Path) else len(source)
+        extra_args = {"ContentType": content_type} if content_type else {}
+        client = await self.client()
+
+        try:
+            if size > self.multipart_threshold:
+                etag = await self._multipart_upload(client, key, source, size, extra_args)
+            else:
+                body = await asyncio.get_running_loop().run_in_executor(
+                    None, _read_range, source, 0, size
+                ) if isinstance(source, Path) else source
+                response = await client.put_object(Bucket=self.bucket, Key=key, Body=body, **extra_args)
+                etag = response.get("ETag")
+        except ClientError as e:
+            logger.error(f"S3 upload failed: {e}")
+            raise StorageException(f"S3 upload failed: {str(e)}")
+
+        return {
+            "url": self.url(key),
+            "bucket": self.bucket,
+            "key": key,
+            "etag": etag,
+            "multipart": size > self.multipart_threshold,
+        }
+
+    async def _multipart_upload(
+        self, client, key: str, source: Union[bytes, Path], size: int, extra_args: Dict[str, Any]
+    ) -> str:
+        """Upload parts concurrently; at most ``concurrency`` parts are in memory at once."""
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra_args)
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def upload_part(part_number: int, offset: int) -> Dict[str, Any]:
+            async with semaphore:
+                if isinstance(source, Path):
+                    body = await loop.run_in_executor(None, _read_range, source, offset, self.part_size)
+                else:
+                    body = source[offset:offset + self.part_size]
+                response = await client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body
+                )
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+        try:
+            parts = await asyncio.gather(*(
+                upload_part(number, offset)
+                for number, offset in enumerate(range(0, size, self.part_size), start=1)
+            ))
+            response = await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": list(parts)}
+            )
+        except BaseException:
+            # Parts of an unfinished upload are billed until aborted
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+        logger.debug(f"Uploaded {key} in {len(parts)} parts")
+        return response.get("ETag")
+
+    async def get_object(self, key: str, byte_range: Optional[Tuple[int, int]] = None) -> bytes:
+        """Read an object, or the inclusive ``(start, end)`` byte range of one."""
+        chunks = [chunk async for chunk in self.iter_object(key, byte_range=byte_range)]
+        return b"".join(chunks)
+
+    async def iter_object(
+        self,
+        key: str,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        byte_range: Optional[Tuple[int, int]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Stream an object body chunk by chunk."""
+        client = await self.client()
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range is not None:
+            params["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+
+        try:
+            response = await client.get_object(**params)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise StorageException(f"File not found in S3: {key}")
+            raise StorageException(f"S3 retrieval failed: {str(e)}")
+
+        body = response["Body"]
+        try:
+            async for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            # Releases the pooled connection even when the caller stops early
+            body.close()
+
+    async def download_file(self, key: str, target: Path) -> int:
+        """Download an object to a file with concurrent ranged GETs; returns its size."""
+        head = await self.head_object(key)
+        if head is None:
+            raise StorageException(f"File not found in S3: {key}")
+        size = head["ContentLength"]
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            f.truncate(size)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def download_range(offset: int) -> None:
+            async with semaphore:
+                end = min(offset + self.part_size, size) - 1
+                data = await self.get_object(key, byte_range=(offset, end))
+                await loop.run_in_executor(None, _write_range, target, offset, data)
+
+        await asyncio.gather(*(download_range(offset) for offset in range(0, size, self.part_size)))
+        return size
+
+    async def head_object(self, key: str) -> Optional[Dict[str, Any]]:
+        """Object metadata, or None if it does not exist."""
+        client = await self.client()
+        try:
+            return await client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+
+    async def delete_object(self, key: str) -> bool:
+        """Delete an object."""
+        client = await self.client()
+        try:
+            await client.delete_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            logger.error(f"S3 deletion failed: {e}")
+            return False
+
+    async def list_objects(self, prefix: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """List objects page by page, stopping once ``limit`` are found."""
+        client = await self.client()
+        params = {"Bucket": self.bucket}
+        if prefix:
+            params["Prefix"] = prefix
+
+        files = []
+        async for page in client.get_paginator("list_objects_v2").paginate(**params):
+            for obj in page.get("Contents", []):
+                files.append({
+                    "path": obj["Key"],
+                    "size": obj["Size"],
+                    "last_modified": obj["LastModified"].isoformat(),
+                    "url": self.url(obj["Key"]),
+                })
+                if len(files) >= limit:
+                    return files
+        return files
+
+    async def generate_presigned_url(self, key: str, expiration: int = 3600) -> str:
+        """Presigned GET URL for an object."""
+        client = await self.client()
+        return await client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expiration,
+        )
+
+
+# Singleton instance
+s3_storage_backend = S3StorageBackend()
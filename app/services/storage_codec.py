@@ -0,0 +1,185 @@
+"""
+Self-describing compression frames for stored objects.
+
+Every compressed object starts with a fixed header, so reads never depend on
+the current ``STORAGE_COMPRESSION_TYPE``:
+
+    magic       4 bytes   b"APCF"
+    version     1 byte
+    codec id    1 byte    0 none, 1 gzip, 2 lz4, 3 zstd
+    dict id     4 bytes   zstd dictionary id, 0 when none
+    length      8 bytes   original (decompressed) length
+
+all little-endian, followed by the codec payload. Objects written before
+framing are recognised by their gzip or lz4 magic bytes.
+"""
+
+import gzip
+import logging
+import shutil
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import lz4.frame
+import zstandard
+
+from app.core.config import settings
+from app.core.exceptions import StorageException
+
+logger = logging.getLogger(__name__)
+
+FRAME_MAGIC = b"APCF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sBBIQ")
+
+CODEC_IDS = {"none": 0, "gzip": 1, "lz4": 2, "zstd": 3}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+
+# Magic bytes of objects written before framing
+_GZIP_MAGIC = b"\x1f\x8b"
+_LZ4_FRAME_MAGIC = b"\x04\x22\x4d\x18"
+
+# Content types the trained zstd dictionary is applied to
+DICTIONARY_CONTENT_TYPES = ("application/pdf",)
+
+
+class StorageCodecs:
+    """Encodes and decodes framed objects, with trained zstd dictionaries."""
+
+    def __init__(self, dictionary_path: Optional[str] = None):
+        """Initialize; dictionaries are loaded from disk on first use."""
+        self._dictionary_path = dictionary_path
+        self._dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+
+    @property
+    def dictionary_path(self) -> Path:
+        return Path(self._dictionary_path or settings.STORAGE_ZSTD_DICTIONARY_PATH)
+
+    def dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict:
+        """A trained dictionary by id; frames that reference one cannot be read without it."""
+        if dict_id not in self._dictionaries:
+            path = self.dictionary_path / f"{dict_id}.zdict"
+            if not path.exists():
+                raise StorageException(f"zstd dictionary {dict_id} not found at {path}")
+            self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(path.read_bytes())
+        return self._dictionaries[dict_id]
+
+    def train_dictionary(self, samples: Iterable[bytes], dict_size: int = 112640) -> int:
+        """Train a zstd dictionary from sample documents and store it; returns its id."""
+        trained = zstandard.train_dictionary(dict_size, list(samples))
+        dict_id = trained.dict_id()
+        self.dictionary_path.mkdir(parents=True, exist_ok=True)
+        (self.dictionary_path / f"{dict_id}.zdict").write_bytes(trained.as_bytes())
+        self._dictionaries[dict_id] = trained
+        logger.info(f"Trained zstd dictionary {dict_id} ({len(trained.as_bytes())} bytes)")
+        return dict_id
+
+    def encode(self, content: bytes, codec: str, content_type: Optional[str] = None) -> bytes:
+        """Compress content into a frame."""
+        if codec not in CODEC_IDS:
+            raise StorageException(f"Unknown compression codec: {codec}")
+
+        dict_id = 0
+        if codec == "gzip":
+            payload = gzip.compress(content)
+        elif codec == "lz4":
+            payload = lz4.frame.compress(content)
+        elif codec == "zstd":
+            compressor, dict_id = self._zstd_compressor(content_type)
+            payload = compressor.compress(content)
+        else:
+            payload = content
+
+        header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, CODEC_IDS[codec], dict_id, len(content))
+        return header + payload
+
+    def encode_file(
+        self,
+        source: Path,
+        target: Path,
+        codec: str,
+        content_type: Optional[str] = None,
+        chunk_size: int = 1024 * 1024,
+    ) -> int:
+        """Compress a file into a frame at ``target`` chunk by chunk; returns the frame size."""
+        if codec not in CODEC_IDS:
+            raise StorageException(f"Unknown compression codec: {codec}")
+
+        length = source.stat().st_size
+        compressor, dict_id = self._zstd_compressor(content_type) if codec == "zstd" else (None, 0)
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            dst.write(FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, CODEC_IDS[codec], dict_id, length))
+            if codec == "gzip":
+                with gzip.GzipFile(fileobj=dst, mode="wb") as gz:
+                    shutil.copyfileobj(src, gz, chunk_size)
+            elif codec == "lz4":
+                with lz4.frame.LZ4FrameCompressor() as lz4_compressor:
+                    dst.write(lz4_compressor.begin(length))
+                    for chunk in iter(lambda: src.read(chunk_size), b""):
+                        dst.write(lz4_compressor.compress(chunk))
+                    dst.write(lz4_compressor.flush())
+            elif codec == "zstd":
+                compressor.copy_stream(src, dst, size=length, read_size=chunk_size)
+            else:
+                shutil.copyfileobj(src, dst, chunk_size)
+
+        return target.stat().st_size
+
+    def _zstd_compressor(self, content_type: Optional[str]) -> Tuple[zstandard.ZstdCompressor, int]:
+        """A zstd compressor, with the trained dictionary for PDFs; returns it with its dict id."""
+        if settings.STORAGE_ZSTD_DICTIONARY_ID and content_type in DICTIONARY_CONTENT_TYPES:
+            dict_id = settings.STORAGE_ZSTD_DICTIONARY_ID
+            return zstandard.ZstdCompressor(
+                level=settings.STORAGE_ZSTD_LEVEL, dict_data=self.dictionary(dict_id)
+            ), dict_id
+        return zstandard.ZstdCompressor(level=settings.STORAGE_ZSTD_LEVEL), 0
+
+    def decode(self, blob: bytes) -> bytes:
+        """Decompress a frame, or a legacy gzip/lz4 object."""
+        codec = self.codec_of(blob)
+        if codec is None:
+            raise StorageException("Unrecognised compressed object format")
+
+        if not blob.startswith(FRAME_MAGIC):
+            # Legacy object written before framing
+            return gzip.decompress(blob) if codec == "gzip" else lz4.frame.decompress(blob)
+
+        _, version, codec_id, dict_id, length = FRAME_HEADER.unpack_from(blob)
+        if version != FRAME_VERSION:
+            raise StorageException(f"Unsupported frame version {version}")
+        payload = memoryview(blob)[FRAME_HEADER.size:]
+
+        if codec == "gzip":
+            content = gzip.decompress(payload)
+        elif codec == "lz4":
+            content = lz4.frame.decompress(payload)
+        elif codec == "zstd":
+            if dict_id:
+                decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary(dict_id))
+            else:
+                decompressor = zstandard.ZstdDecompressor()
+            content = decompressor.decompress(payload, max_output_size=length)
+        else:
+            content = bytes(payload)
+
+        if len(content) != length:
+            raise StorageException(f"Decompressed length {len(content)} does not match frame length {length}")
+        return content
+
+    @staticmethod
+    def codec_of(blob: bytes) -> Optional[str]:
+        """Codec an object was written with, or None if it is not a compressed object."""
+        if blob.startswith(FRAME_MAGIC) and len(blob) >= FRAME_HEADER.size:
+            return CODEC_NAMES.get(blob[5])
+        if blob.startswith(_GZIP_MAGIC):
+            return "gzip"
+        if blob.startswith(_LZ4_FRAME_MAGIC):
+            return "lz4"
+        return None
+
+
+# Singleton instance
+storage_codecs = StorageCodecs()
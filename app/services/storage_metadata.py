@@ -0,0 +1,536 @@
+"""
+Storage metadata unit of work.
+
+A local ``store_file`` call used to open a separate session and commit for the
+deduplication lookup, the deduplication insert, the access-control row, the
+audit row and the reference-count update. The unit of work writes all of them
+on one pooled connection in one transaction, with the deduplication check and
+insert folded into a single upsert on ``file_hash``. Audit rows are normally
+handed to a background flusher once the operation commits, so audit-table
+latency stays out of storage calls.
+
+Access-time touches from reads are coalesced per hash by
+``StorageUsageAccumulator`` and applied with one bulk
+``UPDATE ... FROM (VALUES ...)``, instead of a SELECT and UPDATE per call that
+contend for the row locks on hot files. Reference counts are not batched: a
+delete releases its reference in its own transaction, so a record never
+outlives its object waiting for a flush.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, String, column, delete, func, insert, literal_column, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.storage_audit import FileAccessControl, FileDeduplication, StorageAudit
+
+logger = logging.getLogger(__name__)
+
+# COPY column order; the id comes from the table's sequence
+AUDIT_COLUMNS = [c.name for c in StorageAudit.__table__.columns if c.name != "id"]
+
+
+def _json_default(value: Any) -> str:
+    """Serialize datetimes in spilled audit rows."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} in an audit row")
+
+
+def _load_spilled_row(line: str) -> Dict[str, Any]:
+    """Parse one spilled audit row."""
+    row = json.loads(line)
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+class StorageAuditFlusher:
+    """
+    Buffers storage audit rows in a bounded queue and writes each batch in bulk.
+
+    Batches are written with COPY on asyncpg (a bulk insert otherwise). Rows
+    that cannot be written, or that arrive while the queue is full, are
+    appended to a JSON-lines spill file and replayed once the database
+    accepts writes again. Without a spill directory they are dropped and
+    counted.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_queue_rows: Optional[int] = None,
+        spill_path: Optional[str] = None,
+    ):
+        """Initialize an empty buffer; the flush task starts with the first row."""
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval or settings.STORAGE_AUDIT_FLUSH_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.STORAGE_AUDIT_FLUSH_BATCH_SIZE
+        self.max_queue_rows = max_queue_rows or settings.STORAGE_AUDIT_QUEUE_MAX_ROWS
+        self._spill_path = spill_path
+        self._pending: List[Dict[str, Any]] = []
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    @property
+    def spill_path(self) -> Optional[Path]:
+        if self._spill_path:
+            return Path(self._spill_path)
+        if settings.STORAGE_AUDIT_SPILL_ENABLED:
+            return Path(settings.STORAGE_PATH) / "audit_spill"
+        return None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Queue an audit row for the next flush, spilling or dropping when the queue is full."""
+        row.setdefault("created_at", datetime.utcnow())
+        self._bind_loop()
+        if len(self._pending) >= self.max_queue_rows:
+            # The database is not keeping up; move the backlog out of memory
+            self._record_backpressure()
+            rows, self._pending = self._pending, []
+            self._spill(rows + [row])
+            return
+
+        self._pending.append(row)
+        self._set_queue_depth()
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    def _bind_loop(self) -> None:
+        """Create the event and lock on the running loop (e.g. one asyncio.run per Celery task)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._batch_ready = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = None
+
+    async def flush(self) -> int:
+        """Write all pending rows, spilling them if the write fails; returns the number written."""
+        self._bind_loop()
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            self._set_queue_depth()
+            if not rows:
+                return 0
+            try:
+                await self._write(rows)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(rows)} storage audit rows: {e}")
+                self._spill(rows)
+                return 0
+
+            await self._replay_spilled()
+            return len(rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        """Write one batch in its own transaction."""
+        started = time.perf_counter()
+        async with self._session_factory() as session:
+            connection = await session.connection()
+            if connection.dialect.driver == "asyncpg":
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    StorageAudit.__tablename__,
+                    columns=AUDIT_COLUMNS,
+                    records=[tuple(row.get(name) for name in AUDIT_COLUMNS) for row in rows],
+                )
+            else:
+                await session.execute(insert(StorageAudit), rows)
+            await session.commit()
+
+        self.written += len(rows)
+        self._record_write(len(rows), time.perf_counter() - started)
+
+    def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        """Append rows to a new spill file, or drop them if spilling is off or fails."""
+        spill_path = self.spill_path
+        if spill_path is not None:
+            target = spill_path / f"audit-{time.time_ns()}-{uuid.uuid4().hex[:8]}.jsonl"
+            try:
+                spill_path.mkdir(parents=True, exist_ok=True)
+                with open(target, "w") as f:
+                    for row in rows:
+                        f.write(json.dumps(row, default=_json_default) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.spilled += len(rows)
+                self._record_rows("spilled", len(rows))
+                logger.warning(f"Spilled {len(rows)} storage audit rows to {target}")
+                return
+            except OSError as e:
+                target.unlink(missing_ok=True)
+                logger.error(f"Failed to spill storage audit rows: {e}")
+
+        self.dropped += len(rows)
+        self._record_rows("dropped", len(rows))
+        logger.error(f"Dropped {len(rows)} storage audit rows")
+
+    async def _replay_spilled(self) -> int:
+        """Write spilled rows back to the database, oldest file first; returns the number written."""
+        spill_path = self.spill_path
+        if spill_path is None or not spill_path.is_dir():
+            return 0
+
+        replayed = 0
+        for spill_file in sorted(spill_path.glob("audit-*.jsonl")):
+            # Renaming claims the file, so processes sharing the directory never replay it twice
+            claimed = spill_file.with_name(f"{spill_file.stem}.{os.getpid()}.replaying")
+            try:
+                spill_file.rename(claimed)
+            except FileNotFoundError:
+                continue
+
+            try:
+                with open(claimed) as f:
+                    rows = [_load_spilled_row(line) for line in f if line.strip()]
+                await self._write(rows)
+            except Exception as e:
+                claimed.rename(spill_file)
+                logger.warning(f"Replaying spilled storage audit rows from {spill_file.name} failed: {e}")
+                break
+
+            claimed.unlink()
+            replayed += len(rows)
+            self._record_rows("replayed", len(rows))
+
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled storage audit rows")
+        return replayed
+
+    async def _run(self) -> None:
+        """Flush every interval, or sooner when a batch fills up."""
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def shutdown(self) -> None:
+        """Stop the flush task and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def _set_queue_depth(self) -> None:
+        """Publish the number of buffered rows."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.set_storage_audit_queue_depth(len(self._pending))
+        except Exception as e:
+            logger.debug(f"Could not record storage audit metric: {e}")
+
+    def _record_backpressure(self) -> None:
+        """Count a full queue."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_storage_audit_backpressure()
+        except Exception as e:
+            logger.debug(f"Could not record storage audit metric: {e}")
+
+    def _record_rows(self, outcome: str, count: int) -> None:
+        """Count rows that were spilled, dropped or replayed."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_storage_audit_rows(outcome, count)
+        except Exception as e:
+            logger.debug(f"Could not record storage audit metric: {e}")
+
+    def _record_write(self, count: int, duration_seconds: float) -> None:
+        """Count written rows and time the batch."""
+        try:
+            from app.services.prometheus_service import prometheus_service
+            prometheus_service.record_storage_audit_rows("written", count)
+            prometheus_service.record_storage_audit_flush(duration_seconds)
+        except Exception as e:
+            logger.debug(f"Could not record storage audit metric: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and outcome counters."""
+        spill_path = self.spill_path
+        return {
+            "pending": len(self._pending),
+            "max_queue_rows": self.max_queue_rows,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "spill_files": len(list(spill_path.glob("audit-*.jsonl"))) if spill_path and spill_path.is_dir() else 0,
+        }
+
+
+class StorageUsageAccumulator:
+    """Coalesces access-time touches per file hash."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        flush_interval: Optional[float] = None,
+    ):
+        """Initialize with nothing pending; the flush task starts with the first touch."""
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval or settings.STORAGE_USAGE_FLUSH_INTERVAL_SECONDS
+        self._accessed: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._accessed)
+
+    def touch(self, file_hash: str, accessed_at: Optional[datetime] = None) -> None:
+        """Record an access; only the latest time per hash is written."""
+        accessed_at = accessed_at or datetime.utcnow()
+        if accessed_at > self._accessed.get(file_hash, datetime.min):
+            self._accessed[file_hash] = accessed_at
+        self._ensure_task()
+
+    def _ensure_task(self) -> None:
+        """Start the periodic flush on the running loop if it is not already running there."""
+        if not settings.STORAGE_USAGE_BATCHED:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def flush(self) -> int:
+        """Apply all pending touches in one statement; returns the number of hashes written."""
+        accessed, self._accessed = self._accessed, {}
+        if not accessed:
+            return 0
+
+        rows = list(accessed.items())
+        pending = values(
+            column("file_hash", String),
+            column("last_accessed", DateTime),
+            name="pending",
+        ).data(rows)
+
+        try:
+            async with self._session_factory() as session:
+                await session.execute(
+                    update(FileDeduplication)
+                    .where(FileDeduplication.file_hash == pending.c.file_hash)
+                    .values(
+                        last_accessed=func.greatest(FileDeduplication.last_accessed, pending.c.last_accessed),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to flush storage usage for {len(rows)} files, keeping it for the next flush: {e}")
+            for file_hash, accessed_at in accessed.items():
+                if accessed_at > self._accessed.get(file_hash, datetime.min):
+                    self._accessed[file_hash] = accessed_at
+            return 0
+
+    async def _run(self) -> None:
+        """Flush every interval."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def shutdown(self) -> None:
+        """Stop the flush task and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class StorageMetadataUnitOfWork:
+    """Metadata writes for one storage operation, sharing a session and transaction."""
+
+    def __init__(self, session: AsyncSession, audit_flusher: Optional[StorageAuditFlusher] = None):
+        """Bind to an open session; audit rows go to the flusher when one is given."""
+        self.session = session
+        self.audit_flusher = audit_flusher
+        self._deferred_audit: List[Dict[str, Any]] = []
+
+    @classmethod
+    @asynccontextmanager
+    async def begin(
+        cls,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        defer_audit: Optional[bool] = None,
+    ) -> AsyncIterator["StorageMetadataUnitOfWork"]:
+        """Open a session, commit on success and roll back on error."""
+        if defer_audit is None:
+            defer_audit = settings.STORAGE_AUDIT_DEFERRED
+        async with session_factory() as session:
+            unit = cls(session, storage_audit_flusher if defer_audit else None)
+            try:
+                yield unit
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+        # Deferred audit rows are only released once the operation they describe has committed
+        for row in unit._deferred_audit:
+            unit.audit_flusher.add(row)
+
+    async def claim_file(
+        self,
+        file_hash: str,
+        original_filename: str,
+        stored_path: str,
+        file_size: int,
+        content_type: Optional[str],
+        is_compressed: bool,
+        compression_type: Optional[str],
+        original_size: Optional[int],
+        compressed_size: Optional[int],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Insert the deduplication record, or take a reference on the existing one.
+
+        Returns the stored record and whether this call created it.
+        """
+        now = datetime.utcnow()
+        statement = pg_insert(FileDeduplication).values(
+            file_hash=file_hash,
+            original_filename=original_filename,
+            stored_path=stored_path,
+            file_size=file_size,
+            content_type=content_type,
+            reference_count=1,
+            is_compressed=is_compressed,
+            compression_type=compression_type,
+            original_size=original_size,
+            compressed_size=compressed_size,
+            first_seen=now,
+            last_accessed=now,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[FileDeduplication.file_hash],
+            set_={
+                "reference_count": FileDeduplication.reference_count + 1,
+                "last_accessed": now,
+            },
+        ).returning(
+            FileDeduplication.stored_path,
+            FileDeduplication.is_compressed,
+            FileDeduplication.original_size,
+            FileDeduplication.compressed_size,
+            # xmax is 0 only for a freshly inserted row version
+            literal_column("xmax = 0").label("inserted"),
+        )
+
+        row = (await self.session.execute(statement)).one()
+        record = {
+            "stored_path": row.stored_path,
+            "is_compressed": row.is_compressed,
+            "original_size": row.original_size,
+            "compressed_size": row.compressed_size,
+        }
+        return record, bool(row.inserted)
+
+    async def adjust_reference_count(self, file_hash: str, delta: int) -> Optional[int]:
+        """
+        Add to a file's reference count now; a decrement that reaches zero removes the record.
+
+        Returns the new count, or None if there is no record for the hash.
+        """
+        reference_count = (await self.session.execute(
+            update(FileDeduplication)
+            .where(FileDeduplication.file_hash == file_hash)
+            .values(
+                reference_count=func.greatest(FileDeduplication.reference_count + delta, 0),
+                last_accessed=datetime.utcnow(),
+            )
+            .returning(FileDeduplication.reference_count)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+
+        if reference_count is not None and reference_count <= 0 and delta < 0:
+            await self.session.execute(
+                delete(FileDeduplication)
+                .where(FileDeduplication.file_hash == file_hash, FileDeduplication.reference_count <= 0)
+                .execution_options(synchronize_session=False)
+            )
+        return reference_count
+
+    async def repoint_file(
+        self,
+        file_hash: str,
+        stored_path: str,
+        is_compressed: bool,
+        compression_type: Optional[str],
+        original_size: Optional[int],
+        compressed_size: Optional[int],
+    ) -> None:
+        """Point an existing record at a freshly written object."""
+        await self.session.execute(
+            update(FileDeduplication)
+            .where(FileDeduplication.file_hash == file_hash)
+            .values(
+                stored_path=stored_path,
+                is_compressed=is_compressed,
+                compression_type=compression_type,
+                original_size=original_size,
+                compressed_size=compressed_size,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def grant_access(
+        self,
+        file_path: str,
+        file_hash: str,
+        access_level: str = "private",
+        created_by: Optional[str] = None,
+    ) -> None:
+        """Add the access-control row for a stored file."""
+        self.session.add(FileAccessControl(
+            file_path=file_path,
+            file_hash=file_hash,
+            access_level=access_level,
+            created_by=created_by,
+        ))
+
+    def audit(self, **fields: Any) -> None:
+        """Record a storage audit row, in this transaction or via the deferred flusher."""
+        fields.setdefault("created_at", datetime.utcnow())
+        if self.audit_flusher is not None:
+            self._deferred_audit.append(fields)
+        else:
+            self.session.add(StorageAudit(**fields))
+
+
+# Singleton instances
+storage_audit_flusher = StorageAuditFlusher()
+storage_usage_accumulator = StorageUsageAccumulator()
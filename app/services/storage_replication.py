@@ -0,0 +1,172 @@
+"""
+Backups for the content-addressed local storage layout.
+
+Objects in the content-addressed layout are immutable, so a backup never
+needs a second write on the upload path. It is either a reflink/hard link
+(``STORAGE_BACKUP_MODE=link``) or a copy made later by a rate-limited
+background replicator (``STORAGE_BACKUP_MODE=replicate``).
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl(FICLONE) from linux/fs.h: share extents copy-on-write (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+def link_object(source: Path, target: Path) -> str:
+    """Back up an immutable object without copying it: reflink if supported, else hard link."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        return "exists"
+
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except OSError:
+            target.unlink(missing_ok=True)
+
+    os.link(source, target)
+    return "hardlink"
+
+
+class StorageReplicator:
+    """Copies stored objects to the backup root at a bounded rate."""
+
+    def __init__(
+        self,
+        source_root: Optional[str] = None,
+        backup_root: Optional[str] = None,
+        max_bytes_per_second: Optional[int] = None,
+        max_queue: int = 10000,
+    ):
+        """Initialize the replicator; roots default to the current settings."""
+        self._source_root = source_root
+        self._backup_root = backup_root
+        self._max_bytes_per_second = max_bytes_per_second
+        self._max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def source_root(self) -> Path:
+        return Path(self._source_root or settings.STORAGE_PATH)
+
+    @property
+    def backup_root(self) -> Path:
+        return Path(self._backup_root or settings.STORAGE_BACKUP_PATH)
+
+    @property
+    def max_bytes_per_second(self) -> int:
+        return self._max_bytes_per_second or settings.STORAGE_REPLICATION_MAX_BYTES_PER_SECOND
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def backup(self, relative_path: str) -> None:
+        """Back up a newly stored object according to STORAGE_BACKUP_MODE."""
+        mode = settings.STORAGE_BACKUP_MODE
+        if mode == "none":
+            return
+
+        if mode == "link":
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    None, link_object, self.source_root / relative_path, self.backup_root / relative_path
+                )
+                return
+            except OSError as e:
+                # Typically a backup root on another filesystem; fall back to copying
+                logger.debug(f"Could not link {relative_path} into backup, replicating instead: {e}")
+
+        self.enqueue(relative_path)
+
+    def enqueue(self, relative_path: str) -> None:
+        """Queue an object for background replication."""
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        try:
+            self._queue.put_nowait(relative_path)
+        except asyncio.QueueFull:
+            logger.warning(
+                f"Replication queue full, {relative_path} not queued; "
+                f"scripts/collapse_storage_layout.py --replicate re-syncs missing backups"
+            )
+
+    def _bind_loop(self) -> None:
+        """Create the queue on the running loop (e.g. one asyncio.run per Celery task)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        previous = self._queue
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._task = None
+        # Objects left queued when the previous loop finished still need copying
+        while previous is not None and not previous.empty():
+            self._queue.put_nowait(previous.get_nowait())
+
+    def replicate(self, relative_path: str) -> int:
+        """Copy one object to the backup root; returns the bytes copied."""
+        source = self.source_root / relative_path
+        target = self.backup_root / relative_path
+        size = source.stat().st_size
+        if target.exists() and target.stat().st_size == size:
+            return 0
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_target = target.with_name(f".{target.name}.partial")
+        shutil.copyfile(source, temp_target)
+        os.replace(temp_target, target)
+        return size
+
+    async def _run(self) -> None:
+        """Replicate queued objects, sleeping to stay under the byte-rate budget."""
+        loop = asyncio.get_running_loop()
+        while True:
+            relative_path = await self._queue.get()
+            copied = 0
+            try:
+                copied = await loop.run_in_executor(None, self.replicate, relative_path)
+            except Exception as e:
+                logger.error(f"Failed to replicate {relative_path}: {e}")
+            finally:
+                self._queue.task_done()
+            if copied and self.max_bytes_per_second:
+                await asyncio.sleep(copied / self.max_bytes_per_second)
+
+    async def shutdown(self) -> None:
+        """Stop replicating; objects still queued are picked up by the re-sync tool."""
+        self._bind_loop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.pending:
+            logger.warning(f"{self.pending} objects were not replicated before shutdown")
+
+
+# Singleton instance
+storage_replicator = StorageReplicator()
@@ -2,22 +2,22 @@
 Enhanced storage service for document storage and retrieval with local backend support.
 """
 
-import asyncio
 import hashlib
 import logging
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from urllib.parse import urlparse
 
 import aiofiles
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
 from fastapi import Request
 
 from app.core.config import settings
 from app.core.exceptions import StorageException
+from app.services.document_cache import document_cache, file_hash_from_path
 from app.services.local_storage_service import LocalStorageService
+from app.services.s3_storage_backend import s3_storage_backend
+from app.services.upload_staging import StagedUpload
 
 logger = logging.getLogger(__name__)
 
@@ -39,20 +39,10 @@ class StorageService:
             raise StorageException(f"Unsupported storage type: {self.storage_type}")
 
     def _init_s3_client(self):
-        """Initialize S3 client."""
-        try:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION,
-                endpoint_url=settings.S3_ENDPOINT_URL,
-            )
-            self.bucket_name = settings.S3_BUCKET_NAME
-            logger.info(f"Initialized S3 storage with bucket: {self.bucket_name}")
-        except Exception as e:
-            logger.error(f"Failed to initialize S3 client: {e}")
-            raise StorageException(f"S3 initialization failed: {str(e)}")
+        """Attach the shared async S3 backend."""
+        self.s3_backend = s3_storage_backend
+        self.bucket_name = self.s3_backend.bucket
+        logger.info(f"Initialized S3 storage with bucket: {self.bucket_name}")
 
     def _init_local_storage(self):
         """Initialize enhanced local file storage."""
@@ -65,7 +55,7 @@ class StorageService:
 
     async def store_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, StagedUpload],
         filename: str,
         content_type: Optional[str] = None,
         user_id: Optional[str] = None,
@@ -82,7 +72,10 @@ class StorageService:
             # Store file based on storage type
             if self.storage_type == "s3":
                 # Generate file hash and unique path for S3
-                file_hash = hashlib.sha256(file_content).hexdigest()
+                if isinstance(file_content, StagedUpload):
+                    file_hash, file_size = file_content.file_hash, file_content.size
+                else:
+                    file_hash, file_size = hashlib.sha256(file_content).hexdigest(), len(file_content)
                 file_path = self._generate_file_path(file_hash, filename)
                 storage_info = await self._store_s3(file_content, file_path, content_type)
 
@@ -91,7 +84,7 @@ class StorageService:
                     "storage_type": self.storage_type,
                     "file_path": file_path,
                     "file_hash": file_hash,
-                    "file_size": len(file_content),
+                    "file_size": file_size,
                     "filename": filename,
                     "content_type": content_type,
                     "url": storage_info.get("url"),
@@ -122,16 +115,31 @@ class StorageService:
         file_path: str,
         user_id: Optional[str] = None,
         session_id: Optional[str] = None,
-        request: Optional[Request] = None
+        request: Optional[Request] = None,
+        bypass_cache: bool = False
     ) -> bytes:
-        """Retrieve file content with access control."""
+        """
+        Retrieve file content with access control.
+
+        Internal reads are served from the per-process document cache when
+        possible, skipping decompression and the audit row. Reads on behalf
+        of a user or request always go to the backend so its ACL check runs;
+        other reads that must be audited pass ``bypass_cache``.
+        """
         logger.debug(f"Retrieving file: {file_path}")
 
+        file_hash = file_hash_from_path(file_path)
+        use_cache = not bypass_cache and user_id is None and request is None
+        if file_hash and use_cache:
+            content = document_cache.get(file_hash)
+            if content is not None:
+                return content
+
         try:
             if self.storage_type == "s3":
-                return await self._get_s3_content(file_path)
+                content = await self._get_s3_content(file_path)
             else:  # local - use enhanced local storage service
-                return await self.local_storage_service.get_file_content(
+                content = await self.local_storage_service.get_file_content(
                     file_path=file_path,
                     user_id=user_id,
                     session_id=session_id,
@@ -142,6 +150,29 @@ class StorageService:
             logger.error(f"Failed to retrieve file {file_path}: {e}")
             raise StorageException(f"File retrieval failed: {str(e)}")
 
+        if file_hash:
+            document_cache.put(file_hash, content)
+        return content
+
+    async def iter_file_content(
+        self,
+        file_path: str,
+        chunk_size: int = 1024 * 1024,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request: Optional[Request] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream file content; S3 bodies are read chunk by chunk instead of whole."""
+        if self.storage_type == "s3":
+            async for chunk in self.s3_backend.iter_object(file_path, chunk_size):
+                yield chunk
+            return
+
+        # Local objects may be compressed, so they are decoded whole
+        yield await self.get_file_content(
+            file_path, user_id=user_id, session_id=session_id, request=request, bypass_cache=True
+        )
+
     async def file_exists(self, file_path: str) -> bool:
         """Check if file exists."""
         logger.debug(f"Checking if file exists: {file_path}")
@@ -167,6 +198,10 @@ class StorageService:
         """Delete a file with access control."""
         logger.info(f"Deleting file: {file_path}")
 
+        file_hash = file_hash_from_path(file_path)
+        if file_hash:
+            document_cache.invalidate(file_hash)
+
         try:
             if self.storage_type == "s3":
                 return await self._delete_s3_file(file_path)
@@ -222,42 +257,11 @@ class StorageService:
         return f"{prefix1}/{prefix2}/{file_hash}{extension}"
 
     async def _store_s3(
-        self, file_content: bytes, file_path: str, content_type: Optional[str] = None
+        self, file_content: Union[bytes, StagedUpload], file_path: str, content_type: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Store file in S3."""
-        try:
-            # Prepare S3 upload parameters
-            extra_args = {}
-            if content_type:
-                extra_args["ContentType"] = content_type
-
-            # Upload to S3
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=file_path,
-                    Body=file_content,
-                    **extra_args
-                )
-            )
-
-            # Generate URL
-            url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{file_path}"
-            if settings.S3_ENDPOINT_URL:
-                # For custom S3 endpoints (like MinIO)
-                url = f"{settings.S3_ENDPOINT_URL}/{self.bucket_name}/{file_path}"
-
-            return {
-                "url": url,
-                "bucket": self.bucket_name,
-                "key": file_path,
-            }
-
-        except ClientError as e:
-            logger.error(f"S3 upload failed: {e}")
-            raise StorageException(f"S3 upload failed: {str(e)}")
+        """Store file in S3; staged uploads are sent from disk, in parts when large."""
+        source = file_content.path if isinstance(file_content, StagedUpload) else file_content
+        return await self.s3_backend.put_object(file_path, source, content_type)
 
     async def _store_local(
         self, file_content: bytes, file_path: str, content_type: Optional[str] = None
@@ -282,17 +286,7 @@ class StorageService:
 
     async def _get_s3_content(self, file_path: str) -> bytes:
         """Get file content from S3."""
-        try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.get_object(Bucket=self.bucket_name, Key=file_path)
-            )
-            return response["Body"].read()
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "NoSuchKey":
-                raise StorageException(f"File not found in S3: {file_path}")
-            raise StorageException(f"S3 retrieval failed: {str(e)}")
+        return await self.s3_backend.get_object(file_path)
 
     async def _get_local_content(self, file_path: str) -> bytes:
         """Get file content from local storage."""
@@ -307,15 +301,7 @@ class StorageService:
 
     async def _s3_file_exists(self, file_path: str) -> bool:
         """Check if file exists in S3."""
-        try:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.head_object(Bucket=self.bucket_name, Key=file_path)
-            )
-            return True
-        except ClientError:
-            return False
+        return await self.s3_backend.head_object(file_path) is not None
 
     async def _local_file_exists(self, file_path: str) -> bool:
         """Check if file exists locally."""
@@ -324,16 +310,7 @@ class StorageService:
 
     async def _delete_s3_file(self, file_path: str) -> bool:
         """Delete file from S3."""
-        try:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_path)
-            )
-            return True
-        except ClientError as e:
-            logger.error(f"S3 deletion failed: {e}")
-            return False
+        return await self.s3_backend.delete_object(file_path)
 
     async def _delete_local_file(self, file_path: str) -> bool:
         """Delete file locally."""
@@ -350,37 +327,8 @@ class StorageService:
     async def _list_s3_files(self, prefix: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """List files in S3."""
         try:
-            paginator = self.s3_client.get_paginator("list_objects_v2")
-            loop = asyncio.get_event_loop()
-
-            pages = []
-            if prefix:
-                pages = await loop.run_in_executor(
-                    None,
-                    lambda: list(paginator.paginate(Bucket=self.bucket_name, Prefix=prefix))
-                )
-            else:
-                pages = await loop.run_in_executor(
-                    None,
-                    lambda: list(paginator.paginate(Bucket=self.bucket_name))
-                )
-
-            files = []
-            for page in pages:
-                if "Contents" in page:
-                    for obj in page["Contents"]:
-                        files.append({
-                            "path": obj["Key"],
-                            "size": obj["Size"],
-                            "last_modified": obj["LastModified"].isoformat(),
-                            "url": f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{obj['Key']}",
-                        })
-                        if len(files) >= limit:
-                            return files
-
-            return files
-
-        except ClientError as e:
+            return await self.s3_backend.list_objects(prefix, limit)
+        except Exception as e:
             logger.error(f"S3 list failed: {e}")
             return []
 
@@ -418,16 +366,7 @@ class StorageService:
             return None
 
         try:
-            loop = asyncio.get_event_loop()
-            url = await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.generate_presigned_url(
-                    "get_object",
-                    Params={"Bucket": self.bucket_name, "Key": file_path},
-                    ExpiresIn=expiration,
-                )
-            )
-            return url
-        except ClientError as e:
+            return await self.s3_backend.generate_presigned_url(file_path, expiration)
+        except Exception as e:
             logger.error(f"Failed to generate presigned URL: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,155 @@
+"""
+Chunked staging of uploads to disk.
+
+An upload is read in fixed-size chunks that are hashed and written to a temp
+file under ``STORAGE_PATH/temp`` as they arrive, so no stage ever holds the
+whole file in memory. The MIME type is sniffed from the first chunk and the
+size limit is enforced while reading. Storage then moves the temp file into
+place (it is on the same filesystem), and anything that needs the content
+reads it through a memory map.
+"""
+
+import hashlib
+import logging
+import mmap
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+import aiofiles
+import magic
+
+from app.core.config import settings
+from app.core.exceptions import IngestionException
+
+logger = logging.getLogger(__name__)
+
+# libmagic only looks at the start of a file
+SNIFF_BYTES = 8192
+
+
+@dataclass
+class StagedUpload:
+    """An upload written to a temp file, with its hash, size and sniffed MIME type."""
+
+    path: Path
+    filename: str
+    file_hash: str
+    size: int
+    mime_type: str
+    head: bytes
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """Read-only memoryview over the staged file, backed by a memory map."""
+        with open(self.path, "rb") as f:
+            if self.size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def cleanup(self) -> None:
+        """Remove the temp file if storage has not moved it into place."""
+        self.path.unlink(missing_ok=True)
+
+
+class UploadStager:
+    """Streams uploads to temp files in fixed-size chunks."""
+
+    def __init__(self, temp_path: Optional[str] = None, chunk_size: Optional[int] = None):
+        """Initialize; the temp directory defaults to STORAGE_PATH/temp."""
+        self._temp_path = temp_path
+        self._chunk_size = chunk_size
+
+    @property
+    def temp_path(self) -> Path:
+        return Path(self._temp_path or Path(settings.STORAGE_PATH) / "temp")
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size or settings.UPLOAD_CHUNK_SIZE_BYTES
+
+    async def stage(
+        self,
+        source: Union[bytes, memoryview, Any],
+        filename: str,
+        content_type: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> StagedUpload:
+        """
+        Stage bytes or an UploadFile-like object with an async ``read(size)``.
+
+        Raises IngestionException as soon as more than ``max_size`` bytes have been read.
+        """
+        if max_size is None:
+            max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+        self.temp_path.mkdir(parents=True, exist_ok=True)
+        path = self.temp_path / f"upload-{uuid.uuid4().hex}.part"
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in self._chunks(source):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise IngestionException(
+                            f"File size exceeds maximum {max_size} bytes"
+                        )
+                    if len(head) < SNIFF_BYTES:
+                        head += bytes(chunk[:SNIFF_BYTES - len(head)])
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        staged = StagedUpload(
+            path=path,
+            filename=filename,
+            file_hash=digest.hexdigest(),
+            size=size,
+            mime_type=self.sniff_mime_type(head, content_type),
+            head=head,
+        )
+        logger.debug(f"Staged {filename} ({size} bytes, {staged.mime_type}) at {path}")
+        return staged
+
+    async def _chunks(self, source: Union[bytes, memoryview, Any]):
+        """Yield the source in chunks of at most ``chunk_size`` bytes."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source)
+            for offset in range(0, len(view), self.chunk_size):
+                yield view[offset:offset + self.chunk_size]
+            return
+
+        while True:
+            chunk = await source.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def sniff_mime_type(head: bytes, content_type: Optional[str] = None) -> str:
+        """MIME type from the first bytes of a file, falling back to the declared type."""
+        try:
+            detected_type = magic.Magic(mime=True).from_buffer(head)
+            if detected_type == "application/octet-stream" and content_type:
+                return content_type
+            return detected_type
+        except Exception as e:
+            logger.warning(f"MIME type detection failed: {e}")
+            return content_type or "application/octet-stream"
+
+
+# Singleton instance
+upload_stager = UploadStager()
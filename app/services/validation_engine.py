@@ -3,12 +3,13 @@ Advanced validation engine with deterministic structural validation, mathematica
 business rules validation, and machine-readable reason codes.
 """
 
+import asyncio
 import logging
-import re
+import time
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple, Union
 from decimal import Decimal, InvalidOperation
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -26,10 +27,16 @@ from app.api.schemas.validation import (
     DuplicateCheckResult,
     ValidationRulesConfig,
 )
+from app.core.config import settings
 from app.core.exceptions import ValidationException
 from app.db.session import AsyncSessionLocal
 from app.models.invoice import Invoice, InvoiceExtraction
 from app.models.reference import Vendor, PurchaseOrder, GoodsReceiptNote
+from app.services.invoice_fingerprint_service import invoice_fingerprint_service
+from app.services.line_item_columns import LineItemColumns
+from app.services.parsed_invoice import ENGINE_HEADER_FIELDS, ParsedInvoice, lenient_amount, parse_amount
+from app.services.validation_rule_registry import RuleContext, RuleHandler, RulePlan, rule_registry
+from app.services.validation_snapshot import ValidationSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -86,10 +93,13 @@ class ValidationRule:
     version: str = "1.0.0"
     parameters: Dict[str, Any] = None
     condition: str = None  # Condition expression for rule application
+    depends_on: List[str] = None  # Rules whose results this rule reads
 
     def __post_init__(self):
         if self.parameters is None:
             self.parameters = {}
+        if self.depends_on is None:
+            self.depends_on = []
 
 
 @dataclass
@@ -100,7 +110,7 @@ class RuleExecutionResult:
     reason_taxonomy: Optional[ReasonTaxonomy] = None
     message: str = ""
     details: Dict[str, Any] = None
-    execution_time_ms: int = 0
+    execution_time_ms: float = 0.0
 
     def __post_init__(self):
         if self.details is None:
@@ -113,7 +123,7 @@ class ValidationEngine:
     def __init__(self):
         """Initialize the validation engine."""
         self.rules_version = "2.0.0"
-        self.rules = self._initialize_rules()
+        self.rules = self._rule_plan().rule_sets
         self.reason_taxonomy_map = self._initialize_reason_taxonomy()
 
     def _initialize_rules(self) -> Dict[str, List[ValidationRule]]:
@@ -188,7 +198,8 @@ class ValidationEngine:
                     name="currency_validation",
                     category="business_rules",
                     description="Validate currency matches vendor currency",
-                    severity=ValidationSeverity.ERROR
+                    severity=ValidationSeverity.ERROR,
+                    depends_on=["vendor_validation"]
                 ),
                 ValidationRule(
                     name="po_matching_validation",
@@ -277,199 +288,263 @@ class ValidationEngine:
         lines = extraction_result.get("lines", [])
         confidence = extraction_result.get("confidence", {})
 
-        # Initialize results
-        all_issues = []
-        rule_results = []
-        validation_results = {}
-
         try:
-            # Get database session for advanced validations
-            async with AsyncSessionLocal() as session:
-                # Execute validation rules by category
-                for category, rules in (custom_rules or self.rules).items():
-                    category_results = await self._execute_rule_category(
-                        category, rules, header, lines, confidence, session, invoice_id, vendor_id
-                    )
-                    rule_results.extend(category_results)
-
-                    # Collect issues
-                    for result in category_results:
-                        if not result.passed:
-                            issue = self._create_validation_issue(result)
-                            all_issues.append(issue)
-
-                    # Store category-specific results
-                    if category == "mathematical":
-                        validation_results["math_validation"] = self._create_math_result(
-                            category_results, header, lines
-                        )
-                    elif category == "business_rules":
-                        validation_results["matching_result"] = self._create_matching_result(
-                            category_results, invoice_id, session
-                        )
-                        validation_results["vendor_policy_result"] = self._create_vendor_policy_result(
-                            category_results
-                        )
-                        validation_results["duplicate_check_result"] = self._create_duplicate_result(
-                            category_results
-                        )
-
-            # Calculate overall validation result
-            error_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.ERROR)
-            warning_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.WARNING)
-            info_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.INFO)
-
-            validation_passed = error_count == 0
-            if strict_mode:
-                validation_passed = validation_passed and warning_count == 0
-
-            # Calculate confidence score
-            confidence_score = self._calculate_validation_confidence(rule_results, confidence)
-
-            # Create validation result
-            result = ValidationResult(
-                passed=validation_passed,
-                confidence_score=confidence_score,
-                total_issues=len(all_issues),
-                error_count=error_count,
-                warning_count=warning_count,
-                info_count=info_count,
-                issues=all_issues,
-                math_validation=validation_results.get("math_validation"),
-                matching_result=validation_results.get("matching_result"),
-                vendor_policy_result=validation_results.get("vendor_policy_result"),
-                duplicate_check_result=validation_results.get("duplicate_check_result"),
-                check_results=self._create_check_results(rule_results),
-                validated_at=start_time,
-                rules_version=self.rules_version,
-                validator_version="2.0.0",
-                processing_time_ms=str(int((datetime.utcnow() - start_time).total_seconds() * 1000)),
-                header_summary=self._create_header_summary(header),
-                lines_summary=self._create_lines_summary(lines)
+            # Execute all categories as one rule DAG, then report per category
+            plan = self._rule_plan(vendor_id, custom_rules)
+            context = RuleContext(header, lines, confidence, invoice_id=invoice_id, vendor_id=vendor_id)
+            executed = await self._execute_plan(plan, context)
+            result = self._build_validation_result(
+                plan.rule_sets, executed, header, lines, confidence, invoice_id, strict_mode, start_time,
+                context.line_columns, context.parsed
             )
 
             logger.info(
                 f"Comprehensive validation completed for invoice {invoice_id}: "
                 f"{'PASSED' if result.passed else 'FAILED'} "
-                f"(errors: {error_count}, warnings: {warning_count}, confidence: {confidence_score:.2f})"
+                f"(errors: {result.error_count}, warnings: {result.warning_count}, "
+                f"confidence: {result.confidence_score:.2f})"
             )
 
             return result
 
         except Exception as e:
             logger.error(f"Comprehensive validation failed: {e}")
-            # Create error result
-            error_issue = ValidationIssue(
-                code=ValidationCode.VALIDATION_ERROR,
-                message=f"Validation process failed: {str(e)}",
-                severity=ValidationSeverity.ERROR,
-                details={"error_type": type(e).__name__}
-            )
+            return self._create_failed_result(e, start_time)
 
-            return ValidationResult(
-                passed=False,
-                confidence_score=0.0,
-                total_issues=1,
-                error_count=1,
-                warning_count=0,
-                info_count=0,
-                issues=[error_issue],
-                check_results=self._create_error_check_results(),
-                validated_at=start_time,
-                rules_version=self.rules_version,
-                validator_version="2.0.0",
-                header_summary={},
-                lines_summary={}
-            )
-
-    async def _execute_rule_category(
+    async def validate_batch(
         self,
-        category: str,
-        rules: List[ValidationRule],
-        header: Dict[str, Any],
-        lines: List[Dict[str, Any]],
-        confidence: Dict[str, Any],
-        session: AsyncSession,
-        invoice_id: Optional[str],
-        vendor_id: Optional[str]
-    ) -> List[RuleExecutionResult]:
-        """Execute all rules in a category."""
-        results = []
+        extractions: Dict[str, Dict[str, Any]],
+        strict_mode: bool = False,
+        custom_rules: Optional[Dict[str, List[ValidationRule]]] = None
+    ) -> Dict[str, ValidationResult]:
+        """
+        Validate many extraction results, keyed by invoice id, against one prefetched snapshot.
+
+        Vendors and duplicate fingerprints for the whole batch are loaded in a
+        few set-based queries; every invoice then runs the rule set in memory.
+        An extraction result may carry a ``vendor_id`` to apply that vendor's
+        rule overrides and match duplicates on that vendor record; without
+        one the invoice's stored vendor is used.
+        """
+        start_time = datetime.utcnow()
+        plans: Dict[Optional[str], RulePlan] = {}
+
+        async with AsyncSessionLocal() as session:
+            snapshot = await ValidationSnapshot.load(
+                session,
+                [extraction_result.get("header", {}) for extraction_result in extractions.values()],
+                invoice_ids=list(extractions),
+                vendor_ids=[extraction_result.get("vendor_id") for extraction_result in extractions.values()],
+            )
 
-        for rule in rules:
-            if not rule.enabled:
-                continue
+        results: Dict[str, ValidationResult] = {}
+        for invoice_id, extraction_result in extractions.items():
+            invoice_start_time = datetime.utcnow()
+            header = extraction_result.get("header", {})
+            lines = extraction_result.get("lines", [])
+            confidence = extraction_result.get("confidence", {})
+            vendor_id = extraction_result.get("vendor_id")
 
             try:
-                start_time = datetime.utcnow()
-                result = await self._execute_single_rule(
-                    rule, header, lines, confidence, session, invoice_id, vendor_id
+                if vendor_id not in plans:
+                    plans[vendor_id] = self._rule_plan(vendor_id, custom_rules)
+                plan = plans[vendor_id]
+                context = RuleContext(
+                    header, lines, confidence, invoice_id=invoice_id, vendor_id=vendor_id, snapshot=snapshot
+                )
+                executed = await self._execute_plan(plan, context)
+                results[invoice_id] = self._build_validation_result(
+                    plan.rule_sets, executed, header, lines, confidence, invoice_id, strict_mode, invoice_start_time,
+                    context.line_columns, context.parsed
                 )
-                result.execution_time_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-                results.append(result)
-
             except Exception as e:
-                logger.error(f"Rule {rule.name} execution failed: {e}")
-                results.append(RuleExecutionResult(
-                    rule_name=rule.name,
-                    passed=False,
-                    reason_taxonomy=ReasonTaxonomy.SYSTEM_ERROR,
-                    message=f"Rule execution failed: {str(e)}",
-                    details={"error_type": type(e).__name__}
-                ))
+                logger.error(f"Batch validation failed for invoice {invoice_id}: {e}")
+                results[invoice_id] = self._create_failed_result(e, invoice_start_time)
 
+        passed_count = sum(1 for result in results.values() if result.passed)
+        logger.info(
+            f"Batch validation completed: {passed_count}/{len(results)} invoices passed "
+            f"in {(datetime.utcnow() - start_time).total_seconds():.2f}s"
+        )
         return results
 
-    async def _execute_single_rule(
+    def _build_validation_result(
         self,
-        rule: ValidationRule,
+        rule_sets: Dict[str, List[ValidationRule]],
+        executed: Dict[str, RuleExecutionResult],
         header: Dict[str, Any],
         lines: List[Dict[str, Any]],
         confidence: Dict[str, Any],
-        session: AsyncSession,
         invoice_id: Optional[str],
-        vendor_id: Optional[str]
+        strict_mode: bool,
+        start_time: datetime,
+        columns: Optional[LineItemColumns] = None,
+        parsed: Optional[ParsedInvoice] = None
+    ) -> ValidationResult:
+        """Build the validation result from executed rules, reporting them per category."""
+        all_issues = []
+        rule_results = []
+        validation_results = {}
+
+        for category, rules in rule_sets.items():
+            category_results = [executed[rule.name] for rule in rules if rule.name in executed]
+            rule_results.extend(category_results)
+
+            # Collect issues
+            for result in category_results:
+                if not result.passed:
+                    issue = self._create_validation_issue(result)
+                    all_issues.append(issue)
+
+            # Store category-specific results
+            if category == "mathematical":
+                validation_results["math_validation"] = self._create_math_result(
+                    category_results, header, lines, columns, parsed
+                )
+            elif category == "business_rules":
+                validation_results["matching_result"] = self._create_matching_result(
+                    category_results, invoice_id
+                )
+                validation_results["vendor_policy_result"] = self._create_vendor_policy_result(
+                    category_results
+                )
+                validation_results["duplicate_check_result"] = self._create_duplicate_result(
+                    category_results
+                )
+
+        # Calculate overall validation result
+        error_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.ERROR)
+        warning_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.WARNING)
+        info_count = sum(1 for issue in all_issues if issue.severity == ValidationSeverity.INFO)
+
+        validation_passed = error_count == 0
+        if strict_mode:
+            validation_passed = validation_passed and warning_count == 0
+
+        # Calculate confidence score
+        confidence_score = self._calculate_validation_confidence(rule_results, confidence)
+
+        return ValidationResult(
+            passed=validation_passed,
+            confidence_score=confidence_score,
+            total_issues=len(all_issues),
+            error_count=error_count,
+            warning_count=warning_count,
+            info_count=info_count,
+            issues=all_issues,
+            math_validation=validation_results.get("math_validation"),
+            matching_result=validation_results.get("matching_result"),
+            vendor_policy_result=validation_results.get("vendor_policy_result"),
+            duplicate_check_result=validation_results.get("duplicate_check_result"),
+            check_results=self._create_check_results(rule_results),
+            validated_at=start_time,
+            rules_version=self.rules_version,
+            validator_version="2.0.0",
+            processing_time_ms=str(int((datetime.utcnow() - start_time).total_seconds() * 1000)),
+            header_summary=self._create_header_summary(header),
+            lines_summary=self._create_lines_summary(lines, columns)
+        )
+
+    def _create_failed_result(self, error: Exception, start_time: datetime) -> ValidationResult:
+        """Create the result reported when validation itself fails."""
+        error_issue = ValidationIssue(
+            code=ValidationCode.VALIDATION_ERROR,
+            message=f"Validation process failed: {str(error)}",
+            severity=ValidationSeverity.ERROR,
+            details={"error_type": type(error).__name__}
+        )
+
+        return ValidationResult(
+            passed=False,
+            confidence_score=0.0,
+            total_issues=1,
+            error_count=1,
+            warning_count=0,
+            info_count=0,
+            issues=[error_issue],
+            check_results=self._create_error_check_results(),
+            validated_at=start_time,
+            rules_version=self.rules_version,
+            validator_version="2.0.0",
+            header_summary={},
+            lines_summary={}
+        )
+
+    def _rule_plan(
+        self,
+        vendor_id: Optional[str] = None,
+        custom_rules: Optional[Dict[str, List[ValidationRule]]] = None
+    ) -> RulePlan:
+        """Compiled plan for custom rules, or the cached plan for this engine's rules and the vendor."""
+        if custom_rules:
+            return rule_registry.compile(custom_rules, self.rules_version, vendor_id)
+        return rule_registry.plan_for(type(self), self.rules_version, self._initialize_rules, vendor_id)
+
+    async def _execute_plan(self, plan: RulePlan, context: RuleContext) -> Dict[str, RuleExecutionResult]:
+        """
+        Execute a compiled rule plan, returning results keyed by rule name.
+
+        In-memory rules run inline. Database rules, and rules depending on
+        them, run concurrently with at most VALIDATION_RULE_CONCURRENCY
+        sessions open per invoice; each starts once its dependencies finish.
+        With a prefetched snapshot every rule runs inline against it.
+        """
+        completed = context.completed
+        deferred: List[Tuple[ValidationRule, RuleHandler]] = []
+        deferred_names = set()
+
+        for rule, handler in plan.steps:
+            if context.snapshot is None and (handler.database or deferred_names.intersection(rule.depends_on)):
+                deferred.append((rule, handler))
+                deferred_names.add(rule.name)
+            else:
+                completed[rule.name] = await self._execute_timed_rule(rule, handler, context)
+
+        if not deferred:
+            return completed
+
+        finished = {rule.name: asyncio.Event() for rule, _ in deferred}
+        semaphore = asyncio.Semaphore(max(1, settings.VALIDATION_RULE_CONCURRENCY))
+
+        async def run_deferred(rule: ValidationRule, handler: RuleHandler) -> None:
+            try:
+                for name in rule.depends_on:
+                    if name in finished:
+                        await finished[name].wait()
+                if handler.database:
+                    async with semaphore, AsyncSessionLocal() as session:
+                        completed[rule.name] = await self._execute_timed_rule(
+                            rule, handler, replace(context, session=session)
+                        )
+                else:
+                    completed[rule.name] = await self._execute_timed_rule(rule, handler, context)
+            finally:
+                finished[rule.name].set()
+
+        await asyncio.gather(*(run_deferred(rule, handler) for rule, handler in deferred))
+        return completed
+
+    async def _execute_timed_rule(
+        self, rule: ValidationRule, handler: RuleHandler, context: RuleContext
     ) -> RuleExecutionResult:
-        """Execute a single validation rule."""
-        if rule.name == "required_header_fields":
-            return await self._validate_required_header_fields(rule, header)
-        elif rule.name == "required_line_item_fields":
-            return await self._validate_required_line_item_fields(rule, lines)
-        elif rule.name == "field_format_validation":
-            return await self._validate_field_formats(rule, header, lines)
-        elif rule.name == "line_item_count_validation":
-            return await self._validate_line_item_count(rule, lines)
-        elif rule.name == "line_item_math_validation":
-            return await self._validate_line_item_math(rule, lines)
-        elif rule.name == "subtotal_validation":
-            return await self._validate_subtotal(rule, header, lines)
-        elif rule.name == "total_amount_validation":
-            return await self._validate_total_amount(rule, header, lines)
-        elif rule.name == "tax_calculation_validation":
-            return await self._validate_tax_calculation(rule, header, lines)
-        elif rule.name == "vendor_validation":
-            return await self._validate_vendor(rule, header, session)
-        elif rule.name == "currency_validation":
-            return await self._validate_currency(rule, header, session)
-        elif rule.name == "po_matching_validation":
-            return await self._validate_po_matching(rule, header, session)
-        elif rule.name == "grn_matching_validation":
-            return await self._validate_grn_matching(rule, header, lines, session)
-        elif rule.name == "duplicate_detection":
-            return await self._validate_duplicates(rule, header, invoice_id, session)
-        elif rule.name == "invoice_age_validation":
-            return await self._validate_invoice_age(rule, header)
-        elif rule.name == "amount_limits_validation":
-            return await self._validate_amount_limits(rule, header, lines)
-        else:
-            return RuleExecutionResult(
+        """Execute a rule, recording its duration and turning failures into a system error result."""
+        start_time = time.perf_counter()
+        try:
+            result = await handler(self, rule, context)
+        except Exception as e:
+            logger.error(f"Rule {rule.name} execution failed: {e}")
+            result = RuleExecutionResult(
                 rule_name=rule.name,
                 passed=False,
                 reason_taxonomy=ReasonTaxonomy.SYSTEM_ERROR,
-                message=f"Unknown rule: {rule.name}"
+                message=f"Rule execution failed: {str(e)}",
+                details={"error_type": type(e).__name__}
             )
+        result.execution_time_ms = (time.perf_counter() - start_time) * 1000
+        return result
 
     # Individual rule implementations
+    @rule_registry.register("required_header_fields", "header")
     async def _validate_required_header_fields(
         self, rule: ValidationRule, header: Dict[str, Any]
     ) -> RuleExecutionResult:
@@ -500,6 +575,7 @@ class ValidationEngine:
                 message="All required header fields present"
             )
 
+    @rule_registry.register("required_line_item_fields", "lines")
     async def _validate_required_line_item_fields(
         self, rule: ValidationRule, lines: List[Dict[str, Any]]
     ) -> RuleExecutionResult:
@@ -543,15 +619,21 @@ class ValidationEngine:
                 message="All line item fields present"
             )
 
+    @rule_registry.register("field_format_validation", "header", "lines", "parsed")
     async def _validate_field_formats(
-        self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]]
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        parsed: Optional[ParsedInvoice] = None
     ) -> RuleExecutionResult:
         """Validate field formats."""
         format_issues = []
+        parsed = parsed if parsed is not None else ParsedInvoice.from_extraction(header, lines, ENGINE_HEADER_FIELDS)
 
         # Validate header formats
         invoice_date = header.get("invoice_date")
-        if invoice_date and not self._is_valid_date(invoice_date):
+        if invoice_date and parsed.invoice_date is None:
             format_issues.append({
                 "field": "invoice_date",
                 "value": invoice_date,
@@ -559,7 +641,7 @@ class ValidationEngine:
             })
 
         total_amount = header.get("total_amount")
-        if total_amount and not self._is_valid_amount(total_amount):
+        if total_amount and (parsed.total is None or parsed.total < 0):
             format_issues.append({
                 "field": "total_amount",
                 "value": total_amount,
@@ -569,7 +651,8 @@ class ValidationEngine:
         # Validate line item formats
         for i, line in enumerate(lines):
             amount = line.get("total_amount") or line.get("amount")
-            if amount and not self._is_valid_amount(amount):
+            parsed_amount = parse_amount(amount, currency_strings=True) if amount else None
+            if amount and (parsed_amount is None or parsed_amount < 0):
                 format_issues.append({
                     "field": f"line_{i+1}_amount",
                     "value": amount,
@@ -591,6 +674,7 @@ class ValidationEngine:
                 message="All field formats valid"
             )
 
+    @rule_registry.register("line_item_count_validation", "lines")
     async def _validate_line_item_count(
         self, rule: ValidationRule, lines: List[Dict[str, Any]]
     ) -> RuleExecutionResult:
@@ -612,23 +696,26 @@ class ValidationEngine:
                 message=f"Line item count acceptable: {len(lines)}"
             )
 
+    @rule_registry.register("line_item_math_validation", "lines", "line_columns")
     async def _validate_line_item_math(
-        self, rule: ValidationRule, lines: List[Dict[str, Any]]
+        self, rule: ValidationRule, lines: List[Dict[str, Any]], columns: Optional[LineItemColumns] = None
     ) -> RuleExecutionResult:
-        """Validate line item calculations."""
+        """Validate line item calculations; only lines failing the vectorised check are recomputed in Decimal."""
         tolerance_cents = rule.parameters.get("tolerance_cents", 1)
+        tolerance = Decimal(str(tolerance_cents / 100))
+        columns = columns if columns is not None else LineItemColumns.from_lines(lines)
         issues = []
 
-        for i, line in enumerate(lines):
+        for i in columns.line_math_candidates(tolerance).tolist():
             try:
-                quantity = self._safe_decimal(line.get("quantity", 1))
-                unit_price = self._safe_decimal(line.get("unit_price", 0))
-                amount = self._safe_decimal(line.get("total_amount") or line.get("amount", 0))
+                quantity = lenient_amount(columns.raw_quantities[i])
+                unit_price = lenient_amount(columns.raw_unit_prices[i])
+                amount = lenient_amount(columns.raw_amounts[i])
 
                 expected_amount = quantity * unit_price
                 difference = abs(amount - expected_amount)
 
-                if difference > Decimal(str(tolerance_cents / 100)):
+                if difference > tolerance:
                     issues.append({
                         "line_number": i + 1,
                         "quantity": float(quantity),
@@ -659,21 +746,27 @@ class ValidationEngine:
                 message="All line item calculations correct"
             )
 
+    @rule_registry.register("subtotal_validation", "header", "lines", "line_columns", "parsed")
     async def _validate_subtotal(
-        self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]]
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        columns: Optional[LineItemColumns] = None,
+        parsed: Optional[ParsedInvoice] = None
     ) -> RuleExecutionResult:
         """Validate subtotal matches sum of line items."""
         tolerance_cents = rule.parameters.get("tolerance_cents", 1)
 
         try:
             # Calculate line items total
-            lines_total = sum(
-                self._safe_decimal(line.get("total_amount") or line.get("amount", 0))
-                for line in lines
-            )
+            columns = columns if columns is not None else LineItemColumns.from_lines(lines)
+            lines_total = columns.amounts_total(lenient_amount)
 
             # Get header subtotal
-            header_subtotal = self._safe_decimal(header.get("subtotal_amount", 0))
+            if parsed is None:
+                parsed = ParsedInvoice.from_extraction(header, lines, ENGINE_HEADER_FIELDS)
+            header_subtotal = parsed.subtotal or Decimal(0)
 
             if header_subtotal > 0:
                 difference = abs(lines_total - header_subtotal)
@@ -707,24 +800,33 @@ class ValidationEngine:
                 message=f"Subtotal validation error: {str(e)}"
             )
 
+    @rule_registry.register("total_amount_validation", "header", "lines", "line_columns", "parsed")
     async def _validate_total_amount(
-        self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]]
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        columns: Optional[LineItemColumns] = None,
+        parsed: Optional[ParsedInvoice] = None
     ) -> RuleExecutionResult:
         """Validate total amount calculation."""
         tolerance_cents = rule.parameters.get("tolerance_cents", 1)
 
         try:
             # Calculate expected total
-            lines_total = sum(
-                self._safe_decimal(line.get("total_amount") or line.get("amount", 0))
-                for line in lines
-            )
+            columns = columns if columns is not None else LineItemColumns.from_lines(lines)
+            lines_total = columns.amounts_total(lenient_amount)
 
-            header_subtotal = self._safe_decimal(header.get("subtotal_amount", lines_total))
-            tax_amount = self._safe_decimal(header.get("tax_amount", 0))
+            if parsed is None:
+                parsed = ParsedInvoice.from_extraction(header, lines, ENGINE_HEADER_FIELDS)
+            if ENGINE_HEADER_FIELDS.subtotal in header:
+                header_subtotal = parsed.subtotal or Decimal(0)
+            else:
+                header_subtotal = lines_total
+            tax_amount = parsed.tax or Decimal(0)
 
             expected_total = header_subtotal + tax_amount
-            header_total = self._safe_decimal(header.get("total_amount", 0))
+            header_total = parsed.total or Decimal(0)
 
             if header_total > 0:
                 difference = abs(header_total - expected_total)
@@ -760,8 +862,13 @@ class ValidationEngine:
                 message=f"Total amount validation error: {str(e)}"
             )
 
+    @rule_registry.register("vendor_validation", "header", "session", "snapshot", database=True)
     async def _validate_vendor(
-        self, rule: ValidationRule, header: Dict[str, Any], session: AsyncSession
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        session: AsyncSession,
+        snapshot: Optional[ValidationSnapshot] = None
     ) -> RuleExecutionResult:
         """Validate vendor exists and is active."""
         vendor_name = header.get("vendor_name")
@@ -776,9 +883,7 @@ class ValidationEngine:
 
         try:
             # Search for vendor
-            vendor_query = select(Vendor).where(Vendor.name.ilike(f"%{vendor_name}%"))
-            vendor_result = await session.execute(vendor_query)
-            vendor = vendor_result.scalar_one_or_none()
+            vendor = await self._find_vendor(vendor_name, session, snapshot)
 
             if not vendor:
                 return RuleExecutionResult(
@@ -795,14 +900,18 @@ class ValidationEngine:
                     passed=False,
                     reason_taxonomy=ReasonTaxonomy.INACTIVE_VENDOR,
                     message=f"Vendor '{vendor_name}' is inactive",
-                    details={"vendor_id": str(vendor.id), "status": vendor.status.value}
+                    details={
+                        "vendor_id": str(vendor.id),
+                        "vendor_currency": vendor.currency,
+                        "status": vendor.status.value
+                    }
                 )
 
             return RuleExecutionResult(
                 rule_name=rule.name,
                 passed=True,
                 message=f"Vendor validation passed: {vendor_name}",
-                details={"vendor_id": str(vendor.id)}
+                details={"vendor_id": str(vendor.id), "vendor_currency": vendor.currency}
             )
 
         except Exception as e:
@@ -813,12 +922,19 @@ class ValidationEngine:
                 message=f"Vendor validation error: {str(e)}"
             )
 
+    @rule_registry.register("currency_validation", "header", "session", "completed", "snapshot", database=True)
     async def _validate_currency(
-        self, rule: ValidationRule, header: Dict[str, Any], session: AsyncSession
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        session: AsyncSession,
+        completed: Optional[Dict[str, RuleExecutionResult]] = None,
+        snapshot: Optional[ValidationSnapshot] = None
     ) -> RuleExecutionResult:
-        """Validate currency matches vendor currency."""
+        """Validate currency matches vendor currency, reusing the vendor rule's lookup when available."""
         invoice_currency = header.get("currency", "USD")
         vendor_name = header.get("vendor_name")
+        vendor_result = (completed or {}).get("vendor_validation")
 
         if not vendor_name:
             return RuleExecutionResult(
@@ -828,24 +944,28 @@ class ValidationEngine:
             )
 
         try:
-            # Find vendor
-            vendor_query = select(Vendor).where(Vendor.name.ilike(f"%{vendor_name}%"))
-            vendor_result = await session.execute(vendor_query)
-            vendor = vendor_result.scalar_one_or_none()
-
-            if vendor and vendor.currency:
-                if invoice_currency != vendor.currency:
-                    return RuleExecutionResult(
-                        rule_name=rule.name,
-                        passed=False,
-                        reason_taxonomy=ReasonTaxonomy.INVALID_CURRENCY,
-                        message=f"Currency mismatch: invoice {invoice_currency}, vendor {vendor.currency}",
-                        details={
-                            "invoice_currency": invoice_currency,
-                            "vendor_currency": vendor.currency,
-                            "vendor_id": str(vendor.id)
-                        }
-                    )
+            if vendor_result and "vendor_id" in vendor_result.details:
+                found_vendor_id = vendor_result.details["vendor_id"]
+                vendor_currency = vendor_result.details.get("vendor_currency")
+            elif vendor_result and vendor_result.reason_taxonomy == ReasonTaxonomy.VENDOR_NOT_FOUND:
+                found_vendor_id = vendor_currency = None
+            else:
+                vendor = await self._find_vendor(vendor_name, session, snapshot)
+                found_vendor_id = str(vendor.id) if vendor else None
+                vendor_currency = vendor.currency if vendor else None
+
+            if vendor_currency and invoice_currency != vendor_currency:
+                return RuleExecutionResult(
+                    rule_name=rule.name,
+                    passed=False,
+                    reason_taxonomy=ReasonTaxonomy.INVALID_CURRENCY,
+                    message=f"Currency mismatch: invoice {invoice_currency}, vendor {vendor_currency}",
+                    details={
+                        "invoice_currency": invoice_currency,
+                        "vendor_currency": vendor_currency,
+                        "vendor_id": found_vendor_id
+                    }
+                )
 
             return RuleExecutionResult(
                 rule_name=rule.name,
@@ -861,8 +981,17 @@ class ValidationEngine:
                 message=f"Currency validation error: {str(e)}"
             )
 
+    @rule_registry.register(
+        "duplicate_detection", "header", "invoice_id", "session", "snapshot", "vendor_id", database=True
+    )
     async def _validate_duplicates(
-        self, rule: ValidationRule, header: Dict[str, Any], invoice_id: Optional[str], session: AsyncSession
+        self,
+        rule: ValidationRule,
+        header: Dict[str, Any],
+        invoice_id: Optional[str],
+        session: AsyncSession,
+        snapshot: Optional[ValidationSnapshot] = None,
+        vendor_id: Optional[str] = None
     ) -> RuleExecutionResult:
         """Detect duplicate invoices."""
         invoice_number = header.get("invoice_number")
@@ -877,43 +1006,35 @@ class ValidationEngine:
             )
 
         try:
-            # Search for potential duplicates
-            vendor_query = select(Vendor).where(Vendor.name.ilike(f"%{vendor_name}%"))
-            vendor_result = await session.execute(vendor_query)
-            vendor = vendor_result.scalar_one_or_none()
-
-            if vendor:
-                # Find invoices with same number and vendor
-                duplicate_query = select(Invoice, InvoiceExtraction).join(InvoiceExtraction).where(
-                    and_(
-                        Invoice.vendor_id == vendor.id,
-                        InvoiceExtraction.header_json['invoice_number'].astext == invoice_number,
-                        Invoice.id != invoice_id if invoice_id else True
-                    )
+            # Single index probe on the normalised (vendor, invoice number) fingerprint
+            if snapshot is not None:
+                duplicates = snapshot.find_duplicates(
+                    vendor_name, invoice_number, exclude_invoice_id=invoice_id, vendor_id=vendor_id
+                )
+            else:
+                duplicates = await invoice_fingerprint_service.find_duplicates(
+                    session, vendor_name, invoice_number, exclude_invoice_id=invoice_id, vendor_id=vendor_id
                 )
 
-                duplicate_result = await session.execute(duplicate_query)
-                duplicates = duplicate_result.all()
-
-                if duplicates:
-                    # Check amount match for higher confidence
-                    exact_matches = [
-                        dup for dup in duplicates
-                        if self._extract_header_amount(dup[1]) == total_amount
-                    ]
+            if duplicates:
+                # Check amount match for higher confidence
+                exact_matches = [
+                    dup for dup in duplicates
+                    if self._extract_header_amount(dup[1]) == total_amount
+                ]
 
-                    return RuleExecutionResult(
-                        rule_name=rule.name,
-                        passed=False,
-                        reason_taxonomy=ReasonTaxonomy.DUPLICATE_SUSPECT,
-                        message=f"Potential duplicate invoice found: {len(duplicates)} matches",
-                        details={
-                            "duplicate_count": len(duplicates),
-                            "exact_amount_matches": len(exact_matches),
-                            "invoice_number": invoice_number,
-                            "vendor_name": vendor_name
-                        }
-                    )
+                return RuleExecutionResult(
+                    rule_name=rule.name,
+                    passed=False,
+                    reason_taxonomy=ReasonTaxonomy.DUPLICATE_SUSPECT,
+                    message=f"Potential duplicate invoice found: {len(duplicates)} matches",
+                    details={
+                        "duplicate_count": len(duplicates),
+                        "exact_amount_matches": len(exact_matches),
+                        "invoice_number": invoice_number,
+                        "vendor_name": vendor_name
+                    }
+                )
 
             return RuleExecutionResult(
                 rule_name=rule.name,
@@ -930,6 +1051,16 @@ class ValidationEngine:
             )
 
     # Helper methods
+    async def _find_vendor(
+        self, vendor_name: str, session: Optional[AsyncSession], snapshot: Optional[ValidationSnapshot]
+    ) -> Optional[Vendor]:
+        """Vendor whose name contains ``vendor_name``, from the snapshot when one is given."""
+        if snapshot is not None:
+            return snapshot.find_vendor(vendor_name)
+        vendor_query = select(Vendor).where(Vendor.name.ilike(f"%{vendor_name}%"))
+        vendor_result = await session.execute(vendor_query)
+        return vendor_result.scalar_one_or_none()
+
     def _create_validation_issue(self, result: RuleExecutionResult) -> ValidationIssue:
         """Create ValidationIssue from RuleExecutionResult."""
         # Map reason taxonomy to validation code
@@ -968,53 +1099,6 @@ class ValidationEngine:
         }
         return field_mapping.get(field, field)
 
-    def _is_valid_date(self, date_value: Any) -> bool:
-        """Check if date value is valid."""
-        if isinstance(date_value, datetime):
-            return True
-
-        if isinstance(date_value, str):
-            date_patterns = [
-                r"^\d{4}-\d{2}-\d{2}$",
-                r"^\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4}$"
-            ]
-            return any(re.match(pattern, date_value.strip()) for pattern in date_patterns)
-
-        return False
-
-    def _is_valid_amount(self, amount_value: Any) -> bool:
-        """Check if amount value is valid."""
-        try:
-            if isinstance(amount_value, (int, float, Decimal)):
-                return float(amount_value) >= 0
-
-            if isinstance(amount_value, str):
-                cleaned = amount_value.replace("$", "").replace(",", "").strip()
-                amount = float(cleaned)
-                return amount >= 0
-        except (ValueError, TypeError):
-            pass
-
-        return False
-
-    def _safe_decimal(self, value: Any) -> Decimal:
-        """Safely convert value to Decimal."""
-        if value is None:
-            return Decimal("0")
-
-        try:
-            if isinstance(value, Decimal):
-                return value
-            elif isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, str):
-                cleaned = value.replace("$", "").replace(",", "").strip()
-                return Decimal(cleaned)
-        except (InvalidOperation, ValueError):
-            pass
-
-        return Decimal("0")
-
     def _calculate_validation_confidence(
         self, rule_results: List[RuleExecutionResult], extraction_confidence: Dict[str, Any]
     ) -> float:
@@ -1043,15 +1127,15 @@ class ValidationEngine:
             "currency": header.get("currency", "USD")
         }
 
-    def _create_lines_summary(self, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _create_lines_summary(
+        self, lines: List[Dict[str, Any]], columns: Optional[LineItemColumns] = None
+    ) -> Dict[str, Any]:
         """Create lines summary for validation result."""
         if not lines:
             return {"count": 0, "total_amount": 0.0}
 
-        total_amount = sum(
-            self._safe_decimal(line.get("total_amount") or line.get("amount", 0))
-            for line in lines
-        )
+        columns = columns if columns is not None else LineItemColumns.from_lines(lines)
+        total_amount = columns.amounts_total(lenient_amount)
 
         return {
             "count": len(lines),
@@ -1104,17 +1188,21 @@ class ValidationEngine:
         }
 
     def _create_math_result(
-        self, math_results: List[RuleExecutionResult], header: Dict[str, Any], lines: List[Dict[str, Any]]
+        self,
+        math_results: List[RuleExecutionResult],
+        header: Dict[str, Any],
+        lines: List[Dict[str, Any]],
+        columns: Optional[LineItemColumns] = None,
+        parsed: Optional[ParsedInvoice] = None
     ) -> Optional[MathValidationResult]:
         """Create math validation result."""
         if not math_results:
             return None
 
         # Calculate line total
-        lines_total = sum(
-            self._safe_decimal(line.get("total_amount") or line.get("amount", 0))
-            for line in lines
-        )
+        columns = columns if columns is not None else LineItemColumns.from_lines(lines)
+        parsed = parsed if parsed is not None else ParsedInvoice.from_extraction(header, lines, ENGINE_HEADER_FIELDS)
+        lines_total = columns.amounts_total(lenient_amount)
 
         # Find specific validation results
         subtotal_result = next((r for r in math_results if r.rule_name == "subtotal_validation"), None)
@@ -1126,12 +1214,15 @@ class ValidationEngine:
             subtotal_difference=float(subtotal_result.details.get("difference", 0)) if subtotal_result and not subtotal_result.passed else None,
             total_match=total_result.passed if total_result else None,
             total_difference=float(total_result.details.get("difference", 0)) if total_result and not total_result.passed else None,
-            tax_amount=float(self._safe_decimal(header.get("tax_amount", 0))),
+            tax_amount=float(parsed.tax or 0),
             line_item_validation=[]  # Would be populated by line math validation
         )
 
     def _create_matching_result(
-        self, business_results: List[RuleExecutionResult], invoice_id: Optional[str], session: AsyncSession
+        self,
+        business_results: List[RuleExecutionResult],
+        invoice_id: Optional[str],
+        session: Optional[AsyncSession] = None
     ) -> Optional[MatchingResult]:
         """Create matching validation result."""
         # Simplified matching result
@@ -1187,6 +1278,7 @@ class ValidationEngine:
         return None
 
     # Additional validation methods (simplified implementations)
+    @rule_registry.register("po_matching_validation", "header", "session", database=True)
     async def _validate_po_matching(self, rule: ValidationRule, header: Dict[str, Any], session: AsyncSession) -> RuleExecutionResult:
         """Validate PO matching."""
         # Simplified implementation
@@ -1203,6 +1295,7 @@ class ValidationEngine:
             message="No PO number provided"
         )
 
+    @rule_registry.register("grn_matching_validation", "header", "lines", "session", database=True)
     async def _validate_grn_matching(
         self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]], session: AsyncSession
     ) -> RuleExecutionResult:
@@ -1214,6 +1307,7 @@ class ValidationEngine:
             message="GRN validation passed"
         )
 
+    @rule_registry.register("invoice_age_validation", "header")
     async def _validate_invoice_age(self, rule: ValidationRule, header: Dict[str, Any]) -> RuleExecutionResult:
         """Validate invoice age."""
         max_age_days = rule.parameters.get("max_age_days", 365)
@@ -1235,6 +1329,7 @@ class ValidationEngine:
             message="Invoice age validation passed"
         )
 
+    @rule_registry.register("amount_limits_validation", "header", "lines")
     async def _validate_amount_limits(
         self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]]
     ) -> RuleExecutionResult:
@@ -1261,6 +1356,7 @@ class ValidationEngine:
             message="Amount limits validation passed"
         )
 
+    @rule_registry.register("tax_calculation_validation", "header", "lines")
     async def _validate_tax_calculation(
         self, rule: ValidationRule, header: Dict[str, Any], lines: List[Dict[str, Any]]
     ) -> RuleExecutionResult:
@@ -0,0 +1,234 @@
+"""
+Registry of validation rule handlers and compiled rule plans.
+
+Handlers register under a rule name with ``@rule_registry.register(...)``,
+naming the parts of the rule context they take. A rule set is compiled once
+into a ``RulePlan``: every rule resolved to its handler (unknown names fail
+at compile time), vendor overrides applied, and enabled rules ordered by
+their dependencies. Plans for the built-in rule sets are cached per rules
+version and vendor; ``custom_rules`` compile into the same form per call.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.core.exceptions import ValidationException
+from app.services.line_item_columns import LineItemColumns
+from app.services.parsed_invoice import ENGINE_HEADER_FIELDS, ParsedInvoice
+
+logger = logging.getLogger(__name__)
+
+# Context attributes a handler can ask for, in addition to the rule itself
+CONTEXT_ARGS = frozenset({
+    "header", "lines", "parsed", "line_columns", "confidence", "invoice_id", "vendor_id", "session", "snapshot",
+    "completed",
+})
+
+
+@dataclass
+class RuleContext:
+    """Everything a rule handler can read for one invoice."""
+    header: Dict[str, Any]
+    lines: List[Dict[str, Any]]
+    confidence: Dict[str, Any]
+    invoice_id: Optional[str] = None
+    vendor_id: Optional[str] = None
+    session: Any = None  # AsyncSession for database rules run per invoice
+    snapshot: Any = None  # ValidationSnapshot for batch validation
+    completed: Dict[str, Any] = field(default_factory=dict)  # results of rules already run
+
+    @cached_property
+    def parsed(self) -> ParsedInvoice:
+        """The header parsed once into typed fields, shared by the format and math rules."""
+        return ParsedInvoice.from_extraction(self.header, self.lines, ENGINE_HEADER_FIELDS)
+
+    @cached_property
+    def line_columns(self) -> LineItemColumns:
+        """The lines parsed once into fixed-point columns, shared by the math rules."""
+        return LineItemColumns.from_lines(self.lines)
+
+
+@dataclass(frozen=True)
+class RuleHandler:
+    """A registered rule handler: an engine method and the context it takes."""
+    name: str
+    method_name: str
+    args: Tuple[str, ...]
+    database: bool = False
+
+    def __call__(self, engine: Any, rule: Any, context: RuleContext) -> Awaitable[Any]:
+        """Call the handler on ``engine``, honouring subclass overrides and patched methods."""
+        method = getattr(engine, self.method_name)
+        return method(rule, *(getattr(context, arg) for arg in self.args))
+
+
+@dataclass
+class RulePlan:
+    """A rule set compiled for execution."""
+    rules_version: str
+    vendor_id: Optional[str]
+    rule_sets: Dict[str, List[Any]]  # rules by category, as configured, for reporting
+    steps: List[Tuple[Any, RuleHandler]]  # enabled rules in dependency order
+
+    @property
+    def rule_names(self) -> List[str]:
+        return [rule.name for rules in self.rule_sets.values() for rule in rules]
+
+
+class RuleRegistry:
+    """Maps rule names to handlers and caches compiled rule plans."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._handlers: Dict[str, RuleHandler] = {}
+        self._plans: Dict[Hashable, RulePlan] = {}
+        self._vendor_overrides: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, *args: str, database: bool = False) -> Callable:
+        """
+        Register the decorated engine method as the handler for rule ``name``.
+
+        ``args`` are the RuleContext attributes passed after the rule, in
+        order; ``database`` marks handlers that query through ``session``.
+        """
+        unknown = set(args) - CONTEXT_ARGS
+        if unknown:
+            raise ValueError(f"Unknown rule context argument(s) for {name}: {sorted(unknown)}")
+
+        def decorator(func: Callable) -> Callable:
+            if name in self._handlers and self._handlers[name].method_name != func.__name__:
+                raise ValueError(f"Validation rule {name} is already registered")
+            self._handlers[name] = RuleHandler(name, func.__name__, tuple(args), database)
+            return func
+
+        return decorator
+
+    def handler(self, name: str) -> Optional[RuleHandler]:
+        """The handler registered for a rule name."""
+        return self._handlers.get(name)
+
+    def list_rules(self) -> List[str]:
+        """Names of all registered rules."""
+        return sorted(self._handlers)
+
+    def compile(
+        self,
+        rule_sets: Dict[str, List[Any]],
+        rules_version: str,
+        vendor_id: Optional[str] = None,
+    ) -> RulePlan:
+        """Compile rule sets, applying the vendor's overrides; raises ValidationException for unknown rules or cycles."""
+        overrides = self._vendor_overrides.get(str(vendor_id), {}) if vendor_id is not None else {}
+        rule_sets = {
+            category: [self._apply_override(rule, overrides.get(rule.name)) for rule in rules]
+            for category, rules in rule_sets.items()
+        }
+        rules = [rule for category_rules in rule_sets.values() for rule in category_rules]
+
+        unknown = sorted({rule.name for rule in rules if rule.name not in self._handlers})
+        if unknown:
+            raise ValidationException(f"Unknown validation rule(s): {', '.join(unknown)}", details={"rules": unknown})
+
+        ordered = self._order_rules([rule for rule in rules if rule.enabled])
+        return RulePlan(
+            rules_version=rules_version,
+            vendor_id=vendor_id,
+            rule_sets=rule_sets,
+            steps=[(rule, self._handlers[rule.name]) for rule in ordered],
+        )
+
+    def plan_for(
+        self,
+        scope: Hashable,
+        rules_version: str,
+        build_rules: Callable[[], Dict[str, List[Any]]],
+        vendor_id: Optional[str] = None,
+    ) -> RulePlan:
+        """
+        Cached plan for a built-in rule set.
+
+        ``scope`` and ``rules_version`` identify the rule set ``build_rules``
+        returns; it is only called on a cache miss. Vendors without
+        overrides share the base plan.
+        """
+        if vendor_id is not None and str(vendor_id) not in self._vendor_overrides:
+            vendor_id = None
+        key = (scope, rules_version, str(vendor_id) if vendor_id is not None else None)
+
+        plan = self._plans.get(key)
+        if plan is None:
+            if vendor_id is None:
+                rule_sets = build_rules()
+            else:
+                rule_sets = self.plan_for(scope, rules_version, build_rules).rule_sets
+            plan = self.compile(rule_sets, rules_version, vendor_id)
+            with self._lock:
+                plan = self._plans.setdefault(key, plan)
+            logger.debug(f"Compiled validation rule plan {rules_version} for vendor {vendor_id or 'default'}")
+        return plan
+
+    def set_vendor_overrides(self, vendor_id: str, overrides: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Set per-vendor rule overrides, replacing any previous ones.
+
+        ``overrides`` maps rule names to ``enabled``, ``severity`` and/or
+        ``parameters`` (merged over the rule's own parameters).
+        """
+        unknown = sorted(set(overrides) - set(self._handlers))
+        if unknown:
+            raise ValidationException(f"Unknown validation rule(s): {', '.join(unknown)}", details={"rules": unknown})
+
+        with self._lock:
+            if overrides:
+                self._vendor_overrides[str(vendor_id)] = overrides
+            else:
+                self._vendor_overrides.pop(str(vendor_id), None)
+            self._plans = {key: plan for key, plan in self._plans.items() if key[2] != str(vendor_id)}
+
+    def clear_plans(self) -> None:
+        """Drop every cached plan, e.g. after rule definitions change."""
+        with self._lock:
+            self._plans.clear()
+
+    @staticmethod
+    def _apply_override(rule: Any, override: Optional[Dict[str, Any]]) -> Any:
+        """Copy of a rule with a vendor override applied."""
+        if not override:
+            return rule
+        changes = {key: override[key] for key in ("enabled", "severity") if key in override}
+        if "parameters" in override:
+            changes["parameters"] = {**rule.parameters, **override["parameters"]}
+        return replace(rule, **changes)
+
+    @staticmethod
+    def _order_rules(rules: List[Any]) -> List[Any]:
+        """Order rules so each follows the rules it depends on, keeping the listed order otherwise."""
+        names = {rule.name for rule in rules}
+        ordered: List[Any] = []
+        placed = set()
+        pending = list(rules)
+
+        while pending:
+            ready = [
+                rule for rule in pending
+                if all(name in placed or name not in names for name in rule.depends_on)
+            ]
+            if not ready:
+                raise ValidationException(
+                    "Validation rule dependencies form a cycle",
+                    details={"rules": [rule.name for rule in pending]}
+                )
+            for rule in ready:
+                ordered.append(rule)
+                placed.add(rule.name)
+            pending = [rule for rule in pending if rule.name not in placed]
+
+        return ordered
+
+
+# Singleton instance
+rule_registry = RuleRegistry()
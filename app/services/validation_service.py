@@ -6,6 +6,7 @@ import hashlib
 import logging
 import re
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -29,6 +30,9 @@ from app.core.exceptions import ValidationException
 from app.db.session import AsyncSessionLocal
 from app.models.invoice import Invoice, InvoiceExtraction, Exception as ExceptionModel
 from app.models.reference import Vendor, PurchaseOrder, GoodsReceiptNote
+from app.services.invoice_fingerprint_service import invoice_fingerprint_service
+from app.services.line_item_columns import LineItemColumns
+from app.services.parsed_invoice import ParsedInvoice, ParsedLine
 
 logger = logging.getLogger(__name__)
 
@@ -99,14 +103,17 @@ class ValidationService:
             async with AsyncSessionLocal() as session:
                 # Run comprehensive validation checks
                 structure_result = await self._validate_structure(header, lines, issues, config)
-                header_result = await self._validate_header(header, issues, config)
-                lines_result = await self._validate_lines(lines, issues, config)
+
+                # Parse once for every check below
+                invoice = ParsedInvoice.from_extraction(header, lines)
+                header_result = await self._validate_header(invoice, issues, config)
+                lines_result = await self._validate_lines(invoice, issues, config)
 
                 # Advanced validation modules
-                math_result = await self.math_validator.validate(header, lines, issues)
-                matching_result = await self.matching_validator.validate(header, lines, session, issues)
-                vendor_policy_result = await self.vendor_policy_validator.validate(header, vendor_id, session, issues)
-                duplicate_result = await self.duplicate_detector.check(header, invoice_id, session, issues)
+                math_result = await self.math_validator.validate(invoice, issues)
+                matching_result = await self.matching_validator.validate(invoice, session, issues)
+                vendor_policy_result = await self.vendor_policy_validator.validate(invoice, vendor_id, session, issues)
+                duplicate_result = await self.duplicate_detector.check(invoice, invoice_id, session, issues)
 
             # Classify issues by severity
             error_count = sum(1 for issue in issues if issue.severity == ValidationSeverity.ERROR)
@@ -153,8 +160,8 @@ class ValidationService:
                 rules_version=config.version,
                 validator_version="2.0.0",
                 processing_time_ms=str(int((datetime.utcnow() - start_time).total_seconds() * 1000)),
-                header_summary=self._create_header_summary(header),
-                lines_summary=self._create_lines_summary(lines)
+                header_summary=self._create_header_summary(invoice),
+                lines_summary=self._create_lines_summary(invoice)
             )
 
             logger.info(
@@ -249,7 +256,7 @@ class ValidationService:
         return structure_valid
 
     async def _validate_header(
-        self, header: Dict[str, Any], issues: List[ValidationIssue], config: ValidationRulesConfig
+        self, invoice: ParsedInvoice, issues: List[ValidationIssue], config: ValidationRulesConfig
     ) -> bool:
         """Validate header fields."""
         logger.debug("Validating header fields")
@@ -258,7 +265,7 @@ class ValidationService:
         required_fields = config.required_fields.get("header", [])
 
         for field in required_fields:
-            value = header.get(field)
+            value = invoice.header.get(field)
             if not value or (isinstance(value, str) and value.strip() == ""):
                 issues.append(ValidationIssue(
                     code=ValidationCode.MISSING_REQUIRED_FIELD,
@@ -269,16 +276,16 @@ class ValidationService:
                 header_valid = False
 
         # Validate specific field formats
-        await self._validate_header_formats(header, issues, config)
+        await self._validate_header_formats(invoice, issues, config)
 
         return header_valid
 
     async def _validate_header_formats(
-        self, header: Dict[str, Any], issues: List[ValidationIssue], config: ValidationRulesConfig
+        self, invoice: ParsedInvoice, issues: List[ValidationIssue], config: ValidationRulesConfig
     ) -> None:
         """Validate header field formats."""
         # Validate invoice number format
-        invoice_no = header.get("invoice_no")
+        invoice_no = invoice.invoice_number
         if invoice_no and not str(invoice_no).strip():
             issues.append(ValidationIssue(
                 code=ValidationCode.INVALID_FIELD_FORMAT,
@@ -288,23 +295,18 @@ class ValidationService:
             ))
 
         # Validate date format
-        invoice_date = header.get("invoice_date")
-        if invoice_date:
-            try:
-                parsed_date = self._parse_date(invoice_date)
-                if not parsed_date:
-                    raise ValueError("Invalid date")
-            except (ValueError, TypeError):
-                issues.append(ValidationIssue(
-                    code=ValidationCode.INVALID_FIELD_FORMAT,
-                    message=f"Invalid invoice date format: {invoice_date}",
-                    severity=ValidationSeverity.ERROR,
-                    field="invoice_date",
-                    actual_value=str(invoice_date)
-                ))
+        invoice_date = invoice.header.get("invoice_date")
+        if invoice_date and invoice.invoice_date is None:
+            issues.append(ValidationIssue(
+                code=ValidationCode.INVALID_FIELD_FORMAT,
+                message=f"Invalid invoice date format: {invoice_date}",
+                severity=ValidationSeverity.ERROR,
+                field="invoice_date",
+                actual_value=str(invoice_date)
+            ))
 
         # Validate currency
-        currency = header.get("currency", "USD")
+        currency = invoice.currency
         if not (currency and len(str(currency)) == 3 and str(currency).isalpha()):
             issues.append(ValidationIssue(
                 code=ValidationCode.INVALID_FIELD_FORMAT,
@@ -315,7 +317,7 @@ class ValidationService:
             ))
 
     async def _validate_lines(
-        self, lines: List[Dict[str, Any]], issues: List[ValidationIssue], config: ValidationRulesConfig
+        self, invoice: ParsedInvoice, issues: List[ValidationIssue], config: ValidationRulesConfig
     ) -> bool:
         """Validate line items."""
         logger.debug("Validating line items")
@@ -323,12 +325,12 @@ class ValidationService:
         lines_valid = True
         required_fields = config.required_fields.get("lines", [])
 
-        for i, line in enumerate(lines):
+        for i, line in enumerate(invoice.lines):
             line_valid = True
 
             # Check required fields
             for field in required_fields:
-                value = line.get(field)
+                value = line.raw.get(field)
                 if not value or (isinstance(value, str) and value.strip() == ""):
                     issues.append(ValidationIssue(
                         code=ValidationCode.MISSING_REQUIRED_FIELD,
@@ -348,96 +350,64 @@ class ValidationService:
         return lines_valid
 
     async def _validate_line_amounts(
-        self, line: Dict[str, Any], line_index: int, issues: List[ValidationIssue], config: ValidationRulesConfig
+        self, line: ParsedLine, line_index: int, issues: List[ValidationIssue], config: ValidationRulesConfig
     ) -> None:
         """Validate line item amounts."""
-        try:
-            amount = float(line.get("amount", 0))
-            quantity = float(line.get("quantity", 1))
-            unit_price = float(line.get("unit_price", amount))
-
-            # Check amount ranges
-            min_amount = config.thresholds.get("min_line_amount", 0.01)
-            max_amount = config.thresholds.get("max_line_amount", 100000)
-
-            if amount < min_amount:
-                issues.append(ValidationIssue(
-                    code=ValidationCode.INVALID_AMOUNT,
-                    message=f"Line {line_index+1}: Amount {amount} is below minimum {min_amount}",
-                    severity=ValidationSeverity.ERROR,
-                    field="amount",
-                    line_number=line_index+1,
-                    actual_value=str(amount),
-                    expected_value=f">= {min_amount}"
-                ))
+        invalid_field = line.invalid_field
+        if invalid_field:
+            issues.append(ValidationIssue(
+                code=ValidationCode.INVALID_AMOUNT,
+                message=f"Line {line_index+1}: Invalid amount format - {invalid_field} is not a number",
+                severity=ValidationSeverity.ERROR,
+                field="amount",
+                line_number=line_index+1,
+                actual_value=str(line.raw.get("amount", "undefined"))
+            ))
+            return
 
-            if amount > max_amount:
-                issues.append(ValidationIssue(
-                    code=ValidationCode.INVALID_AMOUNT,
-                    message=f"Line {line_index+1}: Amount {amount} is unusually high",
-                    severity=ValidationSeverity.WARNING,
-                    field="amount",
-                    line_number=line_index+1,
-                    actual_value=str(amount)
-                ))
+        amount = float(line.amount)
+        quantity = float(line.quantity)
+        unit_price = float(line.unit_price)
 
-            # Check quantity and unit price consistency
-            expected_amount = quantity * unit_price
-            tolerance = config.thresholds.get("math_tolerance_cents", 1) / 100
-            if abs(amount - expected_amount) > tolerance:
-                issues.append(ValidationIssue(
-                    code=ValidationCode.LINE_MATH_MISMATCH,
-                    message=f"Line {line_index+1}: Amount {amount} doesn't match quantity {quantity} × unit price {unit_price} = {expected_amount}",
-                    severity=ValidationSeverity.WARNING,
-                    field="amount",
-                    line_number=line_index+1,
-                    actual_value=str(amount),
-                    expected_value=str(expected_amount),
-                    details={"quantity": quantity, "unit_price": unit_price}
-                ))
+        # Check amount ranges
+        min_amount = config.thresholds.get("min_line_amount", 0.01)
+        max_amount = config.thresholds.get("max_line_amount", 100000)
 
-        except (ValueError, TypeError) as e:
+        if amount < min_amount:
             issues.append(ValidationIssue(
                 code=ValidationCode.INVALID_AMOUNT,
-                message=f"Line {line_index+1}: Invalid amount format - {str(e)}",
+                message=f"Line {line_index+1}: Amount {amount} is below minimum {min_amount}",
                 severity=ValidationSeverity.ERROR,
                 field="amount",
                 line_number=line_index+1,
-                actual_value=str(line.get("amount", "undefined"))
+                actual_value=str(amount),
+                expected_value=f">= {min_amount}"
             ))
 
-    def _parse_date(self, date_str: str) -> Optional[datetime]:
-        """Parse date string to datetime object."""
-        if not date_str:
-            return None
+        if amount > max_amount:
+            issues.append(ValidationIssue(
+                code=ValidationCode.INVALID_AMOUNT,
+                message=f"Line {line_index+1}: Amount {amount} is unusually high",
+                severity=ValidationSeverity.WARNING,
+                field="amount",
+                line_number=line_index+1,
+                actual_value=str(amount)
+            ))
 
-        date_formats = [
-            "%Y-%m-%d",
-            "%Y/%m/%d",
-            "%m-%d-%Y",
-            "%m/%d/%Y",
-            "%d-%m-%Y",
-            "%d/%m/%Y",
-            "%Y-%m-%d %H:%M:%S",
-        ]
-
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(str(date_str).strip(), fmt)
-            except ValueError:
-                continue
-
-        return None
-
-    def _is_valid_amount(self, amount: Any) -> bool:
-        """Check if amount is a valid numeric value."""
-        try:
-            if amount is None:
-                return False
-            float(amount)
-            return True
-        except (ValueError, TypeError):
-            return False
+        # Check quantity and unit price consistency
+        expected_amount = quantity * unit_price
+        tolerance = config.thresholds.get("math_tolerance_cents", 1) / 100
+        if abs(amount - expected_amount) > tolerance:
+            issues.append(ValidationIssue(
+                code=ValidationCode.LINE_MATH_MISMATCH,
+                message=f"Line {line_index+1}: Amount {amount} doesn't match quantity {quantity} × unit price {unit_price} = {expected_amount}",
+                severity=ValidationSeverity.WARNING,
+                field="amount",
+                line_number=line_index+1,
+                actual_value=str(amount),
+                expected_value=str(expected_amount),
+                details={"quantity": quantity, "unit_price": unit_price}
+            ))
 
     def _calculate_confidence_score(
         self,
@@ -491,8 +461,9 @@ class ValidationService:
 
         return round(score, 2)
 
-    def _create_header_summary(self, header: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_header_summary(self, invoice: ParsedInvoice) -> Dict[str, Any]:
         """Create a summary of header data for reporting."""
+        header = invoice.header
         return {
             "vendor_name": header.get("vendor_name"),
             "invoice_no": header.get("invoice_no"),
@@ -503,23 +474,18 @@ class ValidationService:
             "tax_amount": header.get("tax", 0)
         }
 
-    def _create_lines_summary(self, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _create_lines_summary(self, invoice: ParsedInvoice) -> Dict[str, Any]:
         """Create a summary of line items for reporting."""
+        lines = invoice.lines
         if not lines:
             return {"count": 0, "total": 0.0}
 
-        total_amount = sum(
-            float(line.get("amount", 0))
-            for line in lines
-            if self._is_valid_amount(line.get("amount"))
-        )
-
         return {
             "count": len(lines),
-            "total": total_amount,
-            "descriptions": [line.get("description", "")[:50] + "..."
-                           if len(line.get("description", "")) > 50
-                           else line.get("description", "")
+            "total": float(invoice.lines_total),
+            "descriptions": [line.description[:50] + "..."
+                           if len(line.description) > 50
+                           else line.description
                            for line in lines[:5]]
         }
 
@@ -531,21 +497,17 @@ class MathValidator:
         self.config = config
 
     async def validate(
-        self, header: Dict[str, Any], lines: List[Dict[str, Any]], issues: List[ValidationIssue]
+        self, invoice: ParsedInvoice, issues: List[ValidationIssue]
     ) -> Optional[MathValidationResult]:
         """Validate mathematical relationships in invoice."""
         logger.debug("Validating mathematical relationships")
 
         try:
             # Calculate line total
-            lines_total = sum(
-                float(line.get("amount", 0))
-                for line in lines
-                if self._is_valid_amount(line.get("amount"))
-            )
+            lines_total = float(invoice.lines_total)
 
             # Validate subtotal
-            subtotal = float(header.get("subtotal", 0)) if self._is_valid_amount(header.get("subtotal")) else None
+            subtotal = float(invoice.subtotal) if invoice.subtotal is not None else None
             subtotal_match = None
             subtotal_difference = None
 
@@ -573,10 +535,10 @@ class MathValidator:
                 ))
 
             # Validate total
-            total = float(header.get("total", 0)) if self._is_valid_amount(header.get("total")) else None
+            total = float(invoice.total) if invoice.total is not None else None
             total_match = None
             total_difference = None
-            tax_amount = float(header.get("tax", 0)) if self._is_valid_amount(header.get("tax")) else 0
+            tax_amount = float(invoice.tax) if invoice.tax is not None else 0
 
             if total is not None:
                 expected_total = (subtotal or lines_total) + tax_amount
@@ -607,12 +569,17 @@ class MathValidator:
                     field="total"
                 ))
 
-            # Validate individual line items
-            line_item_validation = []
-            for i, line in enumerate(lines):
-                line_validation = {"line_index": i, "valid": True}
-                await self._validate_line_math(line, i, issues, line_validation)
-                line_item_validation.append(line_validation)
+            # Validate individual line items; lines the fixed-point pass settles need no further work
+            lines = invoice.lines
+            line_item_validation = [{"line_index": i, "valid": True} for i in range(len(lines))]
+            columns = LineItemColumns(
+                [line.quantity for line in lines],
+                [line.unit_price for line in lines],
+                [line.amount for line in lines],
+            )
+            tolerance = Decimal(self.config.thresholds.get("math_tolerance_cents", 1)) / 100
+            for i in columns.line_math_candidates(tolerance).tolist():
+                await self._validate_line_math(lines[i], i, issues, line_item_validation[i])
 
             return MathValidationResult(
                 lines_total=lines_total,
@@ -634,48 +601,39 @@ class MathValidator:
             return None
 
     async def _validate_line_math(
-        self, line: Dict[str, Any], line_index: int, issues: List[ValidationIssue], line_validation: Dict[str, Any]
+        self, line: ParsedLine, line_index: int, issues: List[ValidationIssue], line_validation: Dict[str, Any]
     ) -> None:
         """Validate math for individual line item."""
-        try:
-            amount = float(line.get("amount", 0))
-            quantity = float(line.get("quantity", 1))
-            unit_price = float(line.get("unit_price", amount))
-
-            expected_amount = quantity * unit_price
-            tolerance = self.config.thresholds.get("math_tolerance_cents", 1) / 100
-
-            if abs(amount - expected_amount) > tolerance:
-                issues.append(ValidationIssue(
-                    code=ValidationCode.LINE_MATH_MISMATCH,
-                    message=f"Line {line_index+1}: Amount {amount} doesn't match quantity {quantity} × unit price {unit_price} = {expected_amount}",
-                    severity=ValidationSeverity.WARNING,
-                    field="amount",
-                    line_number=line_index+1,
-                    actual_value=str(amount),
-                    expected_value=str(expected_amount)
-                ))
-                line_validation["valid"] = False
-
-        except (ValueError, TypeError) as e:
+        invalid_field = line.invalid_field
+        if invalid_field:
             issues.append(ValidationIssue(
                 code=ValidationCode.INVALID_AMOUNT,
-                message=f"Line {line_index+1}: Invalid amount format - {str(e)}",
+                message=f"Line {line_index+1}: Invalid amount format - {invalid_field} is not a number",
                 severity=ValidationSeverity.ERROR,
                 field="amount",
                 line_number=line_index+1
             ))
             line_validation["valid"] = False
+            return
 
-    def _is_valid_amount(self, amount: Any) -> bool:
-        """Check if amount is a valid numeric value."""
-        try:
-            if amount is None:
-                return False
-            float(amount)
-            return True
-        except (ValueError, TypeError):
-            return False
+        amount = float(line.amount)
+        quantity = float(line.quantity)
+        unit_price = float(line.unit_price)
+
+        expected_amount = quantity * unit_price
+        tolerance = self.config.thresholds.get("math_tolerance_cents", 1) / 100
+
+        if abs(amount - expected_amount) > tolerance:
+            issues.append(ValidationIssue(
+                code=ValidationCode.LINE_MATH_MISMATCH,
+                message=f"Line {line_index+1}: Amount {amount} doesn't match quantity {quantity} × unit price {unit_price} = {expected_amount}",
+                severity=ValidationSeverity.WARNING,
+                field="amount",
+                line_number=line_index+1,
+                actual_value=str(amount),
+                expected_value=str(expected_amount)
+            ))
+            line_validation["valid"] = False
 
 
 class MatchingValidator:
@@ -686,8 +644,7 @@ class MatchingValidator:
 
     async def validate(
         self,
-        header: Dict[str, Any],
-        lines: List[Dict[str, Any]],
+        invoice: ParsedInvoice,
         session: AsyncSession,
         issues: List[ValidationIssue]
     ) -> Optional[MatchingResult]:
@@ -695,9 +652,9 @@ class MatchingValidator:
         logger.debug("Performing PO and GRN matching")
 
         try:
-            po_number = header.get("po_number")
-            vendor_name = header.get("vendor_name")
-            invoice_total = float(header.get("total", 0)) if self._is_valid_amount(header.get("total")) else 0
+            po_number = invoice.po_number
+            vendor_name = invoice.vendor_name
+            invoice_total = float(invoice.total) if invoice.total is not None else 0
 
             if not po_number:
                 logger.info("No PO number found, skipping matching validation")
@@ -779,9 +736,11 @@ class MatchingValidator:
                 tolerance_percent = self.config.thresholds.get("grn_quantity_tolerance_percent", 10.0)
                 quantity_issues = []
 
-                for line in lines:
-                    item_desc = line.get("description", "")
-                    invoice_qty = float(line.get("quantity", 0))
+                for line in invoice.lines:
+                    item_desc = line.description
+                    if "quantity" in line.invalid:
+                        raise ValueError(f"Invalid quantity: {line.raw['quantity']}")
+                    invoice_qty = float(line.quantity) if "quantity" in line.raw else 0.0
                     received_qty = total_received.get(item_desc, 0)
 
                     if received_qty > 0:
@@ -833,16 +792,6 @@ class MatchingValidator:
             ))
             return None
 
-    def _is_valid_amount(self, amount: Any) -> bool:
-        """Check if amount is a valid numeric value."""
-        try:
-            if amount is None:
-                return False
-            float(amount)
-            return True
-        except (ValueError, TypeError):
-            return False
-
 
 class VendorPolicyValidator:
     """Specialized validator for vendor-specific policies."""
@@ -852,7 +801,7 @@ class VendorPolicyValidator:
 
     async def validate(
         self,
-        header: Dict[str, Any],
+        invoice: ParsedInvoice,
         vendor_id: Optional[str],
         session: AsyncSession,
         issues: List[ValidationIssue]
@@ -861,10 +810,10 @@ class VendorPolicyValidator:
         logger.debug("Validating vendor policies")
 
         try:
-            vendor_name = header.get("vendor_name")
-            invoice_currency = header.get("currency", "USD")
-            invoice_total = float(header.get("total", 0)) if self._is_valid_amount(header.get("total")) else 0
-            tax_id = header.get("tax_id")
+            vendor_name = invoice.vendor_name
+            invoice_currency = invoice.currency
+            invoice_total = float(invoice.total) if invoice.total is not None else 0
+            tax_id = invoice.tax_id
 
             # Find vendor by name or ID
             vendor = None
@@ -990,16 +939,6 @@ class VendorPolicyValidator:
             ))
             return None
 
-    def _is_valid_amount(self, amount: Any) -> bool:
-        """Check if amount is a valid numeric value."""
-        try:
-            if amount is None:
-                return False
-            float(amount)
-            return True
-        except (ValueError, TypeError):
-            return False
-
 
 class DuplicateDetector:
     """Specialized service for detecting duplicate invoices."""
@@ -1009,7 +948,7 @@ class DuplicateDetector:
 
     async def check(
         self,
-        header: Dict[str, Any],
+        invoice: ParsedInvoice,
         invoice_id: Optional[str],
         session: AsyncSession,
         issues: List[ValidationIssue]
@@ -1018,10 +957,11 @@ class DuplicateDetector:
         logger.debug("Checking for duplicate invoices")
 
         try:
-            invoice_no = header.get("invoice_no")
-            vendor_name = header.get("vendor_name")
-            invoice_total = str(header.get("total", ""))
-            invoice_date = header.get("invoice_date")
+            invoice_no = invoice.invoice_number
+            vendor_name = invoice.vendor_name
+            # Compared as extracted against other invoices' stored headers
+            invoice_total = str(invoice.header.get("total", ""))
+            invoice_date = invoice.header.get("invoice_date")
 
             if not invoice_no or not vendor_name:
                 logger.info("Missing invoice number or vendor name, skipping duplicate check")
@@ -1030,48 +970,25 @@ class DuplicateDetector:
                     match_criteria={"reason": "insufficient_data"}
                 )
 
-            # Build similarity search criteria
-            search_conditions = []
-
-            # Exact invoice number + vendor match
-            vendor_query = select(Vendor).where(Vendor.name.ilike(f"%{vendor_name}%"))
-            vendor_result = await session.execute(vendor_query)
-            vendor = vendor_result.scalar_one_or_none()
-
-            if vendor:
-                search_conditions.append(
-                    and_(
-                        Invoice.vendor_id == vendor.id,
-                        InvoiceExtraction.header_json['invoice_no'].astext == invoice_no
-                    )
-                )
-
-            # Execute duplicate search
+            # Single index probe on the normalised (vendor, invoice number) fingerprint
             duplicate_invoices = []
             confidence = 0.0
 
-            if search_conditions:
-                duplicate_query = select(Invoice, InvoiceExtraction)\
-                    .join(InvoiceExtraction)\
-                    .where(or_(*search_conditions))
-
-                if invoice_id:
-                    duplicate_query = duplicate_query.where(Invoice.id != invoice_id)
-
-                duplicate_result = await session.execute(duplicate_query)
-                duplicates = duplicate_result.all()
-
-                for duplicate_invoice, duplicate_extraction in duplicates:
-                    duplicate_data = {
-                        "invoice_id": str(duplicate_invoice.id),
-                        "invoice_no": self._extract_header_value(duplicate_extraction.header_json, "invoice_no"),
-                        "vendor_name": vendor_name,
-                        "total": self._extract_header_value(duplicate_extraction.header_json, "total"),
-                        "invoice_date": self._extract_header_value(duplicate_extraction.header_json, "invoice_date"),
-                        "status": duplicate_invoice.status.value,
-                        "created_at": duplicate_invoice.created_at.isoformat()
-                    }
-                    duplicate_invoices.append(duplicate_data)
+            duplicates = await invoice_fingerprint_service.find_duplicates(
+                session, vendor_name, invoice_no, exclude_invoice_id=invoice_id
+            )
+
+            for duplicate_invoice, duplicate_extraction, _ in duplicates:
+                duplicate_data = {
+                    "invoice_id": str(duplicate_invoice.id),
+                    "invoice_no": self._extract_header_value(duplicate_extraction.header_json, "invoice_no"),
+                    "vendor_name": vendor_name,
+                    "total": self._extract_header_value(duplicate_extraction.header_json, "total"),
+                    "invoice_date": self._extract_header_value(duplicate_extraction.header_json, "invoice_date"),
+                    "status": duplicate_invoice.status.value,
+                    "created_at": duplicate_invoice.created_at.isoformat()
+                }
+                duplicate_invoices.append(duplicate_data)
 
             # Calculate duplicate confidence
             if duplicate_invoices:
@@ -0,0 +1,176 @@
+"""
+Prefetched reference data for validating a batch of invoices.
+
+Per-invoice validation looks up the vendor (twice, for the vendor and
+currency rules) and the duplicate fingerprints of every invoice. A snapshot
+loads both for a whole batch in a few set-based queries, so the rule set can
+run against memory with the same results.
+"""
+
+import logging
+import re
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple, Union
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.invoice import Invoice
+from app.models.reference import Vendor
+from app.services.invoice_fingerprint_service import invoice_fingerprint_service
+
+logger = logging.getLogger(__name__)
+
+
+def ilike_contains_pattern(value: str) -> Pattern:
+    """Regex equivalent of ``ILIKE '%value%'``, honouring LIKE wildcards and escapes in ``value``."""
+    parts = []
+    escaped = False
+    for char in value:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+class ValidationSnapshot:
+    """Vendors and duplicate fingerprints for one batch of extracted headers."""
+
+    def __init__(
+        self,
+        vendors: List[Vendor],
+        duplicates: Dict[Tuple[str, str], List[Tuple[Any, Any, Any]]],
+        vendor_duplicates: Optional[Dict[Tuple[Any, str], List[Tuple[Any, Any, Any]]]] = None,
+        invoice_vendors: Optional[Dict[str, Any]] = None,
+    ):
+        """Initialize from prefetched rows."""
+        self.vendors = vendors
+        self.duplicates = duplicates  # by (vendor key, invoice number key)
+        self.vendor_duplicates = vendor_duplicates or {}  # by (vendor id, invoice number key)
+        self.invoice_vendors = invoice_vendors or {}  # vendor id by invoice id
+        self._vendor_matches: Dict[str, List[Vendor]] = {}
+
+    @classmethod
+    async def load(
+        cls,
+        session: AsyncSession,
+        headers: Iterable[Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        invoice_ids: Optional[Iterable[Any]] = None,
+        vendor_ids: Optional[Iterable[Any]] = None,
+    ) -> "ValidationSnapshot":
+        """
+        Prefetch every vendor and fingerprint the headers can match, ``chunk_size`` lookups per query.
+
+        ``invoice_ids`` and ``vendor_ids`` run parallel to ``headers``; an
+        invoice without a vendor id falls back to its ``Invoice.vendor_id``,
+        as the single-invoice duplicate lookup does.
+        """
+        headers = [header or {} for header in headers]
+        invoice_ids = list(invoice_ids) if invoice_ids is not None else [None] * len(headers)
+        vendor_ids = list(vendor_ids) if vendor_ids is not None else [None] * len(headers)
+        chunk_size = chunk_size or settings.VALIDATION_BATCH_CHUNK_SIZE
+
+        vendor_names = sorted({header["vendor_name"] for header in headers if header.get("vendor_name")})
+        vendors: Dict[Any, Vendor] = {}
+        for start in range(0, len(vendor_names), chunk_size):
+            chunk = vendor_names[start:start + chunk_size]
+            result = await session.execute(
+                select(Vendor).where(or_(*(Vendor.name.ilike(f"%{name}%") for name in chunk)))
+            )
+            for vendor in result.scalars():
+                vendors[vendor.id] = vendor
+
+        invoice_vendors = {
+            str(invoice_id): vendor_id
+            for invoice_id, vendor_id in zip(invoice_ids, vendor_ids)
+            if invoice_id is not None and vendor_id is not None
+        }
+        unresolved = [
+            invoice_fingerprint_service.as_uuid(invoice_id)
+            for invoice_id, header in zip(invoice_ids, headers)
+            if invoice_id is not None and str(invoice_id) not in invoice_vendors and header.get("vendor_name")
+        ]
+        for start in range(0, len(unresolved), chunk_size):
+            result = await session.execute(
+                select(Invoice.id, Invoice.vendor_id).where(Invoice.id.in_(unresolved[start:start + chunk_size]))
+            )
+            invoice_vendors.update((str(invoice_id), vendor_id) for invoice_id, vendor_id in result.all())
+
+        duplicates = await invoice_fingerprint_service.find_duplicates_bulk(
+            session,
+            ((header.get("vendor_name"), header.get("invoice_number")) for header in headers),
+            chunk_size=chunk_size,
+        )
+        vendor_duplicates = await invoice_fingerprint_service.find_duplicates_by_vendor_bulk(
+            session,
+            (
+                (invoice_vendors.get(str(invoice_id)), header.get("invoice_number"))
+                for invoice_id, header in zip(invoice_ids, headers) if header.get("vendor_name")
+            ),
+            chunk_size=chunk_size,
+        )
+
+        logger.debug(
+            f"Loaded validation snapshot: {len(vendors)} vendor(s) for {len(vendor_names)} name(s), "
+            f"{len(duplicates)} fingerprint key(s), {len(vendor_duplicates)} vendor fingerprint key(s)"
+        )
+        return cls(list(vendors.values()), duplicates, vendor_duplicates, invoice_vendors)
+
+    def matching_vendors(self, vendor_name: str) -> List[Vendor]:
+        """Every vendor ``Vendor.name ILIKE '%vendor_name%'`` selects."""
+        matches = self._vendor_matches.get(vendor_name)
+        if matches is None:
+            pattern = ilike_contains_pattern(vendor_name)
+            matches = [vendor for vendor in self.vendors if pattern.search(vendor.name)]
+            self._vendor_matches[vendor_name] = matches
+        return matches
+
+    def find_vendor(self, vendor_name: str) -> Optional[Vendor]:
+        """The vendor ``Vendor.name ILIKE '%vendor_name%'`` selects; raises MultipleResultsFound like the query."""
+        matches = self.matching_vendors(vendor_name)
+        if len(matches) > 1:
+            raise MultipleResultsFound("Multiple rows were found when one or none was required")
+        return matches[0] if matches else None
+
+    def find_duplicates(
+        self,
+        vendor_name: Optional[str],
+        invoice_number: Optional[str],
+        exclude_invoice_id: Optional[Union[str, uuid.UUID]] = None,
+        vendor_id: Optional[Union[str, uuid.UUID]] = None,
+    ) -> List[Tuple[Any, Any, Any]]:
+        """Prefetched fingerprint matches, as ``InvoiceFingerprintService.find_duplicates`` returns them."""
+        vendor_key, invoice_number_key = invoice_fingerprint_service.lookup_key(vendor_name, invoice_number)
+        if not vendor_key or not invoice_number_key:
+            return []
+
+        if vendor_id is None and exclude_invoice_id is not None:
+            vendor_id = self.invoice_vendors.get(str(exclude_invoice_id))
+        rows = list(self.duplicates.get((vendor_key, invoice_number_key), []))
+        if vendor_id:
+            rows.extend(self.vendor_duplicates.get(
+                invoice_fingerprint_service.vendor_lookup_key(vendor_id, invoice_number), []
+            ))
+
+        # A fingerprint can match on both its name and its vendor record
+        matches, seen = [], set()
+        for row in rows:
+            fingerprint = row[2]
+            if fingerprint.id in seen or invoice_fingerprint_service.same_invoice(
+                fingerprint.invoice_id, exclude_invoice_id
+            ):
+                continue
+            seen.add(fingerprint.id)
+            matches.append(row)
+        return matches
@@ -2,6 +2,7 @@
 Celery application configuration for background task processing.
 """
 
+import asyncio
 import logging
 import os
 
@@ -49,6 +50,7 @@ celery_app.conf.update(
     task_routes={
         "app.workers.invoice_tasks.process_invoice_task": {"queue": "invoice_processing"},
         "app.workers.invoice_tasks.validate_invoice_task": {"queue": "validation"},
+        "app.workers.invoice_tasks.revalidate_invoices_task": {"queue": "validation"},
         "app.workers.invoice_tasks.export_invoice_task": {"queue": "export"},
         "app.workers.email_tasks.process_email_task": {"queue": "email_processing"},
         "app.workers.dlq_handlers.*": {"queue": "dlq_processing"},
@@ -135,12 +137,35 @@ if not os.environ.get("FORKED_BY_MULTIPROCESSING"):
     celery_logger.setLevel(logging.INFO)
 
 # Configure signals for task monitoring
-from celery.signals import task_prerun, task_postrun, task_failure, task_success
+from celery.signals import (
+    task_prerun,
+    task_postrun,
+    task_failure,
+    task_success,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
 # Import DLQ error handlers to register signals
 from app.workers.dlq_handlers import error_handler
 
 
+def _flush_storage_buffers(when: str) -> None:
+    """Write storage access times and audit rows still buffered by this process."""
+    from app.services.storage_metadata import storage_audit_flusher, storage_usage_accumulator
+    if storage_usage_accumulator.pending:
+        try:
+            asyncio.run(storage_usage_accumulator.flush())
+        except Exception as e:
+            logger.error(f"Failed to flush storage usage {when}: {e}")
+    if storage_audit_flusher.pending:
+        # Failed writes are spilled to disk and replayed by the next process
+        try:
+            asyncio.run(storage_audit_flusher.flush())
+        except Exception as e:
+            logger.error(f"Failed to flush storage audit rows {when}: {e}")
+
+
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, **kwds):
     """Handle task pre-run signal."""
@@ -151,6 +176,8 @@ def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=
 def task_postrun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, retval=None, state=None, **kwds):
     """Handle task post-run signal."""
     logger.info(f"Task {sender.name} completed (ID: {task_id}, state: {state})")
+    # The periodic flush tasks died with the task's event loop
+    _flush_storage_buffers("after task")
 
 
 @task_failure.connect
@@ -165,5 +192,33 @@ def task_success_handler(sender=None, result=None, **kwargs):
     logger.info(f"Task {sender.name} succeeded")
 
 
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Load Docling models once per worker process so tasks start warm."""
+    if not settings.DOCLING_WARMUP_ON_WORKER_INIT:
+        return
+
+    try:
+        from app.services.docling_converter_pool import docling_converter_pool
+        docling_converter_pool.warm_up()
+    except Exception as e:
+        # Tasks will warm the pool lazily on first use
+        logger.error(f"Failed to warm Docling converter pool: {e}")
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**kwargs):
+    """Release Docling converters and conversion processes on worker exit."""
+    try:
+        from app.services.docling_converter_pool import docling_converter_pool
+        from app.services.docling_executor import docling_process_executor
+        docling_process_executor.shutdown(wait=False)
+        docling_converter_pool.shutdown()
+    except Exception as e:
+        logger.warning(f"Failed to shut down Docling converter pool: {e}")
+
+    _flush_storage_buffers("on worker exit")
+
+
 if __name__ == "__main__":
     celery_app.start()
\ No newline at end of file
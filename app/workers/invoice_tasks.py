@@ -11,6 +11,7 @@ from typing import Any, Dict, Optional
 from celery import Task
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.invoice import Invoice, InvoiceExtraction, Validation, InvoiceStatus
 from app.services.storage_service import StorageService
@@ -212,6 +213,119 @@ def validate_invoice_task(self, invoice_id: str, extraction_result: Dict[str, An
             raise exc
 
 
+@celery_app.task(bind=True, base=DatabaseTask, max_retries=2, default_retry_delay=60)
+def revalidate_invoices_task(
+    self,
+    start_date: str,
+    end_date: str,
+    chunk_size: Optional[int] = None,
+    after_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Re-validate invoices created in [start_date, end_date) with the current rules.
+
+    Each run validates one chunk of invoices, ordered by id after ``after_id``,
+    with ``ValidationEngine.validate_batch`` and records a Validation row for
+    each, then queues the next chunk. Invoice status is left unchanged.
+    """
+    chunk_size = chunk_size or settings.VALIDATION_BATCH_CHUNK_SIZE
+    logger.info(
+        f"Re-validating invoices created {start_date} to {end_date} after {after_id or 'start'} "
+        f"(task: {self.request.id})"
+    )
+
+    try:
+        from app.services.validation_engine import ValidationEngine
+
+        db = self.get_db()
+
+        query = db.query(Invoice.id, Invoice.vendor_id).filter(
+            Invoice.created_at >= datetime.fromisoformat(start_date),
+            Invoice.created_at < datetime.fromisoformat(end_date),
+        )
+        if after_id:
+            query = query.filter(Invoice.id > uuid.UUID(after_id))
+        vendor_ids = {row.id: row.vendor_id for row in query.order_by(Invoice.id).limit(chunk_size).all()}
+        invoice_ids = list(vendor_ids)
+
+        if not invoice_ids:
+            logger.info(f"Re-validation of invoices created {start_date} to {end_date} complete")
+            return {"validated": 0, "passed": 0, "failed": 0, "next_after_id": None}
+
+        # Latest extraction per invoice
+        extractions = (
+            db.query(InvoiceExtraction)
+            .filter(InvoiceExtraction.invoice_id.in_(invoice_ids))
+            .order_by(InvoiceExtraction.invoice_id, InvoiceExtraction.created_at.desc())
+            .distinct(InvoiceExtraction.invoice_id)
+            .all()
+        )
+
+        batch = {
+            str(extraction.invoice_id): {
+                "header": extraction.header_json,
+                "lines": extraction.lines_json,
+                "confidence": extraction.confidence_json,
+                "vendor_id": str(vendor_ids[extraction.invoice_id]) if vendor_ids[extraction.invoice_id] else None,
+            }
+            for extraction in extractions
+        }
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            results = loop.run_until_complete(ValidationEngine().validate_batch(batch))
+        finally:
+            loop.close()
+
+        db.add_all([
+            Validation(
+                invoice_id=uuid.UUID(invoice_id),
+                passed=result.passed,
+                checks_json=result.model_dump(mode="json", include={"check_results", "issues", "confidence_score"}),
+                rules_version=result.rules_version,
+                validator_version=result.validator_version,
+                processing_time_ms=result.processing_time_ms,
+            )
+            for invoice_id, result in results.items()
+        ])
+        db.commit()
+
+    except Exception as exc:
+        logger.error(f"Failed to re-validate invoices after {after_id or 'start'}: {exc}")
+        if self.db:
+            self.db.rollback()
+
+        # Retry task if possible; nothing from this chunk was committed
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=60 * (2 ** self.request.retries))
+        else:
+            raise exc
+
+    # Queue the next chunk only after this one is committed, so it is never validated twice
+    next_after_id = str(invoice_ids[-1])
+    revalidate_invoices_task.apply_async(
+        kwargs={
+            "start_date": start_date,
+            "end_date": end_date,
+            "chunk_size": chunk_size,
+            "after_id": next_after_id,
+        }
+    )
+
+    passed_count = sum(1 for result in results.values() if result.passed)
+    logger.info(
+        f"Re-validated {len(results)} invoices ({passed_count} passed), "
+        f"continuing after {next_after_id}"
+    )
+    return {
+        "validated": len(results),
+        "passed": passed_count,
+        "failed": len(results) - passed_count,
+        "next_after_id": next_after_id,
+    }
+
+
 @celery_app.task(bind=True, base=DatabaseTask, max_retries=2, default_retry_delay=30)
 def export_invoice_task(
     self, invoice_id: str, export_format: str = "json", destination: str = "default"
@@ -397,6 +397,7 @@ def monitor_worker_performance() -> Dict[str, Any]:
                 )
             },
             "queues": queue_sizes,
+            "docling_pool": _get_docling_pool_stats(),
             "system": {
                 "uptime": "unknown",  # Would get actual uptime
                 "memory_usage": "unknown",  # Would get actual memory usage
@@ -416,6 +417,15 @@ def monitor_worker_performance() -> Dict[str, Any]:
         }
 
 
+def _get_docling_pool_stats() -> Dict[str, Any]:
+    """Get Docling converter pool stats for the current worker process."""
+    try:
+        from app.services.docling_converter_pool import docling_converter_pool
+        return docling_converter_pool.get_stats()
+    except Exception as e:
+        return {"error": str(e)}
+
+
 @celery_app.task(soft_time_limit=120)  # 2 minutes
 def cleanup_temp_files(hours_to_keep: int = 24) -> Dict[str, Any]:
     """
@@ -541,7 +541,7 @@ class InvoiceProcessor:
 
             # Extract data using Docling
             extraction_result = await self.docling_service.extract_from_content(
-                file_content, file_path=file_path
+                file_content, file_path=file_path, file_hash=state.get("file_hash")
             )
 
             # Validate extraction result structure
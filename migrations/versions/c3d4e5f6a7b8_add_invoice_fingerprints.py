@@ -0,0 +1,81 @@
+"""Add invoice_fingerprints table for indexed duplicate detection
+
+Revision ID: c3d4e5f6a7b8
+Revises: 20251110_175340
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = '20251110_175340'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create invoice_fingerprints and backfill it from the latest extraction per invoice."""
+    op.create_table('invoice_fingerprints',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('invoice_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('extraction_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('vendor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('vendor_key', sa.String(length=255), nullable=True),
+        sa.Column('invoice_number_key', sa.String(length=100), nullable=True),
+        sa.Column('total_amount', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('invoice_date', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['extraction_id'], ['invoice_extractions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('invoice_id')
+    )
+
+    op.create_index('idx_fingerprint_vendor_key_number', 'invoice_fingerprints', ['vendor_key', 'invoice_number_key'], unique=False)
+    op.create_index('idx_fingerprint_vendor_id_number', 'invoice_fingerprints', ['vendor_id', 'invoice_number_key'], unique=False)
+
+    # Backfill; normalisation mirrors normalize_vendor_key / normalize_invoice_number_key,
+    # and amounts follow _fingerprint_amount: "$" and "," dropped, signed plain decimals only
+    op.execute("""
+        INSERT INTO invoice_fingerprints
+            (id, invoice_id, extraction_id, vendor_id, vendor_key, invoice_number_key, total_amount, invoice_date)
+        SELECT
+            gen_random_uuid(),
+            latest.invoice_id,
+            latest.id,
+            latest.vendor_id,
+            NULLIF(LEFT(BTRIM(REGEXP_REPLACE(LOWER(latest.vendor_name), '[^a-z0-9]+', ' ', 'g')), 255), ''),
+            NULLIF(LEFT(REGEXP_REPLACE(UPPER(latest.invoice_number), '[^A-Z0-9]', '', 'g'), 100), ''),
+            CASE WHEN latest.total ~ '^[+-]?([0-9]+(\\.[0-9]*)?|\\.[0-9]+)$' THEN
+                CASE WHEN ABS(ROUND(latest.total::numeric, 2)) < 10000000000000 THEN ROUND(latest.total::numeric, 2) END
+            END,
+            CASE WHEN latest.invoice_date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN LEFT(latest.invoice_date, 10)::date END
+        FROM (
+            SELECT DISTINCT ON (e.invoice_id)
+                e.id,
+                e.invoice_id,
+                i.vendor_id,
+                e.header_json->>'vendor_name' AS vendor_name,
+                COALESCE(NULLIF(e.header_json->>'invoice_number', ''), e.header_json->>'invoice_no') AS invoice_number,
+                BTRIM(REPLACE(REPLACE(
+                    COALESCE(e.header_json->>'total_amount', e.header_json->>'total'), ',', ''), '$', '')
+                ) AS total,
+                e.header_json->>'invoice_date' AS invoice_date
+            FROM invoice_extractions e
+            JOIN invoices i ON i.id = e.invoice_id
+            ORDER BY e.invoice_id, e.created_at DESC
+        ) AS latest
+    """)
+
+
+def downgrade():
+    """Drop invoice_fingerprints."""
+    op.drop_index('idx_fingerprint_vendor_id_number', table_name='invoice_fingerprints')
+    op.drop_index('idx_fingerprint_vendor_key_number', table_name='invoice_fingerprints')
+    op.drop_table('invoice_fingerprints')
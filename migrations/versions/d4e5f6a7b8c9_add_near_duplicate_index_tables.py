@@ -0,0 +1,50 @@
+"""Add MinHash/LSH near-duplicate index tables
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create document_minhashes and document_lsh_buckets."""
+    op.create_table('document_minhashes',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('ingestion_job_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.Column('num_perm', sa.SmallInteger(), nullable=False),
+        sa.Column('shingle_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['ingestion_job_id'], ['ingestion_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('ingestion_job_id')
+    )
+
+    # Primary key (band, bucket, job) is the candidate-lookup index
+    op.create_table('document_lsh_buckets',
+        sa.Column('band', sa.SmallInteger(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('ingestion_job_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(['ingestion_job_id'], ['ingestion_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('band', 'bucket', 'ingestion_job_id')
+    )
+    op.create_index('idx_lsh_bucket_job', 'document_lsh_buckets', ['ingestion_job_id'], unique=False)
+
+
+def downgrade():
+    """Drop the near-duplicate index tables."""
+    op.drop_index('idx_lsh_bucket_job', table_name='document_lsh_buckets')
+    op.drop_table('document_lsh_buckets')
+    op.drop_table('document_minhashes')
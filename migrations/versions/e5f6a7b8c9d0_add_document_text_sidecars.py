@@ -0,0 +1,39 @@
+"""Add document_text_sidecars table for stored document text
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create document_text_sidecars."""
+    op.create_table('document_text_sidecars',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('ingestion_job_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('text_compressed', sa.LargeBinary(), nullable=False),
+        sa.Column('text_length', sa.Integer(), nullable=False),
+        sa.Column('shingle_hashes', sa.LargeBinary(), nullable=False),
+        sa.Column('extraction_method', sa.String(length=50), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['ingestion_job_id'], ['ingestion_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id'),
+        sa.UniqueConstraint('ingestion_job_id')
+    )
+
+
+def downgrade():
+    """Drop document_text_sidecars."""
+    op.drop_table('document_text_sidecars')
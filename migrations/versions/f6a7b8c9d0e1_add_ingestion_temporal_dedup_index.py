@@ -0,0 +1,29 @@
+"""Add composite index for SQL temporal deduplication
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create idx_ingestion_temporal_dedup."""
+    op.create_index(
+        'idx_ingestion_temporal_dedup',
+        'ingestion_jobs',
+        ['created_at', 'vendor_id', 'file_extension', 'file_size_bytes'],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Drop idx_ingestion_temporal_dedup."""
+    op.drop_index('idx_ingestion_temporal_dedup', table_name='ingestion_jobs')
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Collapse legacy local storage trees into the content-addressed layout.
+
+The legacy layout keeps each object at an organized path (by vendor, date or
+type) plus a full uncompressed copy under ``originals/``. This tool moves
+every deduplicated object to its canonical ``objects/`` path, leaves a
+relative symlink at the old path so stored references keep resolving,
+repoints ``file_deduplication`` and ``file_access_control`` rows, and removes
+the ``originals/`` copy once a backup exists under ``STORAGE_BACKUP_PATH``.
+``--backup-mode none`` writes no backups, so it requires ``--keep-originals``.
+
+Runs as a dry run unless ``--apply`` is given. Safe to re-run.
+
+Usage:
+    python scripts/collapse_storage_layout.py
+    python scripts/collapse_storage_layout.py --apply --backup-mode link
+    python scripts/collapse_storage_layout.py --apply --replicate
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.storage_audit import FileAccessControl, FileDeduplication
+from app.services.local_storage_service import content_addressed_path
+from app.services.storage_replication import StorageReplicator, link_object
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMPRESSED_PREFIX = "compressed/"
+
+
+class StorageLayoutCollapser:
+    """Moves legacy objects to canonical paths and drops their originals/ copies."""
+
+    def __init__(self, apply: bool, backup_mode: str, keep_originals: bool, batch_size: int = 200):
+        if backup_mode == "none" and not keep_originals:
+            raise ValueError("--backup-mode none writes no backups; add --keep-originals to leave originals/ in place")
+        self.apply = apply
+        self.backup_mode = backup_mode
+        self.keep_originals = keep_originals
+        self.batch_size = batch_size
+        self.storage_path = Path(settings.STORAGE_PATH)
+        self.replicator = StorageReplicator()
+        self.stats: Dict[str, int] = {
+            "records": 0,
+            "moved": 0,
+            "merged": 0,
+            "missing": 0,
+            "originals_removed": 0,
+            "originals_kept": 0,
+            "bytes_reclaimed": 0,
+        }
+
+    @staticmethod
+    def canonical_path(record: FileDeduplication) -> str:
+        """Canonical stored path for a record, keeping its compression prefix."""
+        prefix = COMPRESSED_PREFIX if record.stored_path.startswith(COMPRESSED_PREFIX) else ""
+        return prefix + content_addressed_path(record.file_hash, Path(record.stored_path).suffix.lower() or ".bin")
+
+    def run(self) -> Dict[str, int]:
+        """Collapse every deduplication record."""
+        db = SessionLocal()
+        try:
+            records = db.execute(select(FileDeduplication).order_by(FileDeduplication.id)).scalars().all()
+            for index, record in enumerate(records, start=1):
+                self.stats["records"] += 1
+                self.collapse(db, record)
+                if self.apply and index % self.batch_size == 0:
+                    db.commit()
+            if self.apply:
+                db.commit()
+        finally:
+            db.close()
+        return self.stats
+
+    def collapse(self, db, record: FileDeduplication) -> None:
+        """Move one object to its canonical path and back it up."""
+        old_path = record.stored_path
+        new_path = self.canonical_path(record)
+        source = self.storage_path / old_path
+        target = self.storage_path / new_path
+
+        if old_path != new_path:
+            if not source.exists() and not target.exists():
+                logger.warning(f"Object for {record.file_hash} missing at {old_path}")
+                self.stats["missing"] += 1
+                return
+
+            if self.apply:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.exists():
+                    # Already collapsed by an earlier run or a newer upload
+                    if source.exists() and not source.is_symlink():
+                        self.stats["bytes_reclaimed"] += source.stat().st_size
+                        source.unlink()
+                    self.stats["merged"] += 1
+                else:
+                    os.replace(source.resolve(), target)
+                    if source.is_symlink():
+                        source.unlink()
+                    self.stats["moved"] += 1
+
+                # Old references (ingestion_jobs.storage_path, invoice file URLs) keep resolving
+                if not source.exists():
+                    source.parent.mkdir(parents=True, exist_ok=True)
+                    source.symlink_to(os.path.relpath(target, source.parent))
+
+                record.stored_path = new_path
+                db.execute(
+                    update(FileAccessControl)
+                    .where(FileAccessControl.file_path == old_path)
+                    .values(file_path=new_path)
+                )
+            else:
+                self.stats["moved"] += 1
+                logger.info(f"Would move {old_path} -> {new_path}")
+
+        self.backup(new_path)
+        self.remove_original(old_path, new_path)
+
+    def backup(self, stored_path: str) -> None:
+        """Make sure the canonical object has a backup before its originals/ copy goes."""
+        if not self.apply or self.backup_mode == "none":
+            return
+        source = self.storage_path / stored_path
+        if not source.exists():
+            return
+        if self.backup_mode == "link":
+            try:
+                link_object(source, self.replicator.backup_root / stored_path)
+                return
+            except OSError as e:
+                logger.debug(f"Could not link {stored_path}, copying instead: {e}")
+        self.replicator.replicate(stored_path)
+
+    def replicate_missing(self) -> int:
+        """Copy canonical objects that are missing from the backup root; returns bytes copied."""
+        copied = 0
+        for objects_dir in (self.storage_path / "objects", self.storage_path / COMPRESSED_PREFIX / "objects"):
+            for path in sorted(objects_dir.rglob("*")):
+                if path.is_file() and not path.is_symlink():
+                    relative = str(path.relative_to(self.storage_path))
+                    if self.apply:
+                        copied += self.replicator.replicate(relative)
+                    else:
+                        logger.info(f"Would replicate {relative}")
+        return copied
+
+    def remove_original(self, stored_path: str, canonical_path: str) -> None:
+        """Remove the legacy uncompressed originals/ copy of an object whose canonical copy is backed up."""
+        if self.keep_originals:
+            return
+        relative = stored_path[len(COMPRESSED_PREFIX):] if stored_path.startswith(COMPRESSED_PREFIX) else stored_path
+        original = self.storage_path / "originals" / relative
+        if not original.is_file():
+            return
+        size = original.stat().st_size
+        if self.apply:
+            if not (self.replicator.backup_root / canonical_path).is_file():
+                logger.warning(f"No backup of {canonical_path}, keeping originals/{relative}")
+                self.stats["originals_kept"] += 1
+                return
+            original.unlink()
+        else:
+            logger.info(f"Would remove originals/{relative}")
+        self.stats["originals_removed"] += 1
+        self.stats["bytes_reclaimed"] += size
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Collapse local storage into the content-addressed layout")
+    parser.add_argument("--apply", action="store_true", help="Make changes (default is a dry run)")
+    parser.add_argument(
+        "--backup-mode",
+        choices=["link", "replicate", "none"],
+        default=settings.STORAGE_BACKUP_MODE,
+        help="How canonical objects are backed up before originals/ copies are removed",
+    )
+    parser.add_argument("--keep-originals", action="store_true", help="Leave originals/ copies in place")
+    parser.add_argument(
+        "--replicate",
+        action="store_true",
+        help="Only copy canonical objects missing from the backup root (re-sync after dropped replication)",
+    )
+    args = parser.parse_args()
+
+    try:
+        collapser = StorageLayoutCollapser(
+            apply=args.apply,
+            backup_mode="replicate" if args.replicate else args.backup_mode,
+            keep_originals=args.keep_originals or args.replicate,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.replicate:
+        copied = collapser.replicate_missing()
+        logger.info(f"Replicated {copied} bytes to {collapser.replicator.backup_root}")
+        return
+
+    stats = collapser.run()
+    mode = "Applied" if args.apply else "Dry run"
+    logger.info(
+        f"{mode}: {stats['records']} records, {stats['moved']} moved, {stats['merged']} merged, "
+        f"{stats['missing']} missing, {stats['originals_removed']} originals removed, "
+        f"{stats['originals_kept']} kept without a backup, "
+        f"{stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Recompress stored objects to another codec in the background.
+
+Each object is decoded, re-encoded into a new self-describing frame and
+swapped in with an atomic rename, so the API keeps serving reads throughout.
+Objects that would not get smaller are left alone.
+
+Usage:
+    # Train a zstd dictionary from stored PDFs, then set STORAGE_ZSTD_DICTIONARY_ID
+    python scripts/recompress_storage.py --train-dictionary --samples 2000
+
+    # Move the store to zstd at 10 MB/s
+    python scripts/recompress_storage.py --codec zstd --max-bytes-per-second 10485760
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import or_, select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.storage_audit import FileDeduplication
+from app.services.local_storage_service import LocalStorageService
+from app.services.storage_codec import CODEC_IDS, storage_codecs
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def train_dictionary(storage: LocalStorageService, samples: int, dict_size: int) -> int:
+    """Train a zstd dictionary from a sample of stored PDFs."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(FileDeduplication.stored_path)
+            .where(FileDeduplication.content_type == "application/pdf")
+            .order_by(FileDeduplication.last_accessed.desc())
+            .limit(samples)
+        )
+        paths = result.scalars().all()
+
+    documents = []
+    for stored_path in paths:
+        full_path = storage.storage_path / stored_path
+        if not full_path.is_file():
+            continue
+        content = full_path.read_bytes()
+        if storage_codecs.codec_of(content) is not None:
+            content = storage_codecs.decode(content)
+        documents.append(content)
+
+    if not documents:
+        raise SystemExit("No stored PDFs found to train on")
+    return storage_codecs.train_dictionary(documents, dict_size=dict_size)
+
+
+async def recompress(storage: LocalStorageService, codec: str, max_bytes_per_second: int, limit: int) -> None:
+    """Recompress compressed objects not yet using the target codec."""
+    async with AsyncSessionLocal() as session:
+        query = (
+            select(FileDeduplication.file_hash, FileDeduplication.stored_path)
+            .where(
+                FileDeduplication.is_compressed.is_(True),
+                or_(FileDeduplication.compression_type.is_(None), FileDeduplication.compression_type != codec),
+            )
+            .order_by(FileDeduplication.id)
+        )
+        if limit:
+            query = query.limit(limit)
+        rows = (await session.execute(query)).all()
+
+    converted = saved = 0
+    for file_hash, stored_path in rows:
+        try:
+            result = await storage.recompress_object(file_hash, stored_path, codec)
+        except Exception as e:
+            logger.error(f"Failed to recompress {stored_path}: {e}")
+            continue
+        if not result:
+            continue
+
+        converted += 1
+        saved += result["old_size"] - result["new_size"]
+        if max_bytes_per_second:
+            await asyncio.sleep(result["old_size"] / max_bytes_per_second)
+
+    logger.info(f"Recompressed {converted}/{len(rows)} objects to {codec}, saved {saved / (1024 * 1024):.1f} MB")
+
+
+async def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Recompress stored objects in the background")
+    parser.add_argument("--codec", choices=[c for c in CODEC_IDS if c != "none"], default="zstd")
+    parser.add_argument("--max-bytes-per-second", type=int, default=settings.STORAGE_REPLICATION_MAX_BYTES_PER_SECOND)
+    parser.add_argument("--limit", type=int, default=0, help="Recompress at most this many objects")
+    parser.add_argument("--train-dictionary", action="store_true", help="Train a zstd dictionary from stored PDFs")
+    parser.add_argument("--samples", type=int, default=2000, help="PDFs to sample for dictionary training")
+    parser.add_argument("--dict-size", type=int, default=112640, help="Dictionary size in bytes")
+    args = parser.parse_args()
+
+    storage = LocalStorageService()
+
+    if args.train_dictionary:
+        dict_id = await train_dictionary(storage, args.samples, args.dict_size)
+        logger.info(f"Set STORAGE_ZSTD_DICTIONARY_ID={dict_id} to use it for new PDF objects")
+        return
+
+    await recompress(storage, args.codec, args.max_bytes_per_second, args.limit)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,10 +14,26 @@ from app.main import app
 from app.api.schemas import IngestionResponse
 from app.core.config import settings
 from app.services.ingestion_service import IngestionService
+from app.services.idempotency_service import IdempotencyClaim
 
 client = TestClient(app)
 
 
+def _prepared(result):
+    """What IngestionService.prepare_staged_file returns for a stored file."""
+    return {"result": result, "job": Mock(), "storage_info": {"file_path": result["storage_path"]}}
+
+
+def _claims(record, is_new):
+    """Bulk check-and-create that resolves every key like the single-key mock."""
+    async def check_and_create(db, operation_type, operations, **kwargs):
+        return {
+            operation["idempotency_key"]: IdempotencyClaim(record, is_new=is_new, started=is_new)
+            for operation in operations
+        }
+    return AsyncMock(side_effect=check_and_create)
+
+
 class TestBatchUploadEndpoint:
     """Test cases for batch upload endpoint."""
 
@@ -25,6 +41,7 @@ class TestBatchUploadEndpoint:
     def mock_ingestion_service(self):
         """Mock ingestion service."""
         with patch('app.api.api_v1.endpoints.ingestion.ingestion_service') as mock:
+            mock.queue_processing_tasks = AsyncMock()
             yield mock
 
     @pytest.fixture
@@ -59,12 +76,13 @@ class TestBatchUploadEndpoint:
     def test_batch_upload_success(self, sample_files, mock_ingestion_service, sample_ingestion_response):
         """Test successful batch upload."""
         # Mock ingestion service response
-        mock_ingestion_service.ingest_file = AsyncMock(return_value=sample_ingestion_response)
+        mock_ingestion_service.prepare_staged_file = AsyncMock(return_value=_prepared(sample_ingestion_response))
 
         # Mock idempotency service
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "test-idempotency-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -109,11 +127,12 @@ class TestBatchUploadEndpoint:
     def test_batch_upload_single_file_equivalence(self, sample_files, mock_ingestion_service, sample_ingestion_response):
         """Test that batch upload with single file is equivalent to single upload."""
         # Mock services
-        mock_ingestion_service.ingest_file = AsyncMock(return_value=sample_ingestion_response)
+        mock_ingestion_service.prepare_staged_file = AsyncMock(return_value=_prepared(sample_ingestion_response))
 
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "test-idempotency-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -183,7 +202,7 @@ class TestBatchUploadEndpoint:
         def mock_ingest_file_side_effect(*args, **kwargs):
             if "invoice2" in str(args):
                 raise Exception("Processing failed for invoice2")
-            return {
+            return _prepared({
                 "ingestion_job_id": "success-job-id",
                 "file_size": 1024,
                 "file_hash": "success_hash",
@@ -191,13 +210,14 @@ class TestBatchUploadEndpoint:
                 "storage_path": "/uploads/success.pdf",
                 "duplicate_analysis": {},
                 "estimated_processing_time": 30,
-            }
+            })
 
-        mock_ingestion_service.ingest_file = AsyncMock(side_effect=mock_ingest_file_side_effect)
+        mock_ingestion_service.prepare_staged_file = AsyncMock(side_effect=mock_ingest_file_side_effect)
 
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "test-idempotency-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -239,6 +259,7 @@ class TestBatchUploadEndpoint:
         existing_record.result_data = sample_ingestion_response
 
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (existing_record, False)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(existing_record, False)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -267,7 +288,7 @@ class TestBatchUploadEndpoint:
         # Mock ingestion service with realistic processing delay
         async def delayed_ingest(*args, **kwargs):
             await asyncio.sleep(0.1)  # Simulate processing time
-            return {
+            return _prepared({
                 "ingestion_job_id": f"job-{asyncio.current_task().get_name()}",
                 "file_size": 1024,
                 "file_hash": "hash",
@@ -275,13 +296,14 @@ class TestBatchUploadEndpoint:
                 "storage_path": "/uploads/test.pdf",
                 "duplicate_analysis": {},
                 "estimated_processing_time": 30,
-            }
+            })
 
-        mock_ingestion_service.ingest_file = AsyncMock(side_effect=delayed_ingest)
+        mock_ingestion_service.prepare_staged_file = AsyncMock(side_effect=delayed_ingest)
 
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "concurrent-test-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -311,11 +333,12 @@ class TestBatchUploadEndpoint:
 
     def test_batch_upload_response_format(self, sample_files, mock_ingestion_service, sample_ingestion_response):
         """Test batch upload response format matches specification."""
-        mock_ingestion_service.ingest_file = AsyncMock(return_value=sample_ingestion_response)
+        mock_ingestion_service.prepare_staged_file = AsyncMock(return_value=_prepared(sample_ingestion_response))
 
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "format-test-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_completed = AsyncMock()
 
@@ -393,11 +416,12 @@ class TestBatchUploadEndpoint:
     def test_batch_upload_error_handling(self, sample_files, mock_ingestion_service):
         """Test batch upload error handling when services are unavailable."""
         # Mock ingestion service to raise an exception
-        mock_ingestion_service.ingest_file = AsyncMock(side_effect=Exception("Service unavailable"))
+        mock_ingestion_service.prepare_staged_file = AsyncMock(side_effect=Exception("Service unavailable"))
 
         mock_idempotency_service = AsyncMock()
         mock_idempotency_service.generate_idempotency_key.return_value = "error-test-key"
         mock_idempotency_service.check_and_create_idempotency_record.return_value = (None, True)
+        mock_idempotency_service.check_and_create_idempotency_records = _claims(None, True)
         mock_idempotency_service.mark_operation_started = AsyncMock()
         mock_idempotency_service.mark_operation_failed = AsyncMock()
 
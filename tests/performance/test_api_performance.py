@@ -357,7 +357,7 @@ class TestServiceLayerPerformance(PerformanceTestMixin):
             pdf_content = b"%PDF-1.4\n" + b"x" * (size_mb * 1024 * 1024)
 
             async def extract_content():
-                docling_service = DoclingService()
+                docling_service = DoclingService(converter=MagicMock())
 
                 with patch.object(docling_service.converter, 'convert') as mock_convert:
                     # Mock document processing
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark for the precompiled header field extraction engine.
+
+Checks that the field engine produces the same values and candidate spans as
+the legacy per-call ``re.search`` loop over the sample invoices. Timings are
+only printed by ``run_benchmark``; wall-clock comparisons are too noisy to
+assert in the test suite.
+
+Usage:
+    python -m pytest tests/performance/test_field_extraction_benchmark.py -q
+    python tests/performance/test_field_extraction_benchmark.py
+"""
+
+import re
+import time
+from typing import Dict, List, Optional
+
+from app.services.field_extraction_engine import HEADER_FIELD_PATTERNS, header_field_engine
+from tests.fixtures.sample_documents import SampleDocuments
+
+ITERATIONS = 200
+
+
+def _sample_texts() -> List[str]:
+    """Sample invoice texts, plus one long statement-style document."""
+    texts = [variation["content"] for variation in SampleDocuments.get_invoice_variations()]
+    texts.append("\n".join(texts) * 40)
+    return texts
+
+
+def _legacy_extract(text: str) -> Dict[str, Optional[str]]:
+    """Header extraction as DoclingService did it before the engine."""
+    values = {}
+    for field, patterns in HEADER_FIELD_PATTERNS.items():
+        values[field] = None
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            if match:
+                result = match.group(1).strip()
+                values[field] = result if result else None
+                break
+    return values
+
+
+def _legacy_scan(text: str) -> Dict[str, List[tuple]]:
+    """All-candidate scan as EnhancedExtractionService did it before the engine."""
+    candidates = {}
+    for field, patterns in HEADER_FIELD_PATTERNS.items():
+        candidates[field] = [
+            (match.start(), match.end())
+            for pattern in patterns
+            for match in re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
+        ]
+    return candidates
+
+
+def _time(func, text: str, iterations: int = ITERATIONS) -> float:
+    """Average seconds per call."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(text)
+    return (time.perf_counter() - started) / iterations
+
+
+class TestFieldExtractionBenchmark:
+    """Equivalence checks for the field engine."""
+
+    def test_first_match_values_match_legacy(self):
+        """Engine first-match values equal the legacy re.search loop."""
+        for text in _sample_texts():
+            assert header_field_engine.extract(text) == _legacy_extract(text)
+
+    def test_candidate_spans_match_legacy(self):
+        """Engine candidates equal the legacy finditer scan, with positions."""
+        for text in _sample_texts():
+            scanned = header_field_engine.scan(text)
+            spans = {field: [(c.start, c.end) for c in candidates] for field, candidates in scanned.items()}
+            assert spans == _legacy_scan(text)
+
+
+def run_benchmark() -> None:
+    """Print per-document timings for each sample."""
+    for index, text in enumerate(_sample_texts()):
+        print(
+            f"sample {index} ({len(text)} chars): "
+            f"legacy search {_time(_legacy_extract, text) * 1e6:.1f}us, "
+            f"engine first {_time(header_field_engine.extract, text) * 1e6:.1f}us, "
+            f"legacy finditer {_time(_legacy_scan, text) * 1e6:.1f}us, "
+            f"engine scan {_time(header_field_engine.scan, text) * 1e6:.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,127 @@
+"""
+Latency benchmark for line item math validation on large invoices.
+
+Builds synthetic utility-style invoices with thousands of lines (a few of
+them off by some cents) and compares the math rules on fixed-point NumPy
+columns against the per-line Decimal loop they replace. The tests check
+that both report the same lines; latency is only printed by the script,
+since wall-clock comparisons are not reliable on shared CI runners.
+
+Usage:
+    python -m pytest tests/performance/test_line_math_benchmark.py -q
+    python tests/performance/test_line_math_benchmark.py
+"""
+
+import asyncio
+import random
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from app.services.line_item_columns import LineItemColumns
+from app.services.parsed_invoice import lenient_amount
+from app.services.validation_engine import ValidationEngine
+
+LINE_COUNT = 10_000
+MISMATCH_RATE = 0.002
+TOLERANCE = Decimal("0.01")  # line_item_math_validation default tolerance_cents
+
+
+def build_invoice(line_count: int = LINE_COUNT, seed: int = 5) -> Dict[str, Any]:
+    """Extraction result for a large metered-usage invoice."""
+    rng = random.Random(seed)
+    lines = []
+    for index in range(line_count):
+        quantity = Decimal(rng.randint(1, 500000)) / 100  # kWh to two places
+        unit_price = Decimal(rng.randint(500, 2500)) / 10000  # $/kWh to four places
+        amount = (quantity * unit_price).quantize(Decimal("0.01"))
+        if rng.random() < MISMATCH_RATE:
+            amount += Decimal(rng.randint(5, 5000)) / 100
+        lines.append({
+            "description": f"Meter {index:05d} usage",
+            "quantity": float(quantity),
+            "unit_price": float(unit_price),
+            "total_amount": float(amount),
+        })
+    subtotal = sum((Decimal(str(line["total_amount"])) for line in lines), Decimal("0"))
+    return {
+        "header": {"subtotal_amount": float(subtotal), "tax_amount": 0, "total_amount": float(subtotal)},
+        "lines": lines,
+    }
+
+
+def legacy_line_issues(lines: List[Dict[str, Any]]) -> List[int]:
+    """Line numbers the per-line Decimal loop flags."""
+    issues = []
+    for i, line in enumerate(lines):
+        quantity = lenient_amount(line.get("quantity", 1))
+        unit_price = lenient_amount(line.get("unit_price", 0))
+        amount = lenient_amount(line.get("total_amount") or line.get("amount", 0))
+        if abs(amount - quantity * unit_price) > TOLERANCE:
+            issues.append(i + 1)
+    return issues
+
+
+def legacy_lines_total(lines: List[Dict[str, Any]]) -> Decimal:
+    """Line total as the subtotal and total rules computed it, once per rule."""
+    return sum(lenient_amount(line.get("total_amount") or line.get("amount", 0)) for line in lines)
+
+
+def run_legacy(engine: ValidationEngine, invoice: Dict[str, Any]) -> Dict[str, Any]:
+    """Issues, line total and latency of the per-line loops (line math, subtotal, total, math result)."""
+    lines = invoice["lines"]
+    started = time.perf_counter()
+    issues = legacy_line_issues(lines)
+    totals = [legacy_lines_total(lines) for _ in range(3)]
+    return {"issues": issues, "lines_total": totals[0], "ms": (time.perf_counter() - started) * 1000}
+
+
+def run_columnar(engine: ValidationEngine, invoice: Dict[str, Any]) -> Dict[str, Any]:
+    """Issues, line total and latency of the math rules on shared columns."""
+    header, lines = invoice["header"], invoice["lines"]
+    rules = {rule.name: rule for rule in engine.rules["mathematical"]}
+
+    async def run():
+        started = time.perf_counter()
+        columns = LineItemColumns.from_lines(lines)
+        line_math = await engine._validate_line_item_math(rules["line_item_math_validation"], lines, columns)
+        await engine._validate_subtotal(rules["subtotal_validation"], header, lines, columns)
+        await engine._validate_total_amount(rules["total_amount_validation"], header, lines, columns)
+        lines_total = columns.amounts_total(lenient_amount)
+        return line_math, lines_total, (time.perf_counter() - started) * 1000
+
+    line_math, lines_total, elapsed = asyncio.run(run())
+    issues = [issue["line_number"] for issue in (line_math.details or {}).get("issues", [])]
+    return {"issues": issues, "lines_total": lines_total, "ms": elapsed}
+
+
+class TestLineMathBenchmark:
+    """Parity checks for columnar line math."""
+
+    def test_columnar_rules_match_decimal_loop(self):
+        """Both approaches flag the same lines and compute the same line total."""
+        engine = ValidationEngine()
+        invoice = build_invoice()
+        legacy = run_legacy(engine, invoice)
+        columnar = run_columnar(engine, invoice)
+
+        assert legacy["issues"]
+        assert columnar["issues"] == legacy["issues"]
+        assert columnar["lines_total"] == legacy["lines_total"]
+
+
+def run_benchmark() -> None:
+    """Print latency of both approaches for growing invoice sizes."""
+    engine = ValidationEngine()
+    for line_count in (100, 1_000, 10_000, 50_000):
+        invoice = build_invoice(line_count)
+        legacy = run_legacy(engine, invoice)
+        columnar = run_columnar(engine, invoice)
+        print(
+            f"{line_count:>6} lines: Decimal loop {legacy['ms']:8.2f} ms, columns {columnar['ms']:8.2f} ms "
+            f"({legacy['ms'] / columnar['ms']:.1f}x), {len(columnar['issues'])} mismatched line(s)"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,210 @@
+"""
+Recall and latency benchmark for the MinHash/LSH near-duplicate index.
+
+Builds a corpus of synthetic invoices and a seed duplicate set using the same
+variation rules as ``EvidenceHarnessService.create_seed_duplicate_dataset``
+(exact copy, amount shift, date shift, format change, invoice number
+variation), then compares LSH candidate lookup against the pairwise
+``SequenceMatcher`` scan it replaces.
+
+Usage:
+    python -m pytest tests/performance/test_near_duplicate_benchmark.py -q
+    python tests/performance/test_near_duplicate_benchmark.py
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+from app.models.working_capital import DuplicateType
+from app.services.near_duplicate_index import LSHIndex, MinHasher, hash_shingles, shingle_text
+
+CORPUS_SIZE = 400
+SEED_DUPLICATES = 75  # create_seed_duplicate_dataset default target_count
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+MATCH_THRESHOLD = 0.6  # DeduplicationService.fuzzy_similarity_threshold
+
+_VENDORS = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay", "Tyrell", "Cyberdyne"]
+_SUFFIXES = ["Inc", "LLC", "Corp", "Ltd", "Co"]
+_ITEMS = [
+    "Consulting services", "Software license", "Cloud hosting", "Office supplies", "Hardware maintenance",
+    "Freight charges", "Training session", "Support retainer", "Printer toner", "Network cabling",
+    "Security audit", "Data migration", "Travel expenses", "Catering", "Equipment rental",
+]
+
+
+def _base_invoice(rng: random.Random, index: int) -> Dict:
+    """A synthetic base invoice."""
+    items = []
+    for _ in range(rng.randint(2, 8)):
+        quantity = rng.randint(1, 20)
+        unit_price = Decimal(rng.randint(500, 50000)) / 100
+        items.append({
+            "description": f"{rng.choice(_ITEMS)} {rng.choice(['Q1', 'Q2', 'Q3', 'Q4', 'monthly', 'annual'])}",
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "amount": unit_price * quantity,
+        })
+    invoice_date = date(2024, 1, 1) + timedelta(days=rng.randint(0, 300))
+    return {
+        "vendor": f"{rng.choice(_VENDORS)} {rng.choice(_VENDORS)} {rng.choice(_SUFFIXES)}",
+        "invoice_number": f"INV-{2024}-{index:05d}",
+        "invoice_date": invoice_date,
+        "due_date": invoice_date + timedelta(days=30),
+        "line_items": items,
+        "total_amount": sum((item["amount"] for item in items), Decimal("0")),
+    }
+
+
+def _seed_duplicate(rng: random.Random, base: Dict, duplicate_type: DuplicateType) -> Dict:
+    """Apply the evidence harness variation rules for one duplicate type."""
+    duplicate = dict(base)
+    if duplicate_type == DuplicateType.INVOICE_NUMBER_VARIATION:
+        number = base["invoice_number"]
+        duplicate["invoice_number"] = rng.choice(
+            [f"{number}-R", f"R-{number}", f"{number}REV", f"{number[:-1]}{rng.randint(0, 9)}"]
+        )
+    elif duplicate_type == DuplicateType.DATE_SHIFT:
+        shift = timedelta(days=rng.randint(-7, 7))
+        duplicate["invoice_date"] = base["invoice_date"] + shift
+        duplicate["due_date"] = base["due_date"] + shift
+    elif duplicate_type == DuplicateType.AMOUNT_SHIFT:
+        duplicate["total_amount"] = base["total_amount"] * (1 + Decimal(str(rng.uniform(-0.05, 0.05))))
+    elif duplicate_type == DuplicateType.FORMAT_CHANGE:
+        items = []
+        for item in base["line_items"]:
+            item = dict(item)
+            item["description"] = rng.choice(
+                [item["description"], f"Rev: {item['description']}", f"{item['description']} (Updated)"]
+            )
+            items.append(item)
+        rng.shuffle(items)
+        duplicate["line_items"] = items
+    return duplicate
+
+
+def _render(invoice: Dict) -> str:
+    """Render an invoice the way extracted text reads."""
+    lines = [
+        invoice["vendor"],
+        "INVOICE",
+        f"Invoice Number: {invoice['invoice_number']}",
+        f"Invoice Date: {invoice['invoice_date'].isoformat()}",
+        f"Due Date: {invoice['due_date'].isoformat()}",
+        "Description | Qty | Unit Price | Amount",
+    ]
+    for item in invoice["line_items"]:
+        lines.append(f"{item['description']} | {item['quantity']} | {item['unit_price']:.2f} | {item['amount']:.2f}")
+    lines.append(f"Total: {invoice['total_amount']:.2f}")
+    return "\n".join(lines)
+
+
+def build_dataset(seed: int = 7) -> Tuple[List[str], List[Tuple[int, DuplicateType, str]]]:
+    """Corpus texts and (base index, duplicate type, duplicate text) seed duplicates."""
+    rng = random.Random(seed)
+    bases = [_base_invoice(rng, index) for index in range(CORPUS_SIZE)]
+    variation_types = [t for t in DuplicateType if t != DuplicateType.VENDOR_VARIATION]
+    duplicates = []
+    for position in range(SEED_DUPLICATES):
+        base_index = rng.randrange(CORPUS_SIZE)
+        duplicate_type = variation_types[position % len(variation_types)]
+        duplicates.append((base_index, duplicate_type, _render(_seed_duplicate(rng, bases[base_index], duplicate_type))))
+    return [_render(base) for base in bases], duplicates
+
+
+def _signature(hasher: MinHasher, text: str):
+    return hasher.signature(hash_shingles(shingle_text(text, SHINGLE_SIZE)))
+
+
+def run_lsh(corpus: List[str], duplicates, threshold: float = MATCH_THRESHOLD) -> Dict[str, float]:
+    """Candidate recall, match recall and per-query latency of the LSH index."""
+    hasher = MinHasher(NUM_PERM)
+    index = LSHIndex(BANDS)
+    for key, text in enumerate(corpus):
+        index.add(key, _signature(hasher, text))
+
+    candidate_hits = match_hits = candidate_total = 0
+    started = time.perf_counter()
+    for base_index, _, text in duplicates:
+        signature = _signature(hasher, text)
+        candidates = index.candidates(signature)
+        matches = dict(index.query(signature, threshold=threshold))
+        candidate_total += len(candidates)
+        candidate_hits += base_index in candidates
+        match_hits += base_index in matches
+    elapsed = time.perf_counter() - started
+
+    return {
+        "candidate_recall": candidate_hits / len(duplicates),
+        "match_recall": match_hits / len(duplicates),
+        "avg_candidates": candidate_total / len(duplicates),
+        "query_ms": elapsed / len(duplicates) * 1000,
+    }
+
+
+def run_pairwise(corpus: List[str], duplicates, queries: int = 5) -> Dict[str, float]:
+    """Per-query latency of the pairwise SequenceMatcher scan."""
+    started = time.perf_counter()
+    for _, _, text in duplicates[:queries]:
+        for other in corpus:
+            SequenceMatcher(None, text, other).ratio()
+    return {"query_ms": (time.perf_counter() - started) / queries * 1000}
+
+
+class TestNearDuplicateBenchmark:
+    """Recall and latency checks for the near-duplicate index."""
+
+    def test_seed_duplicates_are_candidates(self):
+        """Every seeded duplicate type finds its base invoice among the LSH candidates."""
+        corpus, duplicates = build_dataset()
+        results = run_lsh(corpus, duplicates)
+        assert results["candidate_recall"] >= 0.95
+        assert results["match_recall"] >= 0.9
+        assert results["avg_candidates"] < CORPUS_SIZE * 0.1
+
+    def test_unrelated_invoices_score_below_threshold(self):
+        """Candidates that are not seeded duplicates stay under the match threshold."""
+        corpus, duplicates = build_dataset()
+        hasher = MinHasher(NUM_PERM)
+        index = LSHIndex(BANDS)
+        for key, text in enumerate(corpus):
+            index.add(key, _signature(hasher, text))
+
+        false_matches = [
+            key
+            for base_index, _, text in duplicates
+            for key, _ in index.query(_signature(hasher, text), threshold=MATCH_THRESHOLD)
+            if key != base_index
+        ]
+        assert not false_matches
+
+    def test_lsh_query_faster_than_pairwise_scan(self):
+        """A candidate lookup is cheaper than comparing against the whole corpus."""
+        corpus, duplicates = build_dataset()
+        assert run_lsh(corpus, duplicates)["query_ms"] < run_pairwise(corpus, duplicates, queries=2)["query_ms"]
+
+
+def run_benchmark() -> None:
+    """Print recall by duplicate type and latency for both approaches."""
+    corpus, duplicates = build_dataset()
+    overall = run_lsh(corpus, duplicates)
+    print(
+        f"LSH ({NUM_PERM} perms, {BANDS} bands, corpus {len(corpus)}): "
+        f"candidate recall {overall['candidate_recall']:.2%}, match recall {overall['match_recall']:.2%}, "
+        f"{overall['avg_candidates']:.1f} candidates/query, {overall['query_ms']:.2f} ms/query"
+    )
+    for duplicate_type in DuplicateType:
+        subset = [dup for dup in duplicates if dup[1] == duplicate_type]
+        if subset:
+            by_type = run_lsh(corpus, subset)
+            print(f"  {duplicate_type.value}: candidate recall {by_type['candidate_recall']:.2%} ({len(subset)} seeds)")
+    print(f"Pairwise SequenceMatcher scan: {run_pairwise(corpus, duplicates)['query_ms']:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -11,6 +11,7 @@ from app.api.schemas.validation import (
     ValidationSeverity,
     ValidationRulesConfig,
 )
+from app.services.parsed_invoice import ParsedInvoice, parse_date
 from app.services.validation_service import (
     ValidationService,
     MathValidator,
@@ -187,14 +188,14 @@ class TestValidationService:
     def test_parse_date_formats(self, validation_service):
         """Test date parsing with various formats."""
         # Valid formats
-        assert validation_service._parse_date("2024-01-15") is not None
-        assert validation_service._parse_date("01/15/2024") is not None
-        assert validation_service._parse_date("15-01-2024") is not None
+        assert parse_date("2024-01-15") is not None
+        assert parse_date("01/15/2024") is not None
+        assert parse_date("15-01-2024") is not None
 
         # Invalid formats
-        assert validation_service._parse_date("invalid") is None
-        assert validation_service._parse_date("") is None
-        assert validation_service._parse_date(None) is None
+        assert parse_date("invalid") is None
+        assert parse_date("") is None
+        assert parse_date(None) is None
 
     def test_calculate_confidence_score(self, validation_service):
         """Test confidence score calculation."""
@@ -254,8 +255,7 @@ class TestMathValidator:
         """Test successful math validation."""
         issues = []
         result = await math_validator.validate(
-            sample_extraction_result["header"],
-            sample_extraction_result["lines"],
+            ParsedInvoice.from_extraction(sample_extraction_result["header"], sample_extraction_result["lines"]),
             issues
         )
 
@@ -276,7 +276,7 @@ class TestMathValidator:
         lines = [{"amount": "1000.00"}]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result.total_match is False
         assert result.total_difference > 0
@@ -294,7 +294,7 @@ class TestMathValidator:
         lines = [{"amount": "1000.00"}]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result.subtotal_match is None
         assert result.total_match is True  # Should use lines_total as subtotal
@@ -333,8 +333,7 @@ class TestMatchingValidator:
 
             issues = []
             result = await matching_validator.validate(
-                sample_extraction_result["header"],
-                sample_extraction_result["lines"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], sample_extraction_result["lines"]),
                 mock_session,
                 issues
             )
@@ -357,8 +356,7 @@ class TestMatchingValidator:
 
             issues = []
             result = await matching_validator.validate(
-                sample_extraction_result["header"],
-                sample_extraction_result["lines"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], sample_extraction_result["lines"]),
                 mock_session,
                 issues
             )
@@ -384,8 +382,7 @@ class TestMatchingValidator:
 
             issues = []
             result = await matching_validator.validate(
-                sample_extraction_result["header"],
-                sample_extraction_result["lines"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], sample_extraction_result["lines"]),
                 mock_session,
                 issues
             )
@@ -418,7 +415,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                sample_extraction_result["header"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], []),
                 "vendor-123",
                 mock_session,
                 issues
@@ -442,7 +439,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                sample_extraction_result["header"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], []),
                 None,
                 mock_session,
                 issues
@@ -468,7 +465,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                sample_extraction_result["header"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], []),
                 "vendor-123",
                 mock_session,
                 issues
@@ -504,7 +501,7 @@ class TestDuplicateDetector:
 
             issues = []
             result = await duplicate_detector.check(
-                sample_extraction_result["header"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], []),
                 "invoice-123",
                 mock_session,
                 issues
@@ -544,7 +541,7 @@ class TestDuplicateDetector:
 
             issues = []
             result = await duplicate_detector.check(
-                sample_extraction_result["header"],
+                ParsedInvoice.from_extraction(sample_extraction_result["header"], []),
                 "invoice-123",
                 mock_session,
                 issues
@@ -564,7 +561,7 @@ class TestDuplicateDetector:
         mock_session = AsyncMock()
         issues = []
         result = await duplicate_detector.check(
-            header,
+            ParsedInvoice.from_extraction(header, []),
             "invoice-123",
             mock_session,
             issues
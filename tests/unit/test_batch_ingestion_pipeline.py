@@ -0,0 +1,158 @@
+"""
+Unit tests for the staged batch upload pipeline.
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.config import settings
+from app.core.exceptions import IngestionException
+from app.services.batch_ingestion_pipeline import BatchIngestionPipeline
+from app.services.idempotency_service import IdempotencyClaim
+
+
+class _Upload:
+    """UploadFile stand-in with an async read."""
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.content_type = "application/pdf"
+        self._content = content
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk, self._content = self._content[:size], self._content[size:]
+        return chunk
+
+
+@pytest.fixture(autouse=True)
+def storage_path():
+    """Stage uploads under a temp storage path."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        original = settings.STORAGE_PATH
+        settings.STORAGE_PATH = temp_dir
+        yield temp_dir
+        settings.STORAGE_PATH = original
+
+
+@pytest.fixture
+def idempotency_service():
+    """Idempotency service where every key is new."""
+    async def check_and_create(db, operation_type, operations, **kwargs):
+        return {
+            operation["idempotency_key"]: IdempotencyClaim(MagicMock(), is_new=True, started=True)
+            for operation in operations
+        }
+
+    service = MagicMock()
+    service.generate_idempotency_key.side_effect = lambda **kwargs: f"key-{kwargs['additional_context']['filename']}"
+    service.check_and_create_idempotency_records = AsyncMock(side_effect=check_and_create)
+    service.mark_operations_finished = AsyncMock(return_value=1)
+    return service
+
+
+@pytest.fixture
+def ingestion_service():
+    """Ingestion service whose storage step takes a fixed time per file."""
+    service = MagicMock()
+
+    async def prepare(staged, filename, **kwargs):
+        await asyncio.sleep(0.05)
+        if filename == "broken.pdf":
+            raise ValueError("unreadable")
+        return {
+            "job": MagicMock(),
+            "storage_info": {"file_path": filename},
+            "result": {
+                "ingestion_job_id": f"job-{filename}",
+                "file_size": staged.size,
+                "file_hash": staged.file_hash,
+                "status": "pending",
+                "storage_path": filename,
+            },
+        }
+
+    service.prepare_staged_file = AsyncMock(side_effect=prepare)
+    service.queue_processing_tasks = AsyncMock()
+    return service
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory counting the sessions opened."""
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = AsyncMock()
+    return factory
+
+
+class TestBatchIngestionPipeline:
+    """Test cases for BatchIngestionPipeline."""
+
+    @pytest.mark.asyncio
+    async def test_files_run_concurrently_and_queue_once(self, ingestion_service, idempotency_service, session_factory):
+        """A batch takes about as long as one file and queues every file in one call."""
+        pipeline = BatchIngestionPipeline(ingestion_service, idempotency_service, session_factory)
+        files = [_Upload(f"invoice-{n}.pdf", f"invoice {n}".encode()) for n in range(10)]
+
+        items = await pipeline.stage_uploads(files)
+        started = time.perf_counter()
+        await pipeline.run(items, "batch-1")
+
+        assert time.perf_counter() - started < 0.4
+        assert all(item.result["batch_id"] == "batch-1" for item in items)
+        ingestion_service.queue_processing_tasks.assert_awaited_once()
+        assert len(ingestion_service.queue_processing_tasks.await_args.args[0]) == 10
+        # One session claims every key and one records every result
+        assert session_factory.call_count == 2
+        idempotency_service.check_and_create_idempotency_records.assert_awaited_once()
+        assert len(idempotency_service.mark_operations_finished.await_args.kwargs["completed"]) == 10
+        assert not any(item.staged.path.exists() for item in items)
+
+    @pytest.mark.asyncio
+    async def test_failures_are_per_file(self, ingestion_service, idempotency_service, session_factory):
+        """A file that fails to store is marked failed without affecting the rest."""
+        pipeline = BatchIngestionPipeline(ingestion_service, idempotency_service, session_factory)
+        items = await pipeline.stage_uploads([_Upload("good.pdf", b"good"), _Upload("broken.pdf", b"bad")])
+
+        await pipeline.run(items, "batch-1")
+
+        good, broken = items
+        assert good.result is not None and good.error is None
+        assert broken.result is None and "unreadable" in broken.error
+        finished = idempotency_service.mark_operations_finished.await_args.kwargs
+        assert list(finished["completed"]) == ["key-good.pdf"]
+        assert list(finished["failed"]) == ["key-broken.pdf"]
+
+    @pytest.mark.asyncio
+    async def test_completed_keys_are_not_reprocessed(self, ingestion_service, idempotency_service, session_factory):
+        """Files whose idempotency key already completed return the stored result."""
+        record = MagicMock()
+        record.operation_status.value = "completed"
+        record.result_data = {"id": "job-earlier"}
+        idempotency_service.check_and_create_idempotency_records = AsyncMock(
+            return_value={"key-invoice.pdf": IdempotencyClaim(record, is_new=False)}
+        )
+        pipeline = BatchIngestionPipeline(ingestion_service, idempotency_service, session_factory)
+        items = await pipeline.stage_uploads([_Upload("invoice.pdf", b"invoice")])
+
+        await pipeline.run(items, "batch-1")
+
+        assert items[0].is_duplicate
+        assert items[0].result == {"id": "job-earlier"}
+        ingestion_service.prepare_staged_file.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_staging_failure_leaves_nothing_behind(self, ingestion_service, idempotency_service, storage_path):
+        """An oversized file fails the whole batch, naming the file, with no temp files left."""
+        pipeline = BatchIngestionPipeline(ingestion_service, idempotency_service)
+
+        with pytest.raises(IngestionException, match="large.pdf"):
+            await pipeline.stage_uploads(
+                [_Upload("small.pdf", b"x" * 10), _Upload("large.pdf", b"x" * 100)], max_size=50
+            )
+
+        assert not any((Path(storage_path) / "temp").iterdir())
@@ -0,0 +1,94 @@
+"""
+Unit tests for the storage layout collapse tool.
+"""
+
+import hashlib
+import importlib.util
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.storage_replication import StorageReplicator
+
+_spec = importlib.util.spec_from_file_location(
+    "collapse_storage_layout", Path(__file__).resolve().parents[2] / "scripts" / "collapse_storage_layout.py"
+)
+collapse_storage_layout = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(collapse_storage_layout)
+StorageLayoutCollapser = collapse_storage_layout.StorageLayoutCollapser
+
+CONTENT = b"%PDF-1.4 invoice body"
+LEGACY_PATH = "vendors/acme/2026/invoice.pdf"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Legacy tree with one organized object and its originals/ copy."""
+    root = tmp_path / "storage"
+    for relative in (LEGACY_PATH, f"originals/{LEGACY_PATH}"):
+        path = root / relative
+        path.parent.mkdir(parents=True)
+        path.write_bytes(CONTENT)
+    return root
+
+
+def _collapser(storage: Path, backup_mode: str, keep_originals: bool = False) -> StorageLayoutCollapser:
+    collapser = StorageLayoutCollapser(apply=True, backup_mode=backup_mode, keep_originals=keep_originals)
+    collapser.storage_path = storage
+    collapser.replicator = StorageReplicator(
+        source_root=str(storage), backup_root=str(storage.parent / "backup")
+    )
+    return collapser
+
+
+def _record() -> MagicMock:
+    return MagicMock(stored_path=LEGACY_PATH, file_hash=hashlib.sha256(CONTENT).hexdigest())
+
+
+class TestBackupGuards:
+    """originals/ copies are only removed once a backup of the canonical object exists."""
+
+    def test_none_mode_requires_keep_originals(self):
+        with pytest.raises(ValueError, match="--keep-originals"):
+            StorageLayoutCollapser(apply=True, backup_mode="none", keep_originals=False)
+
+    def test_none_mode_keeps_originals(self, storage):
+        collapser = _collapser(storage, "none", keep_originals=True)
+        record = _record()
+
+        collapser.collapse(MagicMock(), record)
+
+        assert (storage / f"originals/{LEGACY_PATH}").read_bytes() == CONTENT
+        assert (storage / record.stored_path).read_bytes() == CONTENT
+        assert not (storage.parent / "backup").exists()
+        assert collapser.stats["originals_removed"] == 0
+
+    def test_original_removed_once_backed_up(self, storage):
+        collapser = _collapser(storage, "replicate")
+        record = _record()
+
+        collapser.collapse(MagicMock(), record)
+
+        assert (storage.parent / "backup" / record.stored_path).read_bytes() == CONTENT
+        assert not (storage / f"originals/{LEGACY_PATH}").exists()
+        assert (storage / LEGACY_PATH).read_bytes() == CONTENT  # symlink to the canonical object
+        assert collapser.stats["originals_removed"] == 1
+
+    def test_missing_backup_keeps_original(self, storage):
+        collapser = _collapser(storage, "replicate")
+        record = _record()
+
+        with patch.object(collapser.replicator, "replicate", return_value=0):
+            collapser.collapse(MagicMock(), record)
+
+        assert (storage / f"originals/{LEGACY_PATH}").read_bytes() == CONTENT
+        assert collapser.stats["originals_removed"] == 0
+        assert collapser.stats["originals_kept"] == 1
+
+    def test_cli_refuses_none_mode_without_keep_originals(self):
+        argv = ["collapse_storage_layout.py", "--apply", "--backup-mode", "none"]
+        with patch("sys.argv", argv), pytest.raises(SystemExit) as exc_info:
+            collapse_storage_layout.main()
+
+        assert exc_info.value.code == 2
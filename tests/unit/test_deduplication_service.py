@@ -0,0 +1,156 @@
+"""
+Unit tests for DeduplicationService temporal duplicate detection.
+"""
+
+import itertools
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.ingestion import DeduplicationStrategy
+from app.services.deduplication_service import DeduplicationService
+
+NOW = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+VENDOR_ID = uuid.uuid4()
+WINDOW_HOURS = 24
+
+
+def _job(vendor_id=VENDOR_ID) -> MagicMock:
+    return MagicMock(
+        id=uuid.uuid4(), created_at=NOW, vendor_id=vendor_id, file_size_bytes=10_000, file_extension=".pdf"
+    )
+
+
+def _confidence(age_hours: float, same_vendor: bool, same_type: bool, similar_size: bool) -> float:
+    """The confidence model the temporal query computes in SQL."""
+    score = 1.0 - age_hours / WINDOW_HOURS
+    score += 0.2 * same_vendor + 0.1 * similar_size + 0.1 * same_type
+    return min(score, 1.0)
+
+
+def _passes_filters(service, job, threshold, age_hours, same_vendor, same_type) -> bool:
+    """Whether a candidate survives the indexed pre-filters on created_at, vendor_id and file_extension."""
+    created_at = NOW - timedelta(hours=age_hours)
+    vendor_bonus_max = 0.2 if job.vendor_id else 0.0
+
+    def cutoff(max_bonus):
+        return service._temporal_cutoff(NOW, WINDOW_HOURS, threshold, max_bonus)
+
+    return (
+        created_at >= cutoff(vendor_bonus_max + 0.2)
+        and (same_type or created_at >= cutoff(vendor_bonus_max + 0.1))
+        and (not job.vendor_id or same_vendor or created_at >= cutoff(0.2))
+    )
+
+
+async def _run(service, job, rows=(), **config):
+    result = MagicMock()
+    result.all.return_value = list(rows)
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    duplicates = await service._temporal_deduplication(job, {}, {"window_hours": WINDOW_HOURS, **config}, db)
+    return duplicates, db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+
+
+class TestTemporalWindow:
+    """Window boundaries of the indexed candidate query."""
+
+    @pytest.mark.parametrize("threshold", [0.3, 0.6, 0.8, 0.95, 1.0])
+    @pytest.mark.parametrize("has_vendor", [True, False])
+    def test_filters_never_drop_a_job_that_reaches_the_threshold(self, threshold, has_vendor):
+        service = DeduplicationService()
+        job = _job(VENDOR_ID if has_vendor else None)
+        ages = [hours / 4 for hours in range(0, WINDOW_HOURS * 4 + 1)]
+
+        for age, same_vendor, same_type, similar_size in itertools.product(ages, *[(True, False)] * 3):
+            same_vendor = same_vendor and has_vendor
+            if _confidence(age, same_vendor, same_type, similar_size) >= threshold + 1e-9:
+                assert _passes_filters(service, job, threshold, age, same_vendor, same_type), (
+                    age, same_vendor, same_type, similar_size
+                )
+
+    def test_filters_drop_old_jobs_missing_the_bonuses_they_need(self):
+        service = DeduplicationService()
+        job = _job()
+
+        # 18h old: 0.25 on time, so vendor (0.2) plus one more bonus are needed for 0.6
+        assert not _passes_filters(service, job, 0.6, 18, same_vendor=False, same_type=True)
+        assert _passes_filters(service, job, 0.6, 18, same_vendor=True, same_type=True)
+        # 12h old: 0.5 on time, any one bonus suffices
+        assert _passes_filters(service, job, 0.6, 12, same_vendor=False, same_type=False)
+        # Older than every bonus can make up for
+        assert not _passes_filters(service, job, 0.6, 20, same_vendor=True, same_type=True)
+
+    @pytest.mark.asyncio
+    async def test_query_bounds_scan_on_indexed_columns(self):
+        service = DeduplicationService()
+        job = _job()
+
+        _, compiled = await _run(service, job, confidence_threshold=0.6, max_candidates=5)
+        sql = str(compiled)
+
+        assert set(compiled.params.values()) >= {
+            NOW - timedelta(hours=WINDOW_HOURS * 0.8),  # every bonus
+            NOW - timedelta(hours=WINDOW_HOURS * 0.7),  # no extension match
+            NOW - timedelta(hours=WINDOW_HOURS * 0.6),  # no vendor match
+            NOW,
+            ".pdf",
+            VENDOR_ID,
+            5,
+        }
+        assert "ingestion_jobs.file_extension = " in sql
+        assert "ingestion_jobs.vendor_id = " in sql
+        assert "LIMIT" in sql
+
+    @pytest.mark.asyncio
+    async def test_job_without_vendor_does_not_filter_on_vendor(self):
+        service = DeduplicationService()
+        job = _job(vendor_id=None)
+
+        _, compiled = await _run(service, job, confidence_threshold=0.6)
+
+        assert NOW - timedelta(hours=WINDOW_HOURS * 0.6) in compiled.params.values()
+        assert NOW - timedelta(hours=WINDOW_HOURS * 0.8) not in compiled.params.values()
+        assert "ingestion_jobs.vendor_id = " not in str(compiled).split("WHERE", 1)[1]
+
+
+class TestTemporalScoring:
+    """Confidence computed in SQL and the match details built from each row."""
+
+    @pytest.mark.asyncio
+    async def test_confidence_expression(self):
+        _, compiled = await _run(DeduplicationService(), _job())
+        sql = str(compiled)
+
+        assert "least(" in sql
+        assert "EXTRACT(epoch FROM ingestion_jobs.created_at)" in sql
+        assert {0.2, 0.1, 1.0, WINDOW_HOURS * 3600} <= set(compiled.params.values())
+        assert "ORDER BY confidence DESC, ingestion_jobs.created_at DESC" in sql
+
+    @pytest.mark.asyncio
+    async def test_rows_report_matching_criteria(self):
+        job = _job()
+        close_id, far_id = uuid.uuid4(), uuid.uuid4()
+        rows = [
+            (close_id, NOW - timedelta(hours=2), VENDOR_ID, 10_500, ".pdf", 1.0),
+            (far_id, NOW - timedelta(hours=12), uuid.uuid4(), 20_000, ".png", 0.5),
+        ]
+
+        duplicates, _ = await _run(DeduplicationService(), job, rows)
+
+        close, far = duplicates
+        assert close["matching_job_id"] == str(close_id)
+        assert close["strategy"] == DeduplicationStrategy.TEMPORAL
+        assert close["confidence_score"] == close["similarity_score"] == 1.0
+        assert close["match_criteria"]["criteria_matches"] == ["vendor_match", "size_match", "type_match"]
+        assert close["match_criteria"]["time_diff_seconds"] == 7200
+        assert close["comparison_details"]["vendor_match"] is True
+
+        assert far["confidence_score"] == 0.5
+        assert far["match_criteria"]["criteria_matches"] == []
+        assert far["comparison_details"]["time_diff_hours"] == 12
+        assert far["comparison_details"]["size_diff_ratio"] == 0.5
+        assert far["comparison_details"]["vendor_match"] is False
@@ -12,17 +12,26 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app.services.docling_converter_pool import build_document_converter
 from app.services.docling_service import DoclingService
 from app.core.exceptions import ExtractionException
 
 
+@pytest.fixture(autouse=True)
+def disable_extraction_cache(monkeypatch):
+    """Keep cached results from leaking between tests that reuse the same content."""
+    from app.services.extraction_cache import extraction_cache
+    monkeypatch.setattr(extraction_cache, "enabled", False)
+
+
 class TestDoclingService:
     """Test suite for DoclingService."""
 
     @pytest.fixture
     def docling_service(self) -> DoclingService:
         """Create DoclingService instance for testing."""
-        return DoclingService()
+        # A cold converter: models would only load on convert, which the tests patch
+        return DoclingService(converter=build_document_converter())
 
     @pytest.fixture
     def sample_pdf_content(self) -> bytes:
@@ -68,7 +77,7 @@ class TestDoclingService:
             assert metadata["pages_processed"] == 1
             assert "extracted_at" in metadata
 
-            mock_convert.assert_called_once_with(str(temp_pdf_file))
+            mock_convert.assert_called_once_with(str(temp_pdf_file), page_range=(1, 1))
 
     @pytest.mark.asyncio
     async def test_extract_from_file_not_found(self, docling_service: DoclingService):
@@ -117,7 +126,7 @@ class TestDoclingService:
             result = await docling_service.extract_from_content(sample_content, file_path=str(temp_pdf_file))
 
             assert result is not None
-            mock_convert.assert_called_once_with(str(temp_pdf_file))
+            mock_convert.assert_called_once_with(str(temp_pdf_file), page_range=(1, 1))
 
     @pytest.mark.asyncio
     async def test_extract_from_content_creates_temp_file(self, docling_service: DoclingService, sample_pdf_content: bytes):
@@ -528,12 +537,16 @@ class TestDoclingService:
     @pytest.mark.asyncio
     async def test_service_initialization(self):
         """Test service initialization with default settings."""
-        service = DoclingService()
+        from app.services.docling_converter_pool import docling_converter_pool
+
+        with patch.object(docling_converter_pool, "warm_up") as mock_warm_up:
+            service = DoclingService()
 
         assert service.confidence_threshold is not None
         assert service.max_pages is not None
-        assert service.converter is not None
+        assert service.converter is None  # borrowed from the pool per conversion
         assert service.pipeline_options is not None
+        mock_warm_up.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_extract_with_patterns_whitespace_handling(self, docling_service: DoclingService):
@@ -544,4 +557,360 @@ class TestDoclingService:
         ]
 
         result = docling_service._extract_with_patterns(text, patterns)
-        assert result == "Test Vendor Inc"
\ No newline at end of file
+        assert result == "Test Vendor Inc"
+
+class TestDoclingConverterPool:
+    """Test suite for the process-wide Docling converter pool."""
+
+    def test_warm_up_loads_models_once(self):
+        """Converters are built and initialised once, then reused."""
+        from app.services.docling_converter_pool import DoclingConverterPool
+
+        with patch("app.services.docling_converter_pool.build_document_converter") as mock_build:
+            mock_build.side_effect = lambda options: MagicMock()
+            pool = DoclingConverterPool(size=2)
+
+            pool.warm_up()
+            pool.warm_up()
+
+            assert mock_build.call_count == 2
+            assert pool.is_warm
+            for converter in pool._converters:
+                converter.initialize_pipeline.assert_called_once()
+
+    def test_checkout_reuses_warm_instances(self):
+        """Successive checkouts reuse the pooled converters."""
+        from app.services.docling_converter_pool import DoclingConverterPool
+
+        with patch("app.services.docling_converter_pool.build_document_converter") as mock_build:
+            mock_build.side_effect = lambda options: MagicMock()
+            pool = DoclingConverterPool(size=1)
+
+            with pool.checkout() as first:
+                pass
+            with pool.checkout() as second:
+                pass
+
+            assert first is second
+            assert mock_build.call_count == 1
+            assert pool.get_stats()["checkouts"] == 2
+
+    def test_concurrent_checkouts_get_distinct_converters(self):
+        """A converter is lent to one caller at a time; others wait for it."""
+        import queue
+        from app.services.docling_converter_pool import DoclingConverterPool
+
+        with patch("app.services.docling_converter_pool.build_document_converter") as mock_build:
+            mock_build.side_effect = lambda options: MagicMock()
+            pool = DoclingConverterPool(size=2)
+
+            with pool.checkout() as first, pool.checkout() as second:
+                assert first is not second
+                assert pool.get_stats()["converters_idle"] == 0
+                with pytest.raises(queue.Empty):
+                    with pool.checkout(timeout=0.01):
+                        pass
+
+            assert pool.get_stats()["converters_idle"] == 2
+
+    def test_service_borrows_converter_per_conversion(self):
+        """A service without an injected converter checks one out for each conversion."""
+        from app.services.docling_converter_pool import DoclingConverterPool
+
+        with patch("app.services.docling_converter_pool.build_document_converter") as mock_build:
+            mock_build.side_effect = lambda options: MagicMock()
+            pool = DoclingConverterPool(size=1)
+
+            with patch("app.services.docling_service.docling_converter_pool", pool):
+                service = DoclingService()
+                assert not pool.is_warm
+
+                asyncio.run(service._convert("invoice.pdf", page_range=(1, 2)))
+
+            converter = pool._converters[0]
+            converter.convert.assert_called_once_with("invoice.pdf", page_range=(1, 2))
+            assert pool.get_stats()["converters_idle"] == 1
+
+    def test_stats_report_load_times(self):
+        """Pool stats expose warm status, size and per-pipeline load time."""
+        from app.services.docling_converter_pool import DoclingConverterPool
+
+        with patch("app.services.docling_converter_pool.build_document_converter", return_value=MagicMock()):
+            pool = DoclingConverterPool(size=1)
+            assert pool.get_stats()["warm"] is False
+
+            pool.warm_up()
+            stats = pool.get_stats()
+
+            assert stats["warm"] is True
+            assert stats["pool_size"] == 1
+            assert "pdf_pipeline_0" in stats["model_load_seconds"]
+
+            pool.shutdown()
+            assert pool.get_stats()["converters_loaded"] == 0
+
+
+class TestDoclingProcessExecutor:
+    """Test suite for process-pool Docling conversion."""
+
+    @pytest.mark.asyncio
+    async def test_process_mode_uses_executor(self):
+        """In process mode conversion goes through the executor, not the local converter."""
+        from docling_core.types.doc import DoclingDocument
+
+        service = DoclingService(converter=MagicMock())
+        converted = MagicMock(spec=DoclingDocument)
+
+        with patch("app.services.docling_service.settings.DOCLING_EXECUTION_MODE", "process"), \
+                patch("app.services.docling_service.docling_process_executor.convert",
+                      new=AsyncMock(return_value=converted)) as mock_convert:
+            doc = await service._convert("/tmp/invoice.pdf")
+
+        assert doc is converted
+        mock_convert.assert_awaited_once_with("/tmp/invoice.pdf", page_range=None)
+        service.converter.convert.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_conversion_cancels_only_its_future(self):
+        """Cancelling a caller withdraws its queued conversion and leaves the pool alone."""
+        from concurrent.futures import Future
+        from app.services.docling_executor import DoclingProcessExecutor
+
+        executor = DoclingProcessExecutor(max_workers=1)
+        queued, other = Future(), Future()
+        mock_pool = MagicMock()
+        mock_pool.submit.side_effect = [queued, other]
+
+        with patch.object(executor, "_get_executor", return_value=mock_pool):
+            task = asyncio.ensure_future(executor.convert("/tmp/invoice.pdf"))
+            neighbour = asyncio.ensure_future(executor.convert("/tmp/other.pdf"))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            assert queued.cancelled()
+            assert not other.cancelled()
+            mock_pool.shutdown.assert_not_called()
+            neighbour.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await neighbour
+
+        assert executor.get_stats()["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_conversion_keeps_pool(self):
+        """A conversion already running in a child is left to finish; the pool is not recycled."""
+        from concurrent.futures import Future
+        from app.services.docling_executor import DoclingProcessExecutor
+
+        executor = DoclingProcessExecutor(max_workers=1)
+        running = Future()
+        running.set_running_or_notify_cancel()
+        mock_pool = MagicMock()
+        mock_pool.submit.return_value = running
+
+        with patch.object(executor, "_get_executor", return_value=mock_pool):
+            task = asyncio.ensure_future(executor.convert("/tmp/invoice.pdf"))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert not running.cancelled()
+        mock_pool.shutdown.assert_not_called()
+        assert executor.get_stats()["inflight"] == 0
+
+
+    def test_pool_child_warms_a_single_converter(self):
+        """Each child loads one converter's models, whatever the in-process pool size."""
+        from app.services.docling_converter_pool import docling_converter_pool
+        from app.services.docling_executor import _init_worker_process
+
+        with patch.object(docling_converter_pool, "size", 4), \
+                patch.object(docling_converter_pool, "warm_up") as warm_up:
+            _init_worker_process()
+            assert docling_converter_pool.size == 1
+
+        warm_up.assert_called_once_with()
+
+
+class TestExtractionContext:
+    """Test suite for the shared per-document extraction context."""
+
+    @pytest.mark.asyncio
+    async def test_markdown_rendered_once_per_document(self):
+        """Header, line and confidence extraction share one markdown export."""
+        from app.services.extraction_context import ExtractionContext
+
+        service = DoclingService(converter=MagicMock())
+        doc = MagicMock()
+        doc.export_to_markdown.return_value = (
+            "Vendor: Acme Corp\nInvoice Number: INV-001\nDate: 01/15/2024\n"
+            "Description Qty Amount\nWidgets 2 x 50.00 100.00\nTotal: $100.00\n"
+        )
+        context = ExtractionContext(doc)
+
+        header = await service._extract_header(context)
+        lines = await service._extract_lines(context)
+        await service._calculate_confidence(context, header, lines)
+
+        assert header["invoice_no"] == "INV-001"
+        assert lines
+        doc.export_to_markdown.assert_called_once()
+
+    def test_cached_matches_and_line_lookup(self):
+        """Regex matches are cached and offsets map back to line numbers."""
+        from app.services.extraction_context import ExtractionContext
+
+        context = ExtractionContext.from_text("first line\nTotal: 10.00\n")
+
+        match = context.search(r"total:\s*([\d.]+)")
+        assert match.group(1) == "10.00"
+        assert context.search(r"total:\s*([\d.]+)") is match
+        assert context.line_number_at(match.start()) == 1
+        assert context.text_lower.startswith("first")
+
+
+class TestStreamingExtraction:
+    """Test suite for page-range streaming of long documents."""
+
+    @staticmethod
+    def _page_doc(text: str) -> MagicMock:
+        doc = MagicMock()
+        doc.export_to_markdown.return_value = text
+        doc.pages = {}
+        return doc
+
+    @pytest.mark.asyncio
+    async def test_stops_once_header_and_totals_found(self):
+        """An 80-page statement whose invoice is on page 1 converts only the first chunk."""
+        service = DoclingService(converter=MagicMock())
+        first_page = self._page_doc(
+            "Vendor: Acme Corp\nInvoice Number: INV-001\nDate: 01/15/2024\nTotal: $100.00\n"
+        )
+
+        with patch.object(service, "_convert", new=AsyncMock(return_value=first_page)) as mock_convert:
+            chunks = [chunk async for chunk in service.stream_header_candidates("/tmp/statement.pdf", 80)]
+
+        assert len(chunks) == 1
+        assert chunks[0].complete
+        assert chunks[0].header["invoice_number"] == "INV-001"
+        mock_convert.assert_awaited_once_with(
+            "/tmp/statement.pdf", page_range=(1, service.stream_chunk_pages)
+        )
+
+    @pytest.mark.asyncio
+    async def test_never_converts_beyond_page_limit(self):
+        """Without a totals block the stream stops at DOCLING_MAX_PAGES."""
+        service = DoclingService(converter=MagicMock())
+        service.max_pages = 6
+        service.stream_chunk_pages = 2
+        blank = self._page_doc("Account statement continued\n")
+
+        with patch.object(service, "_convert", new=AsyncMock(return_value=blank)) as mock_convert:
+            chunks = [chunk async for chunk in service.stream_header_candidates("/tmp/statement.pdf", 80)]
+
+        assert [chunk.end_page for chunk in chunks] == [2, 4, 6]
+        assert not chunks[-1].complete
+        assert mock_convert.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_capped_conversion_reports_pages_processed(self):
+        """Streaming conversion records how many pages were actually processed."""
+        service = DoclingService(converter=MagicMock())
+        first_page = self._page_doc(
+            "Vendor: Acme Corp\nInvoice Number: INV-001\nDate: 01/15/2024\nTotal: $100.00\n"
+        )
+
+        with patch.object(service, "_count_pdf_pages", return_value=80), \
+                patch.object(service, "_convert", new=AsyncMock(return_value=first_page)):
+            context, notes = await service._convert_capped("/tmp/statement.pdf")
+
+        assert context.page_count == service.stream_chunk_pages
+        assert "INV-001" in context.text
+        assert notes and "of 80 pages" in notes[0]
+
+    @pytest.mark.asyncio
+    async def test_short_documents_are_capped_at_page_limit(self):
+        """Documents under the streaming threshold still convert at most DOCLING_MAX_PAGES pages."""
+        service = DoclingService(converter=MagicMock())
+        service.max_pages = 5
+        service.stream_threshold_pages = 10
+
+        for total_pages, expected_range in ((8, (1, 5)), (3, (1, 3))):
+            with patch.object(service, "_count_pdf_pages", return_value=total_pages), \
+                    patch.object(service, "_convert", new=AsyncMock(return_value=self._page_doc(""))) as mock_convert:
+                await service._convert_capped("/tmp/invoice.pdf")
+
+            mock_convert.assert_awaited_once_with("/tmp/invoice.pdf", page_range=expected_range)
+
+
+class TestExtractionResultCache:
+    """Test suite for the content-addressed extraction result cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        """Enabled cache backed by a temporary disk tier."""
+        from app.services.extraction_cache import DiskExtractionCache, extraction_cache
+
+        monkeypatch.setattr(extraction_cache, "enabled", True)
+        monkeypatch.setattr(extraction_cache, "_backend", DiskExtractionCache(str(tmp_path), 1024 * 1024))
+        monkeypatch.setattr(extraction_cache, "hits", 0)
+        monkeypatch.setattr(extraction_cache, "misses", 0)
+        return extraction_cache
+
+    def test_key_changes_with_parser_configuration(self):
+        """The same file under a different parser version or options gets a new key."""
+        from app.services.extraction_cache import ExtractionResultCache
+
+        key = ExtractionResultCache.build_key("abc", "docling-2.60.1", {"ocr": True})
+        assert key == ExtractionResultCache.build_key("abc", "docling-2.60.1", {"ocr": True})
+        assert key != ExtractionResultCache.build_key("abc", "docling-2.61.0", {"ocr": True})
+        assert key != ExtractionResultCache.build_key("abc", "docling-2.60.1", {"ocr": False})
+
+    def test_key_changes_with_streaming_configuration(self):
+        """Streaming settings decide which pages are extracted, so they are part of the key."""
+        service = DoclingService(converter=MagicMock())
+        key = service._cache_key("abc")
+
+        service.stream_chunk_pages += 1
+        chunk_key = service._cache_key("abc")
+        service.stream_threshold_pages += 1
+
+        assert len({key, chunk_key, service._cache_key("abc")}) == 3
+
+    @pytest.mark.asyncio
+    async def test_repeat_document_skips_conversion(self, cache):
+        """A second extraction of the same bytes is served from the cache."""
+        service = DoclingService(converter=MagicMock())
+        doc = MagicMock()
+        doc.export_to_markdown.return_value = "Vendor: Acme Corp\nInvoice Number: INV-001\nTotal: $100.00\n"
+        doc.tables = []
+        doc.pages = {1: None}
+
+        with patch.object(service, "_count_pdf_pages", return_value=1), \
+                patch.object(service, "_convert", new=AsyncMock(return_value=doc)) as mock_convert:
+            first = await service.extract_from_content(b"%PDF-1.4 same", file_path="/tmp/a.pdf")
+            second = await service.extract_from_content(b"%PDF-1.4 same", file_path="/tmp/b.pdf")
+
+        assert mock_convert.await_count == 1
+        assert second.header.invoice_number == first.header.invoice_number == "INV-001"
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_evicts_least_recently_used(self, tmp_path):
+        """Writing past the size budget drops the oldest entries first."""
+        import os
+        from app.services.extraction_cache import DiskExtractionCache
+
+        tier = DiskExtractionCache(str(tmp_path), max_bytes=250)
+        await tier.set("aa-old", "x" * 100)
+        os.utime(tier._entry_path("aa-old"), (1, 1))
+        await tier.set("bb-new", "y" * 100)
+        await tier.set("cc-newest", "z" * 100)
+
+        assert await tier.get("aa-old") is None
+        assert await tier.get("cc-newest") == "z" * 100
+        assert tier.get_size_bytes() <= 250
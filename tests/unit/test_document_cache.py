@@ -0,0 +1,110 @@
+"""
+Unit tests for the in-process document byte cache.
+"""
+
+import hashlib
+import tempfile
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.exceptions import StorageException
+from app.services.document_cache import DocumentByteCache, document_cache, file_hash_from_path
+from app.services.storage_service import StorageService
+
+FILE_HASH = hashlib.sha256(b"invoice").hexdigest()
+
+
+class TestDocumentByteCache:
+    """Test cases for DocumentByteCache."""
+
+    def test_file_hash_from_path(self):
+        """Hashes are read from stored object names in every layout."""
+        assert file_hash_from_path(f"compressed/pdfs/ab/cd/{FILE_HASH}.pdf") == FILE_HASH
+        assert file_hash_from_path(f"objects/ab/cd/{FILE_HASH}.pdf") == FILE_HASH
+        assert file_hash_from_path("exports/report.csv") is None
+
+    def test_evicts_least_recently_used_to_fit(self):
+        """Entries are evicted oldest-use first once the byte budget is exceeded."""
+        cache = DocumentByteCache(max_bytes=30, max_item_bytes=30, ttl_seconds=60)
+        cache.put("a", b"x" * 10)
+        cache.put("b", b"x" * 10)
+        cache.put("c", b"x" * 10)
+        assert cache.get("a") is not None
+
+        cache.put("d", b"x" * 10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.current_bytes == 30
+        assert cache.evictions == 1
+
+    def test_skips_items_over_the_item_limit(self):
+        """A single large document never flushes the whole cache."""
+        cache = DocumentByteCache(max_bytes=100, max_item_bytes=10, ttl_seconds=60)
+        cache.put("a", b"x" * 11)
+        assert cache.get("a") is None
+        assert cache.current_bytes == 0
+
+    def test_entries_expire(self):
+        """Entries older than the TTL are dropped on lookup."""
+        cache = DocumentByteCache(max_bytes=100, max_item_bytes=100, ttl_seconds=60)
+        with patch("app.services.document_cache.time.monotonic", return_value=1000.0):
+            cache.put("a", b"content")
+        with patch("app.services.document_cache.time.monotonic", return_value=1061.0):
+            assert cache.get("a") is None
+        assert cache.current_bytes == 0
+
+
+class TestStorageServiceCaching:
+    """Test cases for cached reads through StorageService."""
+
+    @pytest.fixture
+    def storage_service(self):
+        """Local storage service with a clean document cache."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            settings.STORAGE_PATH = temp_dir
+            settings.STORAGE_TYPE = "local"
+            document_cache.clear()
+            service = StorageService()
+            service.local_storage_service.get_file_content = AsyncMock(return_value=b"invoice")
+            yield service
+            document_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_repeat_reads_hit_cache(self, storage_service):
+        """A second internal read skips the backend, its ACL check and audit row."""
+        file_path = f"compressed/pdfs/ab/cd/{FILE_HASH}.pdf"
+
+        assert await storage_service.get_file_content(file_path) == b"invoice"
+        assert await storage_service.get_file_content(file_path) == b"invoice"
+
+        storage_service.local_storage_service.get_file_content.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_bypass_always_reads_backend(self, storage_service):
+        """Audited external reads go to the backend even when the bytes are cached."""
+        file_path = f"compressed/pdfs/ab/cd/{FILE_HASH}.pdf"
+
+        await storage_service.get_file_content(file_path)
+        await storage_service.get_file_content(file_path, bypass_cache=True)
+
+        assert storage_service.local_storage_service.get_file_content.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_user_reads_skip_cache_for_access_check(self, storage_service):
+        """Reads on behalf of a user or request are never served past the backend's ACL check."""
+        file_path = f"compressed/pdfs/ab/cd/{FILE_HASH}.pdf"
+        backend_read = storage_service.local_storage_service.get_file_content
+
+        await storage_service.get_file_content(file_path)
+        await storage_service.get_file_content(file_path, user_id="user-1")
+        await storage_service.get_file_content(file_path, request=MagicMock())
+
+        assert backend_read.await_count == 3
+        assert backend_read.await_args_list[1].kwargs["user_id"] == "user-1"
+
+        backend_read.side_effect = PermissionError("Access denied")
+        with pytest.raises(StorageException, match="Access denied"):
+            await storage_service.get_file_content(file_path, user_id="user-2")
@@ -0,0 +1,155 @@
+"""
+Unit tests for document text sidecars and first-parse text extraction.
+"""
+
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from app.models.ingestion import DocumentTextSidecar
+from app.services.deduplication_service import DeduplicationService
+from app.services.document_text_sidecar import DocumentTextSidecarStore
+from app.services.near_duplicate_index import near_duplicate_index
+
+TEXT = "Acme Corp invoice INV-1001\nWidget quantity 2 unit price 50.00 total 100.00"
+
+
+def _pdf_with_text(*lines: str) -> bytes:
+    """Minimal one-page PDF whose text layer holds the given lines."""
+    content = "BT /F1 12 Tf 72 720 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        "/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return pdf
+
+
+def _result(rows) -> MagicMock:
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+class TestDocumentTextSidecarStore:
+    """Writing and reading sidecars."""
+
+    @pytest.mark.asyncio
+    async def test_save_replaces_sidecar_and_stores_compressed_text(self):
+        db = MagicMock()
+        db.execute = AsyncMock()
+        job_id = uuid.uuid4()
+
+        sidecar = await DocumentTextSidecarStore().save(db, job_id, TEXT, "plain_text")
+
+        db.execute.assert_awaited_once()
+        db.add.assert_called_once_with(sidecar)
+        assert isinstance(sidecar, DocumentTextSidecar)
+        assert sidecar.ingestion_job_id == job_id
+        assert sidecar.text_length == len(TEXT)
+        assert sidecar.extraction_method == "plain_text"
+        assert sidecar.text_compressed != TEXT.encode("utf-8")
+        assert DocumentTextSidecarStore.decompress(sidecar.text_compressed) == TEXT
+        assert sidecar.shingle_hashes == near_duplicate_index.shingle_hashes(TEXT).tobytes()
+
+    @pytest.mark.asyncio
+    async def test_saved_sidecar_reads_back(self):
+        store = DocumentTextSidecarStore()
+        db = MagicMock()
+        db.execute = AsyncMock()
+        job_id = uuid.uuid4()
+        sidecar = await store.save(db, job_id, TEXT, "plain_text")
+
+        db.execute = AsyncMock(return_value=_result([(job_id, sidecar.text_compressed)]))
+        assert await store.load_text(db, job_id) == TEXT
+
+        db.execute = AsyncMock(return_value=_result([(job_id, sidecar.shingle_hashes)]))
+        shingles = await store.load_shingles(db, [job_id])
+        assert np.array_equal(shingles[job_id], near_duplicate_index.shingle_hashes(TEXT))
+
+    @pytest.mark.asyncio
+    async def test_missing_sidecar_and_empty_lookups(self):
+        store = DocumentTextSidecarStore()
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=_result([]))
+
+        assert await store.load_text(db, uuid.uuid4()) is None
+        db.execute.reset_mock()
+        assert await store.load_texts(db, []) == {}
+        assert await store.load_shingles(db, []) == {}
+        db.execute.assert_not_awaited()
+
+
+class TestDocumentTextFallback:
+    """DeduplicationService reads sidecars and extracts text only when one is missing."""
+
+    def _job(self, mime_type: str) -> MagicMock:
+        return MagicMock(id=uuid.uuid4(), mime_type=mime_type)
+
+    @pytest.mark.asyncio
+    async def test_stored_sidecar_skips_extraction(self):
+        service = DeduplicationService()
+        job = self._job("text/plain")
+        with patch("app.services.deduplication_service.document_text_sidecars") as sidecars, \
+                patch.object(service, "_extract_text_content", AsyncMock()) as extract:
+            sidecars.load_text = AsyncMock(return_value=TEXT)
+            sidecars.save = AsyncMock()
+
+            assert await service._get_document_text(job, b"ignored", MagicMock()) == TEXT
+
+        extract.assert_not_awaited()
+        sidecars.save.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_missing_sidecar_extracts_and_stores_text(self):
+        service = DeduplicationService()
+        job = self._job("text/plain")
+        db = MagicMock()
+        with patch("app.services.deduplication_service.document_text_sidecars") as sidecars:
+            sidecars.load_text = AsyncMock(return_value=None)
+            sidecars.save = AsyncMock()
+
+            assert await service._get_document_text(job, TEXT.encode("utf-8"), db) == TEXT
+
+        sidecars.save.assert_awaited_once_with(db, job.id, TEXT, "plain_text")
+
+    @pytest.mark.asyncio
+    async def test_unreadable_sidecar_falls_back_to_extraction(self):
+        service = DeduplicationService()
+        job = self._job("application/pdf")
+        pdf = _pdf_with_text("Acme Corp invoice INV-1001")
+        with patch("app.services.deduplication_service.document_text_sidecars") as sidecars:
+            sidecars.load_text = AsyncMock(side_effect=RuntimeError("sidecar table missing"))
+            sidecars.save = AsyncMock(side_effect=RuntimeError("read-only session"))
+
+            text = await service._get_document_text(job, pdf, MagicMock())
+
+        assert "INV-1001" in text
+        assert sidecars.save.await_args.args[3] == "pdfium_text"
+
+
+class TestPdfTextExtraction:
+    """pypdfium2 text layer extraction."""
+
+    def test_reads_text_layer(self):
+        text = DeduplicationService._read_pdf_text(_pdf_with_text("Acme Corp invoice INV-1001", "Total due 100.00"))
+
+        assert "Acme Corp invoice INV-1001" in text
+        assert "Total due 100.00" in text
+
+    def test_page_without_text_returns_none(self):
+        assert DeduplicationService._read_pdf_text(_pdf_with_text()) is None
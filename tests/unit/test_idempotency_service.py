@@ -0,0 +1,138 @@
+"""
+Unit tests for bulk idempotency check-and-create.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.exceptions import ConflictException
+from app.models.idempotency import IdempotencyRecord, IdempotencyStatus
+from app.services.idempotency_service import IdempotencyOperationType, IdempotencyService
+
+
+def _record(key, status, execution_count=0, max_executions=3, expires_in=3600):
+    return IdempotencyRecord(
+        idempotency_key=key,
+        operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+        operation_status=status,
+        operation_data={},
+        execution_count=execution_count,
+        max_executions=max_executions,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+    )
+
+
+def _db(inserted, existing):
+    """Session whose insert returns ``inserted`` and whose conflict SELECT returns ``existing``."""
+    db = AsyncMock()
+    db.add = MagicMock()
+    results = []
+    for records in (inserted, existing):
+        result = MagicMock()
+        result.all.return_value = records
+        results.append(result)
+    db.scalars.side_effect = results
+    return db
+
+
+def _operations(*keys):
+    return [{"idempotency_key": key, "operation_data": {"filename": f"{key}.pdf"}} for key in keys]
+
+
+class TestBulkIdempotency:
+    """Test cases for IdempotencyService.check_and_create_idempotency_records."""
+
+    @pytest.mark.asyncio
+    async def test_resolves_all_keys_in_two_statements(self):
+        """New keys come from one upsert, existing keys from one SELECT, with one commit."""
+        db = _db(
+            inserted=[_record("new", IdempotencyStatus.PENDING)],
+            existing=[
+                _record("done", IdempotencyStatus.COMPLETED),
+                _record("running", IdempotencyStatus.IN_PROGRESS),
+                _record("failed", IdempotencyStatus.FAILED, execution_count=1),
+                _record("exhausted", IdempotencyStatus.FAILED, execution_count=3),
+            ],
+        )
+
+        claims = await IdempotencyService().check_and_create_idempotency_records(
+            db=db,
+            operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+            operations=_operations("new", "done", "running", "failed", "exhausted"),
+        )
+
+        assert db.scalars.await_count == 2
+        db.commit.assert_awaited_once()
+        upsert = str(db.scalars.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (idempotency_key) DO NOTHING RETURNING" in upsert
+
+        assert claims["new"].is_new and claims["new"].error is None
+        assert not claims["done"].is_new and claims["done"].error is None
+        assert isinstance(claims["running"].error, ConflictException)
+        db.add.assert_called_once()  # conflict record for the concurrent execution
+        # A failed operation with attempts left is handed back for retry, unchanged
+        assert claims["failed"].error is None
+        assert claims["failed"].record.execution_count == 1
+        assert isinstance(claims["exhausted"].error, ConflictException)
+
+    @pytest.mark.asyncio
+    async def test_mark_started_claims_retries_and_expired_runs(self):
+        """With mark_started, retries and expired in-progress runs start in the same transaction."""
+        db = _db(
+            inserted=[],
+            existing=[
+                _record("failed", IdempotencyStatus.FAILED, execution_count=1),
+                _record("stale", IdempotencyStatus.IN_PROGRESS, execution_count=1, expires_in=-60),
+            ],
+        )
+
+        claims = await IdempotencyService().check_and_create_idempotency_records(
+            db=db,
+            operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+            operations=_operations("failed", "stale"),
+            mark_started=True,
+        )
+
+        for key in ("failed", "stale"):
+            assert claims[key].started
+            assert claims[key].record.operation_status == IdempotencyStatus.IN_PROGRESS
+            assert claims[key].record.execution_count == 2
+            assert not claims[key].record.is_expired()
+
+    @pytest.mark.asyncio
+    async def test_single_key_raises_conflicts(self):
+        """The single-key API keeps raising for in-progress operations."""
+        db = _db(inserted=[], existing=[_record("running", IdempotencyStatus.IN_PROGRESS)])
+
+        with pytest.raises(ConflictException):
+            await IdempotencyService().check_and_create_idempotency_record(
+                db=db,
+                idempotency_key="running",
+                operation_type=IdempotencyOperationType.INVOICE_UPLOAD,
+                operation_data={},
+            )
+
+    @pytest.mark.asyncio
+    async def test_mark_operations_finished_counts_returned_rows(self):
+        """Each outcome is one UPDATE ... FROM VALUES, counted from its RETURNING rows."""
+        db = AsyncMock()
+        completed_rows, failed_rows = MagicMock(), MagicMock()
+        completed_rows.all.return_value = [(1,), (2,)]
+        failed_rows.all.return_value = []
+        db.execute.side_effect = [completed_rows, failed_rows]
+
+        updated = await IdempotencyService().mark_operations_finished(
+            db,
+            completed={"a": {"invoice_id": "1"}, "b": {"invoice_id": "2"}},
+            failed={"c": {"error": "boom"}},
+        )
+
+        assert updated == 2
+        assert db.execute.await_count == 2
+        db.commit.assert_awaited_once()
+        statement = str(db.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+        assert "FROM (VALUES" in statement
+        assert "RETURNING idempotency_records.id" in statement
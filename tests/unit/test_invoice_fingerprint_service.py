@@ -0,0 +1,138 @@
+"""
+Unit tests for invoice fingerprints and the indexed duplicate lookup.
+"""
+
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.invoice import (
+    _fingerprint_amount,
+    _sync_updated_invoice_fingerprint,
+    normalize_invoice_number_key,
+    normalize_vendor_key,
+)
+from app.services.invoice_fingerprint_service import InvoiceFingerprintService
+
+
+def _compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestFingerprintNormalization:
+    """Normalised keys and amounts stored on fingerprints."""
+
+    def test_vendor_and_invoice_number_keys(self):
+        assert normalize_vendor_key("  ACME   Corp ") == normalize_vendor_key("acme corp")
+        assert normalize_invoice_number_key("inv-001") == normalize_invoice_number_key("INV 001")
+        assert normalize_vendor_key(None) is None
+        assert normalize_invoice_number_key("") is None
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("$1,250.00", Decimal("1250.00")),
+            ("-40", Decimal("-40.00")),
+            ("1.005", Decimal("1.01")),
+            ("-1.005", Decimal("-1.01")),
+            (".5", Decimal("0.50")),
+            (99.5, Decimal("99.50")),
+        ],
+    )
+    def test_amounts_parse_like_the_backfill(self, value, expected):
+        assert _fingerprint_amount(value) == expected
+
+    @pytest.mark.parametrize("value", [None, "abc", "1e3", "12 34", "NaN", "10000000000000"])
+    def test_non_decimal_and_out_of_range_amounts_are_ignored(self, value):
+        assert _fingerprint_amount(value) is None
+
+
+class TestFingerprintMapperEvents:
+    """The after_update listener only re-points fingerprints from the latest extraction."""
+
+    def _extraction(self) -> MagicMock:
+        return MagicMock(id=uuid.uuid4(), invoice_id=uuid.uuid4(), header_json={"invoice_number": "INV-1"})
+
+    def test_update_of_superseded_extraction_is_ignored(self):
+        target = self._extraction()
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = uuid.uuid4()
+
+        _sync_updated_invoice_fingerprint(None, connection, target)
+
+        # Only the latest-extraction probe ran
+        assert connection.execute.call_count == 1
+
+    def test_update_of_latest_extraction_rewrites_fingerprint(self):
+        target = self._extraction()
+        connection = MagicMock()
+        connection.execute.return_value.scalar.return_value = target.id
+
+        _sync_updated_invoice_fingerprint(None, connection, target)
+
+        statements = [_compiled(call.args[0]) for call in connection.execute.call_args_list]
+        assert len(statements) == 3
+        assert "ORDER BY invoice_extractions.created_at DESC" in statements[0]
+        assert statements[1].startswith("DELETE FROM invoice_fingerprints")
+        assert statements[2].startswith("INSERT INTO invoice_fingerprints")
+
+
+class TestFindDuplicates:
+    """SQL shape of the single-invoice duplicate lookup."""
+
+    @staticmethod
+    def _session() -> MagicMock:
+        result = MagicMock()
+        result.all.return_value = []
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=result)
+        return session
+
+    @pytest.mark.asyncio
+    async def test_resolves_vendor_from_the_excluded_invoice(self):
+        session = self._session()
+        excluded = uuid.uuid4()
+
+        service = InvoiceFingerprintService()
+        assert await service.find_duplicates(session, "Acme Inc", "inv-1", exclude_invoice_id=str(excluded)) == []
+
+        sql = _compiled(session.execute.await_args.args[0])
+        assert "invoice_fingerprints.invoice_number_key = " in sql
+        assert "invoice_fingerprints.vendor_key = " in sql
+        assert "invoice_fingerprints.vendor_id = (SELECT invoices.vendor_id" in sql
+        assert "ILIKE" not in sql
+        assert "invoice_fingerprints.invoice_id != " in sql
+
+    @pytest.mark.asyncio
+    async def test_known_vendor_is_probed_directly(self):
+        session = self._session()
+        vendor_id = uuid.uuid4()
+
+        await InvoiceFingerprintService().find_duplicates(session, "Acme Inc", "inv-1", vendor_id=str(vendor_id))
+
+        statement = session.execute.await_args.args[0]
+        sql = _compiled(statement)
+        assert "invoice_fingerprints.vendor_id = " in sql
+        assert "(SELECT invoices.vendor_id" not in sql
+        assert vendor_id in statement.compile().params.values()
+
+    @pytest.mark.asyncio
+    async def test_without_a_vendor_only_the_name_key_is_probed(self):
+        session = self._session()
+
+        await InvoiceFingerprintService().find_duplicates(session, "Acme Inc", "inv-1")
+
+        assert "invoice_fingerprints.vendor_id" not in _compiled(session.execute.await_args.args[0]).split("WHERE")[1]
+
+    @pytest.mark.asyncio
+    async def test_missing_keys_skip_the_query(self):
+        session = MagicMock()
+        session.execute = AsyncMock()
+        service = InvoiceFingerprintService()
+
+        assert await service.find_duplicates(session, None, "INV-1") == []
+        assert await service.find_duplicates(session, "Acme", "  ") == []
+        session.execute.assert_not_awaited()
@@ -0,0 +1,137 @@
+"""
+Unit tests for the fixed-point line item columns used by the math rules.
+"""
+
+import random
+from decimal import Decimal, InvalidOperation
+
+import pytest
+
+from app.services.line_item_columns import LineItemColumns
+from app.services.parsed_invoice import ParsedInvoice, lenient_amount
+from app.services.validation_engine import ValidationEngine
+from app.services.validation_service import ValidationService
+
+# Lines a per-line check must see: unparseable, too precise for the fixed-point form, or odd types
+AWKWARD_LINES = [
+    {"quantity": "abc", "unit_price": 10, "total_amount": 10},
+    {"quantity": 3, "unit_price": 0.33335, "total_amount": 1.0},
+    {"quantity": 2, "unit_price": "$1,250.50", "total_amount": "$2,501.00"},
+    {"quantity": 0.1, "unit_price": 0.2, "total_amount": 0.02},
+    {"quantity": 1, "unit_price": float("nan"), "total_amount": 5},
+    {"quantity": True, "unit_price": 5, "total_amount": 5},
+    {"quantity": 1, "unit_price": Decimal("7.125"), "amount": Decimal("7.13")},
+    {"quantity": None, "unit_price": 4, "total_amount": 4},
+    {"quantity": 10 ** 12, "unit_price": 1, "total_amount": 10 ** 12},
+    {"quantity": "1e3", "unit_price": "0.01", "total_amount": "10"},
+]
+
+
+def _engine_line_issues(lines, tolerance: Decimal):
+    """Indexes the per-line Decimal loop the line math rule used before columns flags."""
+    issues = []
+    for i, line in enumerate(lines):
+        quantity = lenient_amount(line.get("quantity", 1))
+        unit_price = lenient_amount(line.get("unit_price", 0))
+        amount = lenient_amount(line.get("total_amount") or line.get("amount", 0))
+        try:
+            if abs(amount - quantity * unit_price) > tolerance:
+                issues.append(i)
+        except InvalidOperation:  # NaN values
+            issues.append(i)
+    return issues
+
+
+def _random_lines(count: int, seed: int = 11):
+    """Lines of mixed value types, about one in twenty off by a few cents."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        quantity = rng.choice([rng.randint(1, 50), round(rng.uniform(0, 5000), 3), str(rng.randint(1, 9))])
+        unit_price = Decimal(rng.randint(1, 200000)) / 10000
+        amount = (Decimal(str(quantity)) * unit_price).quantize(Decimal("0.01"))
+        if rng.random() < 0.05:
+            amount += Decimal(rng.randint(2, 500)) / 100
+        lines.append({
+            "quantity": quantity,
+            "unit_price": rng.choice([unit_price, float(unit_price), str(unit_price)]),
+            "total_amount": rng.choice([amount, float(amount), f"${amount:,}"]),
+        })
+    return lines + AWKWARD_LINES
+
+
+class TestLineItemColumns:
+    """Test cases for LineItemColumns."""
+
+    def test_values_convert_exactly_or_not_at_all(self):
+        """Values that fit the fixed-point form are scaled exactly; the rest are marked inexact."""
+        columns = LineItemColumns.from_lines(AWKWARD_LINES)
+
+        assert columns.quantities[2] == 2 * 10 ** 4
+        assert columns.unit_prices[2] == 1_250_5000
+        assert columns.amounts[2] == 250_100
+        assert columns.amounts[6] == 713
+        assert columns.exact.tolist() == [False, False, True, True, False, False, True, False, False, False]
+
+    def test_candidates_cover_mismatches_and_inexact_lines(self):
+        """Only lines out of tolerance or outside the fixed-point form are returned."""
+        lines = [
+            {"quantity": 2, "unit_price": 10.0, "total_amount": 20.0},
+            {"quantity": 2, "unit_price": 10.0, "total_amount": 20.01},
+            {"quantity": 2, "unit_price": 10.0, "total_amount": 20.02},
+            {"quantity": 1, "unit_price": 0.12345, "total_amount": 0.12},
+        ]
+        columns = LineItemColumns.from_lines(lines)
+
+        assert columns.line_math_candidates(Decimal("0.01")).tolist() == [2, 3]
+        assert columns.line_math_candidates(Decimal("0")).tolist() == [1, 2, 3]
+
+    def test_candidates_agree_with_decimal_loop(self):
+        """Every line the Decimal loop flags is a candidate, and every other line passes it."""
+        lines = _random_lines(2000)
+        tolerance = Decimal("0.01")
+
+        columns = LineItemColumns.from_lines(lines)
+        candidates = columns.line_math_candidates(tolerance).tolist()
+        expected = _engine_line_issues(lines, tolerance)
+
+        assert set(expected) <= set(candidates)
+        assert set(candidates) - set(expected) <= {i for i in range(len(lines)) if not columns.exact[i]}
+
+    def test_amounts_total_matches_decimal_sum(self):
+        """The fixed-point sum plus converted leftovers equals the Decimal sum."""
+        lines = _random_lines(500)
+        expected = sum(lenient_amount(line.get("total_amount") or line.get("amount", 0)) for line in lines)
+
+        assert LineItemColumns.from_lines(lines).amounts_total(lenient_amount) == expected
+        assert LineItemColumns.from_lines([]).amounts_total(lenient_amount) == 0
+
+    @pytest.mark.asyncio
+    async def test_line_math_rule_reports_same_issues(self):
+        """The rule's issues match the Decimal loop, with or without prebuilt columns."""
+        engine = ValidationEngine()
+        rule = next(rule for rule in engine.rules["mathematical"] if rule.name == "line_item_math_validation")
+        lines = _random_lines(1000)
+
+        result = await engine._validate_line_item_math(rule, lines, LineItemColumns.from_lines(lines))
+        fallback = await engine._validate_line_item_math(rule, lines)
+
+        expected = _engine_line_issues(lines, Decimal("0.01"))
+        assert [issue["line_number"] - 1 for issue in result.details["issues"]] == expected
+        assert fallback.details == result.details
+
+    @pytest.mark.asyncio
+    async def test_service_line_math_uses_exact_columns(self):
+        """The validation service's math check settles lines in fixed point, so float error no longer flags them."""
+        service = ValidationService()
+        lines = [
+            {"description": "Exactly a cent off", "quantity": 1, "unit_price": 1.00, "amount": 1.01},
+            {"description": "Two cents off", "quantity": 2, "unit_price": "0.10", "amount": "0.22"},
+            {"description": "Not a number", "quantity": 1, "unit_price": 5, "amount": "five"},
+        ]
+        issues = []
+
+        result = await service.math_validator.validate(ParsedInvoice.from_extraction({"total": 6.23}, lines), issues)
+
+        # 1.01 - 1.00 is 0.010000000000000009 in float, past the one-cent tolerance
+        assert [line["valid"] for line in result.line_item_validation] == [True, False, False]
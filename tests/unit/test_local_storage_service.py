@@ -5,6 +5,8 @@ Unit tests for the enhanced local storage service.
 import asyncio
 import os
 import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -147,6 +149,7 @@ class TestLocalStorageService:
         """Test basic file storage functionality."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store file
@@ -181,6 +184,7 @@ class TestLocalStorageService:
         """Test file storage with compression."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store file
@@ -204,6 +208,7 @@ class TestLocalStorageService:
         """Test file storage with vendor-based organization."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store file with vendor information
@@ -232,6 +237,7 @@ class TestLocalStorageService:
         """Test file deduplication functionality."""
         # Mock database operations to simulate existing file
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # First storage - should create new file
@@ -250,14 +256,14 @@ class TestLocalStorageService:
         mock_dedup_record.original_size = len(sample_file_content)
         mock_dedup_record.compressed_size = len(sample_file_content)
 
-        with patch.object(
-            local_storage_service, '_check_deduplication',
-            return_value={
+        with patch(
+            'app.services.storage_metadata.StorageMetadataUnitOfWork.claim_file',
+            new=AsyncMock(return_value=({
                 "stored_path": result1["file_path"],
                 "is_compressed": False,
                 "original_size": len(sample_file_content),
                 "compressed_size": len(sample_file_content),
-            }
+            }, False))
         ):
             # Second storage with same content - should use deduplication
             result2 = await local_storage_service.store_file(
@@ -277,6 +283,7 @@ class TestLocalStorageService:
         """Test file content retrieval."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # First store a file
@@ -320,6 +327,7 @@ class TestLocalStorageService:
         """Test permanent file deletion."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store a file first
@@ -349,6 +357,7 @@ class TestLocalStorageService:
         """Test file archival."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store a file first
@@ -382,6 +391,7 @@ class TestLocalStorageService:
         """Test file listing functionality."""
         # Mock database operations
         mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
         mock_session.return_value.__aenter__.return_value = mock_session_instance
 
         # Store some test files
@@ -473,4 +483,459 @@ class TestLocalStorageService:
 
         # Verify links point to correct file
         assert vendor_link.resolve() == full_path.resolve()
-        assert date_link.resolve() == full_path.resolve()
\ No newline at end of file
+        assert date_link.resolve() == full_path.resolve()
+
+class TestStorageMetadataUnitOfWork:
+    """Test cases for the single-transaction storage metadata path."""
+
+    @pytest.mark.asyncio
+    @patch.object(settings, 'STORAGE_AUDIT_DEFERRED', False)
+    @patch('app.services.local_storage_service.AsyncSessionLocal')
+    async def test_store_file_commits_once(self, mock_session, local_storage_service, sample_file_content):
+        """A new file's dedup, access-control and audit rows are written in one commit."""
+        mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
+        mock_session_instance.add = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_session_instance
+
+        await local_storage_service.store_file(
+            file_content=sample_file_content,
+            filename="test_invoice.pdf",
+            content_type="application/pdf",
+            user_id="test_user"
+        )
+
+        assert mock_session.call_count == 1
+        assert mock_session_instance.execute.await_count == 2  # the dedup upsert + compressed repoint
+        assert mock_session_instance.add.call_count == 2  # access control + audit
+        mock_session_instance.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_reference_release_applies_now(self):
+        """A decrement is written in the caller's transaction and removes a record that reaches zero."""
+        from sqlalchemy.dialects import postgresql
+
+        from app.services.storage_metadata import StorageMetadataUnitOfWork
+
+        session = AsyncMock()
+        session.execute.return_value = MagicMock(scalar_one_or_none=MagicMock(return_value=0))
+
+        assert await StorageMetadataUnitOfWork(session).adjust_reference_count("a", -1) == 0
+
+        update_sql, delete_sql = (
+            str(call.args[0].compile(dialect=postgresql.dialect())) for call in session.execute.await_args_list
+        )
+        assert update_sql.startswith("UPDATE file_deduplication SET reference_count=greatest(")
+        assert "RETURNING file_deduplication.reference_count" in update_sql
+        assert delete_sql.startswith("DELETE FROM file_deduplication")
+
+    @pytest.mark.asyncio
+    async def test_deferred_audit_released_only_after_commit(self):
+        """Deferred audit rows reach the flusher on commit and are dropped on rollback."""
+        from app.services.storage_metadata import StorageMetadataUnitOfWork, storage_audit_flusher
+
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = AsyncMock()
+
+        with patch.object(storage_audit_flusher, 'add') as flusher_add:
+            with pytest.raises(RuntimeError):
+                async with StorageMetadataUnitOfWork.begin(session_factory, defer_audit=True) as unit:
+                    unit.audit(file_path="a", file_hash="h", operation="store", operation_status="success")
+                    raise RuntimeError("write failed")
+            flusher_add.assert_not_called()
+
+            async with StorageMetadataUnitOfWork.begin(session_factory, defer_audit=True) as unit:
+                unit.audit(file_path="a", file_hash="h", operation="store", operation_status="success")
+            flusher_add.assert_called_once()
+
+
+class TestContentAddressedLayout:
+    """Test cases for the single-object content-addressed layout."""
+
+    @pytest.mark.asyncio
+    @patch('app.services.local_storage_service.AsyncSessionLocal')
+    async def test_store_file_writes_one_object(self, mock_session, local_storage_service, sample_file_content):
+        """A store writes only the canonical object and links it into the backup root."""
+        mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_session_instance
+
+        with tempfile.TemporaryDirectory() as backup_dir:
+            local_storage_service.layout = "content_addressed"
+            with patch.object(settings, "STORAGE_BACKUP_MODE", "link"), \
+                    patch.object(settings, "STORAGE_BACKUP_PATH", backup_dir):
+                result = await local_storage_service.store_file(
+                    file_content=sample_file_content,
+                    filename="test_invoice.pdf",
+                    content_type="application/pdf",
+                    user_id="test_user",
+                    vendor_name="ACME Corporation",
+                )
+
+            file_hash = result["file_hash"]
+            assert result["file_path"].endswith(f"objects/{file_hash[:2]}/{file_hash[2:4]}/{file_hash}.pdf")
+            assert not any((local_storage_service.storage_path / "originals").rglob("*.pdf"))
+
+            stored = local_storage_service.storage_path / result["file_path"]
+            backup = Path(backup_dir) / result["file_path"]
+            assert backup.exists()
+            assert os.path.samefile(stored, backup) or backup.read_bytes() == stored.read_bytes()
+
+
+class TestStorageCodecs:
+    """Test cases for self-describing compression frames."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("codec", ["gzip", "lz4", "zstd"])
+    async def test_read_does_not_depend_on_current_codec(self, local_storage_service, sample_file_content, codec):
+        """Objects written with one codec stay readable after the configured codec changes."""
+        local_storage_service.compression_type = codec
+        compressed_content, is_compressed, compression_info = await local_storage_service._compress_file(
+            sample_file_content, "application/pdf"
+        )
+        assert is_compressed
+        assert compression_info["type"] == codec
+
+        local_storage_service.compression_type = "gzip" if codec != "gzip" else "lz4"
+        assert await local_storage_service._decompress_file(compressed_content, "") == sample_file_content
+
+    @pytest.mark.asyncio
+    async def test_legacy_unframed_objects_still_read(self, local_storage_service, sample_file_content):
+        """Objects written before framing are recognised by their own magic bytes."""
+        import gzip
+        import lz4.frame
+
+        for legacy in (gzip.compress(sample_file_content), lz4.frame.compress(sample_file_content)):
+            assert await local_storage_service._decompress_file(legacy, "") == sample_file_content
+
+    def test_zstd_dictionary_recorded_in_frame(self, sample_file_content):
+        """Frames compressed with a trained dictionary name it, so reads load the right one."""
+        from app.services.storage_codec import FRAME_HEADER, StorageCodecs
+
+        with tempfile.TemporaryDirectory() as dictionary_dir:
+            codecs = StorageCodecs(dictionary_path=dictionary_dir)
+            samples = [sample_file_content + f" invoice {i} total {i * 7}.00".encode() for i in range(200)]
+            dict_id = codecs.train_dictionary(samples, dict_size=4096)
+
+            with patch.object(settings, "STORAGE_ZSTD_DICTIONARY_ID", dict_id):
+                frame = codecs.encode(samples[0], "zstd", "application/pdf")
+
+            assert FRAME_HEADER.unpack_from(frame)[3] == dict_id
+            assert StorageCodecs(dictionary_path=dictionary_dir).decode(frame) == samples[0]
+
+
+class TestStagedUploads:
+    """Test cases for chunked upload staging."""
+
+    class _ChunkedUpload:
+        """UploadFile stand-in that records the largest read it was asked for."""
+
+        def __init__(self, content: bytes):
+            self.content = content
+            self.offset = 0
+            self.largest_read = 0
+
+        async def read(self, size: int = -1) -> bytes:
+            self.largest_read = max(self.largest_read, size)
+            chunk = self.content[self.offset:self.offset + size]
+            self.offset += len(chunk)
+            return chunk
+
+    @pytest.mark.asyncio
+    async def test_stage_reads_in_chunks(self, local_storage_service, sample_file_content):
+        """Uploads are hashed and written in fixed-size chunks, never read whole."""
+        import hashlib
+
+        from app.services.upload_staging import UploadStager
+
+        upload = self._ChunkedUpload(sample_file_content)
+        staged = await UploadStager(chunk_size=64).stage(upload, "invoice.txt", "text/plain")
+
+        assert upload.largest_read == 64
+        assert staged.size == len(sample_file_content)
+        assert staged.file_hash == hashlib.sha256(sample_file_content).hexdigest()
+        with staged.view() as view:
+            assert view == sample_file_content
+        staged.cleanup()
+        assert not staged.path.exists()
+
+    @pytest.mark.asyncio
+    async def test_stage_enforces_size_limit(self, local_storage_service, sample_file_content):
+        """Staging stops at the size limit and leaves no temp file behind."""
+        from app.core.exceptions import IngestionException
+        from app.services.upload_staging import UploadStager
+
+        stager = UploadStager(chunk_size=64)
+        with pytest.raises(IngestionException):
+            await stager.stage(self._ChunkedUpload(sample_file_content), "invoice.txt", max_size=100)
+        assert not any(stager.temp_path.iterdir())
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("codec", ["gzip", "lz4", "zstd"])
+    @patch('app.services.local_storage_service.AsyncSessionLocal')
+    async def test_store_staged_file(self, mock_session, local_storage_service, sample_file_content, codec):
+        """A staged upload is compressed file-to-file and reads back unchanged."""
+        from app.services.upload_staging import UploadStager
+
+        mock_session_instance = AsyncMock()
+        mock_session_instance.execute.return_value = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_session_instance
+
+        local_storage_service.compression_type = codec
+        staged = await UploadStager(chunk_size=64).stage(sample_file_content, "invoice.pdf")
+        result = await local_storage_service.store_file(
+            file_content=staged,
+            filename="invoice.pdf",
+            content_type="application/pdf",
+        )
+        staged.cleanup()
+
+        assert result["is_compressed"]
+        assert result["compression_type"] == codec
+        stored = (local_storage_service.storage_path / result["file_path"]).read_bytes()
+        assert await local_storage_service._decompress_file(stored, "") == sample_file_content
+        assert not any((local_storage_service.storage_path / "temp").iterdir())
+
+
+class TestStorageUsageAccumulator:
+    """Test cases for batched access-time updates."""
+
+    @staticmethod
+    def _session_factory(session):
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = session
+        return factory
+
+    @pytest.mark.asyncio
+    async def test_touches_coalesce_into_one_update(self):
+        """Repeated touches of a hash become one row of one UPDATE."""
+        from sqlalchemy.dialects import postgresql
+
+        from app.services.storage_metadata import StorageUsageAccumulator
+
+        session = AsyncMock()
+        accumulator = StorageUsageAccumulator(self._session_factory(session))
+        with patch.object(settings, "STORAGE_USAGE_BATCHED", False):
+            for _ in range(5):
+                accumulator.touch("a")
+            accumulator.touch("b")
+        assert accumulator.pending == 2
+
+        assert await accumulator.flush() == 2
+
+        session.execute.assert_awaited_once()
+        session.commit.assert_awaited_once()
+        sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "FROM (VALUES" in sql
+        assert "reference_count" not in sql
+        assert accumulator.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_touches(self):
+        """Touches from a failed flush are merged into the next one."""
+        from app.services.storage_metadata import StorageUsageAccumulator
+
+        session = AsyncMock()
+        session.execute.side_effect = Exception("database unavailable")
+        accumulator = StorageUsageAccumulator(self._session_factory(session))
+        with patch.object(settings, "STORAGE_USAGE_BATCHED", False):
+            accumulator.touch("a")
+            assert await accumulator.flush() == 0
+            accumulator.touch("b")
+
+        assert accumulator.pending == 2
+
+
+class _FakeDedupTable:
+    """In-memory file_deduplication rows behind a StorageMetadataUnitOfWork stand-in."""
+
+    def __init__(self):
+        self.records = {}
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        yield _FakeMetadataUnit(self)
+
+    def hash_for_path(self, file_path):
+        return next((h for h, record in self.records.items() if record["stored_path"] == file_path), None)
+
+
+class _FakeMetadataUnit:
+    """Implements the unit-of-work calls store_file and delete_file make."""
+
+    def __init__(self, table):
+        self.table = table
+
+    async def claim_file(self, file_hash, stored_path, is_compressed, original_size, compressed_size, **fields):
+        record = self.table.records.get(file_hash)
+        if record is not None:
+            record["reference_count"] += 1
+            return dict(record), False
+        self.table.records[file_hash] = {
+            "stored_path": stored_path,
+            "is_compressed": is_compressed,
+            "original_size": original_size,
+            "compressed_size": compressed_size,
+            "reference_count": 1,
+        }
+        return dict(self.table.records[file_hash]), True
+
+    async def adjust_reference_count(self, file_hash, delta):
+        record = self.table.records.get(file_hash)
+        if record is None:
+            return None
+        record["reference_count"] = max(record["reference_count"] + delta, 0)
+        if record["reference_count"] <= 0 and delta < 0:
+            del self.table.records[file_hash]
+        return record["reference_count"]
+
+    async def repoint_file(self, file_hash, stored_path, **fields):
+        self.table.records[file_hash].update(stored_path=stored_path, **fields)
+
+    def grant_access(self, **fields):
+        pass
+
+    def audit(self, **fields):
+        pass
+
+
+class TestDeleteAndReupload:
+    """Reference counts stay in step with objects on disk across deletes and re-uploads."""
+
+    @pytest.fixture
+    def table(self, local_storage_service):
+        table = _FakeDedupTable()
+        service = local_storage_service
+        service._metadata_unit_of_work = table.unit_of_work
+        service._check_file_access = AsyncMock(return_value=True)
+        service._get_file_hash_from_path = AsyncMock(side_effect=table.hash_for_path)
+        service._delete_access_control = AsyncMock()
+        service._log_storage_operation = AsyncMock()
+        service._update_access_time = AsyncMock()
+        return table
+
+    async def _store(self, service, content):
+        return await service.store_file(file_content=content, filename="invoice.pdf", content_type="application/pdf")
+
+    @pytest.mark.asyncio
+    async def test_permanent_delete_then_reupload_writes_object(self, local_storage_service, table, sample_file_content):
+        """The delete releases its reference at once, so the same bytes are stored again, not deduplicated."""
+        first = await self._store(local_storage_service, sample_file_content)
+
+        assert await local_storage_service.delete_file(first["file_path"], permanent=True)
+        assert table.records == {}
+
+        second = await self._store(local_storage_service, sample_file_content)
+
+        assert not second["deduplicated"]
+        assert await local_storage_service.get_file_content(second["file_path"]) == sample_file_content
+        assert table.records[second["file_hash"]]["reference_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reupload_rewrites_object_missing_from_disk(self, local_storage_service, table, sample_file_content):
+        """A record whose object is already gone is repointed at a fresh copy instead of deduplicated onto it."""
+        first = await self._store(local_storage_service, sample_file_content)
+        # A concurrent permanent delete has unlinked the object but not yet released its reference
+        (local_storage_service.storage_path / first["file_path"]).unlink()
+
+        second = await self._store(local_storage_service, sample_file_content)
+        await local_storage_service._decrement_reference_count(first["file_hash"])
+
+        record = table.records[first["file_hash"]]
+        assert record["reference_count"] == 1
+        assert (local_storage_service.storage_path / record["stored_path"]).exists()
+        assert await local_storage_service.get_file_content(second["file_path"]) == sample_file_content
+
+    @pytest.mark.asyncio
+    async def test_duplicate_upload_skips_compression(self, local_storage_service, table, sample_file_content):
+        """Only the upload that creates the record compresses; a duplicate reuses the stored object."""
+        first = await self._store(local_storage_service, sample_file_content)
+
+        with patch.object(local_storage_service, '_compress_file', AsyncMock()) as compress:
+            second = await self._store(local_storage_service, sample_file_content)
+
+        compress.assert_not_awaited()
+        assert second["deduplicated"]
+        assert second["file_path"] == first["file_path"]
+        assert second["is_compressed"] == first["is_compressed"]
+
+
+class TestStorageAuditFlusher:
+    """Test cases for the buffered storage audit writer."""
+
+    @staticmethod
+    def _flusher(session, spill_path, **kwargs):
+        from app.services.storage_metadata import StorageAuditFlusher
+
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = session
+        return StorageAuditFlusher(factory, spill_path=str(spill_path), **kwargs)
+
+    @staticmethod
+    def _row(n):
+        return {"file_path": f"f{n}", "file_hash": "h", "operation": "retrieve", "operation_status": "success"}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_spills_and_replays(self, tmp_path):
+        """Rows the database rejects are written to disk and replayed on the next good flush."""
+        session = AsyncMock()
+        session.execute.side_effect = [Exception("database unavailable"), None, None]
+        flusher = self._flusher(session, tmp_path)
+
+        flusher.add(self._row(1))
+        assert await flusher.flush() == 0
+        assert flusher.spilled == 1
+        assert len(list(tmp_path.glob("audit-*.jsonl"))) == 1
+
+        flusher.add(self._row(2))
+        assert await flusher.flush() == 1
+
+        replayed_rows = session.execute.await_args_list[2].args[1]
+        assert [row["file_path"] for row in replayed_rows] == ["f1"]
+        assert isinstance(replayed_rows[0]["created_at"], datetime)
+        assert not any(tmp_path.iterdir())
+        await flusher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_spills_backlog(self, tmp_path):
+        """A full queue moves its backlog to disk instead of growing."""
+        flusher = self._flusher(AsyncMock(), tmp_path, max_queue_rows=3)
+
+        for n in range(4):
+            flusher.add(self._row(n))
+
+        assert flusher.pending == 0
+        assert flusher.spilled == 4
+        assert flusher.dropped == 0
+        await flusher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_drops_without_spill_directory(self, tmp_path):
+        """With spilling disabled, rows that cannot be queued are dropped and counted."""
+        flusher = self._flusher(AsyncMock(), tmp_path, max_queue_rows=2)
+        flusher._spill_path = None
+
+        with patch.object(settings, "STORAGE_AUDIT_SPILL_ENABLED", False):
+            for n in range(3):
+                flusher.add(self._row(n))
+
+        assert flusher.dropped == 3
+        await flusher.shutdown()
+
+
+class TestCeleryStorageFlush:
+    """Buffered storage rows must not outlive the Celery task that produced them."""
+
+    def test_task_postrun_flushes_buffers(self):
+        """Each finished task writes the rows its event loop left behind."""
+        pytest.importorskip("celery")
+        from app.workers.celery_app import task_postrun_handler
+
+        accumulator = MagicMock(pending=2, flush=AsyncMock())
+        flusher = MagicMock(pending=0, flush=AsyncMock())
+        with patch("app.services.storage_metadata.storage_usage_accumulator", accumulator), \
+                patch("app.services.storage_metadata.storage_audit_flusher", flusher):
+            task_postrun_handler(sender=MagicMock(), task_id="task-1", state="SUCCESS")
+
+        accumulator.flush.assert_awaited_once()
+        flusher.flush.assert_not_awaited()
@@ -0,0 +1,163 @@
+"""
+Unit tests for the MinHash/LSH near-duplicate index.
+"""
+
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.ingestion import DocumentLSHBucket, DocumentMinHash
+from app.services.near_duplicate_index import (
+    LSHIndex,
+    NearDuplicateIndex,
+    band_buckets,
+    estimate_jaccard,
+    exact_jaccard,
+    shingle_text,
+)
+
+INVOICE = "\n".join(
+    [
+        "Acme Corp invoice INV-1001 dated 2026-01-15",
+        "Bill to Northwind Traders 12 Harbour Road",
+    ]
+    + [f"Line {i} widget model {i * 7} quantity {i} unit price {i}.50 total {i * 3}.00" for i in range(1, 30)]
+    + ["Subtotal 1,250.00 tax 125.00 total due 1,375.00"]
+)
+UNRELATED = "\n".join(
+    f"Meeting notes item {i} discussed roadmap owner team{i} follow up next sprint" for i in range(1, 30)
+)
+
+
+def _near_copy(text: str) -> str:
+    """The same document with one line edited."""
+    lines = text.splitlines()
+    lines[5] = "Line 4 widget model 28 quantity 5 unit price 4.75 total 12.00"
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def index() -> NearDuplicateIndex:
+    return NearDuplicateIndex(num_perm=128, bands=32, shingle_size=3)
+
+
+class TestSignatures:
+    """Shingling and MinHash similarity estimates."""
+
+    def test_shingles_are_taken_within_lines(self):
+        shingles = shingle_text("Total due 10.00\nAcme Corp", size=3)
+        assert shingles == {"total due 10.00", "acme corp"}
+
+    def test_signature_estimates_jaccard(self, index):
+        first = index.shingle_hashes(INVOICE)
+        second = index.shingle_hashes(_near_copy(INVOICE))
+        exact = exact_jaccard(first, second)
+
+        estimate = estimate_jaccard(
+            index.signature_for_text(INVOICE)[0], index.signature_for_text(_near_copy(INVOICE))[0]
+        )
+
+        assert exact > 0.8
+        assert abs(estimate - exact) < 0.15
+
+    def test_empty_text_has_no_signature(self, index):
+        assert index.signature_for_text("  \n ") is None
+
+    def test_num_perm_must_split_into_bands(self):
+        with pytest.raises(ValueError):
+            NearDuplicateIndex(num_perm=100, bands=32, shingle_size=3)
+
+
+class TestLSHIndex:
+    """In-memory index: insert, query, threshold and removal."""
+
+    def _signature(self, index: NearDuplicateIndex, text: str) -> np.ndarray:
+        return index.signature_for_text(text)[0]
+
+    def test_query_finds_inserted_near_duplicate(self, index):
+        lsh = LSHIndex(index.bands)
+        lsh.add("original", self._signature(index, INVOICE))
+        lsh.add("unrelated", self._signature(index, UNRELATED))
+
+        matches = lsh.query(self._signature(index, _near_copy(INVOICE)))
+
+        assert len(lsh) == 2
+        assert [key for key, _ in matches] == ["original"]
+        assert matches[0][1] > 0.8
+
+    def test_threshold_filters_weak_candidates(self, index):
+        lsh = LSHIndex(index.bands)
+        lsh.add("original", self._signature(index, INVOICE))
+        query = self._signature(index, _near_copy(INVOICE))
+        score = lsh.query(query)[0][1]
+
+        assert lsh.query(query, threshold=score) == [("original", score)]
+        assert lsh.query(query, threshold=score + 0.01) == []
+
+    def test_removed_documents_are_no_longer_candidates(self, index):
+        lsh = LSHIndex(index.bands)
+        signature = self._signature(index, INVOICE)
+        lsh.add("original", signature)
+        lsh.add("copy", self._signature(index, _near_copy(INVOICE)))
+
+        lsh.remove("original")
+        lsh.remove("missing")
+
+        assert len(lsh) == 1
+        assert "original" not in lsh.candidates(signature)
+        assert [key for key, _ in lsh.query(signature)] == ["copy"]
+
+        lsh.remove("copy")
+        assert lsh.candidates(signature) == {}
+
+
+class TestPersistentIndex:
+    """Rows and SQL written and read by the database-backed index."""
+
+    @pytest.mark.asyncio
+    async def test_add_replaces_previous_rows(self, index):
+        db = MagicMock()
+        db.execute = AsyncMock()
+        job_id = uuid.uuid4()
+        signature, shingle_count = index.signature_for_text(INVOICE)
+
+        await index.add(db, job_id, signature, shingle_count)
+
+        deleted = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in db.execute.await_args_list]
+        assert deleted[0].startswith("DELETE FROM document_lsh_buckets")
+        assert deleted[1].startswith("DELETE FROM document_minhashes")
+
+        minhash = db.add.call_args.args[0]
+        assert isinstance(minhash, DocumentMinHash)
+        assert minhash.shingle_count == shingle_count
+        assert np.array_equal(np.frombuffer(minhash.signature, dtype=np.uint32), signature)
+
+        buckets = db.add_all.call_args.args[0]
+        assert all(isinstance(bucket, DocumentLSHBucket) for bucket in buckets)
+        assert [(bucket.band, bucket.bucket) for bucket in buckets] == band_buckets(signature, index.bands)
+
+    @pytest.mark.asyncio
+    async def test_query_scores_candidates_and_excludes_current_job(self, index):
+        signature = index.signature_for_text(INVOICE)[0]
+        close_job, far_job = MagicMock(name="close"), MagicMock(name="far")
+        result = MagicMock()
+        result.all.return_value = [
+            (far_job, index.signature_for_text(UNRELATED)[0].tobytes()),
+            (close_job, index.signature_for_text(_near_copy(INVOICE))[0].tobytes()),
+        ]
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=result)
+        current = uuid.uuid4()
+
+        matches = await index.query(db, signature, exclude_job_id=current, limit=5)
+
+        assert [job for job, _ in matches] == [close_job, far_job]
+        assert matches[0][1] > 0.8 > matches[1][1]
+
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "document_lsh_buckets.band = " in sql
+        assert "ingestion_jobs.id != " in sql
+        assert "LIMIT" in sql
@@ -0,0 +1,171 @@
+"""
+Unit tests for the parsed invoice shared by the validation service's checks.
+"""
+
+import dataclasses
+import math
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.parsed_invoice import (
+    ENGINE_HEADER_FIELDS,
+    ParsedInvoice,
+    ParsedLine,
+    lenient_amount,
+    parse_amount,
+    parse_date,
+)
+from app.services.validation_service import ValidationService
+
+HEADER = {
+    "vendor_name": "Test Vendor Inc",
+    "invoice_no": "INV-2024-001",
+    "invoice_date": "01/15/2024",
+    "po_number": "PO-2024-001",
+    "subtotal": "1000.00",
+    "tax": 100,
+    "total": 1100.0,
+}
+
+
+class TestParsedInvoice:
+    """Test cases for ParsedInvoice and its parsing helpers."""
+
+    @pytest.mark.parametrize("value", [
+        100, 100.5, 0.1, "100.50", " 42 ", "1e3", "1_000", "-0", True, Decimal("3.14"), 10 ** 20,
+    ])
+    def test_amounts_round_trip_to_the_same_float(self, value):
+        """Any finite number float() accepts parses to a Decimal that converts back to the same float."""
+        parsed = parse_amount(value)
+        assert isinstance(parsed, Decimal)
+        assert float(parsed) == float(value)
+
+    @pytest.mark.parametrize("value", [None, "", "abc", "$100", "1,000", "sNaN", [], {}, object()])
+    def test_values_float_rejects_are_not_amounts(self, value):
+        """Values float() rejects are not amounts."""
+        assert parse_amount(value) is None
+
+    @pytest.mark.parametrize("value", [
+        "nan", "NaN", "inf", "-Infinity", math.nan, math.inf, Decimal("NaN"), Decimal("-Infinity"), "1e400",
+    ])
+    def test_non_finite_values_are_not_amounts(self, value):
+        """NaN and infinities are not amounts, so they are reported rather than compared."""
+        assert parse_amount(value) is None
+        assert ParsedLine.from_raw({"amount": value}).invalid_field == "amount"
+
+    def test_currency_strings(self):
+        """The engine's format allows "$" and "," in amounts; anything else not a number reads as 0 for lines."""
+        assert parse_amount("$1,250.50", currency_strings=True) == Decimal("1250.50")
+        assert parse_amount("$1,250.50") is None
+        assert lenient_amount("$2,501.00") == Decimal("2501.00")
+        assert lenient_amount("n/a") == lenient_amount(None) == lenient_amount("inf") == Decimal(0)
+
+    def test_dates(self):
+        """Supported formats parse; anything else is None."""
+        assert parse_date("2024-01-15") == datetime(2024, 1, 15)
+        assert parse_date(" 15/01/2024 ") == datetime(2024, 1, 15)
+        assert parse_date("2024-01-15 10:30:00") == datetime(2024, 1, 15, 10, 30)
+        assert parse_date("32/13/2024") is None
+        assert parse_date(None) is None
+        assert parse_date(datetime(2024, 1, 15)) == datetime(2024, 1, 15)
+
+    def test_header_fields_are_parsed_once(self):
+        """Typed header fields are ready to use; the raw header stays available read-only."""
+        invoice = ParsedInvoice.from_extraction(HEADER, [])
+
+        assert invoice.invoice_number == "INV-2024-001"
+        assert invoice.invoice_date == datetime(2024, 1, 15)
+        assert (invoice.subtotal, invoice.tax, invoice.total) == (Decimal("1000.00"), Decimal(100), Decimal("1100.0"))
+        assert invoice.currency == "USD"
+        assert invoice.header["subtotal"] == "1000.00"
+        with pytest.raises(TypeError):
+            invoice.header["total"] = 0
+
+    def test_engine_header_fields(self):
+        """The engine's header keys and currency strings parse into the same fields."""
+        header = {
+            "invoice_number": "INV-9",
+            "invoice_date": "2024-01-15",
+            "subtotal_amount": "$1,000.00",
+            "tax_amount": 100,
+            "total_amount": "1100",
+        }
+        invoice = ParsedInvoice.from_extraction(header, [], ENGINE_HEADER_FIELDS)
+
+        assert invoice.invoice_number == "INV-9"
+        assert (invoice.subtotal, invoice.tax, invoice.total) == (Decimal("1000.00"), Decimal(100), Decimal(1100))
+
+    def test_line_defaults_and_invalid_fields(self):
+        """Absent fields take the validators' defaults; unparseable ones are reported in order."""
+        priced = ParsedLine.from_raw({"description": "Widget", "amount": "90"})
+        assert (priced.quantity, priced.unit_price, priced.amount) == (Decimal(1), Decimal(90), Decimal(90))
+        assert priced.invalid_field is None
+
+        empty = ParsedLine.from_raw({})
+        assert (empty.quantity, empty.unit_price, empty.amount) == (Decimal(1), Decimal(0), Decimal(0))
+        assert empty.description == ""
+
+        broken = ParsedLine.from_raw({"quantity": "two", "amount": None})
+        assert broken.invalid == {"quantity", "amount", "unit_price"}
+        assert broken.invalid_field == "amount"
+
+    def test_lines_total_is_computed_once(self):
+        """Lines parse on first use; the line total skips non-numbers and is cached on the instance."""
+        invoice = ParsedInvoice.from_extraction(HEADER, [{"amount": "600.10"}, {"amount": 399.9}, {"amount": "n/a"}])
+        assert invoice._lines is None and invoice._lines_total is None
+
+        assert invoice.lines_total == Decimal("1000.00")
+        assert invoice._lines_total is invoice.lines_total
+
+    def test_instances_are_immutable_and_slotted(self):
+        """Parsed values cannot be reassigned and carry no per-instance dict."""
+        invoice = ParsedInvoice.from_extraction(HEADER, [{"amount": 1}])
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            invoice.total = Decimal(0)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            invoice.lines[0].amount = Decimal(0)
+        assert not hasattr(invoice, "__dict__")
+        assert not hasattr(invoice.lines[0], "__dict__")
+
+    @pytest.mark.asyncio
+    async def test_service_parses_once_for_all_validators(self):
+        """validate_invoice hands the same parsed invoice to every validator."""
+        service = ValidationService()
+        for validator, method in (
+            (service.math_validator, "validate"),
+            (service.matching_validator, "validate"),
+            (service.vendor_policy_validator, "validate"),
+            (service.duplicate_detector, "check"),
+        ):
+            setattr(validator, method, AsyncMock(return_value=None))
+
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = AsyncMock()
+        with patch("app.services.validation_service.AsyncSessionLocal", session_factory), \
+                patch.object(ParsedInvoice, "from_extraction", wraps=ParsedInvoice.from_extraction) as parse:
+            await service.validate_invoice({"header": HEADER, "lines": [{"description": "Widget", "amount": 1000}]})
+
+        parse.assert_called_once()
+        received = [
+            service.math_validator.validate.await_args.args[0],
+            service.matching_validator.validate.await_args.args[0],
+            service.vendor_policy_validator.validate.await_args.args[0],
+            service.duplicate_detector.check.await_args.args[0],
+        ]
+        assert all(isinstance(item, ParsedInvoice) for item in received)
+        assert all(item is received[0] for item in received)
+
+    @pytest.mark.asyncio
+    async def test_non_finite_line_amount_is_reported_as_not_a_number(self):
+        """A NaN line amount fails the math check as not a number instead of slipping past the comparison."""
+        service = ValidationService()
+        invoice = ParsedInvoice.from_extraction(HEADER, [{"description": "Widget", "amount": "NaN", "quantity": 1}])
+        issues = []
+
+        await service.math_validator.validate(invoice, issues)
+
+        assert "Line 1: Invalid amount format - amount is not a number" in [issue.message for issue in issues]
@@ -0,0 +1,27 @@
+"""
+Unit tests for the background storage replicator.
+"""
+
+import asyncio
+
+from app.services.storage_replication import StorageReplicator
+
+
+def test_replicator_survives_one_event_loop_per_task(tmp_path):
+    """Celery runs each task in its own asyncio.run; the queue must follow the running loop."""
+    source, backup = tmp_path / "storage", tmp_path / "backup"
+    source.mkdir()
+    for name in ("first.pdf", "second.pdf"):
+        (source / name).write_bytes(name.encode())
+    replicator = StorageReplicator(source_root=str(source), backup_root=str(backup), max_bytes_per_second=10**9)
+
+    async def task(name):
+        replicator.enqueue(name)
+        await asyncio.wait_for(replicator._queue.join(), timeout=5)
+
+    asyncio.run(task("first.pdf"))
+    asyncio.run(task("second.pdf"))
+
+    assert (backup / "first.pdf").read_bytes() == b"first.pdf"
+    assert (backup / "second.pdf").read_bytes() == b"second.pdf"
+    assert replicator.pending == 0
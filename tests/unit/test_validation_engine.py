@@ -0,0 +1,232 @@
+"""
+Unit tests for ValidationEngine rule scheduling.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import MultipleResultsFound
+
+from app.api.schemas.validation import ValidationSeverity
+from app.core.config import settings
+from app.services.validation_engine import RuleExecutionResult, ValidationEngine, ValidationRule
+from app.services.validation_rule_registry import RuleContext
+from app.services.validation_snapshot import ValidationSnapshot, ilike_contains_pattern
+
+EXTRACTION = {
+    "header": {
+        "vendor_name": "Acme Corp",
+        "invoice_number": "INV-1",
+        "invoice_date": "2026-01-15",
+        "currency": "USD",
+        "subtotal": 100.0,
+        "tax_amount": 10.0,
+        "total_amount": 110.0,
+    },
+    "lines": [{"description": "Widget", "quantity": 1, "unit_price": 100.0, "total_amount": 100.0}],
+    "confidence": {"overall": 0.95},
+}
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory patched into the engine, counting sessions opened."""
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = AsyncMock()
+    with patch("app.services.validation_engine.AsyncSessionLocal", factory):
+        yield factory
+
+
+@pytest.fixture
+def engine():
+    """Engine whose database rules each wait on a simulated 50ms query."""
+    engine = ValidationEngine()
+    running = {"now": 0, "peak": 0}
+
+    def slow_rule(details=None):
+        async def run(rule, *args, **kwargs):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.05)
+            running["now"] -= 1
+            return RuleExecutionResult(rule_name=rule.name, passed=True, details=dict(details or {}))
+        return AsyncMock(side_effect=run)
+
+    engine._validate_vendor = slow_rule({"vendor_id": "vendor-1", "vendor_currency": "EUR"})
+    engine._validate_po_matching = slow_rule()
+    engine._validate_grn_matching = slow_rule()
+    engine._validate_duplicates = slow_rule()
+    engine.running = running
+    return engine
+
+
+class TestValidationEngineScheduling:
+    """Test cases for dependency-aware rule execution."""
+
+    @pytest.mark.asyncio
+    async def test_database_rules_run_concurrently_on_own_sessions(self, engine, session_factory):
+        """Independent database rules overlap, each on a separate session."""
+        started = time.perf_counter()
+        result = await engine.validate_comprehensive(EXTRACTION, invoice_id="invoice-1")
+
+        # Four 50ms rules in parallel, then the currency rule after the vendor rule
+        assert time.perf_counter() - started < 0.15
+        assert engine.running["peak"] == 4
+        assert session_factory.call_count == sum(handler.database for _, handler in engine._rule_plan().steps)
+        assert result.validator_version == "2.0.0"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped_per_invoice(self, engine, session_factory):
+        """No more database rules run at once than the configured limit."""
+        with patch.object(settings, "VALIDATION_RULE_CONCURRENCY", 2):
+            await engine.validate_comprehensive(EXTRACTION, invoice_id="invoice-1")
+
+        assert engine.running["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_currency_reuses_vendor_lookup(self, engine, session_factory):
+        """The currency rule waits for the vendor rule and checks against its vendor without a query."""
+        results = await engine._execute_plan(
+            engine._rule_plan(),
+            RuleContext(EXTRACTION["header"], EXTRACTION["lines"], EXTRACTION["confidence"], invoice_id="invoice-1")
+        )
+
+        currency = results["currency_validation"]
+        assert not currency.passed
+        assert currency.details["vendor_currency"] == "EUR"
+        session = session_factory.return_value.__aenter__.return_value
+        session.execute.assert_not_awaited()
+        # Timings keep sub-millisecond resolution
+        assert isinstance(currency.execution_time_ms, float)
+        assert 0 < results["required_header_fields"].execution_time_ms < 1
+        assert results["vendor_validation"].execution_time_ms >= 50
+
+    @pytest.mark.asyncio
+    async def test_dependency_cycle_fails_validation(self, engine, session_factory):
+        """Rules that depend on each other fail validation instead of deadlocking."""
+        rules = {
+            "business_rules": [
+                ValidationRule("invoice_age_validation", "business_rules", "", ValidationSeverity.WARNING,
+                               depends_on=["amount_limits_validation"]),
+                ValidationRule("amount_limits_validation", "business_rules", "", ValidationSeverity.WARNING,
+                               depends_on=["invoice_age_validation"]),
+            ]
+        }
+
+        result = await engine.validate_comprehensive(EXTRACTION, custom_rules=rules)
+
+        assert not result.passed
+        assert "cycle" in result.issues[0].message
+
+
+def _vendor(name: str, currency: str = "USD") -> MagicMock:
+    """Active vendor row."""
+    vendor = MagicMock()
+    vendor.id = uuid.uuid4()
+    vendor.name = name
+    vendor.currency = currency
+    vendor.active = True
+    return vendor
+
+
+def _fingerprint_row(
+    invoice_id: uuid.UUID, vendor_key: str, invoice_number_key: str, vendor_id: Optional[uuid.UUID] = None
+) -> tuple:
+    """(Invoice, InvoiceExtraction, InvoiceFingerprint) row as the bulk lookups return it."""
+    fingerprint = MagicMock(
+        invoice_id=invoice_id, vendor_key=vendor_key, invoice_number_key=invoice_number_key, vendor_id=vendor_id
+    )
+    extraction = MagicMock(header_json={"total_amount": 110.0})
+    return MagicMock(id=invoice_id), extraction, fingerprint
+
+
+class TestValidationEngineBatch:
+    """Test cases for batch validation against a prefetched snapshot."""
+
+    @pytest.mark.asyncio
+    async def test_batch_prefetches_reference_data_once(self, session_factory):
+        """A batch costs one vendor, one invoice-vendor and two fingerprint queries, whatever its size."""
+        first_id, second_id, third_id = (uuid.uuid4() for _ in range(3))
+        acme = _vendor("Acme Corp")
+        vendors = MagicMock()
+        vendors.scalars.return_value = [acme]
+        rows = [
+            _fingerprint_row(first_id, "acme corp", "INV1", acme.id),
+            _fingerprint_row(second_id, "acme corp", "INV1", acme.id),
+        ]
+        invoice_vendors, fingerprints, vendor_fingerprints = MagicMock(), MagicMock(), MagicMock()
+        invoice_vendors.all.return_value = [(first_id, acme.id), (second_id, acme.id), (third_id, None)]
+        fingerprints.all.return_value = rows
+        vendor_fingerprints.all.return_value = rows
+        session = session_factory.return_value.__aenter__.return_value
+        session.execute = AsyncMock(side_effect=[vendors, invoice_vendors, fingerprints, vendor_fingerprints])
+
+        unknown_vendor = {**EXTRACTION, "header": {**EXTRACTION["header"], "vendor_name": "Globex", "invoice_number": "G-7"}}
+        results = await ValidationEngine().validate_batch({
+            str(first_id): EXTRACTION,
+            str(second_id): EXTRACTION,
+            str(third_id): unknown_vendor,
+        })
+
+        assert session.execute.await_count == 4
+        assert session_factory.call_count == 1
+        # Each of the first two invoices is the other's duplicate, but not its own
+        first = results[str(first_id)]
+        assert first.duplicate_check_result.is_duplicate
+        assert first.duplicate_check_result.match_criteria["duplicate_count"] == 1
+        assert first.vendor_policy_result.vendor_active
+        third = results[str(third_id)]
+        assert not third.duplicate_check_result.is_duplicate
+        assert not third.vendor_policy_result.vendor_active
+
+    def test_snapshot_matches_vendors_like_ilike(self):
+        """Vendor lookups follow ILIKE '%name%' semantics, including ambiguity errors."""
+        snapshot = ValidationSnapshot([_vendor("Acme Corp"), _vendor("Acme Corporation Ltd"), _vendor("Globex")], {})
+
+        assert snapshot.find_vendor("globex").name == "Globex"
+        assert snapshot.find_vendor("Initech") is None
+        with pytest.raises(MultipleResultsFound):
+            snapshot.find_vendor("acme")
+        assert ilike_contains_pattern("A_me%Ltd").search("Acme Corporation Ltd")
+        assert not ilike_contains_pattern("100\\%").search("1000")
+
+    def test_snapshot_duplicates_match_the_invoice_vendor(self):
+        """A name variant still matches through the vendor record the invoice resolved to."""
+        acme = _vendor("ACME Incorporated")
+        current = uuid.uuid4()
+        earlier = _fingerprint_row(uuid.uuid4(), "acme incorporated", "INV1", acme.id)
+        snapshot = ValidationSnapshot([acme], {}, {(acme.id, "INV1"): [earlier]}, {str(current): acme.id})
+
+        assert snapshot.find_duplicates("Acme Inc", "inv-1", vendor_id=str(acme.id)) == [earlier]
+        assert snapshot.find_duplicates("Acme Inc", "inv-1", exclude_invoice_id=str(current)) == [earlier]
+        assert snapshot.find_duplicates("Acme Inc", "inv-1") == []
+        assert snapshot.find_duplicates("Acme Inc", "inv-2", vendor_id=acme.id) == []
+        assert snapshot.find_duplicates("Acme Inc", "INV1", exclude_invoice_id=earlier[2].invoice_id) == []
+
+        # Matching on both the name and the vendor record reports the invoice once
+        both = ValidationSnapshot([acme], {("acme incorporated", "INV1"): [earlier]}, {(acme.id, "INV1"): [earlier]})
+        assert both.find_duplicates("ACME Incorporated", "INV1", vendor_id=acme.id) == [earlier]
+
+
+class TestValidationEngineFormats:
+    """Test cases for the engine's format rule on the shared parsed invoice."""
+
+    @pytest.mark.asyncio
+    async def test_field_formats_use_parsed_header(self):
+        """Currency-formatted amounts pass; non-numbers, negatives and NaN do not."""
+        engine = ValidationEngine()
+        rule = next(rule for rules in engine.rules.values() for rule in rules if rule.name == "field_format_validation")
+        header = {**EXTRACTION["header"], "total_amount": "$1,100.00"}
+        lines = [{"total_amount": "$100.00"}, {"total_amount": "NaN"}, {"amount": -5}]
+
+        result = await engine._validate_field_formats(rule, header, lines)
+
+        assert [issue["field"] for issue in result.details["format_issues"]] == ["line_2_amount", "line_3_amount"]
+
+        context = RuleContext({**header, "invoice_date": "15th Jan", "total_amount": "inf"}, [], {})
+        result = await engine._validate_field_formats(rule, context.header, context.lines, context.parsed)
+        assert [issue["field"] for issue in result.details["format_issues"]] == ["invoice_date", "total_amount"]
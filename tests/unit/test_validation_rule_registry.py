@@ -0,0 +1,83 @@
+"""
+Unit tests for the validation rule registry and compiled rule plans.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.api.schemas.validation import ValidationSeverity
+from app.core.exceptions import ValidationException
+from app.services.validation_engine import ValidationEngine, ValidationRule
+from app.services.validation_rule_registry import rule_registry
+
+VENDOR_ID = "7d1f5c1e-0000-4000-8000-000000000001"
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Start and finish each test without vendor overrides or cached plans."""
+    rule_registry.set_vendor_overrides(VENDOR_ID, {})
+    rule_registry.clear_plans()
+    yield
+    rule_registry.set_vendor_overrides(VENDOR_ID, {})
+    rule_registry.clear_plans()
+
+
+class TestRuleRegistry:
+    """Test cases for RuleRegistry."""
+
+    def test_every_built_in_rule_has_a_handler(self):
+        """The built-in rule set compiles, so no rule falls through to runtime lookup."""
+        plan = ValidationEngine()._rule_plan()
+
+        assert set(plan.rule_names) <= set(rule_registry.list_rules())
+        assert {rule.name for rule, handler in plan.steps if handler.database} == {
+            "vendor_validation",
+            "currency_validation",
+            "po_matching_validation",
+            "grn_matching_validation",
+            "duplicate_detection",
+        }
+
+    def test_plan_is_compiled_once_per_version(self):
+        """Engines share the cached plan instead of rebuilding their rules."""
+        first = ValidationEngine()
+        with patch.object(ValidationEngine, "_initialize_rules") as build:
+            second = ValidationEngine()
+
+        build.assert_not_called()
+        assert first.rules is second.rules
+        assert first._rule_plan(vendor_id="another-vendor") is first._rule_plan()
+
+    def test_vendor_overrides_compile_their_own_plan(self):
+        """Overrides apply to the vendor's plan only, and replacing them recompiles it."""
+        rule_registry.set_vendor_overrides(VENDOR_ID, {
+            "amount_limits_validation": {"parameters": {"max_total_amount": 5000000}},
+            "invoice_age_validation": {"enabled": False},
+        })
+        engine = ValidationEngine()
+
+        vendor_plan = engine._rule_plan(vendor_id=VENDOR_ID)
+        vendor_rules = {rule.name: rule for rule, _ in vendor_plan.steps}
+        assert vendor_rules["amount_limits_validation"].parameters["max_total_amount"] == 5000000
+        assert "invoice_age_validation" not in vendor_rules
+        base_rules = {rule.name: rule for rule, _ in engine._rule_plan().steps}
+        assert base_rules["amount_limits_validation"].parameters["max_total_amount"] == 1000000
+        assert engine._rule_plan(vendor_id=VENDOR_ID) is vendor_plan
+
+        rule_registry.set_vendor_overrides(VENDOR_ID, {"invoice_age_validation": {"enabled": False}})
+        assert engine._rule_plan(vendor_id=VENDOR_ID) is not vendor_plan
+
+    def test_unknown_rules_fail_at_compile_time(self):
+        """Custom rules naming no registered handler are rejected when compiled."""
+        custom_rules = {
+            "business_rules": [
+                ValidationRule("made_up_rule", "business_rules", "", ValidationSeverity.ERROR),
+            ]
+        }
+
+        with pytest.raises(ValidationException, match="made_up_rule"):
+            ValidationEngine()._rule_plan(custom_rules=custom_rules)
+        with pytest.raises(ValidationException, match="made_up_rule"):
+            rule_registry.set_vendor_overrides(VENDOR_ID, {"made_up_rule": {"enabled": False}})
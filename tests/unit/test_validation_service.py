@@ -4,6 +4,7 @@ Unit tests for ValidationService comprehensive invoice validation.
 
 import asyncio
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Any, Dict, List
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -24,6 +25,7 @@ from app.api.schemas.validation import (
     ValidationRulesConfig,
 )
 from app.models.reference import Vendor, PurchaseOrder, GoodsReceiptNote
+from app.services.parsed_invoice import ParsedInvoice, ParsedLine, parse_amount, parse_date
 
 
 class TestValidationService:
@@ -175,7 +177,7 @@ class TestValidationService:
         issues = []
 
         result = await validation_service._validate_header(
-            header, issues, validation_service.rules_config
+            ParsedInvoice.from_extraction(header, []), issues, validation_service.rules_config
         )
 
         assert result is True
@@ -192,7 +194,7 @@ class TestValidationService:
         issues = []
 
         result = await validation_service._validate_header(
-            header, issues, validation_service.rules_config
+            ParsedInvoice.from_extraction(header, []), issues, validation_service.rules_config
         )
 
         assert result is False
@@ -215,7 +217,9 @@ class TestValidationService:
             "currency": "INVALID",  # Invalid currency
         }
 
-        await validation_service._validate_header_formats(header, issues, validation_service.rules_config)
+        await validation_service._validate_header_formats(
+            ParsedInvoice.from_extraction(header, []), issues, validation_service.rules_config
+        )
 
         assert len(issues) >= 2
         error_codes = [issue.code for issue in issues]
@@ -235,7 +239,7 @@ class TestValidationService:
         issues = []
 
         result = await validation_service._validate_lines(
-            lines, issues, validation_service.rules_config
+            ParsedInvoice.from_extraction({}, lines), issues, validation_service.rules_config
         )
 
         assert result is True
@@ -258,7 +262,7 @@ class TestValidationService:
         issues = []
 
         result = await validation_service._validate_lines(
-            lines, issues, validation_service.rules_config
+            ParsedInvoice.from_extraction({}, lines), issues, validation_service.rules_config
         )
 
         assert result is False
@@ -281,7 +285,7 @@ class TestValidationService:
         }
 
         await validation_service._validate_line_amounts(
-            line, 0, issues, validation_service.rules_config
+            ParsedLine.from_raw(line), 0, issues, validation_service.rules_config
         )
         assert len(issues) == 0
 
@@ -290,7 +294,7 @@ class TestValidationService:
         line["amount"] = 0.001  # Below minimum
 
         await validation_service._validate_line_amounts(
-            line, 0, issues, validation_service.rules_config
+            ParsedLine.from_raw(line), 0, issues, validation_service.rules_config
         )
         assert len(issues) > 0
 
@@ -299,7 +303,7 @@ class TestValidationService:
         line["amount"] = 200000.00  # Above maximum
 
         await validation_service._validate_line_amounts(
-            line, 0, issues, validation_service.rules_config
+            ParsedLine.from_raw(line), 0, issues, validation_service.rules_config
         )
         assert len(issues) > 0
 
@@ -308,7 +312,7 @@ class TestValidationService:
         line["amount"] = 90.00  # Doesn't match 2 x 50.00
 
         await validation_service._validate_line_amounts(
-            line, 0, issues, validation_service.rules_config
+            ParsedLine.from_raw(line), 0, issues, validation_service.rules_config
         )
         assert len(issues) > 0
 
@@ -322,7 +326,7 @@ class TestValidationService:
         ]
 
         for date_str, expected in valid_dates:
-            result = validation_service._parse_date(date_str)
+            result = parse_date(date_str)
             assert result == expected
 
         invalid_dates = [
@@ -333,7 +337,7 @@ class TestValidationService:
         ]
 
         for invalid_date in invalid_dates:
-            result = validation_service._parse_date(invalid_date)
+            result = parse_date(invalid_date)
             assert result is None
 
     def test_is_valid_amount(self, validation_service: ValidationService):
@@ -342,10 +346,10 @@ class TestValidationService:
         invalid_amounts = [None, "", "invalid", [], {}]
 
         for amount in valid_amounts:
-            assert validation_service._is_valid_amount(amount) is True
+            assert parse_amount(amount) == Decimal(str(amount))
 
         for amount in invalid_amounts:
-            assert validation_service._is_valid_amount(amount) is False
+            assert parse_amount(amount) is None
 
     def test_calculate_confidence_score(self, validation_service: ValidationService):
         """Test confidence score calculation."""
@@ -385,7 +389,7 @@ class TestValidationService:
             "tax": 100.00,
         }
 
-        summary = validation_service._create_header_summary(header)
+        summary = validation_service._create_header_summary(ParsedInvoice.from_extraction(header, []))
 
         assert summary["vendor_name"] == "Test Vendor"
         assert summary["invoice_no"] == "INV-001"
@@ -400,7 +404,7 @@ class TestValidationService:
             {"description": "Test Product 3", "amount": 150.00},
         ]
 
-        summary = validation_service._create_lines_summary(lines)
+        summary = validation_service._create_lines_summary(ParsedInvoice.from_extraction({}, lines))
 
         assert summary["count"] == 3
         assert summary["total"] == 450.00
@@ -409,7 +413,7 @@ class TestValidationService:
 
     def test_create_lines_summary_empty(self, validation_service: ValidationService):
         """Test lines summary creation with empty lines."""
-        summary = validation_service._create_lines_summary([])
+        summary = validation_service._create_lines_summary(ParsedInvoice.from_extraction({}, []))
 
         assert summary["count"] == 0
         assert summary["total"] == 0.0
@@ -440,7 +444,7 @@ class TestMathValidator:
         ]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result is not None
         assert result.subtotal_match is True
@@ -462,7 +466,7 @@ class TestMathValidator:
         ]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result is not None
         assert result.subtotal_match is False
@@ -486,7 +490,7 @@ class TestMathValidator:
         ]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result is not None
         assert result.total_match is False
@@ -503,7 +507,7 @@ class TestMathValidator:
         lines = [{"amount": 100.00}]
         issues = []
 
-        result = await math_validator.validate(header, lines, issues)
+        result = await math_validator.validate(ParsedInvoice.from_extraction(header, lines), issues)
 
         assert result is not None
         assert result.subtotal_match is None
@@ -522,7 +526,7 @@ class TestMathValidator:
         line = {"quantity": 2, "unit_price": 50.00, "amount": 100.00}
         line_validation = {"valid": True}
 
-        await math_validator._validate_line_math(line, 0, issues, line_validation)
+        await math_validator._validate_line_math(ParsedLine.from_raw(line), 0, issues, line_validation)
         assert len(issues) == 0
         assert line_validation["valid"] is True
 
@@ -530,7 +534,7 @@ class TestMathValidator:
         issues.clear()
         line["amount"] = 90.00  # Doesn't match 2 x 50.00
 
-        await math_validator._validate_line_math(line, 0, issues, line_validation)
+        await math_validator._validate_line_math(ParsedLine.from_raw(line), 0, issues, line_validation)
         assert len(issues) > 0
         assert line_validation["valid"] is False
 
@@ -595,7 +599,7 @@ class TestMatchingValidator:
             mock_select.return_value.where.return_value = mock_grn_result
 
             issues = []
-            result = await matching_validator.validate(header, lines, mock_session, issues)
+            result = await matching_validator.validate(ParsedInvoice.from_extraction(header, lines), mock_session, issues)
 
             assert result is not None
             assert result.po_found is True
@@ -622,7 +626,7 @@ class TestMatchingValidator:
             mock_select.return_value.join.return_value.where.return_value = mock_result
 
             issues = []
-            result = await matching_validator.validate(header, lines, mock_session, issues)
+            result = await matching_validator.validate(ParsedInvoice.from_extraction(header, lines), mock_session, issues)
 
             assert result is not None
             assert result.po_found is False
@@ -656,7 +660,7 @@ class TestMatchingValidator:
             mock_select.return_value.where.return_value = mock_po_result
 
             issues = []
-            result = await matching_validator.validate(header, [], mock_session, issues)
+            result = await matching_validator.validate(ParsedInvoice.from_extraction(header, []), mock_session, issues)
 
             assert result is not None
             assert result.po_amount_match is False
@@ -707,7 +711,7 @@ class TestVendorPolicyValidator:
 
                 issues = []
                 result = await vendor_policy_validator.validate(
-                    header, None, mock_session, issues
+                    ParsedInvoice.from_extraction(header, []), None, mock_session, issues
                 )
 
                 assert result is not None
@@ -735,7 +739,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                header, None, mock_session, issues
+                ParsedInvoice.from_extraction(header, []), None, mock_session, issues
             )
 
             assert result is not None
@@ -766,7 +770,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                header, None, mock_session, issues
+                ParsedInvoice.from_extraction(header, []), None, mock_session, issues
             )
 
             assert result is not None
@@ -797,7 +801,7 @@ class TestVendorPolicyValidator:
 
             issues = []
             result = await vendor_policy_validator.validate(
-                header, None, mock_session, issues
+                ParsedInvoice.from_extraction(header, []), None, mock_session, issues
             )
 
             assert result is not None
@@ -835,7 +839,7 @@ class TestVendorPolicyValidator:
             with patch('sqlalchemy.func.sum') as mock_sum:
                 issues = []
                 result = await vendor_policy_validator.validate(
-                    header, None, mock_session, issues
+                    ParsedInvoice.from_extraction(header, []), None, mock_session, issues
                 )
 
                 assert result is not None
@@ -869,13 +873,14 @@ class TestDuplicateDetector:
 
         mock_session = AsyncMock(spec=AsyncSession)
 
-        with patch('sqlalchemy.select') as mock_select:
-            mock_result = AsyncMock()
-            mock_result.all.return_value = []  # No duplicates found
-            mock_select.return_value.join.return_value.where.return_value = mock_result
-
+        with patch(
+            'app.services.validation_service.invoice_fingerprint_service.find_duplicates',
+            new=AsyncMock(return_value=[])  # No duplicates found
+        ) as mock_find:
             issues = []
-            result = await duplicate_detector.check(header, None, mock_session, issues)
+            result = await duplicate_detector.check(ParsedInvoice.from_extraction(header, []), None, mock_session, issues)
+
+            mock_find.assert_awaited_once_with(mock_session, "Test Vendor", "INV-001", exclude_invoice_id=None)
 
             assert result is not None
             assert result.is_duplicate is False
@@ -901,16 +906,15 @@ class TestDuplicateDetector:
             "invoice_date": "2024-01-15",
         }
 
-        with patch('sqlalchemy.select') as mock_select:
-            mock_result = AsyncMock()
-            mock_result.all.return_value = [(mock_duplicate_invoice, mock_duplicate_extraction)]
-            mock_select.return_value.join.return_value.where.return_value = mock_result
-
+        with patch(
+            'app.services.validation_service.invoice_fingerprint_service.find_duplicates',
+            new=AsyncMock(return_value=[(mock_duplicate_invoice, mock_duplicate_extraction, MagicMock())])
+        ):
             with patch.object(duplicate_detector, '_extract_header_value') as mock_extract:
                 mock_extract.side_effect = lambda json_dict, key: json_dict.get(key, "")
 
                 issues = []
-                result = await duplicate_detector.check(header, None, mock_session, issues)
+                result = await duplicate_detector.check(ParsedInvoice.from_extraction(header, []), None, mock_session, issues)
 
                 assert result is not None
                 assert result.is_duplicate is True
@@ -931,7 +935,7 @@ class TestDuplicateDetector:
         mock_session = AsyncMock(spec=AsyncSession)
         issues = []
 
-        result = await duplicate_detector.check(header, None, mock_session, issues)
+        result = await duplicate_detector.check(ParsedInvoice.from_extraction(header, []), None, mock_session, issues)
 
         assert result is not None
         assert result.is_duplicate is False